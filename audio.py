@@ -7,89 +7,504 @@ Usage:
     python wav_receiver.py COM3        # Windows
     python wav_receiver.py /dev/ttyUSB0  # Linux
     python wav_receiver.py /dev/tty.usbserial  # Mac
+    python wav_receiver.py /dev/ttyUSB0 921600  # Faster link (firmware must match)
 """
 
 import serial
 import sys
-import base64
+import binascii
+import io
+import os
+import struct
 import time
+import wave
+
+import numpy as np
+
+# Serial reads block for up to READ_TIMEOUT seconds instead of polling
+# in_waiting; a transfer that goes quiet for IDLE_TIMEOUT seconds is abandoned
+READ_TIMEOUT = 0.5
+IDLE_TIMEOUT = 10.0
+
+BEGIN_MARKER = b"---BEGIN WAV FILE---"
+END_MARKER = b"---END WAV FILE---"
+BASE64_WHITESPACE = b" \t\r\n"
+
+
+class Base64StreamDecoder:
+    """Decode base64 as it arrives, carrying incomplete 4-character groups to the next chunk."""
+
+    def __init__(self, out):
+        self.out = out
+        self.pending = b""
+        self.decoded = 0
+
+    def feed(self, chunk):
+        data = self.pending + chunk.translate(None, BASE64_WHITESPACE)
+        usable = len(data) - len(data) % 4
+        self.pending = data[usable:]
+        if usable:
+            decoded = binascii.a2b_base64(data[:usable])
+            self.out.write(decoded)
+            self.decoded += len(decoded)
+
+    def finish(self):
+        if self.pending:
+            raise ValueError(f"Truncated base64 data ({len(self.pending)} stray characters)")
+        return self.decoded
+
+
+def read_available(ser):
+    """Block until at least one byte arrives (or READ_TIMEOUT), then take everything buffered."""
+    return ser.read(max(ser.in_waiting, 1))
+
 
 def receive_base64_wav(ser, output_file="recording.wav"):
     """Receive base64-encoded WAV file"""
     print("Waiting for WAV data...")
     print("(Send 'd' command from ESP32 Serial Monitor)\n")
-    
-    in_data = False
-    base64_data = ""
-    
+
+    ser.timeout = READ_TIMEOUT
+    buffer = b""
+
+    # Skip log output until the begin marker
     while True:
-        if ser.in_waiting > 0:
-            line = ser.readline().decode('utf-8', errors='ignore').strip()
-            
-            if "---BEGIN WAV FILE---" in line:
-                print("✓ Receiving data...")
-                in_data = True
-                base64_data = ""
-                continue
-            
-            if "---END WAV FILE---" in line:
-                print("✓ Data received, decoding...")
+        buffer += read_available(ser)
+        start = buffer.find(BEGIN_MARKER)
+        if start >= 0:
+            line_end = buffer.find(b"\n", start)
+            if line_end >= 0:
+                buffer = buffer[line_end + 1:]
                 break
-            
-            if in_data:
-                base64_data += line
-    
-    # Decode base64
+        else:
+            # Keep enough of the tail to catch a marker split across reads
+            buffer = buffer[-len(BEGIN_MARKER):]
+
+    print("✓ Receiving data...")
+    started = time.perf_counter()
+    last_data = started
+
+    # Decode straight into the output file; base64 never contains '-' so the
+    # end marker can't appear inside the payload
     try:
-        wav_data = base64.b64decode(base64_data)
-        
-        # Save to file
-        with open(output_file, 'wb') as f:
-            f.write(wav_data)
-        
-        print(f"✓ WAV file saved: {output_file}")
-        print(f"  Size: {len(wav_data)} bytes")
-        print(f"\nYou can now play it with any media player!")
-        
-    except Exception as e:
+        with open(output_file + ".part", "wb") as f:
+            decoder = Base64StreamDecoder(f)
+            while True:
+                end = buffer.find(END_MARKER)
+                if end >= 0:
+                    decoder.feed(buffer[:end])
+                    break
+                keep = len(END_MARKER) - 1
+                decoder.feed(buffer[:-keep])
+                buffer = buffer[-keep:]
+
+                chunk = read_available(ser)
+                now = time.perf_counter()
+                if chunk:
+                    last_data = now
+                elif now - last_data > IDLE_TIMEOUT:
+                    raise TimeoutError(f"No data for {IDLE_TIMEOUT:.0f}s")
+                buffer += chunk
+
+            size = decoder.finish()
+        os.replace(output_file + ".part", output_file)
+    except (ValueError, binascii.Error, TimeoutError) as e:
         print(f"✗ Error decoding: {e}")
+        if os.path.exists(output_file + ".part"):
+            os.remove(output_file + ".part")
+        return None
+
+    elapsed = time.perf_counter() - started
+    print("✓ Data received")
+    print(f"✓ WAV file saved: {output_file}")
+    print(f"  Size: {size} bytes in {elapsed:.2f}s ({size / max(elapsed, 1e-9) / 1024:.1f} KB/s)")
+    print(f"\nYou can now play it with any media player!")
+    return size
+
+# Framed binary transfer ('s' command)
+#
+# Every frame: SYNC (A5 5A) | type u8 | seq u32 | length u16 | payload | crc32 u32
+# All integers are little endian; the CRC covers type through payload.
+#
+#   glove -> host  HEADER  payload: "GLWV" | total_length u32 | sample_rate u32 |
+#                                   channels u8 | bits u8 | chunk_size u16 | chunk_count u32 |
+#                                   codec u8 | frames u32
+#                  DATA    seq = chunk index, payload = encoded audio at seq * chunk_size
+#                  END     no payload; sent after the last chunk and after each resend
+#   host -> glove  ACK     everything arrived
+#                  NAK     payload: u32 seq of each chunk to resend (HEADER_SEQ = header)
+#
+# The host answers each END with ACK or NAK, and sends a NAK on its own if
+# the link goes quiet for RESEND_TIMEOUT mid-transfer (e.g. END was lost).
+FRAME_SYNC = b"\xa5\x5a"
+FRAME_HEADER = struct.Struct("<2sBIH")
+FRAME_CRC = struct.Struct("<I")
+WAV_HEADER = struct.Struct("<4sIIBBHIBI")
+WAV_MAGIC = b"GLWV"
+
+FRAME_TYPE_HEADER = 0x01
+FRAME_TYPE_DATA = 0x02
+FRAME_TYPE_END = 0x03
+FRAME_TYPE_ACK = 0x10
+FRAME_TYPE_NAK = 0x11
+FRAME_TYPES = {FRAME_TYPE_HEADER, FRAME_TYPE_DATA, FRAME_TYPE_END, FRAME_TYPE_ACK, FRAME_TYPE_NAK}
+
+HEADER_SEQ = 0xFFFFFFFF
+MAX_FRAME_PAYLOAD = 8192
+MAX_NAK_SEQS = 256
+MAX_RESEND_ROUNDS = 10
+RESEND_TIMEOUT = 1.0
+
+DEFAULT_BAUD = 115200
+
+# Payload codecs. total_length is the encoded size; bits and frames describe
+# the 16-bit PCM the host rebuilds. Compressed transfers are mono.
+CODEC_PCM = 0
+CODEC_MULAW = 1
+CODEC_IMA_ADPCM = 2
+CODEC_NAMES = {CODEC_PCM: "PCM", CODEC_MULAW: "mu-law", CODEC_IMA_ADPCM: "IMA-ADPCM"}
+
+# G.711 mu-law
+MULAW_BIAS = 0x84
+MULAW_CLIP = 32635
+
+# IMA-ADPCM in WAV-style blocks: predictor i16 | step index u8 | reserved u8,
+# then two 4-bit codes per byte (low nibble first)
+ADPCM_BLOCK_ALIGN = 256
+ADPCM_BLOCK_HEADER = 4
+ADPCM_SAMPLES_PER_BLOCK = 1 + (ADPCM_BLOCK_ALIGN - ADPCM_BLOCK_HEADER) * 2
+ADPCM_STEPS = np.array([
+    7, 8, 9, 10, 11, 12, 13, 14, 16, 17, 19, 21, 23, 25, 28, 31, 34, 37, 41, 45,
+    50, 55, 60, 66, 73, 80, 88, 97, 107, 118, 130, 143, 157, 173, 190, 209, 230,
+    253, 279, 307, 337, 371, 408, 449, 494, 544, 598, 658, 724, 796, 876, 963,
+    1060, 1166, 1282, 1411, 1552, 1707, 1878, 2066, 2272, 2499, 2749, 3024, 3327,
+    3660, 4026, 4428, 4871, 5358, 5894, 6484, 7132, 7845, 8630, 9493, 10442,
+    11487, 12635, 13899, 15289, 16818, 18500, 20350, 22385, 24623, 27086, 29794,
+    32767
+], dtype=np.int32)
+ADPCM_INDEX_ADJUST = np.array([-1, -1, -1, -1, 2, 4, 6, 8] * 2, dtype=np.int32)
+
+
+def encode_frame(frame_type, seq=0, payload=b""):
+    body = FRAME_HEADER.pack(FRAME_SYNC, frame_type, seq, len(payload)) + payload
+    return body + FRAME_CRC.pack(binascii.crc32(body[2:]))
+
+
+class FrameParser:
+    """
+    Receiver state machine: SYNC -> HEADER -> BODY -> SYNC.
+
+    feed() returns (type, seq, payload) for each frame with a valid CRC.
+    Damaged frames are counted and skipped by hunting for the next sync.
+    """
+
+    SYNC, HEADER, BODY = "sync", "header", "body"
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.state = self.SYNC
+        self.frame_length = 0
+        self.crc_errors = 0
+
+    def feed(self, data):
+        self.buffer += data
+        frames = []
+        while True:
+            if self.state == self.SYNC:
+                start = self.buffer.find(FRAME_SYNC)
+                if start < 0:
+                    del self.buffer[:max(len(self.buffer) - 1, 0)]
+                    return frames
+                del self.buffer[:start]
+                self.state = self.HEADER
+
+            if self.state == self.HEADER:
+                if len(self.buffer) < FRAME_HEADER.size:
+                    return frames
+                _, frame_type, _, length = FRAME_HEADER.unpack_from(self.buffer)
+                if frame_type not in FRAME_TYPES or length > MAX_FRAME_PAYLOAD:
+                    # Not a real frame start; resume the hunt past this sync
+                    del self.buffer[:1]
+                    self.state = self.SYNC
+                    continue
+                self.frame_length = FRAME_HEADER.size + length + FRAME_CRC.size
+                self.state = self.BODY
+
+            if self.state == self.BODY:
+                if len(self.buffer) < self.frame_length:
+                    return frames
+                body_end = self.frame_length - FRAME_CRC.size
+                (crc,) = FRAME_CRC.unpack_from(self.buffer, body_end)
+                if binascii.crc32(memoryview(self.buffer)[2:body_end]) == crc:
+                    _, frame_type, seq, _ = FRAME_HEADER.unpack_from(self.buffer)
+                    frames.append((frame_type, seq, bytes(self.buffer[FRAME_HEADER.size:body_end])))
+                    del self.buffer[:self.frame_length]
+                else:
+                    self.crc_errors += 1
+                    del self.buffer[:1]
+                self.state = self.SYNC
+
+
+# Codecs
+#
+# Both decoders are vectorized: mu-law is a 256-entry lookup table, and
+# IMA-ADPCM steps through sample positions once while decoding every block
+# in parallel (blocks restart the predictor, so they are independent).
+
+def mulaw_encode(samples):
+    """int16 samples -> mu-law bytes, matching G.711 (and audioop.lin2ulaw) bit for bit"""
+    # G.711 works on 14-bit samples; the arithmetic shift floors negative
+    # values, which the reference does too
+    samples = np.asarray(samples, dtype=np.int32) >> 2
+    mask = np.where(samples < 0, 0x7F, 0xFF)
+    magnitude = np.minimum(np.abs(samples), MULAW_CLIP >> 2) + (MULAW_BIAS >> 2)
+    exponent = np.clip(np.floor(np.log2(magnitude)).astype(np.int32) - 5, 0, 7)
+    code = (exponent << 4) | ((magnitude >> (exponent + 1)) & 0x0F)
+    # Magnitudes past the top segment saturate at the largest code
+    code = np.where(magnitude > 0x1FFF, 0x7F, code)
+    return (code ^ mask).astype(np.uint8).tobytes()
+
+
+def _mulaw_table():
+    code = ~np.arange(256, dtype=np.int32) & 0xFF
+    exponent = (code >> 4) & 0x07
+    magnitude = (((code & 0x0F) << 3) + MULAW_BIAS << exponent) - MULAW_BIAS
+    return np.where(code & 0x80, -magnitude, magnitude).astype(np.int16)
+
+
+MULAW_TABLE = _mulaw_table()
+
+
+def mulaw_decode(data):
+    """mu-law bytes -> int16 samples"""
+    return MULAW_TABLE[np.frombuffer(data, dtype=np.uint8)]
+
+
+def ima_adpcm_encode(samples):
+    """int16 mono samples -> IMA-ADPCM blocks of ADPCM_BLOCK_ALIGN bytes"""
+    samples = np.asarray(samples, dtype=np.int32)
+    block_count = max(-(-len(samples) // ADPCM_SAMPLES_PER_BLOCK), 1)
+    blocks = np.zeros(block_count * ADPCM_SAMPLES_PER_BLOCK, dtype=np.int32)
+    blocks[:len(samples)] = samples
+    blocks = blocks.reshape(block_count, ADPCM_SAMPLES_PER_BLOCK)
+
+    # Start each block with a step size that fits its opening slope
+    slope = np.abs(np.diff(blocks[:, :9], axis=1)).mean(axis=1)
+    index = np.clip(np.searchsorted(ADPCM_STEPS, slope / 2), 0, 88).astype(np.int32)
+    predictor = blocks[:, 0].copy()
+    header_index = index.copy()
+
+    codes = np.empty((block_count, ADPCM_SAMPLES_PER_BLOCK - 1), dtype=np.int32)
+    for position in range(1, ADPCM_SAMPLES_PER_BLOCK):
+        step = ADPCM_STEPS[index]
+        diff = blocks[:, position] - predictor
+        code = np.where(diff < 0, 8, 0)
+        diff = np.abs(diff)
+        delta = step >> 3
+        for bit, scale in ((4, 0), (2, 1), (1, 2)):
+            part = step >> scale
+            hit = diff >= part
+            code |= np.where(hit, bit, 0)
+            diff = np.where(hit, diff - part, diff)
+            delta = np.where(hit, delta + part, delta)
+        predictor = np.clip(np.where(code & 8, predictor - delta, predictor + delta), -32768, 32767)
+        index = np.clip(index + ADPCM_INDEX_ADJUST[code], 0, 88)
+        codes[:, position - 1] = code
+
+    header = np.zeros((block_count, ADPCM_BLOCK_HEADER), dtype=np.uint8)
+    header[:, :2] = blocks[:, :1].astype("<i2").view(np.uint8)
+    header[:, 2] = header_index
+    packed = (codes[:, 0::2] | (codes[:, 1::2] << 4)).astype(np.uint8)
+    return np.concatenate([header, packed], axis=1).tobytes()
+
+
+def ima_adpcm_decode(data, frames):
+    """IMA-ADPCM blocks -> the first `frames` int16 mono samples"""
+    if len(data) % ADPCM_BLOCK_ALIGN:
+        raise ValueError(f"IMA-ADPCM data is not a whole number of {ADPCM_BLOCK_ALIGN}-byte blocks")
+    blocks = np.frombuffer(data, dtype=np.uint8).reshape(-1, ADPCM_BLOCK_ALIGN)
+    predictor = blocks[:, :2].copy().view("<i2")[:, 0].astype(np.int32)
+    index = np.minimum(blocks[:, 2].astype(np.int32), 88)
+
+    payload = blocks[:, ADPCM_BLOCK_HEADER:].astype(np.int32)
+    codes = np.empty((len(blocks), ADPCM_SAMPLES_PER_BLOCK - 1), dtype=np.int32)
+    codes[:, 0::2] = payload & 0x0F
+    codes[:, 1::2] = payload >> 4
+
+    output = np.empty((len(blocks), ADPCM_SAMPLES_PER_BLOCK), dtype=np.int16)
+    output[:, 0] = predictor
+    for position in range(1, ADPCM_SAMPLES_PER_BLOCK):
+        code = codes[:, position - 1]
+        step = ADPCM_STEPS[index]
+        delta = (step >> 3) + np.where(code & 4, step, 0) + np.where(code & 2, step >> 1, 0) \
+            + np.where(code & 1, step >> 2, 0)
+        predictor = np.clip(np.where(code & 8, predictor - delta, predictor + delta), -32768, 32767)
+        index = np.clip(index + ADPCM_INDEX_ADJUST[code], 0, 88)
+        output[:, position] = predictor
+    return output.reshape(-1)[:frames]
+
+
+def encode_audio(pcm, codec):
+    """16-bit mono PCM bytes -> transfer payload for codec"""
+    if codec == CODEC_PCM:
+        return bytes(pcm)
+    samples = np.frombuffer(pcm, dtype="<i2")
+    if codec == CODEC_MULAW:
+        return mulaw_encode(samples)
+    if codec == CODEC_IMA_ADPCM:
+        return ima_adpcm_encode(samples)
+    raise ValueError(f"Unknown codec {codec}")
+
+
+def decode_audio(data, codec, frames, channels):
+    """Transfer payload -> 16-bit little endian PCM bytes"""
+    if codec == CODEC_PCM:
+        return data
+    if channels != 1:
+        raise ValueError(f"{CODEC_NAMES.get(codec, codec)} transfers must be mono")
+    if codec == CODEC_MULAW:
+        return mulaw_decode(data[:frames]).astype("<i2").tobytes()
+    if codec == CODEC_IMA_ADPCM:
+        return ima_adpcm_decode(bytes(data), frames).astype("<i2").tobytes()
+    raise ValueError(f"Unknown codec {codec}")
+
+
+def snr_db(original, decoded):
+    """Signal-to-noise ratio of decoded against original int16 samples"""
+    original = np.asarray(original, dtype=np.float64)
+    noise = original - np.asarray(decoded, dtype=np.float64)
+    return 10 * np.log10(np.sum(original ** 2) / max(np.sum(noise ** 2), 1e-12))
+
+
+def wav_bytes(pcm, sample_rate, channels, bits):
+    """PCM -> an in-memory WAV file"""
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(channels)
+        wav.setsampwidth(bits // 8)
+        wav.setframerate(sample_rate)
+        wav.writeframes(pcm)
+    return buffer.getvalue()
+
+
+def _write_wav(output_file, pcm, sample_rate, channels, bits):
+    with open(output_file + ".part", "wb") as f:
+        f.write(wav_bytes(pcm, sample_rate, channels, bits))
+    os.replace(output_file + ".part", output_file)
+
+
+def read_framed_transfer(ser, log=print, stop=None):
+    """
+    Read one framed transfer, asking for resends until it is complete.
+
+    Returns a dict with the header fields, the decoded "pcm" and transfer
+    stats, or None if `stop` (a threading.Event) is set while waiting.
+    Raises ValueError, struct.error or TimeoutError on a failed transfer.
+    """
+    ser.timeout = READ_TIMEOUT
+    parser = FrameParser()
+    header = None
+    data = None
+    have = None
+    resend_rounds = 0
+    resent = 0
+    started = None
+    last_data = time.perf_counter()
+
+    def request_resend():
+        nonlocal resend_rounds, resent
+        if header is None:
+            missing = [HEADER_SEQ]
+        else:
+            missing = [seq for seq in range(header["chunk_count"]) if not have[seq]]
+        if not missing:
+            ser.write(encode_frame(FRAME_TYPE_ACK))
+            return True
+        resend_rounds += 1
+        if resend_rounds > MAX_RESEND_ROUNDS:
+            raise TimeoutError(f"{len(missing)} chunks still missing after {MAX_RESEND_ROUNDS} resend rounds")
+        missing = missing[:MAX_NAK_SEQS]
+        resent += len(missing)
+        ser.write(encode_frame(FRAME_TYPE_NAK, payload=struct.pack(f"<{len(missing)}I", *missing)))
+        return False
+
+    while True:
+        if stop is not None and stop.is_set():
+            return None
+        chunk = read_available(ser)
+        now = time.perf_counter()
+        if not chunk:
+            if started is not None and now - last_data > RESEND_TIMEOUT:
+                # The END frame (or everything after some point) was lost;
+                # MAX_RESEND_ROUNDS bounds how long a dead link is retried
+                last_data = now
+                if request_resend():
+                    break
+            continue
+        last_data = now
+
+        done = False
+        for frame_type, seq, payload in parser.feed(chunk):
+            if frame_type == FRAME_TYPE_HEADER and header is None:
+                magic, total, rate, channels, bits, chunk_size, count, codec, frames = WAV_HEADER.unpack(payload)
+                if magic != WAV_MAGIC:
+                    raise ValueError(f"Unknown transfer magic {magic!r}")
+                if codec not in CODEC_NAMES:
+                    raise ValueError(f"Unknown codec {codec}")
+                if not chunk_size or count != -(-total // chunk_size):
+                    raise ValueError(f"{count} chunks of {chunk_size} bytes can't hold {total} bytes")
+                header = {"total_length": total, "sample_rate": rate, "channels": channels,
+                          "bits": bits, "chunk_size": chunk_size, "chunk_count": count,
+                          "codec": codec, "frames": frames}
+                data = bytearray(total)
+                have = bytearray(count)
+                started = now
+                log(f"✓ Receiving {total} bytes of {CODEC_NAMES[codec]} at {rate} Hz in {count} chunks...")
+            elif frame_type == FRAME_TYPE_DATA and header is not None and seq < header["chunk_count"]:
+                offset = seq * header["chunk_size"]
+                # A valid CRC only proves the frame wasn't damaged in transit;
+                # an oversized chunk would grow the buffer past total_length
+                if len(payload) > header["chunk_size"] or offset + len(payload) > header["total_length"]:
+                    raise ValueError(f"Chunk {seq} overruns the transfer ({len(payload)} bytes at offset {offset})")
+                data[offset:offset + len(payload)] = payload
+                have[seq] = 1
+            elif frame_type == FRAME_TYPE_END:
+                started = started or now
+                done = request_resend()
+        if done:
+            break
+
+    return dict(
+        header,
+        pcm=decode_audio(data, header["codec"], header["frames"], header["channels"]),
+        encoded_bytes=len(data),
+        elapsed=time.perf_counter() - started,
+        crc_errors=parser.crc_errors,
+        resent=resent
+    )
+
 
 def receive_binary_wav(ser, output_file="recording.wav"):
-    """Receive binary WAV file"""
+    """Receive a WAV recording over the framed binary protocol, decoding compressed payloads"""
     print("Waiting for binary data...")
     print("(Send 's' command from ESP32 Serial Monitor)\n")
-    
-    in_data = False
-    wav_data = bytearray()
-    
-    while True:
-        if ser.in_waiting > 0:
-            line = ser.readline()
-            
-            if b"BINARY_START" in line:
-                print("✓ Receiving binary data...")
-                in_data = True
-                time.sleep(0.2)  # Wait for data to start flowing
-                continue
-            
-            if b"BINARY_END" in line:
-                print("✓ Binary data received")
-                break
-            
-            if in_data:
-                wav_data.extend(line)
-    
-    # Save to file
+
     try:
-        with open(output_file, 'wb') as f:
-            f.write(wav_data)
-        
-        print(f"✓ WAV file saved: {output_file}")
-        print(f"  Size: {len(wav_data)} bytes")
-        print(f"\nYou can now play it with any media player!")
-        
-    except Exception as e:
-        print(f"✗ Error saving: {e}")
+        transfer = read_framed_transfer(ser)
+        pcm = transfer["pcm"]
+        _write_wav(output_file, pcm, transfer["sample_rate"], transfer["channels"], transfer["bits"])
+    except (ValueError, struct.error, TimeoutError) as e:
+        print(f"✗ Error receiving: {e}")
+        return None
+
+    elapsed = transfer["elapsed"]
+    print("✓ Binary data received")
+    print(f"✓ WAV file saved: {output_file}")
+    print(f"  Size: {len(pcm)} bytes ({transfer['encoded_bytes']} {CODEC_NAMES[transfer['codec']]} bytes "
+          f"over the link) in {elapsed:.2f}s ({len(pcm) / max(elapsed, 1e-9) / 1024:.1f} KB/s)")
+    print(f"  CRC errors: {transfer['crc_errors']}, chunks resent: {transfer['resent']}")
+    print(f"\nYou can now play it with any media player!")
+    return len(pcm)
 
 def interactive_mode(ser):
     """Interactive command mode"""
@@ -99,7 +514,9 @@ def interactive_mode(ser):
     print("Commands:")
     print("  r = Tell ESP32 to record")
     print("  d = Download WAV (base64)")
-    print("  s = Download WAV (binary - faster)")
+    print("  s = Download WAV (framed binary - faster)")
+    print("  u = Download WAV (framed mu-law - 2x smaller)")
+    print("  a = Download WAV (framed IMA-ADPCM - 4x smaller)")
     print("  q = Quit\n")
     
     while True:
@@ -122,8 +539,9 @@ def interactive_mode(ser):
             ser.write(b'd')
             receive_base64_wav(ser)
         
-        elif cmd == 's':
-            ser.write(b's')
+        elif cmd in ('s', 'u', 'a'):
+            # Same framing for all three; the header says which codec was used
+            ser.write(cmd.encode())
             receive_binary_wav(ser)
         
         else:
@@ -131,7 +549,7 @@ def interactive_mode(ser):
 
 def main():
     if len(sys.argv) < 2:
-        print("Usage: python wav_receiver.py <serial_port>")
+        print("Usage: python wav_receiver.py <serial_port> [baud]")
         print("\nExamples:")
         print("  Windows: python wav_receiver.py COM3")
         print("  Linux:   python wav_receiver.py /dev/ttyUSB0")
@@ -139,10 +557,11 @@ def main():
         sys.exit(1)
     
     port = sys.argv[1]
+    baud = int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_BAUD
     
     try:
-        print(f"Connecting to {port}...")
-        ser = serial.Serial(port, 115200, timeout=1)
+        print(f"Connecting to {port} at {baud} baud...")
+        ser = serial.Serial(port, baud, timeout=1)
         time.sleep(2)  # Wait for connection to stabilize
         print("✓ Connected!\n")
         
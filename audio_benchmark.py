@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+Serial receive throughput benchmark for audio.py
+
+Uses a pseudo-terminal pair as a stand-in for the ESP32's USB serial port:
+a sender thread writes a WAV file the way the firmware does, and the
+receiver reads the other end through pyserial. Compares the old polling
+receiver (string concatenation, decode at the end) with the current one,
+or base64 against the framed binary protocol. Linux/macOS only.
+
+Usage:
+    python audio_benchmark.py                 # recording.wav, unthrottled
+    python audio_benchmark.py --repeat 16     # 16x the recording (~5 MB)
+    python audio_benchmark.py --baud 115200   # pace the sender like the real link
+    python audio_benchmark.py --mode framed --framed-baud 921600 --corrupt 0.02
+    python audio_benchmark.py --mode codecs --baud 115200   # d vs s vs mu-law vs IMA-ADPCM
+"""
+
+import argparse
+import base64
+import contextlib
+import io
+import os
+import pty
+import random
+import select
+import struct
+import threading
+import time
+import tty
+import wave
+
+import numpy as np
+import serial
+
+import audio
+
+BASE64_LINE_LENGTH = 76
+FRAME_CHUNK_SIZE = 1024
+
+# Round-trip quality floors; IMA-ADPCM matches the reference codec at ~23 dB
+# on speech, mu-law ~36 dB
+MIN_SNR_DB = {audio.CODEC_MULAW: 30.0, audio.CODEC_IMA_ADPCM: 18.0}
+
+
+def open_pty_serial():
+    """Return (master_fd, serial port on the slave end)."""
+    master, slave = pty.openpty()
+    tty.setraw(master)
+    port = serial.Serial(os.ttyname(slave), timeout=audio.READ_TIMEOUT)
+    os.close(slave)
+    return master, port
+
+
+def base64_transfer(wav_data):
+    """The byte stream the firmware prints for the 'd' command."""
+    encoded = base64.b64encode(wav_data)
+    lines = [encoded[i:i + BASE64_LINE_LENGTH] for i in range(0, len(encoded), BASE64_LINE_LENGTH)]
+    return (
+        b"Sending WAV...\r\n"
+        + audio.BEGIN_MARKER + b"\r\n"
+        + b"\r\n".join(lines) + b"\r\n"
+        + audio.END_MARKER + b"\r\n"
+    )
+
+
+def send(master, payload, baud=None):
+    """Write payload to the pty, paced to baud (10 bits per byte) if given."""
+    chunk = 1024
+    started = time.perf_counter()
+    for offset in range(0, len(payload), chunk):
+        os.write(master, payload[offset:offset + chunk])
+        if baud:
+            due = started + (offset + chunk) * 10 / baud
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+
+
+class FramedSender:
+    """
+    Firmware stand-in for the 's', 'u' and 'a' commands: sends HEADER, DATA
+    and END frames, then resends whatever the receiver NAKs until it ACKs.
+    The first pass flips a byte in a `corrupt` fraction of DATA frames to
+    exercise resend.
+    """
+
+    def __init__(self, wav_data, corrupt=0.0, seed=0, codec=audio.CODEC_PCM):
+        with wave.open(io.BytesIO(wav_data)) as wav:
+            self.params = wav.getparams()
+            self.pcm = audio.encode_audio(wav.readframes(wav.getnframes()), codec)
+        self.codec = codec
+        self.chunk_count = -(-len(self.pcm) // FRAME_CHUNK_SIZE)
+        self.corrupt = corrupt
+        self.rng = random.Random(seed)
+        self.resent = 0
+
+    def header_frame(self):
+        return audio.encode_frame(audio.FRAME_TYPE_HEADER, payload=audio.WAV_HEADER.pack(
+            audio.WAV_MAGIC, len(self.pcm), self.params.framerate, self.params.nchannels,
+            self.params.sampwidth * 8, FRAME_CHUNK_SIZE, self.chunk_count, self.codec, self.params.nframes
+        ))
+
+    def data_frame(self, seq, damage=False):
+        frame = bytearray(audio.encode_frame(
+            audio.FRAME_TYPE_DATA, seq, self.pcm[seq * FRAME_CHUNK_SIZE:(seq + 1) * FRAME_CHUNK_SIZE]
+        ))
+        if damage:
+            frame[self.rng.randrange(audio.FRAME_HEADER.size, len(frame))] ^= 0xFF
+        return bytes(frame)
+
+    def transfer(self):
+        return (
+            b"Sending WAV (framed)...\r\n"
+            + self.header_frame()
+            + b"".join(self.data_frame(seq, self.rng.random() < self.corrupt) for seq in range(self.chunk_count))
+            + audio.encode_frame(audio.FRAME_TYPE_END)
+        )
+
+    def __call__(self, master, baud):
+        send(master, self.transfer(), baud)
+        parser = audio.FrameParser()
+        while True:
+            select.select([master], [], [])
+            for frame_type, _, payload in parser.feed(os.read(master, 4096)):
+                if frame_type == audio.FRAME_TYPE_ACK:
+                    return
+                if frame_type == audio.FRAME_TYPE_NAK:
+                    seqs = struct.unpack(f"<{len(payload) // 4}I", payload)
+                    self.resent += len(seqs)
+                    resend = b"".join(
+                        self.header_frame() if seq == audio.HEADER_SEQ else self.data_frame(seq) for seq in seqs
+                    )
+                    send(master, resend + audio.encode_frame(audio.FRAME_TYPE_END), baud)
+
+
+def legacy_receive_base64_wav(ser, output_file):
+    """The previous receiver: polls in_waiting, concatenates strings, decodes at the end."""
+    in_data = False
+    base64_data = ""
+    while True:
+        if ser.in_waiting > 0:
+            line = ser.readline().decode('utf-8', errors='ignore').strip()
+            if "---BEGIN WAV FILE---" in line:
+                in_data = True
+                base64_data = ""
+                continue
+            if "---END WAV FILE---" in line:
+                break
+            if in_data:
+                base64_data += line
+    wav_data = base64.b64decode(base64_data)
+    with open(output_file, 'wb') as f:
+        f.write(wav_data)
+    return len(wav_data)
+
+
+def quality_check(pcm):
+    """Encode and decode pcm with each codec; return {codec: (ratio, snr_db)}."""
+    samples = np.frombuffer(pcm, dtype="<i2")
+    results = {}
+    for codec in MIN_SNR_DB:
+        encoded = audio.encode_audio(pcm, codec)
+        decoded = np.frombuffer(audio.decode_audio(encoded, codec, len(samples), 1), dtype="<i2")
+        results[codec] = (len(pcm) / len(encoded), audio.snr_db(samples, decoded))
+    return results
+
+
+def run(receiver, sender, baud, output_file):
+    master, port = open_pty_serial()
+    result = {}
+
+    def receive():
+        cpu_started = time.thread_time()
+        with contextlib.redirect_stdout(io.StringIO()):
+            result["size"] = receiver(port, output_file)
+        result["cpu"] = time.thread_time() - cpu_started
+
+    receiver_thread = threading.Thread(target=receive)
+    started = time.perf_counter()
+    receiver_thread.start()
+    sender(master, baud)
+    receiver_thread.join()
+    result["wall"] = time.perf_counter() - started
+
+    port.close()
+    os.close(master)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the serial WAV receiver over a pty")
+    parser.add_argument("wav", nargs="?", default="recording.wav")
+    parser.add_argument("--repeat", type=int, default=1, help="Send the WAV data this many times over")
+    parser.add_argument("--baud", type=int, default=None, help="Pace the sender to this baud rate")
+    parser.add_argument("--mode", choices=("base64", "framed", "codecs"), default="base64",
+                        help="base64: legacy vs streaming receiver; framed: streaming base64 vs framed binary; "
+                             "codecs: d vs s vs compressed framed transfers")
+    parser.add_argument("--framed-baud", type=int, default=None, help="Baud rate for the framed run (default --baud)")
+    parser.add_argument("--corrupt", type=float, default=0.0, help="Fraction of framed DATA frames to damage")
+    args = parser.parse_args()
+
+    with open(args.wav, "rb") as f:
+        wav_data = f.read()
+    with wave.open(args.wav) as wav:
+        params = wav.getparams()
+        pcm = wav.readframes(wav.getnframes()) * args.repeat
+    wav_buffer = io.BytesIO()
+    with wave.open(wav_buffer, "wb") as wav:
+        wav.setparams(params)
+        wav.writeframes(pcm)
+    wav_data = wav_buffer.getvalue()
+    payload = base64_transfer(wav_data)
+    output_file = "benchmark_output.wav"
+
+    def base64_sender(master, baud):
+        send(master, payload, baud)
+
+    framed = FramedSender(wav_data, args.corrupt)
+    framed_baud = args.framed_baud or args.baud
+    if args.mode == "base64":
+        runs = (("legacy", legacy_receive_base64_wav, base64_sender, args.baud, len(payload)),
+                ("streaming", audio.receive_base64_wav, base64_sender, args.baud, len(payload)))
+    elif args.mode == "framed":
+        runs = (("base64", audio.receive_base64_wav, base64_sender, args.baud, len(payload)),
+                ("framed", audio.receive_binary_wav, framed, framed_baud, len(framed.transfer())))
+    else:
+        mulaw = FramedSender(wav_data, args.corrupt, codec=audio.CODEC_MULAW)
+        adpcm = FramedSender(wav_data, args.corrupt, codec=audio.CODEC_IMA_ADPCM)
+        runs = (("d base64", audio.receive_base64_wav, base64_sender, args.baud, len(payload)),
+                ("s pcm", audio.receive_binary_wav, framed, framed_baud, len(framed.transfer())),
+                ("u mu-law", audio.receive_binary_wav, mulaw, framed_baud, len(mulaw.transfer())),
+                ("a adpcm", audio.receive_binary_wav, adpcm, framed_baud, len(adpcm.transfer())))
+
+    print("Serial Receive Benchmark")
+    print("=" * 50)
+    print(f"  WAV: {len(wav_data) / 1024:.0f} KB")
+
+    if args.mode == "codecs":
+        quality = quality_check(pcm)
+        for codec, (ratio, snr) in quality.items():
+            print(f"  {audio.CODEC_NAMES[codec]:<10} {ratio:.1f}:1  SNR {snr:.1f} dB  "
+                  f"(floor {MIN_SNR_DB[codec]:.0f} dB) {'ok' if snr >= MIN_SNR_DB[codec] else 'FAIL'}")
+
+    try:
+        for name, receiver, sender, baud, wire_bytes in runs:
+            result = run(receiver, sender, baud, output_file)
+            with wave.open(output_file) as wav:
+                received = wav.readframes(wav.getnframes())
+                expected = pcm
+                if getattr(sender, "codec", audio.CODEC_PCM) != audio.CODEC_PCM:
+                    # Lossy: compare against the host-side round trip of the same codec
+                    expected = audio.decode_audio(
+                        audio.encode_audio(pcm, sender.codec), sender.codec, len(pcm) // 2, 1
+                    )
+                intact = received == expected and wav.getparams() == params._replace(nframes=wav.getnframes())
+            print(f"  {name:<10} baud {baud or 'unthrottled'}  on the wire {wire_bytes / 1024:.0f} KB  "
+                  f"wall {result['wall']:.3f}s  receiver CPU {result['cpu']:.3f}s  "
+                  f"{len(wav_data) / result['wall'] / 1024:.0f} KB/s  intact: {intact}")
+        if args.mode == "framed":
+            print(f"  framed chunks resent: {framed.resent}")
+    finally:
+        if os.path.exists(output_file):
+            os.remove(output_file)
+
+
+if __name__ == "__main__":
+    main()
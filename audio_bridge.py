@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Serial-to-server audio bridge for ESP32-S3 gloves
+
+Listens on one or more glove serial ports for framed WAV transfers (see
+audio.py) and posts each completed utterance straight to the server, with
+no file on disk and no manual upload step. Every glove gets its own reader
+thread; uploads share one pooled keep-alive HTTP connection pool.
+
+Usage:
+    python audio_bridge.py /dev/ttyUSB0=user_123
+    python audio_bridge.py /dev/ttyUSB0=user_123 /dev/ttyUSB1=user_456 --baud 921600
+    python audio_bridge.py COM3=user_123 --server http://192.168.1.20:3000 --endpoint transcribe
+
+Endpoints:
+    voice       POST /api/voice-command/audio (transcribe, run the command, spoken answer)
+    transcribe  POST /api/transcribe (transcript only)
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import struct
+import threading
+import time
+
+import httpx
+import serial
+
+import audio
+
+# server/main.py listens on PORT, 3000 by default
+DEFAULT_SERVER = "http://localhost:3000"
+RECONNECT_DELAY = 2.0
+UPLOAD_TIMEOUT = 60.0
+MAX_CONNECTIONS = 8
+MAX_QUEUED_UTTERANCES = 4
+
+ENDPOINTS = {
+    "voice": "/api/voice-command/audio",
+    "transcribe": "/api/transcribe",
+}
+
+
+class GloveReader:
+    """
+    One glove: a thread doing blocking framed reads on the serial port and
+    handing each finished utterance to the event loop as an in-memory WAV.
+    """
+
+    def __init__(self, port, user_id, baud, loop, queue, stop):
+        self.port = port
+        self.user_id = user_id
+        self.baud = baud
+        self.loop = loop
+        self.queue = queue
+        self.stop = stop
+        self.thread = threading.Thread(target=self.run, name=f"glove-{port}", daemon=True)
+
+    def log(self, message):
+        print(f"[{self.port}] {message}")
+
+    def run(self):
+        while not self.stop.is_set():
+            try:
+                with serial.Serial(self.port, self.baud, timeout=audio.READ_TIMEOUT) as ser:
+                    self.log(f"Listening at {self.baud} baud for {self.user_id}")
+                    self.read_utterances(ser)
+            except serial.SerialException as e:
+                self.log(f"✗ Serial error: {e}; retrying in {RECONNECT_DELAY:.0f}s")
+                self.stop.wait(RECONNECT_DELAY)
+
+    def read_utterances(self, ser):
+        while not self.stop.is_set():
+            try:
+                transfer = audio.read_framed_transfer(ser, log=self.log, stop=self.stop)
+            except (ValueError, struct.error, TimeoutError) as e:
+                self.log(f"✗ Error receiving: {e}")
+                continue
+            if transfer is None:
+                return
+            wav = audio.wav_bytes(transfer["pcm"], transfer["sample_rate"], transfer["channels"], transfer["bits"])
+            self.log(f"✓ {len(wav)} byte utterance in {transfer['elapsed']:.2f}s "
+                     f"(CRC errors: {transfer['crc_errors']}, resent: {transfer['resent']})")
+            self.loop.call_soon_threadsafe(self._enqueue, wav, time.perf_counter())
+
+    def _enqueue(self, wav, received_at):
+        if self.queue.full():
+            # The server is falling behind; a stale command is worse than a dropped one
+            self.queue.get_nowait()
+            self.log("✗ Upload queue full, dropped the oldest utterance")
+        self.queue.put_nowait((wav, received_at))
+
+
+async def upload_utterances(reader, http, endpoint, voice, on_result=None):
+    """Post one glove's utterances in order over the shared client."""
+    while True:
+        wav, received_at = await reader.queue.get()
+        params = {"user_id": reader.user_id, "voice": voice} if endpoint == "voice" else None
+        files = {"file": (f"{reader.user_id}.wav", wav, "audio/wav")}
+        try:
+            response = await http.post(ENDPOINTS[endpoint], params=params, files=files)
+            response.raise_for_status()
+            if "X-Voice-Result" in response.headers:
+                # The body is the spoken answer; a summary of the result rides in a header
+                result = json.loads(response.headers["X-Voice-Result"])
+            else:
+                result = response.json()
+        except (httpx.HTTPError, ValueError) as e:
+            reader.log(f"✗ Upload failed: {e}")
+            continue
+        latency = time.perf_counter() - received_at
+        detail = repr(result.get("transcript"))
+        if "spoken_response" in result:
+            detail += f" -> {result['spoken_response']}"
+        timing = response.headers.get("Server-Timing", "")
+        reader.log(f"✓ {detail} ({latency * 1000:.0f} ms after the last frame){f'  [{timing}]' if timing else ''}")
+        if on_result:
+            on_result(reader, result, latency)
+
+
+async def run_bridge(gloves, server, endpoint="voice", voice="default", baud=audio.DEFAULT_BAUD,
+                     stop=None, on_result=None):
+    """
+    Bridge gloves ({port: user_id}) to the server until `stop` is set.
+    on_result(reader, result, latency_seconds) is called after each upload.
+    """
+    loop = asyncio.get_running_loop()
+    stop = stop or threading.Event()
+    limits = httpx.Limits(max_connections=MAX_CONNECTIONS, max_keepalive_connections=MAX_CONNECTIONS)
+    async with httpx.AsyncClient(base_url=server, timeout=UPLOAD_TIMEOUT, limits=limits) as http:
+        readers = [
+            GloveReader(port, user_id, baud, loop, asyncio.Queue(MAX_QUEUED_UTTERANCES), stop)
+            for port, user_id in gloves.items()
+        ]
+        uploads = [
+            asyncio.create_task(upload_utterances(reader, http, endpoint, voice, on_result))
+            for reader in readers
+        ]
+        for reader in readers:
+            reader.thread.start()
+        try:
+            while not stop.is_set():
+                await asyncio.sleep(audio.READ_TIMEOUT)
+        finally:
+            stop.set()
+            for task in uploads:
+                task.cancel()
+            await asyncio.gather(*uploads, return_exceptions=True)
+            for reader in readers:
+                await asyncio.to_thread(reader.thread.join)
+
+
+def parse_glove(value):
+    port, sep, user_id = value.partition("=")
+    if not sep or not port or not user_id:
+        raise argparse.ArgumentTypeError(f"expected PORT=USER_ID, got {value!r}")
+    return port, user_id
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Stream glove utterances from serial ports to the server")
+    parser.add_argument("gloves", nargs="+", type=parse_glove, metavar="PORT=USER_ID")
+    parser.add_argument("--server", default=os.environ.get("GLOVE_SERVER_URL", DEFAULT_SERVER))
+    parser.add_argument("--endpoint", choices=sorted(ENDPOINTS), default="voice")
+    parser.add_argument("--voice", default="default", help="Voice for spoken answers (voice endpoint)")
+    parser.add_argument("--baud", type=int, default=audio.DEFAULT_BAUD)
+    return parser
+
+
+def main():
+    args = build_parser().parse_args()
+
+    print(f"Bridging {len(args.gloves)} glove(s) to {args.server}{ENDPOINTS[args.endpoint]}")
+    try:
+        asyncio.run(run_bridge(dict(args.gloves), args.server, args.endpoint, args.voice, args.baud))
+    except KeyboardInterrupt:
+        print("\nGoodbye!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Report what WAV preprocessing saves before speech-to-text.
+
+Runs every .wav in a directory through preprocess_wav and reports upload
+bytes, audio duration (what STT bills and spends time on) and processing
+time, before and after. With --live, each clip is also transcribed by
+ElevenLabs in both forms to measure STT latency and compare transcripts.
+
+Run: python benchmarks/audio_preprocess.py [wav_dir] [--noise LEVEL] [--live]
+     wav_dir defaults to the repository root (recording.wav)
+"""
+import asyncio
+import glob
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.audio_preprocess import preprocess_wav
+
+DEFAULT_WAV_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+async def transcribe(data: bytes) -> tuple[float, str]:
+    from controllers.speech_to_text import client
+
+    started = time.perf_counter()
+    result = await client.speech_to_text.convert(
+        file=("clip.wav", data, "audio/wav"), model_id="scribe_v1", language_code="eng"
+    )
+    return time.perf_counter() - started, result.text
+
+
+def run_report(paths: list[str], noise: str = None, live: bool = False) -> list[dict]:
+    rows = []
+    for path in paths:
+        with open(path, "rb") as f:
+            data = f.read()
+        prepared = preprocess_wav(data, noise)
+        if prepared is None:
+            print(f"  skipping {path}: not PCM WAV")
+            continue
+        output, stats = prepared
+        row = {"file": os.path.basename(path), **stats}
+        if live:
+            row["stt_seconds_before"], row["transcript_before"] = asyncio.run(transcribe(data))
+            row["stt_seconds_after"], row["transcript_after"] = asyncio.run(transcribe(output))
+        rows.append(row)
+    return rows
+
+
+def main():
+    args = sys.argv[1:]
+    live = "--live" in args
+    noise = None
+    if "--noise" in args:
+        noise = args[args.index("--noise") + 1]
+    positional = [a for i, a in enumerate(args) if not a.startswith("--") and (i == 0 or args[i - 1] != "--noise")]
+    wav_dir = positional[0] if positional else DEFAULT_WAV_DIR
+
+    paths = sorted(glob.glob(os.path.join(wav_dir, "*.wav")))
+    rows = run_report(paths, noise, live)
+    if not rows:
+        print(f"No WAV files in {wav_dir}")
+        return
+
+    print("Audio Preprocessing Report\n" + "=" * 50)
+    for row in rows:
+        print(f"  {row['file']}: {row['input_channels']}ch {row['input_sample_rate']} Hz, "
+              f"{row['input_bytes'] / 1024:.0f} -> {row['output_bytes'] / 1024:.0f} KB, "
+              f"{row['input_seconds']:.2f} -> {row['output_seconds']:.2f} s, "
+              f"{row['processing_ms']:.1f} ms")
+        if live:
+            print(f"    stt {row['stt_seconds_before'] * 1000:.0f} -> {row['stt_seconds_after'] * 1000:.0f} ms")
+            print(f"    before: {row['transcript_before']!r}")
+            print(f"    after:  {row['transcript_after']!r}")
+
+    bytes_before = sum(r["input_bytes"] for r in rows)
+    bytes_after = sum(r["output_bytes"] for r in rows)
+    seconds_before = sum(r["input_seconds"] for r in rows)
+    seconds_after = sum(r["output_seconds"] for r in rows)
+    print("-" * 50)
+    print(f"  files:              {len(rows)} (noise gate: {noise or 'off'})")
+    print(f"  upload bytes:       {bytes_before / 1024:.0f} -> {bytes_after / 1024:.0f} KB "
+          f"({1 - bytes_after / bytes_before:.0%} less)")
+    print(f"  audio duration:     {seconds_before:.1f} -> {seconds_after:.1f} s "
+          f"({1 - seconds_after / seconds_before:.0%} less)")
+    print(f"  processing p50:     {statistics.median(r['processing_ms'] for r in rows):.1f} ms")
+    if live:
+        before = statistics.median(r["stt_seconds_before"] for r in rows)
+        after = statistics.median(r["stt_seconds_after"] for r in rows)
+        print(f"  stt latency p50:    {before * 1000:.0f} -> {after * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Benchmark the IMU gesture recognizer.
+
+  throughput - one GestureEngine tick (window fetch, features, banded DTW)
+               for N gloves at once, worst case: every glove has a finished
+               gesture to match against every template
+  realtime   - N gloves streaming 250 Hz telemetry in real time, each doing
+               a gesture at a random moment; latency is measured from the
+               arrival of the gesture's last moving sample to the published
+               event (it includes END_QUIET_SECONDS of waiting for the
+               gesture to be over)
+
+Run: python benchmarks/gesture_latency.py [gloves] [seconds]
+"""
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.gesture_recognizer import END_QUIET_SECONDS, WINDOW_SECONDS, GestureEngine
+from services.imu_telemetry import SAMPLE_DTYPE, TelemetryStore, pack_batch
+
+RATE = 250
+BATCH = 10  # 40 ms of samples per packet
+GLOVE_COUNTS = (1, 10, 50, 100, 250)
+
+
+def gesture_signal(kind: int, rng) -> np.ndarray:
+    """Gyro (dps) for one of: swipe, circle, shake."""
+    if kind == 0:
+        t = np.arange(int(0.3 * RATE)) / (0.3 * RATE)
+        return np.outer(np.sin(np.pi * t), [0, 0, rng.choice([-300, 300])])
+    if kind == 1:
+        phase = 2 * np.pi * np.arange(int(0.8 * RATE)) / (0.8 * RATE)
+        return np.stack([np.zeros_like(phase), 250 * np.cos(phase), 250 * np.sin(phase)], axis=1)
+    t = np.arange(int(0.8 * RATE)) / RATE
+    return np.outer(np.sin(2 * np.pi * 5 * t), [0, 0, 400])
+
+
+def to_samples(gyro: np.ndarray, start_index: int) -> np.ndarray:
+    samples = np.zeros(len(gyro), dtype=SAMPLE_DTYPE)
+    samples["t_us"] = (start_index + np.arange(len(gyro))) * 4000
+    samples["accel"][:, 2] = 16384
+    samples["gyro"] = np.round(gyro * 131).clip(-32768, 32767)
+    return samples
+
+
+def bench_throughput() -> None:
+    print("Engine tick, every glove with a finished gesture")
+    rng = np.random.default_rng(0)
+    window = int(WINDOW_SECONDS * RATE)
+    for gloves in GLOVE_COUNTS:
+        engine = GestureEngine(TelemetryStore(buffer_seconds=4, max_devices=gloves))
+        timings = []
+        for round_number in range(5):
+            for glove in range(gloves):
+                gyro = rng.normal(0, 2, (window, 3))
+                motion = gesture_signal(glove % 3, rng)
+                gyro[-len(motion) - 60:-60] += motion
+                engine.store.ingest(pack_batch(f"g{glove}", round_number, to_samples(gyro, round_number * window)))
+            started = time.perf_counter()
+            engine.evaluate()
+            timings.append(time.perf_counter() - started)
+        tick = statistics.median(timings)
+        print(f"  {gloves:>4} gloves: {tick * 1000:7.2f} ms/tick  ({tick / gloves * 1e6:6.1f} us per glove, "
+              f"budget at 50 ms ticks: {0.05 / (tick / gloves):,.0f} gloves)")
+
+
+async def bench_realtime(gloves: int, seconds: float) -> None:
+    rng = np.random.default_rng(1)
+    total = int(seconds * RATE)
+    streams, gesture_end = [], []
+    for glove in range(gloves):
+        gyro = rng.normal(0, 2, (total, 3))
+        motion = gesture_signal(glove % 3, rng)
+        start = int(rng.uniform(WINDOW_SECONDS + 0.2, seconds - 1.0) * RATE)
+        gyro[start:start + len(motion)] += motion
+        streams.append(gyro)
+        gesture_end.append(start + len(motion) - 1)
+
+    published = {}
+    end_arrival = {}
+
+    async def publish(user_id, event, payload):
+        published.setdefault(payload["deviceId"], (time.perf_counter(), payload["gesture"]))
+
+    engine = GestureEngine(TelemetryStore(buffer_seconds=4, max_devices=gloves))
+    engine.set_publisher(publish)
+    engine.start()
+
+    started = time.perf_counter()
+    for seq, offset in enumerate(range(0, total, BATCH)):
+        due = started + (offset + BATCH) / RATE
+        await asyncio.sleep(max(due - time.perf_counter(), 0))
+        for glove in range(gloves):
+            engine.store.ingest(pack_batch(f"g{glove}", seq, to_samples(streams[glove][offset:offset + BATCH], offset)))
+            if offset <= gesture_end[glove] < offset + BATCH:
+                end_arrival[f"g{glove}"] = time.perf_counter()
+    await asyncio.sleep(0.5)
+    await engine.stop()
+
+    latencies = [(published[device][0] - end_arrival[device]) * 1000 for device in published if device in end_arrival]
+    stats = engine.stats()
+    print(f"\nReal time, {gloves} gloves at {RATE} Hz in {BATCH}-sample packets for {seconds:.0f}s")
+    print(f"  detected:       {len(published)}/{gloves}")
+    if latencies:
+        print(f"  latency p50:    {statistics.median(latencies):.0f} ms after the last moving sample "
+              f"(floor {END_QUIET_SECONDS * 1000:.0f} ms quiet + packet/tick granularity)")
+        print(f"  latency p95:    {sorted(latencies)[int(len(latencies) * 0.95) - 1 if len(latencies) > 1 else 0]:.0f} ms")
+    print(f"  engine tick:    p50 {stats['tick_ms_p50']} ms, p95 {stats['tick_ms_p95']} ms")
+
+
+def main():
+    gloves = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 6.0
+    bench_throughput()
+    asyncio.run(bench_realtime(gloves, seconds))
+
+
+if __name__ == "__main__":
+    main()
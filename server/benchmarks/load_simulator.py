@@ -0,0 +1,541 @@
+"""
+Headless load generator: many simulated players, apps and gloves at once.
+
+Client kinds, mixed by weight (--mix game=70,app=20,voice=5,glove=5):
+
+  game   - a Socket.IO client acting like game/game.js: join, an
+           environmentUpdate every ENVIRONMENT_INTERVAL (the game's
+           throttle) and, at random moments, bursts of updateGold with
+           the game's 'rock' and 'treasure' reasons
+  app    - the Flutter app's REST calls (backend_service.dart) with think
+           time between them
+  voice  - the Flutter voice flow: POST /api/transcribe, then
+           /api/voice-command with the transcript
+  glove  - a glove streaming 250 Hz IMU batches over
+           /api/telemetry/ingest, shaking now and then
+
+Clients start evenly over --ramp seconds and run until --duration is up.
+Clients still running --grace seconds after that are cancelled, and a
+stall report lists them with the requests they were waiting on; the
+simulator then exits with status 1.
+Every Socket.IO event is sent with an ack id, so its latency is the time
+until the server's handler returned; a server 'error' event counts against
+the oldest event still waiting for its ack on that socket. REST latency is
+the full response. A glove batch's latency is how long the send took
+(backpressure from the server).
+
+Without --url the server runs in this process against a throwaway SQLite
+file, with the speech-to-text and intent-parser stubs from
+voice_stream_latency.py, so no provider is called. The clients share the
+process (and the GIL) with it; for high client counts start the server
+separately (python main.py) and pass --url, in which case voice commands
+use whatever providers that server is configured with.
+
+Run: python benchmarks/load_simulator.py [--clients N] [--mix ...] [--ramp S] [--duration S] [--grace S]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+
+import httpx
+import numpy as np
+import websockets
+from sqlalchemy import create_engine
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gesture_latency import gesture_signal, to_samples
+from tts_ttfb import free_port, serve
+from voice_stream_latency import RECORD_TAIL_SECONDS, make_utterance, stub_app, stub_state, to_wav
+from services.imu_telemetry import pack_batch
+
+CLIENT_KINDS = ("game", "app", "voice", "glove")
+DEFAULT_MIX = "game=70,app=20,voice=5,glove=5"
+
+# game/game.js and game/constants.js
+ENVIRONMENT_INTERVAL = 0.4
+OBSTACLE_GOLD_PENALTY = 5
+TREASURE_GOLD = (10, 100)
+ENVIRONMENTS = [
+    {"type": "beach", "name": "Bright Beach", "brightness": 1.5, "temperature": 35, "humidity": 60, "windSpeed": 5, "soundLevel": 30},
+    {"type": "cave", "name": "Dark Cave", "brightness": 0.2, "temperature": 15, "humidity": 80, "windSpeed": 0, "soundLevel": 10},
+    {"type": "jungle", "name": "Loud Jungle", "brightness": 0.8, "temperature": 28, "humidity": 90, "windSpeed": 5, "soundLevel": 85},
+    {"type": "windy", "name": "Windy Plain", "brightness": 1.0, "temperature": 18, "humidity": 40, "windSpeed": 50,
+     "windDirection": {"x": 1, "y": 0}, "soundLevel": 45},
+    {"type": "rain", "name": "Rainy Zone", "brightness": 0.6, "temperature": 12, "humidity": 95, "windSpeed": 20, "soundLevel": 50},
+    {"type": "arctic", "name": "Arctic Snow", "brightness": 1.1, "temperature": -15, "humidity": 30, "windSpeed": 30, "soundLevel": 20},
+]
+BIOME_SECONDS = 8.0  # Mean time a player stays in one biome
+ROCK_PROBABILITY = 0.7
+
+IMU_RATE = 250
+IMU_BATCH = 25  # 100 ms per packet
+GESTURE_SECONDS = 5.0
+
+ACK_TIMEOUT = 10.0
+
+
+class Recorder:
+    """Latencies, errors and counters per event type."""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.counts = Counter()
+        self.errors = Counter()
+        self.counters = Counter()
+        self.messages = Counter()  # Error texts, to see what failed
+        self.waiting = {}  # token -> (kind, started) of requests in flight
+        self.last_completed = None
+        self.started = time.perf_counter()
+        self.stalled = Counter()  # Kinds of the clients cancelled at the hard deadline
+        self.stalled_waiting = defaultdict(list)  # Kind -> ages of the requests they were waiting on
+        self.stalled_idle = 0.0
+
+    def begin(self, kind: str, started: float) -> object:
+        """Note a request in flight, for the stall report; pass the token to end()."""
+        token = object()
+        self.waiting[token] = (kind, started)
+        return token
+
+    def end(self, token: object) -> None:
+        self.waiting.pop(token, None)
+
+    def record(self, kind: str, started: float, error: str = None) -> None:
+        """Count a completed event and its latency, failed if `error` is given."""
+        self.last_completed = time.perf_counter()
+        self.latencies[kind].append(self.last_completed - started)
+        self.counts[kind] += 1
+        if error:
+            self._failed(kind, error)
+
+    def error(self, kind: str, message: str) -> None:
+        """Count an event that never completed (timeout, connection lost)."""
+        self.counts[kind] += 1
+        self._failed(kind, message)
+
+    def _failed(self, kind: str, message: str) -> None:
+        self.errors[kind] += 1
+        self.messages[f"{kind}: {message[:100]}"] += 1
+
+    async def track(self, kind: str, started: float, ack: asyncio.Future, socket: "SocketIOClient") -> None:
+        token = self.begin(kind, started)
+        try:
+            await asyncio.wait_for(ack, ACK_TIMEOUT)
+            self.record(kind, started, socket.failed.pop(ack, None))
+        except asyncio.TimeoutError:
+            self.error(kind, "no ack")
+        except ConnectionError as e:
+            self.error(kind, str(e))
+        finally:
+            self.end(token)
+
+    def stall(self, kinds: list[str]) -> None:
+        """Note the clients still running at the hard deadline, before they are cancelled."""
+        self.stalled.update(kinds)
+        now = time.perf_counter()
+        for kind, started in self.waiting.values():
+            self.stalled_waiting[kind].append(now - started)
+        self.stalled_idle = now - (self.last_completed or self.started)
+
+    def report(self, args) -> None:
+        elapsed = time.perf_counter() - self.started
+        print(f"\nLoad: {args.clients} clients ({args.mix}), ramp {args.ramp:.0f}s, {elapsed:.1f}s total")
+        print(f"  {'event':<40} {'count':>8} {'per s':>8} {'errors':>7} {'err %':>6} "
+              f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+        for kind in sorted(self.counts):
+            values = sorted(self.latencies[kind])
+            count = self.counts[kind]
+            line = f"  {kind:<40} {count:>8} {count / elapsed:>8.1f} {self.errors[kind]:>7} {self.errors[kind] / count:>6.1%}"
+            if values:
+                line += "".join(f" {percentile(values, p) * 1000:>8.1f}" for p in (50, 95, 99)) + f" {values[-1] * 1000:>8.1f}"
+            print(line)
+        for name, count in sorted(self.counters.items()):
+            print(f"  {name:<40} {count:>8} {count / elapsed:>8.1f}")
+        if self.messages:
+            print("  most common errors:")
+            for message, count in self.messages.most_common(5):
+                print(f"    {count:>6}  {message}")
+        if self.stalled:
+            clients = ", ".join(f"{kind} {count}" for kind, count in sorted(self.stalled.items()))
+            print(f"\nSTALLED: {clients} client(s) still running {args.grace:.0f}s after the run ended; "
+                  f"nothing completed in the last {self.stalled_idle:.1f}s")
+            for kind, ages in sorted(self.stalled_waiting.items(), key=lambda item: -max(item[1])):
+                print(f"  waiting on {kind:<29} {len(ages):>8}  oldest {max(ages):.1f}s")
+
+
+def percentile(values: list, p: float) -> float:
+    return values[min(int(len(values) * p / 100), len(values) - 1)]
+
+
+class SocketIOClient:
+    """
+    Just enough of a Socket.IO (Engine.IO 4) client over one WebSocket to
+    act like game.js, without python-socketio's aiohttp dependency.
+    """
+
+    def __init__(self):
+        self.ws = None
+        self.handlers = {}
+        self.pending = {}  # ack id -> future, oldest first
+        self.failed = {}  # future -> message of the 'error' event it drew
+        self.next_ack = 0
+        self.reader = None
+
+    async def connect(self, base_url: str) -> None:
+        url = base_url.replace("http", "ws", 1) + "/socket.io/?EIO=4&transport=websocket"
+        self.ws = await websockets.connect(url, max_queue=None)
+        opened = await self.ws.recv()
+        if not opened.startswith("0"):
+            raise ConnectionError(f"Unexpected open packet: {opened[:80]}")
+        await self.ws.send("40")
+        connected = await self.ws.recv()
+        if not connected.startswith("40"):
+            raise ConnectionError(f"Namespace connect refused: {connected[:80]}")
+        self.reader = asyncio.create_task(self._read())
+
+    def on(self, event: str, handler) -> None:
+        self.handlers[event] = handler
+
+    async def emit(self, event: str, data) -> asyncio.Future:
+        """Send an event and return a future resolved by the server's ack."""
+        ack_id = self.next_ack
+        self.next_ack += 1
+        ack = asyncio.get_running_loop().create_future()
+        self.pending[ack_id] = ack
+        await self.ws.send(f"42{ack_id}" + json.dumps([event, data]))
+        return ack
+
+    async def _read(self) -> None:
+        try:
+            async for message in self.ws:
+                if message == "2":
+                    await self.ws.send("3")
+                elif message.startswith("42"):
+                    event, *args = json.loads(message[2:])
+                    if event == "error" and self.pending:
+                        self.failed[next(iter(self.pending.values()))] = args[0].get("message", "error")
+                    handler = self.handlers.get(event)
+                    if handler:
+                        handler(*args)
+                elif message.startswith("43"):
+                    ack_id, _, _ = message[2:].partition("[")
+                    ack = self.pending.pop(int(ack_id), None)
+                    if ack and not ack.done():
+                        ack.set_result(None)
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            for ack in self.pending.values():
+                if not ack.done():
+                    ack.set_exception(ConnectionError("Socket closed"))
+            self.pending.clear()
+
+    async def close(self) -> None:
+        if self.ws:
+            await self.ws.close()
+        if self.reader:
+            await self.reader
+
+
+async def run_game(index: int, base_url: str, recorder: Recorder, deadline: float, args) -> None:
+    rng = random.Random(index)
+    player_id = f"player_sim{index:05d}"
+    socket = SocketIOClient()
+    socket.on("environmentUpdated", lambda data: recorder.counters.update(["sio environmentUpdated received"]))
+    socket.on("goldUpdated", lambda data: recorder.counters.update(["sio goldUpdated received"]))
+    socket.on("gesture", lambda data: recorder.counters.update(["sio gesture received"]))
+
+    started = time.perf_counter()
+    token = recorder.begin("sio connect", started)
+    try:
+        await socket.connect(base_url)
+    except (OSError, websockets.WebSocketException, ConnectionError) as e:
+        recorder.error("sio connect", repr(e))
+        return
+    finally:
+        recorder.end(token)
+    recorder.record("sio connect", started)
+
+    async def emit(event, data):
+        sent_at = time.perf_counter()
+        ack = await socket.emit(event, data)
+        tasks.add(asyncio.create_task(recorder.track(f"sio {event}", sent_at, ack, socket)))
+
+    tasks = set()
+    gold = 0
+    environment = rng.choice(ENVIRONMENTS)
+    next_biome = time.perf_counter() + rng.expovariate(1 / BIOME_SECONDS)
+    next_burst = time.perf_counter() + rng.expovariate(1 / args.gold_interval)
+    try:
+        await emit("join", player_id)
+        while time.perf_counter() < deadline:
+            now = time.perf_counter()
+            if now >= next_biome:
+                environment = rng.choice(ENVIRONMENTS)
+                next_biome = now + rng.expovariate(1 / BIOME_SECONDS)
+            await emit("environmentUpdate", {"playerId": player_id, "environment": environment})
+            if now >= next_burst:
+                for _ in range(rng.randint(1, args.burst)):
+                    if rng.random() < ROCK_PROBABILITY:
+                        change, reason = -OBSTACLE_GOLD_PENALTY, "rock"
+                    else:
+                        change, reason = rng.randint(*TREASURE_GOLD), "treasure"
+                    gold += change
+                    await emit("updateGold", {"playerId": player_id, "goldChange": change, "newTotal": gold, "reason": reason})
+                next_burst = now + rng.expovariate(1 / args.gold_interval)
+            await asyncio.sleep(ENVIRONMENT_INTERVAL)
+        await asyncio.gather(*tasks)
+    except websockets.ConnectionClosed as e:
+        recorder.error("sio disconnected", str(e))
+    finally:
+        await socket.close()
+
+
+async def run_app(index: int, base_url: str, recorder: Recorder, deadline: float, args) -> None:
+    rng = random.Random(index)
+    user_id = f"sim_app{index:05d}"
+    peers = []  # Recipients found by the last user search
+
+    async with httpx.AsyncClient(base_url=base_url + "/api", timeout=30) as http:
+        async def call(name, method, path, **kwargs):
+            started = time.perf_counter()
+            token = recorder.begin(name, started)
+            try:
+                response = await http.request(method, path, **kwargs)
+            except httpx.HTTPError as e:
+                recorder.error(name, repr(e))
+                return None
+            finally:
+                recorder.end(token)
+            if response.status_code >= 400:
+                recorder.record(name, started, f"HTTP {response.status_code} {response.text}")
+                return None
+            recorder.record(name, started)
+            return response.json()
+
+        user = await call("POST /api/user/get-or-create", "POST", "/user/get-or-create", json={"id": user_id, "name": f"Sim {index}"})
+        if not user:
+            return
+        accounts = {account["type"]: account["id"] for account in user["accounts"]}
+        calls = [
+            (5, "GET /api/user/{id}", "GET", f"/user/{user_id}", {}),
+            (5, "GET /api/user/{id}/accounts", "GET", f"/user/{user_id}/accounts", {}),
+            (4, "GET /api/user/{id}/transactions", "GET", f"/user/{user_id}/transactions", {}),
+            (2, "GET /api/account/{id}/transactions", "GET", f"/account/{accounts['checking']}/transactions", {}),
+            (3, "GET /api/environment", "GET", "/environment", {}),
+            (3, "GET /api/environment/hints", "GET", "/environment/hints", {}),
+            (2, "GET /api/gold-rate", "GET", "/gold-rate", {}),
+            (1, "GET /api/users?search=", "GET", "/users", {"params": {"search": "sim"}}),
+            (1, "POST /api/transfer", "POST", "/transfer", {"json": {
+                "from_account_id": accounts["checking"], "to_account_id": accounts["savings"],
+                "amount": 1, "description": "Load test"}}),
+            (1, "POST /api/send", "POST", "/send", {}),
+        ]
+        weights = [weight for weight, *_ in calls]
+        while time.perf_counter() < deadline:
+            _, name, method, path, kwargs = rng.choices(calls, weights)[0]
+            if name == "POST /api/send":
+                if not peers:
+                    continue
+                kwargs = {"json": {
+                    "from_user_id": user_id, "to_user_id": rng.choice(peers), "amount": 1,
+                    "from_account_type": "checking", "to_account_type": "checking"}}
+            result = await call(name, method, path, **kwargs)
+            if name == "GET /api/users?search=" and result:
+                peers = [user["id"] for user in result if user["id"] != user_id]
+            await asyncio.sleep(rng.expovariate(1 / args.think))
+
+
+async def run_voice(index: int, base_url: str, recorder: Recorder, deadline: float, args) -> None:
+    rng = random.Random(index)
+    user_id = f"sim_voice{index:05d}"
+    wav = to_wav(make_utterance(RECORD_TAIL_SECONDS))
+
+    async with httpx.AsyncClient(base_url=base_url + "/api", timeout=60) as http:
+        async def post(name, path, **kwargs):
+            started = time.perf_counter()
+            token = recorder.begin(name, started)
+            try:
+                response = await http.post(path, **kwargs)
+            except httpx.HTTPError as e:
+                recorder.error(name, repr(e))
+                return None
+            finally:
+                recorder.end(token)
+            if response.status_code >= 400:
+                recorder.record(name, started, f"HTTP {response.status_code} {response.text}")
+                return None
+            recorder.record(name, started)
+            return response.json()
+
+        await post("POST /api/user/get-or-create", "/user/get-or-create", json={"id": user_id, "name": f"Sim voice {index}"})
+        await asyncio.sleep(rng.uniform(0, args.voice_interval))
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            transcript = await post("POST /api/transcribe", "/transcribe", files={"file": ("clip.wav", wav, "audio/wav")})
+            result = transcript and await post("POST /api/voice-command", "/voice-command", json={
+                "user_id": user_id, "transcript": transcript["transcript"]
+            })
+            recorder.record("voice command end to end", started, None if result else "no result")
+            await asyncio.sleep(rng.expovariate(1 / args.voice_interval))
+
+
+async def run_glove(index: int, base_url: str, recorder: Recorder, deadline: float, args, owner: int = None) -> None:
+    """Stream as glove `index`, worn by game client `owner` (gestures go to its socket)."""
+    rng = np.random.default_rng(index)
+    device_id = f"sim_glove{index:05d}"
+    url = base_url.replace("http", "ws", 1) + "/api/telemetry/ingest"
+    if owner is not None:
+        url += f"?user_id=player_sim{owner:05d}"
+
+    started = time.perf_counter()
+    try:
+        ws = await websockets.connect(url, max_queue=None)
+    except (OSError, websockets.WebSocketException) as e:
+        recorder.error("ws telemetry connect", repr(e))
+        return
+    recorder.record("ws telemetry connect", started)
+
+    async def read_errors():
+        async for message in ws:
+            recorder.error("ws telemetry batch", json.loads(message)["message"])
+
+    reader = asyncio.create_task(read_errors())
+    motion = np.zeros((0, 3))
+    next_gesture = time.perf_counter() + rng.exponential(GESTURE_SECONDS)
+    seq = 0
+    stream_started = time.perf_counter()
+    try:
+        while time.perf_counter() < deadline:
+            if time.perf_counter() >= next_gesture:
+                motion = gesture_signal(2, rng)  # A shake
+                next_gesture = time.perf_counter() + rng.exponential(GESTURE_SECONDS)
+            gyro = rng.normal(0, 2, (IMU_BATCH, 3))
+            take = min(len(motion), IMU_BATCH)
+            gyro[:take] += motion[:take]
+            motion = motion[take:]
+            packet = pack_batch(device_id, seq, to_samples(gyro, seq * IMU_BATCH))
+            sent_at = time.perf_counter()
+            await ws.send(packet)
+            recorder.record("ws telemetry batch", sent_at)
+            seq += 1
+            due = stream_started + seq * IMU_BATCH / IMU_RATE
+            await asyncio.sleep(max(due - time.perf_counter(), 0))
+    except websockets.ConnectionClosed as e:
+        recorder.error("ws telemetry disconnected", str(e))
+    finally:
+        await ws.close()
+        reader.cancel()
+    recorder.counters["imu samples sent"] += seq * IMU_BATCH
+
+
+RUNNERS = {"game": run_game, "app": run_app, "voice": run_voice, "glove": run_glove}
+
+
+def parse_mix(mix: str, clients: int) -> list[str]:
+    """Spread `clients` over the kinds in proportion to the mix weights, interleaved."""
+    weights = {}
+    for part in mix.split(","):
+        kind, _, weight = part.partition("=")
+        if kind.strip() not in CLIENT_KINDS:
+            raise ValueError(f"Unknown client kind {kind!r}; expected one of {', '.join(CLIENT_KINDS)}")
+        weights[kind.strip()] = float(weight or 1)
+    total = sum(weights.values())
+    kinds, credit = [], Counter()
+    for _ in range(clients):
+        for kind, weight in weights.items():
+            credit[kind] += weight / total
+        kind = max(credit, key=credit.get)
+        credit[kind] -= 1
+        kinds.append(kind)
+    return kinds
+
+
+async def simulate(base_url: str, args) -> Recorder:
+    recorder = Recorder()
+    kinds = parse_mix(args.mix, args.clients)
+    deadline = time.perf_counter() + args.ramp + args.duration
+    players = [index for index, kind in enumerate(kinds) if kind == "game"]
+    gloves = [index for index, kind in enumerate(kinds) if kind == "glove"]
+    owners = {glove: players[number % len(players)] for number, glove in enumerate(gloves)} if players else {}
+
+    async def start(index, kind):
+        await asyncio.sleep(index * args.ramp / max(len(kinds), 1))
+        if kind == "glove":
+            await run_glove(index, base_url, recorder, deadline, args, owners.get(index))
+        else:
+            await RUNNERS[kind](index, base_url, recorder, deadline, args)
+
+    clients = {asyncio.create_task(start(index, kind)): kind for index, kind in enumerate(kinds)}
+    _, running = await asyncio.wait(clients, timeout=deadline + args.grace - time.perf_counter())
+    if running:
+        recorder.stall([clients[task] for task in running])
+        for task in running:
+            task.cancel()
+        await asyncio.wait(running, timeout=ACK_TIMEOUT)
+    return recorder
+
+
+def start_local_server() -> str:
+    """Serve main.py in-process on a throwaway database with stub providers."""
+    stub_port = free_port()
+    serve(stub_app, stub_port)
+    os.environ["ELEVENLABS_BASE_URL"] = f"http://127.0.0.1:{stub_port}"
+    os.environ.setdefault("ELEVENLABS_API_KEY", "stub")
+
+    import database
+    database.engine = create_engine(
+        f"sqlite:///{tempfile.mkdtemp()}/load.db", connect_args={"check_same_thread": False}
+    )
+    database.SessionLocal.configure(bind=database.engine)
+
+    from controllers import voice_command
+    from main import socket_app
+
+    async def stub_parse(transcript):
+        await asyncio.sleep(stub_state["parse_delay"])
+        result = voice_command.parse_command_with_keywords(transcript)
+        result["parser"] = "stub"
+        return result
+
+    voice_command.parse_command_with_gemini = stub_parse
+    app_port = free_port()
+    serve(socket_app, app_port)
+    return f"http://127.0.0.1:{app_port}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate game, app, voice and glove clients against the server")
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"kind=weight,... over {', '.join(CLIENT_KINDS)}")
+    parser.add_argument("--ramp", type=float, default=5.0, help="seconds over which clients start")
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds to run after the ramp")
+    parser.add_argument("--grace", type=float, default=30.0,
+                        help="seconds clients may take to finish after --duration before the run is called stalled")
+    parser.add_argument("--url", help="target an already running server instead of an in-process one")
+    parser.add_argument("--gold-interval", type=float, default=3.0, help="mean seconds between updateGold bursts")
+    parser.add_argument("--burst", type=int, default=4, help="most updateGold events in one burst")
+    parser.add_argument("--think", type=float, default=1.0, help="mean seconds between app REST calls")
+    parser.add_argument("--voice-interval", type=float, default=5.0, help="mean seconds between voice commands")
+    parser.add_argument("--stt-ms", type=int, default=300, help="stub speech-to-text latency")
+    parser.add_argument("--parse-ms", type=int, default=400, help="stub intent parser latency")
+    args = parser.parse_args()
+
+    stub_state["stt_delay"] = args.stt_ms / 1000
+    stub_state["parse_delay"] = args.parse_ms / 1000
+    base_url = args.url.rstrip("/") if args.url else start_local_server()
+    recorder = asyncio.run(simulate(base_url, args))
+    recorder.report(args)
+    if recorder.stalled:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+Measure the cost of each instrumentation layer on hot socket events.
+
+Runs main.py's Socket.IO handlers directly (no clients connected, so emits
+are cheap and the handler's own work dominates) against a temporary SQLite
+database. Each layer is timed on its own against the bare handler (every
+wrapper unwrapped, every SQL listener removed and SQLAlchemy's event
+flags cleared), alternating short rounds:
+
+  metrics   the /metrics event wrapper plus its SQL listeners
+  tracing   the span wrapper plus its SQL listeners, at TRACE_SAMPLE_RATE
+  slowlog   the slow query log's SQL listeners (no wrapper)
+  all       the handler as main.py registers it, with every listener on
+  a/a       the bare handler against itself, i.e. the noise floor
+
+Prints the per-call median of the bare handler and, per layer, the median
+of the per-round ratios. Set DETECT_N_PLUS_ONE=true to include the
+per-statement bookkeeping the N+1 detector needs.
+
+Run: python benchmarks/metrics_overhead.py [calls_per_round] [rounds]
+"""
+import asyncio
+import inspect
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.engine import Dialect, Engine
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+from services import metrics, tracing
+from services.slow_query_log import get_slow_query_log
+
+PLAYER = "bench_player"
+
+
+def socket_calls() -> dict:
+    return {
+        "updateGold": ({"playerId": PLAYER, "goldChange": 10},),
+        "getAccountSummary": (PLAYER,),
+        "environmentUpdate": ({"temperature": 20, "humidity": 50, "windSpeed": 5, "noise": "low", "brightness": 5},),
+        "getEnvironment": (),
+    }
+
+
+def install_all():
+    metrics.instrument_database()
+    tracing.trace_database()
+    get_slow_query_log().install()
+
+
+def uninstall_all():
+    metrics.uninstrument_database()
+    tracing.untrace_database()
+    get_slow_query_log().uninstall()
+
+
+def clear_event_flags():
+    # SQLAlchemy flags a class as having listeners when the first one is
+    # added and never clears it, so after any install every "bare" run would
+    # still take the event dispatch path. Only valid once all are removed.
+    Engine._has_events = False
+    Dialect._has_events = False
+
+
+def _nothing():
+    pass
+
+
+def layers(name: str, registered, bare) -> dict:
+    """Layer -> (handler, install listeners, remove listeners)."""
+    slow_log = get_slow_query_log()
+    return {
+        "metrics": (metrics._timed_socket_handler(name, bare), metrics.instrument_database,
+                    metrics.uninstrument_database),
+        "tracing": (tracing._traced_socket_handler(name, bare), tracing.trace_database, tracing.untrace_database),
+        "slowlog": (bare, slow_log.install, slow_log.uninstall),
+        "all": (registered, install_all, uninstall_all),
+        "a/a": (bare, _nothing, _nothing),
+    }
+
+
+async def time_round(handler, args: tuple, calls: int) -> float:
+    started = time.perf_counter()
+    for _ in range(calls):
+        await handler("bench_sid", *args)
+    return (time.perf_counter() - started) / calls
+
+
+async def compare(bare, layer: tuple, args: tuple, calls: int, rounds: int) -> tuple[list, list]:
+    handler, install, uninstall = layer
+    off, on = [], []
+    for round_number in range(rounds):
+        # Swap the order each round; writes make later calls slightly slower
+        for instrumented in ((False, True) if round_number % 2 else (True, False)):
+            if instrumented:
+                install()
+                on.append(await time_round(handler, args, calls))
+                uninstall()
+                clear_event_flags()
+            else:
+                off.append(await time_round(bare, args, calls))
+    return off, on
+
+
+async def run(calls: int, rounds: int) -> None:
+    import main
+    handlers = main.sio.handlers["/"]
+    await handlers["join"]("bench_sid", PLAYER)
+    uninstall_all()  # main.py installed every listener at import
+    clear_event_flags()
+
+    names = ("metrics", "tracing", "slowlog", "all", "a/a")
+    print(f"{'event':<20} {'bare (us)':>10}" + "".join(f" {name:>9}" for name in names))
+    for name, args in socket_calls().items():
+        registered = handlers[name]
+        bare = inspect.unwrap(registered)
+        bare_times, overheads = [], []
+        for layer in layers(name, registered, bare).values():
+            off, on = await compare(bare, layer, args, calls, rounds)
+            bare_times.extend(off)
+            # Paired by round so drift in machine load cancels out
+            overheads.append(statistics.median(b / a - 1 for a, b in zip(off, on)))
+        print(f"{name:<20} {statistics.median(bare_times) * 1e6:>10.1f}"
+              + "".join(f" {overhead:>+9.1%}" for overhead in overheads))
+
+
+def main(calls: int = 50, rounds: int = 60):
+    with tempfile.TemporaryDirectory() as directory:
+        database.engine = create_engine(
+            f"sqlite:///{os.path.join(directory, 'bench.db')}", connect_args={"check_same_thread": False}
+        )
+        database.SessionLocal.configure(bind=database.engine)
+        database.init_db()
+        asyncio.run(run(calls, rounds))
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:3]))
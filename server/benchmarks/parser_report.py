@@ -0,0 +1,279 @@
+"""
+Report prompt size and parse-failure rate for the Gemini intent parser,
+before and after it moved to a system instruction with a response schema.
+
+  before  LEGACY_PROMPT pasted into every request, the reply decoded with
+          fence stripping plus json.loads (the old parse path)
+  after   parse_command_with_gemini: SYSTEM_PROMPT as system instruction,
+          schema-constrained reply validated with ParsedCommand
+
+Each corpus line may carry the model's recorded reply for both paths
+("legacy_response" and "response": text plus the prompt tokens the API
+billed, or the provider error). By default those recordings are replayed
+through a stub in place of the model, so the report runs in CI without an
+API key. Lines without recordings only contribute estimated prompt sizes
+(characters / 4 on both sides). --live calls the real model for both paths
+instead; --record does the same and writes the replies into the corpus.
+Provider errors are counted apart from parse failures.
+
+Run: python benchmarks/parser_report.py [corpus.jsonl] [--live | --record]
+     --live and --record need GEMINI_API_KEY
+"""
+import asyncio
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from controllers import voice_command
+from controllers.voice_command import SYSTEM_PROMPT, COMMAND_SCHEMA
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "voice_corpus.jsonl")
+
+# Rough characters per token for English prompts when nothing was recorded
+CHARS_PER_TOKEN = 4
+
+# The prompt the parser concatenated into every request before it used a
+# system instruction, kept verbatim so the old path can be re-run
+LEGACY_PROMPT = """You are a banking voice command parser. Your job is to convert natural language banking requests into structured JSON commands.
+
+Available commands:
+1. check_balance - Check account balance
+   - account_type: "checking", "savings", "credit_card", or "treasure_chest" (gold bars)
+   - If user says "all" or doesn't specify, use "all"
+
+2. transfer - Transfer money between user's own accounts
+   - from_account: "checking" or "savings"
+   - to_account: "checking", "savings", or "credit_card" (to pay off debt)
+   - amount: number (in dollars)
+
+3. send_money - Send money to another person
+   - recipient_name: string (the person's name to search for)
+   - amount: number (in dollars)
+   - from_account: "checking" or "savings" (default: "checking")
+
+4. exchange_gold - Convert gold bars to cash
+   - bars: number of gold bars to exchange
+   - to_account: "checking" or "savings" (default: "checking")
+
+5. get_transactions - Get recent transaction history
+   - account_type: "checking", "savings", "credit_card", "treasure_chest", or "all"
+   - limit: number (default: 5)
+
+6. help - User needs help or is confused
+   - No parameters needed
+
+7. unknown - Cannot understand the request
+   - No parameters needed
+
+RULES:
+- Always respond with valid JSON only, no other text
+- Parse amounts carefully: "fifty dollars" = 50, "one hundred" = 100, "5 bucks" = 5
+- Account synonyms: "main account" = "checking", "emergency fund" = "savings", "gold" = "treasure_chest"
+- If the user mentions a person's name for sending money, extract it as recipient_name
+- Be flexible with phrasing but strict with JSON format
+
+Response format:
+{
+  "action": "command_name",
+  "parameters": { ... },
+  "confidence": 0.0-1.0
+}
+
+Examples:
+User: "What's my balance?"
+{"action": "check_balance", "parameters": {"account_type": "all"}, "confidence": 0.95}
+
+User: "How much do I have in savings?"
+{"action": "check_balance", "parameters": {"account_type": "savings"}, "confidence": 0.98}
+
+User: "Transfer 50 dollars from checking to savings"
+{"action": "transfer", "parameters": {"from_account": "checking", "to_account": "savings", "amount": 50}, "confidence": 0.95}
+
+User: "Send 20 bucks to John"
+{"action": "send_money", "parameters": {"recipient_name": "John", "amount": 20, "from_account": "checking"}, "confidence": 0.90}
+
+User: "Exchange 2 gold bars"
+{"action": "exchange_gold", "parameters": {"bars": 2, "to_account": "checking"}, "confidence": 0.95}
+
+User: "Show my recent transactions"
+{"action": "get_transactions", "parameters": {"account_type": "all", "limit": 5}, "confidence": 0.92}
+
+User: "Gibberish asdfasdf"
+{"action": "unknown", "parameters": {}, "confidence": 0.1}
+"""
+
+
+def legacy_prompt(transcript: str) -> str:
+    return f"{LEGACY_PROMPT}\n\nUser: \"{transcript}\"\n\nRespond with JSON only:"
+
+
+def legacy_decode(response_text: str) -> dict:
+    """The fence-stripping json.loads the parser used before structured output."""
+    response_text = response_text.strip()
+    if response_text.startswith("```"):
+        lines = response_text.split("\n")
+        response_text = "\n".join(lines[1:-1])
+    result = json.loads(response_text)
+    if not isinstance(result, dict) or "action" not in result:
+        raise ValueError("Reply is not a command object")
+    return result
+
+
+def estimate_tokens(chars: int) -> float:
+    return chars / CHARS_PER_TOKEN
+
+
+class RecordedResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class ReplayModel:
+    """Stands in for the Gemini model, returning the recorded reply for each prompt."""
+
+    def __init__(self, replies: dict):
+        self.replies = replies
+
+    async def generate_content_async(self, prompt, **kwargs):
+        return RecordedResponse(self.replies[prompt])
+
+
+def load_corpus(path: str) -> list[dict]:
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def save_corpus(path: str, corpus: list[dict]) -> None:
+    with open(path, "w") as f:
+        for entry in corpus:
+            f.write(json.dumps(entry) + "\n")
+
+
+async def record_reply(model, prompt: str) -> dict:
+    try:
+        response = await model.generate_content_async(prompt)
+        return {"text": response.text, "prompt_tokens": response.usage_metadata.prompt_token_count}
+    except Exception as e:
+        return {"error": str(e)}
+
+
+async def record(corpus: list[dict]) -> list[dict]:
+    """Send every transcript through both paths of the real model and attach the replies."""
+    import google.generativeai as genai
+
+    legacy_model = genai.GenerativeModel(voice_command.model.model_name)
+    recorded = []
+    for entry in corpus:
+        recorded.append({
+            **entry,
+            "legacy_response": await record_reply(legacy_model, legacy_prompt(entry["transcript"])),
+            "response": await record_reply(voice_command.model, entry["transcript"]),
+        })
+    return recorded
+
+
+async def parse_legacy(model, transcript: str) -> dict:
+    """Parse the old way; a reply json.loads can't turn into a command counts as failed."""
+    response = await model.generate_content_async(legacy_prompt(transcript))
+    try:
+        return legacy_decode(response.text)
+    except ValueError:  # json.JSONDecodeError included
+        return {"failed": True}
+
+
+async def parse_schema(transcript: str) -> dict:
+    """Parse the current way; None if the parser fell back without a reply (circuit open)."""
+    result = await voice_command.parse_command_with_gemini(transcript)
+    if result["parser"] == "gemini":
+        return result
+    if result.get("gemini_error", "").startswith("Invalid response"):
+        return {"failed": True}
+    return None
+
+
+async def replay(corpus: list[dict]) -> tuple[list, list]:
+    """Run the recorded replies through both parse paths; None where the provider failed."""
+    replies = {}
+    for entry in corpus:
+        for prompt, reply in ((legacy_prompt(entry["transcript"]), entry["legacy_response"]),
+                              (entry["transcript"], entry["response"])):
+            if "error" not in reply:
+                replies[prompt] = reply["text"]
+    model = ReplayModel(replies)
+
+    original_model = voice_command.model
+    voice_command.model = model
+    try:
+        before, after = [], []
+        for entry in corpus:
+            transcript = entry["transcript"]
+            before.append(await parse_legacy(model, transcript) if legacy_prompt(transcript) in replies else None)
+            after.append(await parse_schema(transcript) if transcript in replies else None)
+    finally:
+        voice_command.model = original_model
+    return before, after
+
+
+def summarize(results: list, corpus: list[dict]) -> dict:
+    answered = [(r, e) for r, e in zip(results, corpus) if r is not None]
+    count = len(answered)
+    return {
+        "provider_errors": len(results) - count,
+        "parse_failure_rate": sum(1 for r, _ in answered if r.get("failed")) / count if count else None,
+        "action_accuracy": sum(1 for r, e in answered if not r.get("failed") and r["action"] == e["action"]) / count
+        if count else None,
+    }
+
+
+def mean_prompt_tokens(corpus: list[dict], key: str) -> float:
+    counted = [e[key]["prompt_tokens"] for e in corpus if "prompt_tokens" in e[key]]
+    return round(sum(counted) / len(counted), 1) if counted else None
+
+
+def run_report(corpus: list[dict], live: bool = False) -> dict:
+    """Return before/after prompt tokens and failure figures for the corpus."""
+    if live:
+        corpus = asyncio.run(record(corpus))
+    recorded = [e for e in corpus if "legacy_response" in e and "response" in e]
+    report = {"transcripts": len(corpus), "recorded": len(recorded)}
+
+    if recorded:
+        report["tokens_per_request_before"] = mean_prompt_tokens(recorded, "legacy_response")
+        report["tokens_per_request_after"] = mean_prompt_tokens(recorded, "response")
+        report["tokens_counted"] = "billed"
+        before, after = asyncio.run(replay(recorded))
+        for name, results in (("before", before), ("after", after)):
+            report.update({f"{key}_{name}": value for key, value in summarize(results, recorded).items()})
+    else:
+        fixed_chars = len(SYSTEM_PROMPT) + len(json.dumps(COMMAND_SCHEMA))
+        report["tokens_per_request_before"] = round(
+            sum(estimate_tokens(len(legacy_prompt(e["transcript"]))) for e in corpus) / len(corpus), 1)
+        report["tokens_per_request_after"] = round(
+            sum(estimate_tokens(fixed_chars + len(e["transcript"])) for e in corpus) / len(corpus), 1)
+        report["tokens_counted"] = "estimated"
+    return report
+
+
+def main():
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    path = args[0] if args else DEFAULT_CORPUS
+    corpus = load_corpus(path)
+    if "--record" in sys.argv:
+        corpus = asyncio.run(record(corpus))
+        save_corpus(path, corpus)
+    report = run_report(corpus, live="--live" in sys.argv)
+
+    print("Gemini Parser Report\n" + "=" * 50)
+    for key, value in report.items():
+        if isinstance(value, float):
+            print(f"  {key:<28} {value:.3f}")
+        else:
+            print(f"  {key:<28} {value}")
+    if not report["recorded"]:
+        print("\n  No recorded replies: failure rates need --record (or --live) with GEMINI_API_KEY")
+
+
+if __name__ == "__main__":
+    main()
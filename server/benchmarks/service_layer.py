@@ -0,0 +1,229 @@
+"""
+Microbenchmarks for the service layer over seeded datasets.
+
+For each dataset size (a seed_dataset.py snapshot, generated on first use)
+and each storage (a copy of the snapshot file, or an in-memory copy),
+times the hot service calls, each on a fresh session as a request would
+get:
+
+  UserService.create_user / get_or_create_user
+  TransactionService.transfer / send_money / exchange_gold / get_transaction_history
+  AccountService.get_account_summary
+  EnvironmentService.update_environment
+
+Results go to a JSON file tagged with the git commit; pass --compare with
+an older file to print the change per call and flag regressions.
+
+Run: python benchmarks/service_layer.py [--sizes 1000,100000,1000000]
+     [--storage file,memory] [--iterations N] [--output PATH] [--compare OLD.json]
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import sqlalchemy
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from seed_dataset import account_id, ensure_snapshot, memory_engine, restore, user_id
+from services.account_service import AccountService
+from services.environment_service import EnvironmentService
+from services.transaction_service import TransactionService
+from services.user_service import UserService
+
+SEED = 1234
+DEFAULT_SIZES = (1_000, 100_000, 1_000_000)
+STORAGES = ("file", "memory")
+ITERATIONS = 300
+WARMUP = 20
+MIN_ITERATIONS = 5
+SECONDS_PER_CALL = 10.0  # Fewer iterations for calls slower than this allows
+REGRESSION_THRESHOLD = 0.2
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+def open_dataset(storage: str, users: int, directory: str) -> tuple:
+    """Engine on a fresh copy of the (users, SEED) snapshot, and seconds to put it in place."""
+    snapshot = ensure_snapshot(users, SEED)
+    started = time.perf_counter()
+    if storage == "memory":
+        engine = memory_engine(snapshot)
+    else:
+        path = restore(snapshot, os.path.join(directory, f"users_{users}.db"))
+        engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    return engine, time.perf_counter() - started
+
+
+def eligible_users(engine, rng: random.Random) -> tuple[list, list]:
+    """
+    Users with at least 1 in checking, and one entry per gold bar (up to
+    five per user) in random order, to pop one per exchange.
+    """
+    with engine.connect() as connection:
+        funded = connection.exec_driver_sql(
+            "SELECT (id - 1) / 4 FROM accounts WHERE type = 'checking' AND balance >= 1"
+        ).scalars().all()
+        gold = [
+            n for n, bars in connection.exec_driver_sql(
+                "SELECT (id - 1) / 4, CAST(balance AS INTEGER) FROM accounts WHERE type = 'treasure_chest' AND balance >= 1"
+            )
+            for _ in range(min(bars, 5))
+        ]
+    rng.shuffle(gold)
+    return funded, gold
+
+
+def service_calls(users: int, funded: list, gold: list, rng: random.Random) -> dict:
+    """Service call name -> fn(db), each picking seeded users at random."""
+    created = iter(range(10 ** 9))
+    noises = ["quiet", "low", "med", "high", "boomboom"]
+
+    def pick():
+        return rng.randrange(users)
+
+    def send_money(db):
+        sender = rng.choice(funded)
+        recipient = (sender + 1 + rng.randrange(users - 1)) % users
+        return TransactionService(db).send_money(user_id(sender), user_id(recipient), 1)
+
+    def transfer(db):
+        n = rng.choice(funded)
+        return TransactionService(db).transfer(account_id(n, "checking"), account_id(n, "savings"), 1)
+
+    return {
+        "UserService.create_user": lambda db: UserService(db).create_user(f"new{next(created):09d}", "New Player"),
+        "UserService.get_or_create_user": lambda db: UserService(db).get_or_create_user(user_id(pick()), "Player"),
+        "TransactionService.transfer": transfer,
+        "TransactionService.send_money": send_money,
+        "TransactionService.exchange_gold": lambda db: TransactionService(db).exchange_gold(user_id(gold.pop()), 1, "checking"),
+        "TransactionService.get_transaction_history": lambda db: TransactionService(db).get_transaction_history(user_id(pick())),
+        "AccountService.get_account_summary": lambda db: AccountService(db).get_account_summary(user_id(pick())),
+        "EnvironmentService.update_environment": lambda db: EnvironmentService(db).update_environment(
+            temperature=rng.randint(-30, 50), humidity=rng.randint(0, 100), wind_speed=rng.randint(0, 60),
+            noise=rng.choice(noises), brightness=rng.randint(1, 10)
+        ),
+    }
+
+
+def time_call(session_factory, call, iterations: int) -> dict:
+    deadline = time.perf_counter() + SECONDS_PER_CALL
+    for _ in range(WARMUP):
+        db = session_factory()
+        call(db)
+        db.close()
+        if time.perf_counter() > deadline:
+            break
+    timings = []
+    deadline = time.perf_counter() + SECONDS_PER_CALL
+    while len(timings) < iterations and (len(timings) < MIN_ITERATIONS or time.perf_counter() < deadline):
+        db = session_factory()
+        started = time.perf_counter()
+        call(db)
+        timings.append(time.perf_counter() - started)
+        db.close()
+    timings.sort()
+    return {
+        "iterations": len(timings),
+        "mean_us": round(statistics.fmean(timings) * 1e6, 1),
+        "p50_us": round(timings[len(timings) // 2] * 1e6, 1),
+        "p95_us": round(timings[int(len(timings) * 0.95)] * 1e6, 1),
+        "max_us": round(timings[-1] * 1e6, 1),
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run(sizes, storages, iterations: int) -> dict:
+    results = {
+        "commit": git_commit(),
+        "created_at": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "sqlalchemy": sqlalchemy.__version__,
+        "sqlite": sqlite3.sqlite_version,
+        "machine": platform.machine(),
+        "iterations": iterations,
+        "runs": [],
+    }
+    with tempfile.TemporaryDirectory() as directory:
+        for users in sizes:
+            for storage in storages:
+                engine, seconds = open_dataset(storage, users, directory)
+                print(f"\n{users:,} users, {storage}: snapshot loaded in {seconds:.1f}s", flush=True)
+                session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+                rng = random.Random(SEED)
+                funded, gold = eligible_users(engine, rng)
+                calls = {}
+                for name, call in service_calls(users, funded, gold, rng).items():
+                    calls[name] = time_call(session_factory, call, iterations)
+                    print(f"  {name:<45} p50 {calls[name]['p50_us']:>11.1f} us  p95 {calls[name]['p95_us']:>11.1f} us"
+                          f"  ({calls[name]['iterations']} runs)", flush=True)
+                results["runs"].append({"users": users, "storage": storage, "load_seconds": round(seconds, 2), "calls": calls})
+                engine.dispose()
+    return results
+
+
+def compare(old: dict, new: dict, threshold: float = REGRESSION_THRESHOLD) -> int:
+    """Print p50 changes from `old` to `new`; returns the number of regressions."""
+    previous = {(run["users"], run["storage"]): run["calls"] for run in old["runs"]}
+    regressions = 0
+    print(f"\nChange in p50 from {old['commit']} to {new['commit']} (regression: > {threshold:.0%} slower)")
+    for run in new["runs"]:
+        before = previous.get((run["users"], run["storage"]), {})
+        for name, timing in run["calls"].items():
+            if name not in before:
+                continue
+            change = timing["p50_us"] / before[name]["p50_us"] - 1
+            flag = "  REGRESSION" if change > threshold else ""
+            regressions += bool(flag)
+            print(f"  {run['users']:>9,} {run['storage']:<6} {name:<45} "
+                  f"{before[name]['p50_us']:>9.1f} -> {timing['p50_us']:>9.1f} us ({change:+.0%}){flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the service layer over seeded SQLite datasets")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)), help="comma-separated user counts")
+    parser.add_argument("--storage", default=",".join(STORAGES), help="file, memory or both")
+    parser.add_argument("--iterations", type=int, default=ITERATIONS)
+    parser.add_argument("--output", help="results file (default: benchmarks/results/service_layer-<commit>.json)")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    args = parser.parse_args()
+
+    storages = args.storage.split(",")
+    for storage in storages:
+        if storage not in STORAGES:
+            parser.error(f"unknown storage {storage!r}")
+    results = run([int(size) for size in args.sizes.split(",")], storages, args.iterations)
+
+    output = args.output or os.path.join(RESULTS_DIR, f"service_layer-{results['commit']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nWrote {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(json.load(f), results)
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Measure IMU telemetry ingest throughput.
+
+  direct     - TelemetryStore.ingest() on prebuilt packets, per batch size,
+               with tracemalloc counting allocations per batch (constant in
+               the batch size means nothing is allocated per sample)
+  websocket  - N simulated gloves each sending 25-sample batches as fast as
+               they can over /api/telemetry/ingest against a live server
+  udp        - the same over TELEMETRY_UDP_PORT datagrams (unpaced, so the
+               kernel drops what the server can't keep up with)
+
+Run: python benchmarks/telemetry_ingest.py [devices] [seconds]
+"""
+import asyncio
+import os
+import socket
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import websockets
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tts_ttfb import free_port, serve
+from services.imu_telemetry import SAMPLE_DTYPE, TelemetryStore, pack_batch
+
+BATCH_SIZES = (1, 10, 25, 100, 250)
+WIRE_BATCH = 25  # 100 ms of samples at 250 Hz
+
+
+def make_packets(device_id: str, batch: int, count: int) -> list[bytes]:
+    rng = np.random.default_rng(0)
+    packets = []
+    for seq in range(count):
+        samples = np.zeros(batch, dtype=SAMPLE_DTYPE)
+        samples["t_us"] = (seq * batch + np.arange(batch)) * 4000
+        samples["accel"] = rng.integers(-16384, 16384, (batch, 3))
+        samples["gyro"] = rng.integers(-3000, 3000, (batch, 3))
+        packets.append(pack_batch(device_id, seq, samples))
+    return packets
+
+
+def bench_direct() -> None:
+    print("Direct ingest (one device)")
+    for batch in BATCH_SIZES:
+        store = TelemetryStore()
+        packets = make_packets("bench", batch, max(20000 // batch, 200))
+
+        tracemalloc.start()
+        for packet in packets[:50]:
+            store.ingest(packet)
+        before = tracemalloc.take_snapshot()
+        for packet in packets[50:100]:
+            store.ingest(packet)
+        after = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+        blocks = sum(stat.count_diff for stat in after.compare_to(before, "filename") if stat.count_diff > 0)
+
+        started = time.perf_counter()
+        for packet in packets:
+            store.ingest(packet)
+        elapsed = time.perf_counter() - started
+        samples = batch * len(packets)
+        print(f"  batch {batch:>4}: {samples / elapsed:>12,.0f} samples/s  "
+              f"{elapsed / len(packets) * 1e6:6.1f} us/batch  retained blocks per 50 batches: {blocks}")
+
+
+async def stream_websocket(url: str, device_id: str, seconds: float) -> int:
+    packets = make_packets(device_id, WIRE_BATCH, 400)
+    sent = 0
+    deadline = time.perf_counter() + seconds
+    async with websockets.connect(url, max_queue=None) as ws:
+        while time.perf_counter() < deadline:
+            await ws.send(packets[sent % len(packets)])
+            sent += 1
+    return sent * WIRE_BATCH
+
+
+async def stream_udp(port: int, device_id: str, seconds: float) -> int:
+    packets = make_packets(device_id, WIRE_BATCH, 400)
+    sent = 0
+    deadline = time.perf_counter() + seconds
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        while time.perf_counter() < deadline:
+            sock.sendto(packets[sent % len(packets)], ("127.0.0.1", port))
+            sent += 1
+            if sent % 50 == 0:
+                await asyncio.sleep(0)  # Let the other senders run
+    return sent * WIRE_BATCH
+
+
+def report(name: str, store: TelemetryStore, devices: int, seconds: float, sent: int, prefix: str) -> None:
+    stats = store.stats()["devices"]
+    stored = sum(device["samples"] for key, device in stats.items() if key.startswith(prefix))
+    print(f"  {name:<9} {devices} devices: {stored / seconds:>10,.0f} samples/s stored "
+          f"({stored / seconds / devices:,.0f} per device, {stored / max(sent, 1):.1%} of sent)")
+
+
+def main():
+    devices = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 3.0
+
+    bench_direct()
+
+    udp_port = free_port()
+    from services import imu_telemetry
+    imu_telemetry.TELEMETRY_UDP_PORT = udp_port
+    from main import socket_app
+    app_port = free_port()
+    serve(socket_app, app_port)
+    store = imu_telemetry.get_telemetry_store()
+
+    print("\nOver the network (live server, 25-sample batches)")
+    url = f"ws://127.0.0.1:{app_port}/api/telemetry/ingest"
+
+    async def run_all(streamer, target, prefix):
+        return sum(await asyncio.gather(*(streamer(target, f"{prefix}{i}", seconds) for i in range(devices))))
+
+    sent = asyncio.run(run_all(stream_websocket, url, "ws-"))
+    time.sleep(0.5)
+    report("websocket", store, devices, seconds, sent, "ws-")
+    sent = asyncio.run(run_all(stream_udp, udp_port, "udp-"))
+    time.sleep(0.5)
+    report("udp", store, devices, seconds, sent, "udp-")
+    print(f"  (a glove produces {250:,} samples/s)")
+
+
+if __name__ == "__main__":
+    main()
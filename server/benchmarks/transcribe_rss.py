@@ -0,0 +1,121 @@
+"""
+Measure server peak RSS while /api/transcribe handles many concurrent uploads.
+
+Starts a stub ElevenLabs speech-to-text endpoint that drains the upload and
+returns a fixed transcript, runs the game server in a subprocess pointed at it
+via ELEVENLABS_BASE_URL, fires concurrent uploads of random audio-sized
+payloads and reads the server's peak RSS (VmHWM) from /proc. Linux only.
+
+Run: python benchmarks/transcribe_rss.py [uploads] [upload_mb]
+"""
+import asyncio
+import os
+import subprocess
+import sys
+import time
+
+import httpx
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from tts_ttfb import free_port, serve
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+stub_state = {"requests": 0, "bytes": 0}
+
+
+async def stub_stt(request):
+    """Stand-in for POST /v1/speech-to-text; reads the body as it streams in."""
+    stub_state["requests"] += 1
+    async for chunk in request.stream():
+        stub_state["bytes"] += len(chunk)
+    await asyncio.sleep(0.05)
+    return JSONResponse({
+        "language_code": "eng",
+        "language_probability": 1.0,
+        "text": "check my balance",
+        "words": []
+    })
+
+
+stub_app = Starlette(routes=[Route("/v1/speech-to-text", stub_stt, methods=["POST"])])
+
+
+def read_memory_kb(pid: int) -> dict:
+    """VmRSS and VmHWM (peak) for a process, in kB."""
+    memory = {}
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith(("VmRSS:", "VmHWM:")):
+                key, value = line.split(":")
+                memory[key] = int(value.split()[0])
+    return memory
+
+
+def start_server(port: int, stub_port: int) -> subprocess.Popen:
+    env = dict(
+        os.environ,
+        ELEVENLABS_BASE_URL=f"http://127.0.0.1:{stub_port}",
+        ELEVENLABS_API_KEY=os.environ.get("ELEVENLABS_API_KEY", "stub")
+    )
+    code = f"import uvicorn, main; uvicorn.run(main.socket_app, host='127.0.0.1', port={port}, log_level='warning')"
+    process = subprocess.Popen([sys.executable, "-c", code], cwd=SERVER_DIR, env=env)
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/", timeout=1)
+            return process
+        except httpx.TransportError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError("server did not start")
+
+
+async def upload_all(url: str, uploads: int, payload: bytes) -> list[int]:
+    limits = httpx.Limits(max_connections=uploads)
+    async with httpx.AsyncClient(timeout=120, limits=limits) as http:
+        async def upload(i):
+            files = {"file": (f"clip{i}.wav", payload, "audio/wav")}
+            response = await http.post(url, files=files)
+            return response.status_code
+
+        return await asyncio.gather(*(upload(i) for i in range(uploads)))
+
+
+def main():
+    uploads = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    upload_mb = float(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    stub_port = free_port()
+    serve(stub_app, stub_port)
+    port = free_port()
+    server = start_server(port, stub_port)
+    try:
+        idle = read_memory_kb(server.pid)
+        payload = os.urandom(int(upload_mb * 1024 * 1024))
+        started = time.perf_counter()
+        statuses = asyncio.run(upload_all(f"http://127.0.0.1:{port}/api/transcribe", uploads, payload))
+        elapsed = time.perf_counter() - started
+        after = read_memory_kb(server.pid)
+    finally:
+        server.terminate()
+        server.wait()
+
+    upload_total_mb = uploads * upload_mb
+    peak_growth_mb = (after["VmHWM"] - idle["VmRSS"]) / 1024
+
+    print("Transcribe Upload Memory\n" + "=" * 50)
+    print(f"  uploads:            {uploads} x {upload_mb:g} MB concurrent ({upload_total_mb:g} MB total)")
+    print(f"  status codes:       { {code: statuses.count(code) for code in sorted(set(statuses))} }")
+    print(f"  forwarded to stub:  {stub_state['bytes'] / 1024 / 1024:.1f} MB in {stub_state['requests']} requests")
+    print(f"  elapsed:            {elapsed:.2f} s")
+    print(f"  server RSS idle:    {idle['VmRSS'] / 1024:.1f} MB")
+    print(f"  server RSS peak:    {after['VmHWM'] / 1024:.1f} MB (+{peak_growth_mb:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
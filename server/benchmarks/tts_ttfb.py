@@ -0,0 +1,124 @@
+"""
+Measure time-to-first-byte of /api/text-to-speech against a local stub TTS server.
+
+Starts a stub ElevenLabs endpoint that emits MP3-sized chunks with a fixed
+delay between them, points the server at it via ELEVENLABS_BASE_URL, and
+times the first audio byte and the full response for each request.
+Also checks that a client hanging up mid-stream closes the upstream request.
+
+Run: python benchmarks/tts_ttfb.py [requests] [chunks] [chunk_delay_ms]
+"""
+import asyncio
+import os
+import socket
+import statistics
+import sys
+import threading
+import time
+
+import httpx
+import uvicorn
+from starlette.applications import Starlette
+from starlette.responses import StreamingResponse
+from starlette.routing import Route
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+CHUNK_SIZE = 4096
+
+stub_state = {"chunks": 10, "delay": 0.05, "started": 0, "finished": 0, "aborted": 0}
+
+
+async def stub_tts(request):
+    """Stand-in for POST /v1/text-to-speech/{voice_id}."""
+    stub_state["started"] += 1
+
+    async def generate():
+        sent = 0
+        try:
+            for _ in range(stub_state["chunks"]):
+                await asyncio.sleep(stub_state["delay"])
+                yield b"\xff" * CHUNK_SIZE
+                sent += 1
+        finally:
+            if sent == stub_state["chunks"]:
+                stub_state["finished"] += 1
+            else:
+                stub_state["aborted"] += 1
+
+    return StreamingResponse(generate(), media_type="audio/mpeg")
+
+
+stub_app = Starlette(routes=[Route("/v1/text-to-speech/{voice_id}", stub_tts, methods=["POST"])])
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def serve(app, port: int) -> uvicorn.Server:
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return server
+
+
+def measure(url: str, requests: int) -> tuple[list[float], list[float]]:
+    ttfb, total = [], []
+    with httpx.Client(timeout=60) as http:
+        for _ in range(requests):
+            started = time.perf_counter()
+            with http.stream("POST", url, json={"text": "Your credit card has no balance."}) as response:
+                response.raise_for_status()
+                first = None
+                for _ in response.iter_bytes():
+                    if first is None:
+                        first = time.perf_counter() - started
+            ttfb.append(first)
+            total.append(time.perf_counter() - started)
+    return ttfb, total
+
+
+def check_disconnect(url: str) -> None:
+    """Read one chunk, hang up, and wait for the stub to see the abort."""
+    before = stub_state["aborted"]
+    with httpx.Client(timeout=60) as http:
+        with http.stream("POST", url, json={"text": "Hang up early"}) as response:
+            next(response.iter_bytes())
+    deadline = time.time() + 5
+    while stub_state["aborted"] == before and time.time() < deadline:
+        time.sleep(0.05)
+    print(f"  upstream closed on disconnect: {stub_state['aborted'] > before}")
+
+
+def main():
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    stub_state["chunks"] = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    stub_state["delay"] = (int(sys.argv[3]) if len(sys.argv) > 3 else 50) / 1000
+
+    stub_port = free_port()
+    serve(stub_app, stub_port)
+    os.environ["ELEVENLABS_BASE_URL"] = f"http://127.0.0.1:{stub_port}"
+    os.environ.setdefault("ELEVENLABS_API_KEY", "stub")
+
+    from main import socket_app
+    app_port = free_port()
+    serve(socket_app, app_port)
+    url = f"http://127.0.0.1:{app_port}/api/text-to-speech"
+
+    ttfb, total = measure(url, requests)
+
+    print("TTS Time To First Byte\n" + "=" * 50)
+    print(f"  stub: {stub_state['chunks']} x {CHUNK_SIZE} B chunks, {stub_state['delay'] * 1000:.0f} ms apart")
+    print(f"  requests:          {requests}")
+    print(f"  ttfb p50 / max:    {statistics.median(ttfb) * 1000:.1f} / {max(ttfb) * 1000:.1f} ms")
+    print(f"  total p50 / max:   {statistics.median(total) * 1000:.1f} / {max(total) * 1000:.1f} ms")
+    print(f"  buffered ttfb would equal total: {statistics.median(total) / statistics.median(ttfb):.1f}x later")
+    check_disconnect(url)
+
+
+if __name__ == "__main__":
+    main()
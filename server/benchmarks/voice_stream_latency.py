@@ -0,0 +1,187 @@
+"""
+Compare end-of-speech-to-result latency: /voice-stream vs upload-then-parse.
+
+Both paths hit the same stub speech-to-text server (fixed latency plus a
+per-second-of-audio cost) and a stub intent parser with Gemini-like latency,
+against an in-memory database.
+
+  serial  - the user stops recording RECORD_TAIL_SECONDS after speaking,
+            then the WAV is POSTed to /api/transcribe and the transcript
+            to /api/voice-command
+  stream  - frames are sent in real time over /api/voice-stream
+
+Both are timed from the end of speech to the command result.
+
+Run: python benchmarks/voice_stream_latency.py [runs] [stt_ms] [parse_ms]
+"""
+import asyncio
+import io
+import json
+import os
+import statistics
+import sys
+import time
+import wave
+
+import httpx
+import numpy as np
+import websockets
+from sqlalchemy import StaticPool, create_engine
+from sqlalchemy.orm import sessionmaker
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tts_ttfb import free_port, serve
+
+RATE = 16000
+FRAME_SECONDS = 0.02
+STT_SECONDS_PER_AUDIO_SECOND = 0.05
+SPEECH_START_SECONDS = 0.5
+SPEECH_SECONDS = 1.5
+RECORD_TAIL_SECONDS = 0.3
+
+stub_state = {"stt_delay": 0.3, "parse_delay": 0.4}
+
+
+async def stub_stt(request):
+    """Stand-in for POST /v1/speech-to-text; latency grows with audio length."""
+    body = await request.body()
+    audio_seconds = len(body) / (RATE * 2)
+    await asyncio.sleep(stub_state["stt_delay"] + audio_seconds * STT_SECONDS_PER_AUDIO_SECOND)
+    return JSONResponse({
+        "language_code": "eng",
+        "language_probability": 1.0,
+        "text": "check my balance",
+        "words": []
+    })
+
+
+stub_app = Starlette(routes=[Route("/v1/speech-to-text", stub_stt, methods=["POST"])])
+
+
+def make_utterance(tail_seconds: float) -> np.ndarray:
+    """Room noise, SPEECH_SECONDS of 'speech', then tail_seconds of room noise."""
+    rng = np.random.default_rng(0)
+    t = np.arange(int(SPEECH_SECONDS * RATE)) / RATE
+    speech = 0.4 * np.sin(2 * np.pi * 220 * t) * (0.6 + 0.4 * np.sin(2 * np.pi * 3 * t))
+    noise = lambda seconds: 0.002 * rng.standard_normal(int(seconds * RATE))
+    return np.concatenate([noise(SPEECH_START_SECONDS), speech, noise(tail_seconds)]).astype(np.float32)
+
+
+def to_wav(samples: np.ndarray) -> bytes:
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(RATE)
+        wav.writeframes((samples * 32767).astype("<i2").tobytes())
+    return buffer.getvalue()
+
+
+def install_stubs(user_id: str) -> None:
+    """Point the voice command pipeline at an in-memory database and a slow stub parser."""
+    from database import Base
+    from controllers import voice_command
+    from services.user_service import UserService
+    import models  # noqa: F401
+
+    engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    voice_command.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    db = voice_command.SessionLocal()
+    UserService(db).create_user(user_id, "Bench User")
+    db.close()
+
+    async def slow_parse(transcript):
+        await asyncio.sleep(stub_state["parse_delay"])
+        result = voice_command.parse_command_with_keywords(transcript)
+        result["parser"] = "stub"
+        return result
+
+    voice_command.parse_command_with_gemini = slow_parse
+
+
+async def run_serial(base_url: str, user_id: str, audio: np.ndarray) -> float:
+    wav = to_wav(audio)
+    await asyncio.sleep(len(audio) / RATE)  # Recording the clip
+    async with httpx.AsyncClient(base_url=base_url, timeout=60) as http:
+        started = time.perf_counter()
+        transcript = (await http.post("/api/transcribe", files={"file": ("clip.wav", wav, "audio/wav")})).json()
+        result = (await http.post("/api/voice-command", json={
+            "user_id": user_id, "transcript": transcript["transcript"]
+        })).json()
+        elapsed = time.perf_counter() - started
+    assert result["action"] == "check_balance", result
+    return elapsed + RECORD_TAIL_SECONDS
+
+
+async def run_stream(ws_url: str, audio: np.ndarray) -> tuple[float, dict]:
+    frame = int(RATE * FRAME_SECONDS)
+    speech_end = int((SPEECH_START_SECONDS + SPEECH_SECONDS) * RATE)
+    pcm = (audio * 32767).astype("<i2")
+    final = None
+    async with websockets.connect(ws_url) as ws:
+        async def receive():
+            nonlocal final
+            async for message in ws:
+                data = json.loads(message)
+                if data["type"] in ("final", "error"):
+                    final = (time.perf_counter(), data)
+                    return
+
+        receiver = asyncio.create_task(receive())
+        speech_end_sent = None
+        for start in range(0, len(pcm), frame):
+            if receiver.done():
+                break
+            await ws.send(pcm[start:start + frame].tobytes())
+            if speech_end_sent is None and start + frame >= speech_end:
+                speech_end_sent = time.perf_counter()
+            await asyncio.sleep(FRAME_SECONDS)  # Real-time capture
+        await receiver
+    received_at, data = final
+    assert data["type"] == "final" and data["result"]["action"] == "check_balance", data
+    return received_at - speech_end_sent, data
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    stub_state["stt_delay"] = (int(sys.argv[2]) if len(sys.argv) > 2 else 300) / 1000
+    stub_state["parse_delay"] = (int(sys.argv[3]) if len(sys.argv) > 3 else 400) / 1000
+
+    stub_port = free_port()
+    serve(stub_app, stub_port)
+    os.environ["ELEVENLABS_BASE_URL"] = f"http://127.0.0.1:{stub_port}"
+    os.environ.setdefault("ELEVENLABS_API_KEY", "stub")
+
+    from main import socket_app
+    user_id = "bench_voice_stream"
+    install_stubs(user_id)
+    app_port = free_port()
+    serve(socket_app, app_port)
+
+    recorded = make_utterance(RECORD_TAIL_SECONDS)
+    live = make_utterance(2.0)
+    serial = [asyncio.run(run_serial(f"http://127.0.0.1:{app_port}", user_id, recorded)) for _ in range(runs)]
+    streamed = [
+        asyncio.run(run_stream(f"ws://127.0.0.1:{app_port}/api/voice-stream?user_id={user_id}", live))
+        for _ in range(runs)
+    ]
+    stream_latency = [latency for latency, _ in streamed]
+    server_latency = [data["latency"]["from_last_frame_ms"] for _, data in streamed]
+
+    print("Voice Command Latency After End Of Speech\n" + "=" * 50)
+    print(f"  stub stt: {stub_state['stt_delay'] * 1000:.0f} ms + {STT_SECONDS_PER_AUDIO_SECOND * 1000:.0f} ms/s audio, "
+          f"stub parse: {stub_state['parse_delay'] * 1000:.0f} ms, runs: {runs}")
+    print(f"  serial upload + parse p50:   {statistics.median(serial) * 1000:.0f} ms after end of speech")
+    print(f"  stream p50:                  {statistics.median(stream_latency) * 1000:.0f} ms after end of speech")
+    print(f"  stream server p50:           {statistics.median(server_latency):.0f} ms after the endpoint frame")
+    print(f"  early intent used:           {sum(d['latency']['early_intent'] for _, d in streamed)}/{runs}")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,5 +4,9 @@ from .transaction_controller import router as transaction_router
 from .environment_controller import router as environment_router
 from .speech_to_text import router as speech_to_text_router
 from .voice_command import router as voice_command_router
+from .diagnostics_controller import router as diagnostics_router
+from .voice_stream import router as voice_stream_router
+from .telemetry_controller import router as telemetry_router
+from .metrics_controller import router as metrics_router
 
-__all__ = ["user_router", "account_router", "transaction_router", "environment_router", "speech_to_text_router", "voice_command_router"]
+__all__ = ["user_router", "account_router", "transaction_router", "environment_router", "speech_to_text_router", "voice_command_router", "diagnostics_router", "voice_stream_router", "telemetry_router", "metrics_router"]
@@ -3,9 +3,10 @@ from sqlalchemy.orm import Session
 from typing import List
 from database import get_db
 from services.account_service import AccountService
+from services.profiler import ProfiledRoute
 from schemas.account import AccountResponse, AccountSummary
 
-router = APIRouter(prefix="/api", tags=["accounts"])
+router = APIRouter(prefix="/api", tags=["accounts"], route_class=ProfiledRoute)
 
 
 @router.get("/user/{user_id}/accounts", response_model=List[AccountResponse])
@@ -0,0 +1,114 @@
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import FileResponse
+from pydantic import BaseModel, Field
+from services.provider_health import get_all_provider_health
+from controllers.voice_command import voice_jobs
+from controllers.speech_to_text import get_tts_cache
+from services.gesture_recognizer import get_gesture_engine
+from services.slow_query_log import get_slow_query_log
+from services.tracing import get_exporter
+from services.profiler import ProfiledRoute, get_profiler
+
+router = APIRouter(prefix="/api/diagnostics", tags=["diagnostics"], route_class=ProfiledRoute)
+
+
+class ProfileArmRequest(BaseModel):
+    target: str = Field(..., description='"GET /api/user/{user_id}" (route template) or "socket sendMoney"')
+    count: int = Field(1, ge=1, le=100)
+    mode: str = Field("sample", description="sample or cprofile")
+    format: str = Field("speedscope", description="speedscope or collapsed (sample mode only)")
+
+
+@router.get("/providers")
+def get_providers():
+    """Get circuit breaker state and rolling stats for external providers."""
+    return get_all_provider_health()
+
+
+@router.get("/voice-jobs")
+def get_voice_job_stats():
+    """Get queue depth and wait/service times for deferred voice commands."""
+    return voice_jobs.stats()
+
+
+@router.get("/tts-cache")
+def get_tts_cache_stats():
+    """Get entry count, size and hit/miss counts for the TTS audio cache."""
+    return get_tts_cache().stats()
+
+
+@router.get("/gestures")
+def get_gesture_stats():
+    """Get tick timings and event counts for the IMU gesture recognizer."""
+    return get_gesture_engine().stats()
+
+
+@router.get("/slow-queries")
+def get_slow_queries(
+    limit: int = Query(50, ge=1, le=500),
+    order_by: str = Query("total_ms", description="total_ms, max_ms, mean_ms or count")
+):
+    """Get statements slower than SLOW_QUERY_MS, aggregated by fingerprint, with plans and sample parameters."""
+    if order_by not in ("total_ms", "max_ms", "mean_ms", "count"):
+        raise HTTPException(status_code=400, detail="order_by must be total_ms, max_ms, mean_ms or count")
+    return get_slow_query_log().summary(limit=limit, order_by=order_by)
+
+
+@router.delete("/slow-queries")
+def reset_slow_queries():
+    """Clear the slow statement aggregates (the log file is kept)."""
+    get_slow_query_log().reset()
+    return {"message": "Slow query aggregates cleared"}
+
+
+@router.get("/tracing")
+def get_tracing_stats():
+    """Get the trace sample rate and span exporter counts (exported, dropped, failed)."""
+    return get_exporter().stats()
+
+
+@router.get("/profiles")
+def list_profiles():
+    """Get armed profiling targets and saved profiles, newest first."""
+    profiler = get_profiler()
+    return {
+        "header_enabled": bool(profiler.token),
+        "armed": profiler.armed,
+        "profiles": profiler.list_profiles()
+    }
+
+
+@router.post("/profiles/arm")
+def arm_profiler(request: ProfileArmRequest):
+    """Profile the next `count` calls of a REST route or Socket.IO event."""
+    try:
+        return get_profiler().arm(request.target, request.count, request.mode, request.format)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.delete("/profiles/arm")
+def disarm_profiler(target: Optional[str] = None):
+    """Stop profiling a target, or every armed target if none is given."""
+    get_profiler().disarm(target)
+    return {"message": "Profiling disarmed"}
+
+
+@router.get("/profiles/{name}")
+def download_profile(name: str):
+    """Download a saved profile (open .speedscope.json files at speedscope.app)."""
+    path = get_profiler().path_for(name)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    media_type = "application/json" if name.endswith(".json") else "application/octet-stream"
+    return FileResponse(path, media_type=media_type, filename=name)
+
+
+@router.delete("/profiles/{name}")
+def delete_profile(name: str):
+    """Delete a saved profile."""
+    if not get_profiler().delete(name):
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return {"message": "Profile deleted"}
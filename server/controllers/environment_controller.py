@@ -2,9 +2,10 @@ from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
 from database import get_db
 from services.environment_service import EnvironmentService
+from services.profiler import ProfiledRoute
 from schemas.environment import EnvironmentUpdate, EnvironmentResponse, AdaptationHints
 
-router = APIRouter(prefix="/api", tags=["environment"])
+router = APIRouter(prefix="/api", tags=["environment"], route_class=ProfiledRoute)
 
 
 @router.get("/environment", response_model=EnvironmentResponse)
@@ -0,0 +1,12 @@
+from fastapi import APIRouter
+from fastapi.responses import Response
+from services.metrics import CONTENT_TYPE, render_metrics
+from services.profiler import ProfiledRoute
+
+router = APIRouter(tags=["metrics"], route_class=ProfiledRoute)
+
+
+@router.get("/metrics", include_in_schema=False)
+def get_metrics():
+    """Get request, socket event, database and provider metrics for Prometheus."""
+    return Response(render_metrics(), media_type=CONTENT_TYPE)
@@ -1,12 +1,24 @@
+import asyncio
 import os
+import time
 from dotenv import load_dotenv
-from fastapi import APIRouter, UploadFile, File, HTTPException
+from fastapi import APIRouter, HTTPException, Request
 from fastapi.responses import StreamingResponse, Response
 from pydantic import BaseModel
 from elevenlabs.client import AsyncElevenLabs
-from typing import Optional
+from starlette.datastructures import UploadFile
+from starlette.formparsers import MultiPartParser, MultiPartException
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, BinaryIO, Optional
 import io
 
+from database import SessionLocal
+from services.audio_preprocess import preprocess_wav
+from services.environment_service import EnvironmentService
+from services.provider_health import get_provider_health
+from services.tracing import CLIENT, set_attribute, span
+from services.tts_cache import AudioCache, cache_key
+
 load_dotenv()
 
 # Initialize the Router
@@ -15,7 +27,33 @@ router = APIRouter(
     tags=["ElevenLabs Operations"]
 )
 
-client = AsyncElevenLabs(api_key=os.getenv("ELEVENLABS_API_KEY"))
+# ELEVENLABS_BASE_URL points the client at a local stand-in for benchmarks
+client = AsyncElevenLabs(
+    api_key=os.getenv("ELEVENLABS_API_KEY"),
+    base_url=os.getenv("ELEVENLABS_BASE_URL")
+)
+
+# Fail fast with 503 while ElevenLabs is down instead of waiting on each call
+stt_health = get_provider_health("elevenlabs_stt")
+tts_health = get_provider_health("elevenlabs_tts")
+
+# Client errors that mean the requested model was rejected, so retrying
+# without model_id can help; anything else fails the request right away
+MODEL_REJECTED_STATUS_CODES = {400, 404, 422}
+
+# Upload limits for /transcribe. Uploads are spooled to a temp file (in
+# memory only up to the parser's 1 MB spool size) and streamed to ElevenLabs,
+# so memory per request stays flat; the semaphore bounds how many uploads are
+# spooled and in flight at once. Extra requests wait for a slot, then get 503.
+TRANSCRIBE_MAX_BYTES = int(os.getenv("TRANSCRIBE_MAX_BYTES", 25 * 1024 * 1024))
+TRANSCRIBE_MAX_CONCURRENT = int(os.getenv("TRANSCRIBE_MAX_CONCURRENT", 8))
+TRANSCRIBE_SLOT_TIMEOUT = float(os.getenv("TRANSCRIBE_SLOT_TIMEOUT", 30))
+
+transcribe_slots = asyncio.Semaphore(TRANSCRIBE_MAX_CONCURRENT)
+
+# WAV uploads up to this size are resampled, trimmed and noise gated before
+# STT; larger ones are streamed through untouched to keep memory bounded
+PREPROCESS_MAX_BYTES = int(os.getenv("PREPROCESS_MAX_BYTES", 10 * 1024 * 1024))
 
 # Available voices - using ElevenLabs preset voices
 # You can also use custom voice IDs
@@ -26,87 +64,334 @@ VOICES = {
 }
 
 
+# Using eleven_turbo_v2_5 (available on free tier, fast and good quality)
+TTS_MODEL_ID = "eleven_turbo_v2_5"
+
+# On-disk cache of synthesized phrases, created on first use
+tts_cache: Optional[AudioCache] = None
+CACHED_AUDIO_CHUNK_SIZE = 64 * 1024
+
+
+def get_tts_cache() -> AudioCache:
+    global tts_cache
+    if tts_cache is None:
+        tts_cache = AudioCache()
+    return tts_cache
+
+
+def resolve_voice_id(voice: Optional[str]) -> str:
+    """Map a voice preset name to its id; unknown names are used as ids."""
+    voice_id = VOICES.get(voice, voice)
+    if not voice_id:
+        voice_id = VOICES["default"]
+    return voice_id
+
+
 class TTSRequest(BaseModel):
     text: str
     voice: Optional[str] = "default"  # Voice preset name or voice_id
 
-@router.post("/transcribe")
-async def transcribe_audio(file: UploadFile = File(...)):
+async def _limited_body(request: Request, max_bytes: int) -> AsyncIterator[bytes]:
+    """Relay the request body, refusing it once it grows past max_bytes."""
+    received = 0
+    async for chunk in request.stream():
+        received += len(chunk)
+        if received > max_bytes:
+            raise HTTPException(status_code=413, detail="Audio upload is too large")
+        yield chunk
+
+
+async def spool_upload(request: Request, max_bytes: int = TRANSCRIBE_MAX_BYTES) -> UploadFile:
     """
-    Controller to convert uploaded audio files into text using ElevenLabs Speech-to-Text.
+    Parse a multipart upload into a spooled temp file without buffering it whole.
+
+    Raises HTTPException(413) past max_bytes, 400 for a malformed body and
+    422 when there is no "file" part.
     """
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > max_bytes:
+        raise HTTPException(status_code=413, detail="Audio upload is too large")
+
+    parser = MultiPartParser(request.headers, _limited_body(request, max_bytes), max_files=1)
     try:
-        # Read the uploaded file into memory
-        audio_data = await file.read()
+        form = await parser.parse()
+    except MultiPartException as e:
+        raise HTTPException(status_code=400, detail=e.message)
 
-        # Call ElevenLabs Speech-to-Text
-        # Try with the available model - "scribe_v1" or just default
-        try:
-            transcription = await client.speech_to_text.convert(
-                file=audio_data,
+    upload = form.get("file")
+    if not isinstance(upload, UploadFile):
+        await form.close()
+        raise HTTPException(status_code=422, detail="An audio file is required")
+    return upload
+
+
+def current_noise_level() -> Optional[str]:
+    """The game's current Environment.noise level, used to tune the noise gate."""
+    db = SessionLocal()
+    try:
+        return EnvironmentService(db).get_environment().noise
+    except Exception:
+        return None
+    finally:
+        db.close()
+
+
+def prepare_wav_upload(handle) -> Optional[tuple[bytes, dict]]:
+    """Preprocess a spooled WAV upload; returns None to send it as-is."""
+    try:
+        handle.seek(0, os.SEEK_END)
+        if handle.tell() > PREPROCESS_MAX_BYTES:
+            return None
+        handle.seek(0)
+        header = handle.read(12)
+        if header[:4] != b"RIFF" or header[8:12] != b"WAVE":
+            return None
+        return preprocess_wav(header + handle.read(), current_noise_level())
+    finally:
+        handle.seek(0)
+
+
+TRANSCRIBE_REQUEST_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "properties": {"file": {"type": "string", "format": "binary"}},
+                    "required": ["file"]
+                }
+            }
+        }
+    }
+}
+
+
+async def convert_speech(audio: tuple):
+    """
+    Transcribe (filename, file, content_type) with ElevenLabs Speech-to-Text.
+    Raises HTTPException(503) while the STT circuit is open.
+    """
+    if not stt_health.allow_request():
+        raise HTTPException(status_code=503, detail="Speech-to-text is temporarily unavailable")
+
+    # Call ElevenLabs Speech-to-Text
+    # Try with the available model - "scribe_v1" or just default
+    try:
+        with stt_health.track():
+            return await client.speech_to_text.convert(
+                file=audio,
                 model_id="scribe_v1",  # Use v1 as fallback
                 language_code="eng",
             )
-        except Exception:
-            # Try without model_id if scribe_v1 doesn't work
-            transcription = await client.speech_to_text.convert(
-                file=audio_data,
-                language_code="eng",
-            )
+    except Exception as e:
+        if getattr(e, "status_code", None) not in MODEL_REJECTED_STATUS_CODES:
+            raise
+    # Try without model_id if scribe_v1 doesn't work
+    audio[1].seek(0)
+    with stt_health.track():
+        return await client.speech_to_text.convert(
+            file=audio,
+            language_code="eng",
+        )
 
-        return {
-            "filename": file.filename,
-            "transcript": getattr(transcription, 'text', str(transcription)),
-            "language": getattr(transcription, 'language_code', 'eng'),
-            "words": getattr(transcription, 'words', [])
-        }
 
+@asynccontextmanager
+async def transcribe_slot():
+    """Hold one of the TRANSCRIBE_MAX_CONCURRENT upload slots; 503 if none frees up in time."""
+    try:
+        await asyncio.wait_for(transcribe_slots.acquire(), TRANSCRIBE_SLOT_TIMEOUT)
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=503, detail="Too many transcriptions in progress")
+    try:
+        yield
+    finally:
+        transcribe_slots.release()
+
+
+async def transcribe_spooled(file: UploadFile, preprocess: bool = True) -> tuple:
+    """Transcribe a spooled upload; returns (transcription, preprocessing stats or None)."""
+    # Hand ElevenLabs the spooled file; httpx reads it in chunks and
+    # rewinds it for each attempt, so a retry reuses the same file
+    audio = (file.filename or "audio", file.file, file.content_type)
+    preprocessing = None
+    if preprocess:
+        prepared = await asyncio.to_thread(prepare_wav_upload, file.file)
+        if prepared:
+            data, preprocessing = prepared
+            audio = (file.filename or "audio.wav", io.BytesIO(data), "audio/wav")
+
+    return await convert_speech(audio), preprocessing
+
+
+@router.post("/transcribe", openapi_extra=TRANSCRIBE_REQUEST_BODY)
+async def transcribe_audio(request: Request, preprocess: bool = True):
+    """
+    Controller to convert uploaded audio files into text using ElevenLabs Speech-to-Text.
+    The upload is spooled to a temp file and streamed to ElevenLabs from there.
+    WAV uploads are converted to trimmed 16 kHz mono first unless preprocess=false.
+    """
+    async with transcribe_slot():
+        file = None
+        try:
+            file = await spool_upload(request, TRANSCRIBE_MAX_BYTES)
+            transcription, preprocessing = await transcribe_spooled(file, preprocess)
+
+            return {
+                "filename": file.filename,
+                "transcript": getattr(transcription, 'text', str(transcription)),
+                "language": getattr(transcription, 'language_code', 'eng'),
+                "words": getattr(transcription, 'words', []),
+                "preprocessing": preprocessing
+            }
+
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Transcription failed: {str(e)}")
+        finally:
+            if file:
+                await file.close()
+
+
+async def open_speech_stream(
+    text: str,
+    voice: Optional[str] = "default",
+    cache_writer=None
+) -> AsyncIterator[bytes]:
+    """
+    Start ElevenLabs synthesis and return an async iterator of MP3 chunks.
+
+    The first chunk is awaited before returning so upstream failures still
+    surface as HTTP errors instead of a truncated 200 response. Chunks are
+    only pulled from ElevenLabs as the consumer asks for them. If a cache
+    writer is given, the audio is teed into it and committed once complete.
+    Raises HTTPException(503) while the TTS circuit is open.
+    """
+    if not tts_health.allow_request():
+        if cache_writer:
+            cache_writer.abort()
+        raise HTTPException(status_code=503, detail="Text-to-speech is temporarily unavailable")
+
+    # Generate speech using text_to_speech.convert
+    # Note: This returns an async generator, not a coroutine
+    started = time.perf_counter()
+    audio_generator = client.text_to_speech.convert(
+        voice_id=resolve_voice_id(voice),
+        text=text,
+        model_id=TTS_MODEL_ID,
+    )
+
+    try:
+        # Spans the wait for the first chunk; the rest streams to the client
+        with span("elevenlabs_tts first_chunk", CLIENT, {"provider": "elevenlabs_tts"}, root=False):
+            first_chunk = await anext(audio_generator)
+    except StopAsyncIteration:
+        first_chunk = b""
+    except BaseException as e:
+        if isinstance(e, Exception):
+            tts_health.record_failure(time.perf_counter() - started, e)
+        else:
+            tts_health.record_cancelled()
+        if cache_writer:
+            cache_writer.abort()
+        await audio_generator.aclose()
+        raise
+
+    return _relay_speech(audio_generator, first_chunk, started, cache_writer)
+
+
+async def _relay_speech(audio_generator, first_chunk: bytes, started: float, cache_writer=None) -> AsyncIterator[bytes]:
+    """Yield the primed chunk, then the rest; close ElevenLabs if the consumer goes away."""
+    completed = False
+    failed = False
+    try:
+        chunk = first_chunk
+        while True:
+            if chunk:
+                yield chunk
+                if cache_writer:
+                    await asyncio.to_thread(cache_writer.write, chunk)
+            try:
+                chunk = await anext(audio_generator)
+            except StopAsyncIteration:
+                break
+        completed = True
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Transcription failed: {str(e)}")
+        failed = True
+        tts_health.record_failure(time.perf_counter() - started, e)
+        raise
     finally:
-        await file.close()
+        if completed:
+            tts_health.record_success(time.perf_counter() - started)
+        elif not failed:
+            tts_health.record_cancelled()
+        if cache_writer:
+            # Only complete renderings are cached
+            if completed and cache_writer.size:
+                await asyncio.to_thread(cache_writer.commit)
+            else:
+                await asyncio.to_thread(cache_writer.abort)
+        await audio_generator.aclose()
+
+
+async def _read_cached_audio(file: BinaryIO) -> AsyncIterator[bytes]:
+    """Chunks of an open cache file, read off the event loop; closes the file when done."""
+    try:
+        while chunk := await asyncio.to_thread(file.read, CACHED_AUDIO_CHUNK_SIZE):
+            yield chunk
+    finally:
+        file.close()
+
+
+async def open_cached_speech(text: str, voice: Optional[str] = "default") -> tuple[AsyncIterator[bytes], str]:
+    """
+    Audio chunks for text, from the cache or streamed from ElevenLabs (and
+    cached once complete). Returns (chunks, "hit" or "miss").
+
+    A hit opens the file before returning, so evicting the entry while the
+    chunks are being sent can't cut the audio short.
+    """
+    cache = get_tts_cache()
+    key = cache_key(resolve_voice_id(voice), TTS_MODEL_ID, text)
+    file = await asyncio.to_thread(cache.open, key)
+    set_attribute("tts.cache", "hit" if file else "miss")
+    if file:
+        return _read_cached_audio(file), "hit"
+    return await open_speech_stream(text, voice, cache.writer(key)), "miss"
+
+
+async def synthesize_speech(text: str, voice: Optional[str] = "default") -> bytes:
+    """Synthesize text with ElevenLabs (or the cache) and return the whole MP3."""
+    stream, _ = await open_cached_speech(text, voice)
+    return b"".join([chunk async for chunk in stream])
 
 
 @router.post("/text-to-speech")
 async def text_to_speech(request: TTSRequest):
     """
     Convert text to speech using ElevenLabs TTS.
-    Returns audio as MP3 stream.
+    Cached phrases are read from disk; anything else is streamed to the
+    client as ElevenLabs produces it and cached once complete.
     """
     try:
         if not request.text or not request.text.strip():
             raise HTTPException(status_code=400, detail="Text is required")
 
-        # Get voice ID
-        voice_id = VOICES.get(request.voice, request.voice)
-        if not voice_id:
-            voice_id = VOICES["default"]
-
-        # Generate speech using text_to_speech.convert
-        # Using eleven_turbo_v2_5 (available on free tier, fast and good quality)
-        # Note: This returns an async generator, not a coroutine
-        audio_generator = client.text_to_speech.convert(
-            voice_id=voice_id,
-            text=request.text,
-            model_id="eleven_turbo_v2_5",
-        )
-
-        # Collect audio chunks
-        audio_chunks = []
-        async for chunk in audio_generator:
-            audio_chunks.append(chunk)
-        audio_data = b"".join(audio_chunks)
+        audio_stream, cache_status = await open_cached_speech(request.text, request.voice)
 
-        # Return as audio response
-        return Response(
-            content=audio_data,
+        # Stream as audio response; a disconnecting client cancels the
+        # iterator, which closes the upstream request
+        return StreamingResponse(
+            audio_stream,
             media_type="audio/mpeg",
             headers={
-                "Content-Disposition": "inline; filename=response.mp3"
+                "Content-Disposition": "inline; filename=response.mp3",
+                "X-TTS-Cache": cache_status
             }
         )
 
     except HTTPException:
         raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"TTS failed: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"TTS failed: {str(e)}")
@@ -0,0 +1,78 @@
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query, WebSocket, WebSocketDisconnect
+
+from services.gesture_recognizer import get_gesture_engine
+from services.imu_telemetry import TelemetryError, get_telemetry_store
+from services.profiler import ProfiledRoute
+
+router = APIRouter(prefix="/api/telemetry", tags=["telemetry"], route_class=ProfiledRoute)
+
+MAX_WINDOW_SECONDS = 60.0
+MAX_WINDOW_POINTS = 5000
+
+
+@router.websocket("/ingest")
+async def ingest_telemetry(websocket: WebSocket, user_id: Optional[str] = None):
+    """
+    Stream IMU batch packets from a glove.
+
+    Each binary message is one batch packet (see services/imu_telemetry.py);
+    several devices may share a connection. Nothing is sent back for good
+    batches; a malformed one gets an error message and is dropped.
+    Gestures from devices on this connection go to user_id's Socket.IO
+    sockets (by default, to the player whose id is the device id).
+    """
+    await websocket.accept()
+    store = get_telemetry_store()
+    gestures = get_gesture_engine()
+    bound = set()
+    try:
+        while True:
+            packet = await websocket.receive_bytes()
+            try:
+                device_id, _ = store.ingest(packet)
+                if user_id and device_id not in bound:
+                    gestures.bind(device_id, user_id)
+                    bound.add(device_id)
+            except TelemetryError as e:
+                await websocket.send_json({"type": "error", "message": str(e)})
+    except WebSocketDisconnect:
+        pass
+
+
+@router.get("/devices")
+def get_telemetry_devices():
+    """Get ingest counters and rates for every device with telemetry."""
+    return get_telemetry_store().stats()
+
+
+@router.get("/devices/{device_id}/window")
+def get_telemetry_window(
+    device_id: str,
+    seconds: float = Query(2.0, gt=0, le=MAX_WINDOW_SECONDS),
+    max_points: int = Query(500, gt=0, le=MAX_WINDOW_POINTS)
+):
+    """
+    Get the last `seconds` of a device's samples, oldest first.
+    Accelerometer values are in g, gyroscope in degrees per second; long
+    windows are decimated to at most max_points samples.
+    """
+    window = get_telemetry_store().window(device_id, seconds)
+    if window is None:
+        raise HTTPException(status_code=404, detail="No telemetry for this device")
+
+    available = len(window["t_us"])
+    stride = max(-(-available // max_points), 1)
+    if stride > 1:
+        # Keep the newest sample in the decimated window
+        window = {name: column[::-1][::stride][::-1] for name, column in window.items()}
+    return {
+        "device_id": device_id,
+        "samples": len(window["t_us"]),
+        "stride": stride,
+        "t_us": window["t_us"].tolist(),
+        "accel": window["accel"].round(4).tolist(),
+        "gyro": window["gyro"].round(3).tolist(),
+        "flags": window["flags"].tolist()
+    }
@@ -5,13 +5,14 @@ from database import get_db
 from services.transaction_service import TransactionService
 from services.user_service import UserService
 from services.account_service import AccountService
+from services.profiler import ProfiledRoute
 from schemas.transaction import (
     TransferRequest, DepositRequest, WithdrawRequest,
     CollectGoldRequest, ExchangeGoldRequest, SendMoneyRequest,
     TransactionResponse, GoldRateResponse
 )
 
-router = APIRouter(prefix="/api", tags=["transactions"])
+router = APIRouter(prefix="/api", tags=["transactions"], route_class=ProfiledRoute)
 
 
 @router.post("/transfer", response_model=TransactionResponse, status_code=201)
@@ -2,9 +2,10 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from database import get_db
 from services.user_service import UserService
+from services.profiler import ProfiledRoute
 from schemas.user import UserCreate, UserUpdate, UserResponse, UserWithAccounts
 
-router = APIRouter(prefix="/api", tags=["users"])
+router = APIRouter(prefix="/api", tags=["users"], route_class=ProfiledRoute)
 
 
 @router.get("/user/{user_id}", response_model=UserWithAccounts)
@@ -1,9 +1,13 @@
 import os
+import base64
 import json
 import re
+import time
+import asyncio
 from dotenv import load_dotenv
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel, Field, ValidationError
 from typing import Optional, Literal
 import google.generativeai as genai
 
@@ -11,6 +15,13 @@ from database import SessionLocal
 from services.account_service import AccountService
 from services.transaction_service import TransactionService
 from services.user_service import UserService
+from services.provider_health import get_provider_health
+from services.job_queue import JobQueue, JobQueueFull
+from services.tracing import span, traced
+from controllers.speech_to_text import (
+    TRANSCRIBE_REQUEST_BODY, open_cached_speech, spool_upload, synthesize_speech,
+    transcribe_slot, transcribe_spooled
+)
 
 load_dotenv()
 
@@ -284,15 +295,13 @@ router = APIRouter(
     tags=["Voice Command Operations"]
 )
 
-# Configure Gemini
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
-# Use gemini-2.0-flash (current available model)
-model = genai.GenerativeModel("gemini-2.0-flash")
-
 # Request/Response models
 class VoiceCommandRequest(BaseModel):
     user_id: str
     transcript: str
+    defer: bool = False  # Return 202 and push the result over Socket.IO
+    speak: bool = False  # Deferred jobs only: include TTS audio in the pushed result
+    voice: Optional[str] = "default"
 
 class VoiceCommandResponse(BaseModel):
     success: bool
@@ -301,139 +310,350 @@ class VoiceCommandResponse(BaseModel):
     data: Optional[dict] = None
     error: Optional[str] = None
 
-# System prompt for Gemini to parse banking commands
-SYSTEM_PROMPT = """You are a banking voice command parser. Your job is to convert natural language banking requests into structured JSON commands.
-
-Available commands:
-1. check_balance - Check account balance
-   - account_type: "checking", "savings", "credit_card", or "treasure_chest" (gold bars)
-   - If user says "all" or doesn't specify, use "all"
-
-2. transfer - Transfer money between user's own accounts
-   - from_account: "checking" or "savings"
-   - to_account: "checking", "savings", or "credit_card" (to pay off debt)
-   - amount: number (in dollars)
-
-3. send_money - Send money to another person
-   - recipient_name: string (the person's name to search for)
-   - amount: number (in dollars)
-   - from_account: "checking" or "savings" (default: "checking")
-
-4. exchange_gold - Convert gold bars to cash
-   - bars: number of gold bars to exchange
-   - to_account: "checking" or "savings" (default: "checking")
-
-5. get_transactions - Get recent transaction history
-   - account_type: "checking", "savings", "credit_card", "treasure_chest", or "all"
-   - limit: number (default: 5)
-
-6. help - User needs help or is confused
-   - No parameters needed
-
-7. unknown - Cannot understand the request
-   - No parameters needed
-
-RULES:
-- Always respond with valid JSON only, no other text
-- Parse amounts carefully: "fifty dollars" = 50, "one hundred" = 100, "5 bucks" = 5
-- Account synonyms: "main account" = "checking", "emergency fund" = "savings", "gold" = "treasure_chest"
-- If the user mentions a person's name for sending money, extract it as recipient_name
-- Be flexible with phrasing but strict with JSON format
-
-Response format:
-{
-  "action": "command_name",
-  "parameters": { ... },
-  "confidence": 0.0-1.0
+class BatchParseRequest(BaseModel):
+    transcripts: list[str]
+
+class BatchParseResponse(BaseModel):
+    results: list[dict]
+    stats: dict
+
+# Parsed command returned by Gemini, validated before it reaches an executor
+class CommandParameters(BaseModel):
+    account_type: Optional[str] = None
+    from_account: Optional[str] = None
+    to_account: Optional[str] = None
+    amount: Optional[float] = None
+    recipient_name: Optional[str] = None
+    bars: Optional[int] = None
+    limit: Optional[int] = None
+
+class ParsedCommand(BaseModel):
+    action: Literal["check_balance", "transfer", "send_money", "exchange_gold", "get_transactions", "help", "unknown"]
+    parameters: CommandParameters = Field(default_factory=CommandParameters)
+    confidence: float = Field(ge=0, le=1)
+
+class BatchParsedCommand(ParsedCommand):
+    index: int
+
+# Same shape as ParsedCommand, in the schema dialect Gemini accepts for constrained output
+COMMAND_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "action": {
+            "type": "string",
+            "enum": ["check_balance", "transfer", "send_money", "exchange_gold", "get_transactions", "help", "unknown"]
+        },
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "account_type": {"type": "string"},
+                "from_account": {"type": "string"},
+                "to_account": {"type": "string"},
+                "amount": {"type": "number"},
+                "recipient_name": {"type": "string"},
+                "bars": {"type": "integer"},
+                "limit": {"type": "integer"}
+            }
+        },
+        "confidence": {"type": "number"}
+    },
+    "required": ["action", "parameters", "confidence"]
+}
+
+BATCH_COMMAND_SCHEMA = {
+    "type": "array",
+    "items": {
+        **COMMAND_SCHEMA,
+        "properties": {"index": {"type": "integer"}, **COMMAND_SCHEMA["properties"]},
+        "required": ["index", *COMMAND_SCHEMA["required"]]
+    }
 }
 
+# System instruction for Gemini to parse banking commands; the JSON shape is
+# enforced by COMMAND_SCHEMA, so the prompt carries the domain rules and one
+# example per kind of request
+SYSTEM_PROMPT = """You parse banking voice commands into JSON.
+
+Actions and parameters:
+- check_balance: account_type ("checking", "savings", "credit_card", "treasure_chest", or "all" if unspecified)
+- transfer: between the user's own accounts. from_account ("checking" or "savings"), to_account ("checking", "savings", or "credit_card" to pay off debt), amount in dollars
+- send_money: to another person. recipient_name, amount in dollars, from_account (default "checking")
+- exchange_gold: gold bars to cash. bars, to_account (default "checking")
+- get_transactions: account_type (any account or "all"), limit (default 5)
+- help: the user needs help or is confused
+- unknown: the request can't be understood
+
+Rules:
+- Amounts: "fifty dollars" = 50, "one hundred" = 100, "5 bucks" = 5
+- Synonyms: "main account" = checking, "emergency fund" = savings, "gold" = treasure_chest
+- confidence is 0.0-1.0; use a low value for gibberish
+
 Examples:
-User: "What's my balance?"
-{"action": "check_balance", "parameters": {"account_type": "all"}, "confidence": 0.95}
+"What's my balance?" -> {"action": "check_balance", "parameters": {"account_type": "all"}, "confidence": 0.95}
+"How much do I have in savings?" -> {"action": "check_balance", "parameters": {"account_type": "savings"}, "confidence": 0.98}
+"Transfer 50 dollars from checking to savings" -> {"action": "transfer", "parameters": {"from_account": "checking", "to_account": "savings", "amount": 50}, "confidence": 0.95}
+"Send 20 bucks to John" -> {"action": "send_money", "parameters": {"recipient_name": "John", "amount": 20, "from_account": "checking"}, "confidence": 0.9}
+"Exchange 2 gold bars" -> {"action": "exchange_gold", "parameters": {"bars": 2, "to_account": "checking"}, "confidence": 0.95}
+"Show my recent transactions" -> {"action": "get_transactions", "parameters": {"account_type": "all", "limit": 5}, "confidence": 0.92}
+"Gibberish asdfasdf" -> {"action": "unknown", "parameters": {}, "confidence": 0.1}
+"""
 
-User: "How much do I have in savings?"
-{"action": "check_balance", "parameters": {"account_type": "savings"}, "confidence": 0.98}
+# Extra instructions sent with the transcripts when parsing several at once
+BATCH_PROMPT = """Parse each numbered request below independently.
+Return one object per request and copy its number into "index"."""
 
-User: "Transfer 50 dollars from checking to savings"
-{"action": "transfer", "parameters": {"from_account": "checking", "to_account": "savings", "amount": 50}, "confidence": 0.95}
+# Configure Gemini
+genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+# Use gemini-2.0-flash (current available model). The system instruction and
+# response schema are set once here instead of being sent in every prompt.
+model = genai.GenerativeModel(
+    "gemini-2.0-flash",
+    system_instruction=SYSTEM_PROMPT,
+    generation_config={
+        "response_mime_type": "application/json",
+        "response_schema": COMMAND_SCHEMA
+    }
+)
 
-User: "Send 20 bucks to John"
-{"action": "send_money", "parameters": {"recipient_name": "John", "amount": 20, "from_account": "checking"}, "confidence": 0.90}
+# Skip straight to the keyword parser while Gemini is failing
+gemini_health = get_provider_health("gemini")
 
-User: "Exchange 2 gold bars"
-{"action": "exchange_gold", "parameters": {"bars": 2, "to_account": "checking"}, "confidence": 0.95}
+BATCH_GENERATION_CONFIG = {
+    "response_mime_type": "application/json",
+    "response_schema": BATCH_COMMAND_SCHEMA
+}
 
-User: "Show my recent transactions"
-{"action": "get_transactions", "parameters": {"account_type": "all", "limit": 5}, "confidence": 0.92}
+# Maximum transcripts packed into a single Gemini request
+BATCH_PARSE_SIZE = 20
+# Maximum transcripts accepted by the batch endpoint
+MAX_BATCH_TRANSCRIPTS = 200
 
-User: "Gibberish asdfasdf"
-{"action": "unknown", "parameters": {}, "confidence": 0.1}
-"""
+# Fixed spoken responses; these are pre-rendered by warm_tts_cache.py
+HELP_RESPONSE = """I can help you with the following commands:
+    Say 'check my balance' to see your account balances.
+    Say 'transfer' followed by an amount and account names to move money between your accounts.
+    Say 'send' followed by an amount and a person's name to send them money.
+    Say 'exchange gold' to convert your gold bars to cash.
+    Say 'show transactions' to see your recent activity.
+    Just shake your phone to activate me anytime!"""
+UNKNOWN_RESPONSE = "I'm sorry, I didn't understand that. You can ask me to check your balance, transfer money, send money to someone, exchange gold bars, or show your transactions. Say 'help' for more options."
+NO_CREDIT_BALANCE_RESPONSE = "Your credit card has no balance."
+NO_TRANSACTIONS_RESPONSE = "You don't have any recent transactions."
+INVALID_TRANSFER_AMOUNT_RESPONSE = "Please specify a valid amount to transfer."
+NO_RECIPIENT_RESPONSE = "Please specify who you want to send money to."
+INVALID_SEND_AMOUNT_RESPONSE = "Please specify a valid amount to send."
+SEND_TO_SELF_RESPONSE = "You can't send money to yourself. Use transfer instead."
+INVALID_BARS_RESPONSE = "Please specify how many gold bars you want to exchange."
+GENERIC_ERROR_RESPONSE = "Something went wrong."
+
+FIXED_RESPONSES = [
+    HELP_RESPONSE,
+    UNKNOWN_RESPONSE,
+    NO_CREDIT_BALANCE_RESPONSE,
+    NO_TRANSACTIONS_RESPONSE,
+    INVALID_TRANSFER_AMOUNT_RESPONSE,
+    NO_RECIPIENT_RESPONSE,
+    INVALID_SEND_AMOUNT_RESPONSE,
+    SEND_TO_SELF_RESPONSE,
+    INVALID_BARS_RESPONSE,
+    GENERIC_ERROR_RESPONSE,
+]
+
+# Number of recent transactions loaded into the per-request snapshot
+SNAPSHOT_TRANSACTION_LIMIT = 10
+
+# X-Voice-Result is a summary, since proxies commonly cap all headers at
+# 8 KB: no `data`, and each text cut to this many characters
+VOICE_RESULT_HEADER_TEXT_CHARS = 200
+
+# What nothing heard parses to, without asking Gemini
+EMPTY_TRANSCRIPT_PARSE = {"action": "unknown", "parameters": {}, "confidence": 0.0}
 
 
 def get_db_session():
     return SessionLocal()
 
 
+@traced("voice.snapshot", root=False)
+def load_user_snapshot(user_id: str, transaction_limit: int = SNAPSHOT_TRANSACTION_LIMIT) -> Optional[dict]:
+    """
+    Load the user's accounts and recent transactions as plain dicts.
+    Runs alongside intent parsing; returns None if the user can't be loaded
+    so executors fall back to querying the database themselves.
+    """
+    db = get_db_session()
+    try:
+        account_service = AccountService(db)
+        transaction_service = TransactionService(db)
+
+        summary = account_service.get_account_summary(user_id)
+        if not summary["accounts"]:
+            return None
+        transactions = transaction_service.get_transaction_history(user_id, transaction_limit)
+
+        return {
+            "summary": summary,
+            "accounts": {acc["type"]: acc for acc in summary["accounts"]},
+            "transactions": [t.to_dict() for t in transactions],
+            "transaction_limit": transaction_limit
+        }
+    except Exception as e:
+        print(f"Snapshot prefetch failed for {user_id}: {e}")
+        return None
+    finally:
+        db.close()
+
+
+def prefetch_user_snapshot(user_id: str) -> asyncio.Task:
+    """Start loading the user's snapshot in a worker thread; cancel the task if it won't be used."""
+    return asyncio.create_task(asyncio.to_thread(load_user_snapshot, user_id))
+
+
+def _keyword_fallback(transcript: str, error: str) -> dict:
+    """Parse with keywords and record why Gemini wasn't used."""
+    result = parse_command_with_keywords(transcript)
+    result["parser"] = "keywords"
+    result["gemini_error"] = error
+    return result
+
+
 async def parse_command_with_gemini(transcript: str) -> dict:
     """
     Use Gemini to parse the transcript into a structured command.
     Falls back to keyword matching if Gemini fails.
     """
-    try:
-        prompt = f"{SYSTEM_PROMPT}\n\nUser: \"{transcript}\"\n\nRespond with JSON only:"
+    with span("voice.parse", root=False) as parse_span:
+        if transcript.strip():
+            result = await _parse_command_with_gemini(transcript)
+        else:
+            result = {**EMPTY_TRANSCRIPT_PARSE, "parser": "empty"}
+        parse_span.set_attribute("parser", result["parser"])
+        parse_span.set_attribute("gemini_error", result.get("gemini_error"))
+        return result
 
-        response = model.generate_content(prompt)
-        response_text = response.text.strip()
 
-        # Clean up response - remove markdown code blocks if present
-        if response_text.startswith("```"):
-            lines = response_text.split("\n")
-            response_text = "\n".join(lines[1:-1])
+async def _parse_command_with_gemini(transcript: str) -> dict:
+    if not gemini_health.allow_request():
+        return _keyword_fallback(transcript, "Gemini unavailable (circuit open)")
 
-        result = json.loads(response_text)
+    try:
+        with gemini_health.track():
+            response = await model.generate_content_async(transcript)
+
+        parsed = ParsedCommand.model_validate_json(response.text)
+        result = parsed.model_dump(exclude_none=True)
         result["parser"] = "gemini"  # Track which parser was used
         return result
 
-    except json.JSONDecodeError as e:
-        print(f"Gemini JSON parse error: {e}, falling back to keywords")
-        result = parse_command_with_keywords(transcript)
-        result["parser"] = "keywords"
-        result["gemini_error"] = f"JSON parse error: {str(e)}"
-        return result
+    except ValidationError as e:
+        print(f"Gemini response invalid: {e.error_count()} errors, falling back to keywords")
+        return _keyword_fallback(transcript, f"Invalid response: {e.errors()[0]['msg']}")
 
     except Exception as e:
         # Gemini failed (quota, network, etc.) - use keyword fallback
         print(f"Gemini API error: {e}, falling back to keywords")
-        result = parse_command_with_keywords(transcript)
-        result["parser"] = "keywords"
-        result["gemini_error"] = str(e)
-        return result
+        return _keyword_fallback(transcript, str(e))
 
 
-def execute_check_balance(user_id: str, params: dict) -> dict:
+async def parse_commands_with_gemini_batch(transcripts: list[str]) -> tuple[list[dict], dict]:
+    """
+    Parse many transcripts with one Gemini request per BATCH_PARSE_SIZE chunk.
+    Results are mapped back by index; any transcript missing or malformed in
+    the response falls back to keyword matching on its own.
+    Returns (results, usage) where usage totals calls and tokens.
+    """
+    results: list[Optional[dict]] = [None] * len(transcripts)
+    usage = {"llm_calls": 0, "prompt_tokens": 0, "output_tokens": 0}
+
+    for start in range(0, len(transcripts), BATCH_PARSE_SIZE):
+        chunk = transcripts[start:start + BATCH_PARSE_SIZE]
+        error = "Missing from batch response"
+        parsed = []
+        try:
+            if not gemini_health.allow_request():
+                raise RuntimeError("Gemini unavailable (circuit open)")
+
+            lines = "\n".join(f"{i}: {json.dumps(t)}" for i, t in enumerate(chunk))
+            prompt = f"{BATCH_PROMPT}\n\n{lines}"
+
+            with gemini_health.track():
+                response = await model.generate_content_async(
+                    prompt, generation_config=BATCH_GENERATION_CONFIG
+                )
+            usage["llm_calls"] += 1
+            metadata = getattr(response, "usage_metadata", None)
+            if metadata is not None:
+                usage["prompt_tokens"] += getattr(metadata, "prompt_token_count", 0) or 0
+                usage["output_tokens"] += getattr(metadata, "candidates_token_count", 0) or 0
+
+            parsed = json.loads(response.text)
+            if not isinstance(parsed, list):
+                error = "Batch response is not a JSON array"
+                parsed = []
+        except json.JSONDecodeError as e:
+            print(f"Gemini batch JSON parse error: {e}, falling back to keywords")
+            error = f"JSON parse error: {str(e)}"
+        except Exception as e:
+            print(f"Gemini batch API error: {e}, falling back to keywords")
+            error = str(e)
+
+        for item in parsed:
+            try:
+                command = BatchParsedCommand.model_validate(item)
+            except ValidationError:
+                continue
+            if not 0 <= command.index < len(chunk):
+                continue
+            result = command.model_dump(exclude={"index"}, exclude_none=True)
+            result["parser"] = "gemini"
+            results[start + command.index] = result
+
+        for i, transcript in enumerate(chunk):
+            if results[start + i] is None:
+                results[start + i] = _keyword_fallback(transcript, error)
+
+    return results, usage
+
+
+def _describe_balance(account_type: str, balance: float) -> str:
+    """Build the spoken sentence for a single account balance."""
+    if account_type == "treasure_chest":
+        return f"You have {int(balance)} gold bars in your treasure chest"
+    if account_type == "credit_card":
+        if balance > 0:
+            return f"You owe ${balance:.2f} on your credit card"
+        return "Your credit card has no balance"
+    return f"Your {account_type} account has ${balance:.2f}"
+
+
+def execute_check_balance(user_id: str, params: dict, snapshot: Optional[dict] = None) -> dict:
     """Execute balance check command."""
+    account_type = params.get("account_type", "all")
+
+    # Balance checks are read-only, so the prefetched snapshot answers them
+    if snapshot is not None:
+        if account_type == "all":
+            summary = snapshot["summary"]
+            parts = [_describe_balance(acc["type"], acc["balance"]) for acc in summary["accounts"]]
+            return {
+                "success": True,
+                "spoken_response": ". ".join(parts) + ".",
+                "data": summary
+            }
+        if account_type in snapshot["accounts"]:
+            balance = snapshot["accounts"][account_type]["balance"]
+            return _balance_response(account_type, balance)
+
     db = get_db_session()
     try:
         account_service = AccountService(db)
-        account_type = params.get("account_type", "all")
 
         if account_type == "all":
             summary = account_service.get_account_summary(user_id)
             accounts = summary["accounts"]
 
             # Build spoken response
-            parts = []
-            for acc in accounts:
-                if acc["type"] == "treasure_chest":
-                    parts.append(f"You have {int(acc['balance'])} gold bars in your treasure chest")
-                elif acc["type"] == "credit_card":
-                    if acc["balance"] > 0:
-                        parts.append(f"You owe ${acc['balance']:.2f} on your credit card")
-                    else:
-                        parts.append("Your credit card has no balance")
-                else:
-                    parts.append(f"Your {acc['type']} account has ${acc['balance']:.2f}")
+            parts = [_describe_balance(acc["type"], acc["balance"]) for acc in accounts]
 
             spoken = ". ".join(parts) + "."
             return {
@@ -443,22 +663,7 @@ def execute_check_balance(user_id: str, params: dict) -> dict:
             }
         else:
             balance = account_service.get_balance_by_type(user_id, account_type)
-
-            if account_type == "treasure_chest":
-                spoken = f"You have {int(balance)} gold bars in your treasure chest."
-            elif account_type == "credit_card":
-                if balance > 0:
-                    spoken = f"You owe ${balance:.2f} on your credit card."
-                else:
-                    spoken = "Your credit card has no balance."
-            else:
-                spoken = f"Your {account_type} account balance is ${balance:.2f}."
-
-            return {
-                "success": True,
-                "spoken_response": spoken,
-                "data": {"account_type": account_type, "balance": balance}
-            }
+            return _balance_response(account_type, balance)
     except HTTPException as e:
         return {"success": False, "spoken_response": e.detail, "error": e.detail}
     except Exception as e:
@@ -467,7 +672,33 @@ def execute_check_balance(user_id: str, params: dict) -> dict:
         db.close()
 
 
-def execute_transfer(user_id: str, params: dict) -> dict:
+def _balance_response(account_type: str, balance: float) -> dict:
+    if account_type == "treasure_chest":
+        spoken = f"You have {int(balance)} gold bars in your treasure chest."
+    elif account_type == "credit_card":
+        if balance > 0:
+            spoken = f"You owe ${balance:.2f} on your credit card."
+        else:
+            spoken = NO_CREDIT_BALANCE_RESPONSE
+    else:
+        spoken = f"Your {account_type} account balance is ${balance:.2f}."
+
+    return {
+        "success": True,
+        "spoken_response": spoken,
+        "data": {"account_type": account_type, "balance": balance}
+    }
+
+
+def _snapshot_account_id(snapshot: Optional[dict], account_type: str) -> Optional[int]:
+    """Look up an account id in the prefetched snapshot."""
+    if snapshot is None:
+        return None
+    account = snapshot["accounts"].get(account_type)
+    return account["id"] if account else None
+
+
+def execute_transfer(user_id: str, params: dict, snapshot: Optional[dict] = None) -> dict:
     """Execute transfer between own accounts."""
     db = get_db_session()
     try:
@@ -481,23 +712,29 @@ def execute_transfer(user_id: str, params: dict) -> dict:
         if amount <= 0:
             return {
                 "success": False,
-                "spoken_response": "Please specify a valid amount to transfer.",
+                "spoken_response": INVALID_TRANSFER_AMOUNT_RESPONSE,
                 "error": "Invalid amount"
             }
 
-        from_account = account_service.get_account_by_type(user_id, from_type)
-        to_account = account_service.get_account_by_type(user_id, to_type)
+        # Resolve account ids from the snapshot; balances are re-validated
+        # by TransactionService.transfer when the write happens
+        from_account_id = _snapshot_account_id(snapshot, from_type)
+        if from_account_id is None:
+            from_account_id = account_service.get_account_by_type(user_id, from_type).id
+        to_account_id = _snapshot_account_id(snapshot, to_type)
+        if to_account_id is None:
+            to_account_id = account_service.get_account_by_type(user_id, to_type).id
 
         transaction = transaction_service.transfer(
-            from_account.id,
-            to_account.id,
+            from_account_id,
+            to_account_id,
             amount,
             f"Voice command transfer"
         )
 
         # Get updated balances
-        new_from_balance = account_service.get_balance(from_account.id)
-        new_to_balance = account_service.get_balance(to_account.id)
+        new_from_balance = account_service.get_balance(from_account_id)
+        new_to_balance = account_service.get_balance(to_account_id)
 
         if to_type == "credit_card":
             spoken = f"Done! I've transferred ${amount:.2f} from {from_type} to pay off your credit card. Your {from_type} balance is now ${new_from_balance:.2f}, and your credit card balance is ${new_to_balance:.2f}."
@@ -522,7 +759,7 @@ def execute_transfer(user_id: str, params: dict) -> dict:
         db.close()
 
 
-def execute_send_money(user_id: str, params: dict) -> dict:
+def execute_send_money(user_id: str, params: dict, snapshot: Optional[dict] = None) -> dict:
     """Execute sending money to another user."""
     db = get_db_session()
     try:
@@ -537,14 +774,14 @@ def execute_send_money(user_id: str, params: dict) -> dict:
         if not recipient_name:
             return {
                 "success": False,
-                "spoken_response": "Please specify who you want to send money to.",
+                "spoken_response": NO_RECIPIENT_RESPONSE,
                 "error": "No recipient specified"
             }
 
         if amount <= 0:
             return {
                 "success": False,
-                "spoken_response": "Please specify a valid amount to send.",
+                "spoken_response": INVALID_SEND_AMOUNT_RESPONSE,
                 "error": "Invalid amount"
             }
 
@@ -573,7 +810,7 @@ def execute_send_money(user_id: str, params: dict) -> dict:
         if recipient.id == user_id:
             return {
                 "success": False,
-                "spoken_response": "You can't send money to yourself. Use transfer instead.",
+                "spoken_response": SEND_TO_SELF_RESPONSE,
                 "error": "Cannot send to self"
             }
 
@@ -608,7 +845,7 @@ def execute_send_money(user_id: str, params: dict) -> dict:
         db.close()
 
 
-def execute_exchange_gold(user_id: str, params: dict) -> dict:
+def execute_exchange_gold(user_id: str, params: dict, snapshot: Optional[dict] = None) -> dict:
     """Execute gold bar exchange."""
     db = get_db_session()
     try:
@@ -621,7 +858,7 @@ def execute_exchange_gold(user_id: str, params: dict) -> dict:
         if bars <= 0:
             return {
                 "success": False,
-                "spoken_response": "Please specify how many gold bars you want to exchange.",
+                "spoken_response": INVALID_BARS_RESPONSE,
                 "error": "Invalid number of bars"
             }
 
@@ -655,48 +892,30 @@ def execute_exchange_gold(user_id: str, params: dict) -> dict:
         db.close()
 
 
-def execute_get_transactions(user_id: str, params: dict) -> dict:
+def execute_get_transactions(user_id: str, params: dict, snapshot: Optional[dict] = None) -> dict:
     """Execute transaction history retrieval."""
+    account_type = params.get("account_type", "all")
+    limit = params.get("limit", 5)
+
+    # The snapshot holds the most recent history across all accounts
+    if snapshot is not None and account_type == "all" and limit <= snapshot["transaction_limit"]:
+        return _transactions_response(snapshot["transactions"][:limit])
+
     db = get_db_session()
     try:
         transaction_service = TransactionService(db)
         account_service = AccountService(db)
 
-        account_type = params.get("account_type", "all")
-        limit = params.get("limit", 5)
-
         if account_type == "all":
             transactions = transaction_service.get_transaction_history(user_id, limit)
         else:
-            account = account_service.get_account_by_type(user_id, account_type)
-            transactions = transaction_service.get_account_transactions(account.id, limit)
-
-        if not transactions:
-            return {
-                "success": True,
-                "spoken_response": "You don't have any recent transactions.",
-                "data": {"transactions": []}
-            }
-
-        # Build spoken summary
-        parts = [f"Here are your last {len(transactions)} transactions:"]
-        for i, t in enumerate(transactions[:5], 1):
-            if t.type == "transfer":
-                parts.append(f"{i}. Transfer of ${t.amount:.2f}")
-            elif t.type == "deposit":
-                parts.append(f"{i}. Deposit of ${t.amount:.2f}")
-            elif t.type == "withdrawal":
-                parts.append(f"{i}. Withdrawal of ${t.amount:.2f}")
-            elif t.type == "gold_exchange":
-                parts.append(f"{i}. Gold exchange of {int(t.amount)} bars")
-
-        spoken = " ".join(parts)
+            account_id = _snapshot_account_id(snapshot, account_type)
+            if account_id is None:
+                account_id = account_service.get_account_by_type(user_id, account_type).id
+            transactions = transaction_service.get_account_transactions(account_id, limit)
+        transactions = [t.to_dict() for t in transactions]
 
-        return {
-            "success": True,
-            "spoken_response": spoken,
-            "data": {"transactions": [t.to_dict() for t in transactions]}
-        }
+        return _transactions_response(transactions)
     except HTTPException as e:
         return {"success": False, "spoken_response": e.detail, "error": e.detail}
     except Exception as e:
@@ -705,15 +924,39 @@ def execute_get_transactions(user_id: str, params: dict) -> dict:
         db.close()
 
 
-def execute_help(user_id: str, params: dict) -> dict:
+def _transactions_response(transactions: list[dict]) -> dict:
+    """Build the spoken summary for a list of transaction dicts."""
+    if not transactions:
+        return {
+            "success": True,
+            "spoken_response": NO_TRANSACTIONS_RESPONSE,
+            "data": {"transactions": []}
+        }
+
+    # Build spoken summary
+    parts = [f"Here are your last {len(transactions)} transactions:"]
+    for i, t in enumerate(transactions[:5], 1):
+        if t["type"] == "transfer":
+            parts.append(f"{i}. Transfer of ${t['amount']:.2f}")
+        elif t["type"] == "deposit":
+            parts.append(f"{i}. Deposit of ${t['amount']:.2f}")
+        elif t["type"] == "withdrawal":
+            parts.append(f"{i}. Withdrawal of ${t['amount']:.2f}")
+        elif t["type"] == "gold_exchange":
+            parts.append(f"{i}. Gold exchange of {int(t['amount'])} bars")
+
+    spoken = " ".join(parts)
+
+    return {
+        "success": True,
+        "spoken_response": spoken,
+        "data": {"transactions": transactions}
+    }
+
+
+def execute_help(user_id: str, params: dict, snapshot: Optional[dict] = None) -> dict:
     """Provide help information."""
-    spoken = """I can help you with the following commands:
-    Say 'check my balance' to see your account balances.
-    Say 'transfer' followed by an amount and account names to move money between your accounts.
-    Say 'send' followed by an amount and a person's name to send them money.
-    Say 'exchange gold' to convert your gold bars to cash.
-    Say 'show transactions' to see your recent activity.
-    Just shake your phone to activate me anytime!"""
+    spoken = HELP_RESPONSE
 
     return {
         "success": True,
@@ -722,11 +965,11 @@ def execute_help(user_id: str, params: dict) -> dict:
     }
 
 
-def execute_unknown(user_id: str, params: dict) -> dict:
+def execute_unknown(user_id: str, params: dict, snapshot: Optional[dict] = None) -> dict:
     """Handle unknown commands."""
     return {
         "success": False,
-        "spoken_response": "I'm sorry, I didn't understand that. You can ask me to check your balance, transfer money, send money to someone, exchange gold bars, or show your transactions. Say 'help' for more options.",
+        "spoken_response": UNKNOWN_RESPONSE,
         "error": "Unknown command"
     }
 
@@ -743,35 +986,55 @@ COMMAND_EXECUTORS = {
 }
 
 
-@router.post("/voice-command", response_model=VoiceCommandResponse)
-async def process_voice_command(request: VoiceCommandRequest):
+async def run_voice_command(
+    user_id: str,
+    transcript: str,
+    parsed: Optional[dict] = None,
+    snapshot_task: Optional[asyncio.Task] = None
+) -> VoiceCommandResponse:
     """
-    Process a voice command from transcribed text.
+    Parse and execute one voice command.
 
-    1. Parse the transcript using Gemini to extract intent
+    1. Parse the transcript using Gemini to extract intent, while the
+       user's accounts are prefetched in a worker thread
     2. Execute the appropriate banking operation
     3. Return a spoken response
+
+    Callers that already parsed the transcript or started the snapshot
+    load (e.g. the streaming endpoint) can pass them in.
     """
     try:
-        # Parse the command with Gemini
-        parsed = await parse_command_with_gemini(request.transcript)
+        with span("voice.command", root=False) as command_span:
+            command_span.set_attribute("user_id", user_id)
+
+            # Load the user's accounts while Gemini parses the transcript
+            if snapshot_task is None:
+                snapshot_task = prefetch_user_snapshot(user_id)
+
+            # Parse the command with Gemini
+            if parsed is None:
+                parsed = await parse_command_with_gemini(transcript)
 
-        action = parsed.get("action", "unknown")
-        parameters = parsed.get("parameters", {})
-        confidence = parsed.get("confidence", 0.0)
+            action = parsed.get("action", "unknown")
+            parameters = parsed.get("parameters", {})
+            confidence = parsed.get("confidence", 0.0)
 
-        # If confidence is too low, treat as unknown
-        if confidence < 0.5:
-            action = "unknown"
+            # If confidence is too low, treat as unknown
+            if confidence < 0.5:
+                action = "unknown"
+            command_span.set_attribute("action", action)
+            command_span.set_attribute("parser", parsed.get("parser"))
 
-        # Execute the command
-        executor = COMMAND_EXECUTORS.get(action, execute_unknown)
-        result = executor(request.user_id, parameters)
+            # Execute the command
+            snapshot = await snapshot_task
+            executor = COMMAND_EXECUTORS.get(action, execute_unknown)
+            with span(f"voice.execute {action}", root=False):
+                result = executor(user_id, parameters, snapshot)
 
         return VoiceCommandResponse(
             success=result.get("success", False),
             action=action,
-            spoken_response=result.get("spoken_response", "Something went wrong."),
+            spoken_response=result.get("spoken_response", GENERIC_ERROR_RESPONSE),
             data=result.get("data"),
             error=result.get("error")
         )
@@ -782,3 +1045,210 @@ async def process_voice_command(request: VoiceCommandRequest):
             spoken_response=f"An error occurred: {str(e)}",
             error=str(e)
         )
+
+
+# Pushes a deferred job's result to the user; set by main.py so results can
+# reach the user's Socket.IO room. Signature: (user_id, event, payload).
+result_publisher = None
+
+
+def set_result_publisher(publisher) -> None:
+    global result_publisher
+    result_publisher = publisher
+
+
+async def _process_voice_job(job_id: str, payload: dict) -> dict:
+    """Worker pipeline for deferred commands: parse, execute, optional TTS, push."""
+    response = await run_voice_command(payload["user_id"], payload["transcript"])
+    message = {"jobId": job_id, "result": response.model_dump()}
+
+    if payload["speak"]:
+        try:
+            message["audio"] = await synthesize_speech(response.spoken_response, payload["voice"])
+        except Exception as e:
+            message["audioError"] = getattr(e, "detail", str(e))
+
+    if result_publisher is not None:
+        await result_publisher(payload["user_id"], "voiceCommandResult", message)
+    return message["result"]
+
+
+# Bounded worker pool for deferred voice commands
+voice_jobs = JobQueue("voice_command", _process_voice_job)
+
+
+@router.post("/voice-command", response_model=VoiceCommandResponse)
+async def process_voice_command(request: VoiceCommandRequest):
+    """
+    Process a voice command from transcribed text.
+
+    With defer=true the command is queued and 202 is returned with a job id;
+    the result is pushed to the user's Socket.IO room as voiceCommandResult
+    and can also be polled at /voice-command/jobs/{job_id}.
+    """
+    if not request.defer:
+        return await run_voice_command(request.user_id, request.transcript)
+
+    payload = {
+        "user_id": request.user_id,
+        "transcript": request.transcript,
+        "speak": request.speak,
+        "voice": request.voice
+    }
+    try:
+        job_id = voice_jobs.submit(payload)
+    except JobQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+    return JSONResponse(status_code=202, content={"job_id": job_id, "status": "queued"})
+
+
+def _server_timing(timings: dict) -> str:
+    return ", ".join(f"{stage};dur={ms:.1f}" for stage, ms in timings.items())
+
+
+def _result_header(result: dict) -> str:
+    """Summary of a voice command result small enough for a response header."""
+    summary = {key: result.get(key) for key in ("success", "action", "error", "transcript", "spoken_response")}
+    for key in ("error", "transcript", "spoken_response"):
+        text = summary[key]
+        if text and len(text) > VOICE_RESULT_HEADER_TEXT_CHARS:
+            summary[key] = text[:VOICE_RESULT_HEADER_TEXT_CHARS]
+            summary["truncated"] = True
+    # ensure_ascii keeps the header latin-1 safe
+    return json.dumps(summary)
+
+
+@router.post("/voice-command/audio", openapi_extra=TRANSCRIBE_REQUEST_BODY)
+async def process_voice_audio(
+    request: Request,
+    user_id: str,
+    voice: Optional[str] = "default",
+    preprocess: bool = True,
+    response_format: Literal["mp3", "json"] = "mp3"
+):
+    """
+    Audio in, spoken answer out, in one round trip.
+
+    Runs speech-to-text, intent parsing, execution and text-to-speech
+    server-side; the user's accounts load while the audio is transcribed.
+    An empty transcript is answered as an unknown command without a
+    Gemini call.
+
+    By default the body is the MP3 answer, streamed as soon as the command
+    has run. X-Voice-Result then carries a JSON summary (success, action,
+    error, transcript, spoken_response; texts cut to
+    VOICE_RESULT_HEADER_TEXT_CHARS, flagged truncated) and Server-Timing
+    the milliseconds spent in each stage (tts is time to the first audio
+    chunk). With response_format=json the body is the full result,
+    including data, with the MP3 base64 encoded in `audio`. If speech
+    synthesis fails, the result is returned as JSON with tts_error.
+    """
+    timings = {}
+    started = time.perf_counter()
+
+    async with transcribe_slot():
+        # Started once there's a slot, so a refused request loads nothing;
+        # dropped if the audio can't be transcribed
+        snapshot_task = prefetch_user_snapshot(user_id)
+        file = None
+        try:
+            file = await spool_upload(request)
+            transcription, _ = await transcribe_spooled(file, preprocess)
+        except HTTPException:
+            snapshot_task.cancel()
+            raise
+        except Exception as e:
+            snapshot_task.cancel()
+            raise HTTPException(status_code=500, detail=f"Transcription failed: {str(e)}")
+        finally:
+            if file:
+                await file.close()
+    transcript = getattr(transcription, "text", "") or ""
+    timings["stt"] = (time.perf_counter() - started) * 1000
+
+    stage_started = time.perf_counter()
+    parsed = await parse_command_with_gemini(transcript)
+    timings["intent"] = (time.perf_counter() - stage_started) * 1000
+
+    stage_started = time.perf_counter()
+    response = await run_voice_command(user_id, transcript, parsed=parsed, snapshot_task=snapshot_task)
+    timings["execute"] = (time.perf_counter() - stage_started) * 1000
+
+    result = {**response.model_dump(mode="json"), "transcript": transcript}
+
+    stage_started = time.perf_counter()
+    try:
+        audio_stream, cache_status = await open_cached_speech(response.spoken_response, voice)
+    except Exception as e:
+        timings["total"] = (time.perf_counter() - started) * 1000
+        result["tts_error"] = getattr(e, "detail", str(e))
+        return JSONResponse(content=result, headers={"Server-Timing": _server_timing(timings)})
+    if response_format == "json":
+        result["audio"] = base64.b64encode(b"".join([chunk async for chunk in audio_stream])).decode("ascii")
+        timings["tts"] = (time.perf_counter() - stage_started) * 1000
+        timings["total"] = (time.perf_counter() - started) * 1000
+        return JSONResponse(
+            content=result,
+            headers={"X-TTS-Cache": cache_status, "Server-Timing": _server_timing(timings)}
+        )
+    timings["tts"] = (time.perf_counter() - stage_started) * 1000
+    timings["total"] = (time.perf_counter() - started) * 1000
+
+    return StreamingResponse(
+        audio_stream,
+        media_type="audio/mpeg",
+        headers={
+            "Content-Disposition": "inline; filename=response.mp3",
+            "X-Voice-Result": _result_header(result),
+            "X-TTS-Cache": cache_status,
+            "Server-Timing": _server_timing(timings)
+        }
+    )
+
+
+@router.get("/voice-command/jobs/{job_id}")
+async def get_voice_command_job(job_id: str):
+    """Get the status and result of a deferred voice command."""
+    job = voice_jobs.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@router.post("/voice-command/parse-batch", response_model=BatchParseResponse)
+async def parse_voice_command_batch(request: BatchParseRequest):
+    """
+    Parse many transcripts without executing them.
+
+    Transcripts are packed into as few Gemini requests as possible and
+    each result carries its index in the request. Stats report how many
+    LLM calls and tokens the batch cost per transcript.
+    """
+    if not request.transcripts:
+        raise HTTPException(status_code=400, detail="At least one transcript is required")
+    if len(request.transcripts) > MAX_BATCH_TRANSCRIPTS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {MAX_BATCH_TRANSCRIPTS} transcripts per batch"
+        )
+
+    parsed, usage = await parse_commands_with_gemini_batch(request.transcripts)
+
+    results = [
+        {"index": i, "transcript": transcript, **result}
+        for i, (transcript, result) in enumerate(zip(request.transcripts, parsed))
+    ]
+    count = len(results)
+    total_tokens = usage["prompt_tokens"] + usage["output_tokens"]
+
+    return BatchParseResponse(
+        results=results,
+        stats={
+            **usage,
+            "transcripts": count,
+            "fallbacks": sum(1 for r in results if r["parser"] == "keywords"),
+            "llm_calls_per_transcript": usage["llm_calls"] / count,
+            "tokens_per_transcript": total_tokens / count
+        }
+    )
@@ -0,0 +1,212 @@
+import asyncio
+import io
+import json
+import time
+from typing import Optional
+
+import numpy as np
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+
+from controllers import voice_command
+from controllers.speech_to_text import convert_speech
+from services.audio_preprocess import StreamResampler, StreamingEndpointer, TARGET_SAMPLE_RATE, encode_wav
+
+router = APIRouter(prefix="/api", tags=["Voice Stream"])
+
+MIN_SAMPLE_RATE = 8000
+MAX_SAMPLE_RATE = 48000
+
+
+async def transcribe_segment(samples: np.ndarray) -> str:
+    """
+    Transcribe one 16 kHz mono segment with ElevenLabs.
+    Set ELEVENLABS_BASE_URL to send segments to a local stand-in instead.
+    """
+    audio = ("segment.wav", io.BytesIO(encode_wav(samples, TARGET_SAMPLE_RATE)), "audio/wav")
+    transcription = await convert_speech(audio)
+    return getattr(transcription, "text", "").strip()
+
+
+class Utterance:
+    """State for one spoken command, from speech start to endpoint."""
+
+    def __init__(self, number: int, snapshot_task: asyncio.Task):
+        self.number = number
+        self.snapshot_task = snapshot_task
+        self.segments: list[asyncio.Task] = []
+        self.intent_text: Optional[str] = None
+        self.intent_task: Optional[asyncio.Task] = None
+        self.intent_segments = 0
+        self.finished = False
+
+
+class VoiceStreamSession:
+    """
+    One /voice-stream connection.
+
+    Segments closed by the endpointer are transcribed while the user keeps
+    talking; each new partial transcript is sent to the client and parsed for
+    intent right away. A newer partial cancels the previous parse, and one
+    whose segment already has a successor is not parsed at all. When the
+    utterance ends, a parse of the same text is reused, so usually only the
+    command itself runs after the last frame; a parse of different text is
+    cancelled.
+    """
+
+    def __init__(self, websocket: WebSocket, user_id: str, sample_rate: int):
+        self.websocket = websocket
+        self.user_id = user_id
+        self.sample_rate = sample_rate
+        self.resampler = StreamResampler(sample_rate)
+        self.endpointer = StreamingEndpointer()
+        self.utterance: Optional[Utterance] = None
+        self.utterance_count = 0
+        self.tasks: set[asyncio.Task] = set()
+        self._send_lock = asyncio.Lock()
+
+    async def run(self) -> None:
+        while True:
+            message = await self.websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                return
+            received_at = time.perf_counter()
+
+            if message.get("bytes") is not None:
+                events = self.endpointer.feed(self._decode_pcm(message["bytes"]))
+            elif message.get("text") is not None:
+                events = self._handle_control(message["text"])
+            else:
+                events = []
+
+            for event, audio in events:
+                await self._handle_event(event, audio, received_at)
+
+    async def close(self) -> None:
+        tasks = list(self.tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def send(self, message: dict) -> None:
+        async with self._send_lock:
+            await self.websocket.send_json(message)
+
+    def _decode_pcm(self, data: bytes) -> np.ndarray:
+        """16-bit little endian mono PCM at the session's rate -> 16 kHz float."""
+        samples = np.frombuffer(data[:len(data) - len(data) % 2], dtype="<i2").astype(np.float32) / 32768
+        return self.resampler.feed(samples)
+
+    def _handle_control(self, text: str) -> list:
+        try:
+            control = json.loads(text)
+        except json.JSONDecodeError:
+            return []
+        if isinstance(control, dict) and control.get("type") == "end":
+            # Client stopped recording; don't wait for trailing silence
+            return self.endpointer.flush()
+        return []
+
+    async def _handle_event(self, event: str, audio: Optional[np.ndarray], received_at: float) -> None:
+        if event == "start":
+            self.utterance_count += 1
+            snapshot_task = self._spawn(
+                asyncio.to_thread(voice_command.load_user_snapshot, self.user_id)
+            )
+            self.utterance = Utterance(self.utterance_count, snapshot_task)
+            await self.send({"type": "speechStart", "utterance": self.utterance.number})
+        elif event == "segment" and self.utterance:
+            utterance = self.utterance
+            utterance.segments.append(self._spawn(transcribe_segment(audio)))
+            self._spawn(self._publish_partial(utterance, list(utterance.segments)))
+        elif event == "end" and self.utterance:
+            utterance, self.utterance = self.utterance, None
+            if audio is not None:
+                utterance.segments.append(self._spawn(transcribe_segment(audio)))
+            self._spawn(self._finish(utterance, received_at))
+
+    async def _publish_partial(self, utterance: Utterance, segments: list[asyncio.Task]) -> None:
+        """Send the transcript so far and start parsing it for intent."""
+        try:
+            texts = await asyncio.gather(*segments)
+        except Exception:
+            return  # Reported when the utterance finishes
+        if utterance.finished or len(segments) <= utterance.intent_segments:
+            return  # The final transcript or a later partial already got here
+        transcript = " ".join(text for text in texts if text)
+        utterance.intent_segments = len(segments)
+        if utterance.intent_task is not None:
+            utterance.intent_task.cancel()
+        utterance.intent_text, utterance.intent_task = transcript, None
+        if transcript and len(utterance.segments) == len(segments):
+            # Only parse the newest transcript; a pending segment will replace it
+            utterance.intent_task = self._spawn(voice_command.parse_command_with_gemini(transcript))
+        await self.send({"type": "partial", "utterance": utterance.number, "transcript": transcript})
+
+    async def _finish(self, utterance: Utterance, last_frame_at: float) -> None:
+        """Assemble the final transcript, run the command and push the result."""
+        try:
+            texts = await asyncio.gather(*utterance.segments)
+        except Exception as e:
+            utterance.finished = True
+            if utterance.intent_task is not None:
+                utterance.intent_task.cancel()
+            await self.send({"type": "error", "utterance": utterance.number, "message": f"Transcription failed: {e}"})
+            return
+        utterance.finished = True
+        transcript = " ".join(text for text in texts if text)
+
+        parsed = None
+        early_intent = utterance.intent_task is not None and utterance.intent_text == transcript
+        if early_intent:
+            parsed = await utterance.intent_task
+        elif utterance.intent_task is not None:
+            utterance.intent_task.cancel()  # Parsed a transcript that turned out incomplete
+
+        result = None
+        if transcript:
+            response = await voice_command.run_voice_command(
+                self.user_id, transcript, parsed=parsed, snapshot_task=utterance.snapshot_task
+            )
+            result = response.model_dump()
+
+        await self.send({
+            "type": "final",
+            "utterance": utterance.number,
+            "transcript": transcript,
+            "result": result,
+            "latency": {
+                "from_last_frame_ms": round((time.perf_counter() - last_frame_at) * 1000, 1),
+                "segments": len(utterance.segments),
+                "early_intent": early_intent
+            }
+        })
+
+    def _spawn(self, coro) -> asyncio.Task:
+        task = asyncio.create_task(coro)
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+        return task
+
+
+@router.websocket("/voice-stream")
+async def voice_stream(websocket: WebSocket, user_id: str, sample_rate: int = TARGET_SAMPLE_RATE):
+    """
+    Stream microphone audio and get voice command results back.
+
+    Binary messages are 16-bit little endian mono PCM at sample_rate.
+    Send {"type": "end"} to end an utterance without waiting for silence.
+    The server sends speechStart, partial (transcript so far) and final
+    (transcript, command result, latency from the last audio frame) messages.
+    """
+    if not MIN_SAMPLE_RATE <= sample_rate <= MAX_SAMPLE_RATE:
+        await websocket.close(code=1008, reason="Unsupported sample rate")
+        return
+
+    await websocket.accept()
+    session = VoiceStreamSession(websocket, user_id, sample_rate)
+    try:
+        await session.run()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        await session.close()
@@ -15,7 +15,9 @@ engine = create_engine(
     echo=False
 )
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Sessions live for one request or socket event, so objects are not expired
+# on commit: reading them afterwards costs no extra SELECTs.
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
 
 Base = declarative_base()
 
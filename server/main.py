@@ -4,15 +4,23 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 import uvicorn
 import os
+from contextlib import contextmanager
 
 from database import SessionLocal, init_db
-from controllers import user_router, account_router, transaction_router, environment_router, speech_to_text_router, voice_command_router
+from controllers import user_router, account_router, transaction_router, environment_router, speech_to_text_router, voice_command_router, diagnostics_router, voice_stream_router, telemetry_router, metrics_router
 from services.user_service import UserService
 from services.account_service import AccountService
 from services.transaction_service import TransactionService
 from services.environment_service import EnvironmentService
+from services.imu_telemetry import start_udp_ingest
+from services.gesture_recognizer import get_gesture_engine
+from services.metrics import MetricsMiddleware, instrument_database, instrument_socketio
+from services.slow_query_log import get_slow_query_log
+from services.tracing import TracingMiddleware, get_exporter, trace_database, trace_socketio
+from services.profiler import ProfilingMiddleware, get_profiler
 from models.transaction import Transaction
 from models.user import User
+from controllers import voice_command
 
 # Create FastAPI app
 app = FastAPI(
@@ -30,6 +38,20 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# On-demand profiles (X-Profile header, or armed via /api/diagnostics/profiles);
+# added before metrics and tracing so their overhead stays out of the profile
+app.add_middleware(ProfilingMiddleware)
+
+# Request latency, in-flight and per-request SQL metrics, served at /metrics
+app.add_middleware(MetricsMiddleware)
+instrument_database()
+# Statements over SLOW_QUERY_MS, served at /api/diagnostics/slow-queries
+get_slow_query_log().install()
+# Sampled spans (TRACE_SAMPLE_RATE) for requests, socket events, SQL and
+# provider calls; added last so it is outermost and covers the metrics too
+app.add_middleware(TracingMiddleware)
+trace_database()
+
 # Include routers
 app.include_router(user_router)
 app.include_router(account_router)
@@ -37,6 +59,10 @@ app.include_router(transaction_router)
 app.include_router(environment_router)
 app.include_router(speech_to_text_router)
 app.include_router(voice_command_router)
+app.include_router(diagnostics_router)
+app.include_router(voice_stream_router)
+app.include_router(telemetry_router)
+app.include_router(metrics_router)
 
 # Mount static files for game
 game_path = os.path.join(os.path.dirname(__file__), "..", "game")
@@ -55,6 +81,9 @@ socket_app = socketio.ASGIApp(sio, other_asgi_app=app)
 # Store connected players
 connected_players = {}
 
+# UDP telemetry listener, when TELEMETRY_UDP_PORT is set
+telemetry_transport = None
+
 VALID_NOISE_LEVELS = {"quiet", "low", "med", "high", "boomboom"}
 DIRECT_DEPOSIT_AMOUNT = 50
 ROCK_HIT_CREDIT_CHARGE = 50
@@ -150,9 +179,14 @@ def _normalize_environment_payload(env):
     }
 
 
+@contextmanager
 def get_db_session():
-    """Get a database session for socket handlers."""
-    return SessionLocal()
+    """Get a database session for socket handlers, closed when the block exits."""
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
 
 
 def _register_player_sid(player_id, sid):
@@ -180,6 +214,16 @@ def _get_player_sids(player_id, fallback_sid=None):
     return set()
 
 
+async def _emit_to_player(player_id, event, payload):
+    """Emit an event to every socket registered for a player."""
+    for target_sid in _get_player_sids(player_id):
+        await sio.emit(event, payload, room=target_sid)
+
+
+voice_command.set_result_publisher(_emit_to_player)
+get_gesture_engine().set_publisher(_emit_to_player)
+
+
 def _resolve_deposit_user_id(db, player_id):
     if not player_id:
         return None
@@ -210,7 +254,10 @@ def _select_deposit_account(account_service, user_id):
     return accounts[0]
 
 
-# Socket.IO event handlers
+# Socket.IO event handlers. Each one leaves its `with get_db_session()`
+# block before emitting: an emit can yield to the event loop, and a session
+# held across it keeps its pooled connection, so enough suspended handlers
+# leave the next one blocking the loop in pool checkout.
 @sio.event
 async def connect(sid, environ):
     print(f"Client connected: {sid}")
@@ -225,225 +272,221 @@ async def disconnect(sid):
 @sio.event
 async def join(sid, player_id):
     """Player joins the game."""
-    db = get_db_session()
     try:
-        user_service = UserService(db)
-        user, created = user_service.get_or_create_user(player_id, f"Player {player_id[:8]}")
-        _register_player_sid(player_id, sid)
-
-        # Load accounts
-        _ = user.accounts
-
-        await sio.emit("playerData", {
-            "id": user.id,
-            "name": user.name,
-            "gold": sum(a.balance for a in user.accounts if a.type == "treasure_chest"),
-            "accounts": [a.to_dict() for a in user.accounts]
-        }, room=sid)
+        with get_db_session() as db:
+            user_service = UserService(db)
+            user, created = user_service.get_or_create_user(player_id, f"Player {player_id[:8]}")
+            _register_player_sid(player_id, sid)
+
+            player_data = {
+                "id": user.id,
+                "name": user.name,
+                "gold": sum(a.balance for a in user.accounts if a.type == "treasure_chest"),
+                "accounts": [a.to_dict() for a in user.accounts]
+            }
     except Exception as e:
         await sio.emit("error", {"message": str(e)}, room=sid)
-    finally:
-        db.close()
+        return
+    await sio.emit("playerData", player_data, room=sid)
 
 
 @sio.event
 async def getUser(sid, player_id):
     """Get user data."""
-    db = get_db_session()
     try:
-        user_service = UserService(db)
-        user = user_service.get_user_with_accounts(player_id)
-        await sio.emit("playerData", {
-            "id": user.id,
-            "name": user.name,
-            "accounts": [a.to_dict() for a in user.accounts]
-        }, room=sid)
+        with get_db_session() as db:
+            user_service = UserService(db)
+            user = user_service.get_user_with_accounts(player_id)
+            player_data = {
+                "id": user.id,
+                "name": user.name,
+                "accounts": [a.to_dict() for a in user.accounts]
+            }
     except Exception as e:
         await sio.emit("error", {"message": str(e)}, room=sid)
-    finally:
-        db.close()
+        return
+    await sio.emit("playerData", player_data, room=sid)
 
 
 @sio.event
 async def collectGold(sid, player_id):
     """Collect gold bar from game."""
-    db = get_db_session()
     try:
-        transaction_service = TransactionService(db)
-        account_service = AccountService(db)
+        with get_db_session() as db:
+            transaction_service = TransactionService(db)
 
-        transaction = transaction_service.collect_gold_bar(player_id)
-        treasure = account_service.get_account_by_type(player_id, "treasure_chest")
+            transaction = transaction_service.collect_gold_bar(player_id)
+            # Already in the session, so no SELECT
+            treasure = transaction.to_account
 
-        await sio.emit("goldCollected", {
-            "transaction": transaction.to_dict(),
-            "goldBars": int(treasure.balance)
-        }, room=sid)
+            collected = {
+                "transaction": transaction.to_dict(),
+                "goldBars": int(treasure.balance)
+            }
     except Exception as e:
         await sio.emit("error", {"message": str(e)}, room=sid)
-    finally:
-        db.close()
+        return
+    await sio.emit("goldCollected", collected, room=sid)
 
 
 @sio.event
 async def exchangeGold(sid, data):
     """Exchange gold bars for cash."""
-    db = get_db_session()
     try:
-        player_id = data.get("playerId")
-        bars = data.get("bars", 1)
-        to_account_type = data.get("toAccountType", "checking")
-
-        transaction_service = TransactionService(db)
-        account_service = AccountService(db)
-
-        transaction = transaction_service.exchange_gold(player_id, bars, to_account_type)
-        summary = account_service.get_account_summary(player_id)
-
-        await sio.emit("goldExchanged", {
-            "transaction": transaction.to_dict(),
-            "summary": summary,
-            "exchangeRate": transaction_service.get_gold_bar_value()
-        }, room=sid)
+        with get_db_session() as db:
+            player_id = data.get("playerId")
+            bars = data.get("bars", 1)
+            to_account_type = data.get("toAccountType", "checking")
+
+            transaction_service = TransactionService(db)
+            account_service = AccountService(db)
+
+            transaction = transaction_service.exchange_gold(player_id, bars, to_account_type)
+            summary = account_service.get_account_summary(player_id)
+
+            exchanged = {
+                "transaction": transaction.to_dict(),
+                "summary": summary,
+                "exchangeRate": transaction_service.get_gold_bar_value()
+            }
     except Exception as e:
         await sio.emit("error", {"message": str(e)}, room=sid)
-    finally:
-        db.close()
+        return
+    await sio.emit("goldExchanged", exchanged, room=sid)
 
 
 @sio.event
 async def updateEnvironment(sid, data):
     """Update environment state."""
-    db = get_db_session()
     try:
-        environment_service = EnvironmentService(db)
-        env_payload = _normalize_environment_payload(_extract_environment_payload(data))
-        env = environment_service.update_environment(
-            temperature=env_payload["temperature"],
-            humidity=env_payload["humidity"],
-            wind_speed=env_payload["wind_speed"],
-            noise=env_payload["noise"],
-            brightness=env_payload["brightness"]
-        )
-        hints = environment_service.get_adaptation_hints()
-
-        await sio.emit("environmentUpdated", {
-            "environment": env.to_dict(),
-            "hints": hints
-        }, room=sid)
+        with get_db_session() as db:
+            environment_service = EnvironmentService(db)
+            env_payload = _normalize_environment_payload(_extract_environment_payload(data))
+            env = environment_service.update_environment(
+                temperature=env_payload["temperature"],
+                humidity=env_payload["humidity"],
+                wind_speed=env_payload["wind_speed"],
+                noise=env_payload["noise"],
+                brightness=env_payload["brightness"]
+            )
+            hints = environment_service.get_adaptation_hints()
+
+            updated = {
+                "environment": env.to_dict(),
+                "hints": hints
+            }
     except Exception as e:
         await sio.emit("error", {"message": str(e)}, room=sid)
-    finally:
-        db.close()
+        return
+    await sio.emit("environmentUpdated", updated, room=sid)
 
 
 @sio.event
 async def getEnvironment(sid):
     """Get environment state."""
-    db = get_db_session()
     try:
-        environment_service = EnvironmentService(db)
-        env = environment_service.get_environment()
-        hints = environment_service.get_adaptation_hints()
-
-        await sio.emit("environmentData", {
-            "environment": env.to_dict(),
-            "hints": hints
-        }, room=sid)
+        with get_db_session() as db:
+            environment_service = EnvironmentService(db)
+            env = environment_service.get_environment()
+            hints = environment_service.get_adaptation_hints()
+
+            environment_data = {
+                "environment": env.to_dict(),
+                "hints": hints
+            }
     except Exception as e:
         await sio.emit("error", {"message": str(e)}, room=sid)
-    finally:
-        db.close()
+        return
+    await sio.emit("environmentData", environment_data, room=sid)
 
 
 @sio.event
 async def transfer(sid, data):
     """Transfer between accounts."""
-    db = get_db_session()
     try:
-        player_id = data.get("playerId")
-        from_account_id = data.get("fromAccountId")
-        to_account_id = data.get("toAccountId")
-        amount = data.get("amount")
-        description = data.get("description")
-
-        transaction_service = TransactionService(db)
-        account_service = AccountService(db)
-
-        transaction = transaction_service.transfer(
-            from_account_id, to_account_id, amount, description
-        )
-        summary = account_service.get_account_summary(player_id)
-
-        await sio.emit("transferComplete", {
-            "transaction": transaction.to_dict(),
-            "summary": summary
-        }, room=sid)
+        with get_db_session() as db:
+            player_id = data.get("playerId")
+            from_account_id = data.get("fromAccountId")
+            to_account_id = data.get("toAccountId")
+            amount = data.get("amount")
+            description = data.get("description")
+
+            transaction_service = TransactionService(db)
+            account_service = AccountService(db)
+
+            transaction = transaction_service.transfer(
+                from_account_id, to_account_id, amount, description
+            )
+            summary = account_service.get_account_summary(player_id)
+
+            completed = {
+                "transaction": transaction.to_dict(),
+                "summary": summary
+            }
     except Exception as e:
         await sio.emit("error", {"message": str(e)}, room=sid)
-    finally:
-        db.close()
+        return
+    await sio.emit("transferComplete", completed, room=sid)
 
 
 @sio.event
 async def getAccountSummary(sid, player_id):
     """Get account summary."""
-    db = get_db_session()
     try:
-        account_service = AccountService(db)
-        summary = account_service.get_account_summary(player_id)
-        await sio.emit("accountSummary", summary, room=sid)
+        with get_db_session() as db:
+            account_service = AccountService(db)
+            summary = account_service.get_account_summary(player_id)
     except Exception as e:
         await sio.emit("error", {"message": str(e)}, room=sid)
-    finally:
-        db.close()
+        return
+    await sio.emit("accountSummary", summary, room=sid)
 
 
 @sio.event
 async def sendMoney(sid, data):
     """Send money to another user."""
-    db = get_db_session()
     try:
-        from_user_id = data.get("fromUserId")
-        to_user_id = data.get("toUserId")
-        amount = data.get("amount")
-        from_account_type = data.get("fromAccountType", "checking")
-        to_account_type = data.get("toAccountType", "checking")
-        description = data.get("description")
-
-        transaction_service = TransactionService(db)
-        account_service = AccountService(db)
-        user_service = UserService(db)
-
-        transaction = transaction_service.send_money(
-            from_user_id, to_user_id, amount,
-            from_account_type, to_account_type, description
-        )
-
-        sender_summary = account_service.get_account_summary(from_user_id)
-        recipient_summary = account_service.get_account_summary(to_user_id)
-        sender = user_service.get_user(from_user_id)
-        recipient = user_service.get_user(to_user_id)
-
-        # Notify sender
-        await sio.emit("moneySent", {
-            "transaction": transaction.to_dict(),
-            "summary": sender_summary,
-            "recipient": recipient.to_dict()
-        }, room=sid)
-
-        # Notify recipient if connected
-        if to_user_id in connected_players:
-            for recipient_sid in connected_players[to_user_id]:
-                await sio.emit("moneyReceived", {
-                    "transaction": transaction.to_dict(),
-                    "summary": recipient_summary,
-                    "sender": sender.to_dict()
-                }, room=recipient_sid)
+        with get_db_session() as db:
+            from_user_id = data.get("fromUserId")
+            to_user_id = data.get("toUserId")
+            amount = data.get("amount")
+            from_account_type = data.get("fromAccountType", "checking")
+            to_account_type = data.get("toAccountType", "checking")
+            description = data.get("description")
+
+            transaction_service = TransactionService(db)
+            user_service = UserService(db)
+
+            transaction = transaction_service.send_money(
+                from_user_id, to_user_id, amount,
+                from_account_type, to_account_type, description
+            )
+
+            # One query for both users and their accounts
+            users = user_service.get_users_with_accounts([from_user_id, to_user_id])
+            sender = users[from_user_id]
+            recipient = users[to_user_id]
+
+            sent = {
+                "transaction": transaction.to_dict(),
+                "summary": AccountService.summarize_accounts(sender.accounts),
+                "recipient": recipient.to_dict()
+            }
+            received = {
+                "transaction": transaction.to_dict(),
+                "summary": AccountService.summarize_accounts(recipient.accounts),
+                "sender": sender.to_dict()
+            }
     except Exception as e:
         await sio.emit("error", {"message": str(e)}, room=sid)
-    finally:
-        db.close()
+        return
+
+    # Notify sender
+    await sio.emit("moneySent", sent, room=sid)
+
+    # Notify recipient if connected
+    for recipient_sid in _get_player_sids(to_user_id):
+        await sio.emit("moneyReceived", received, room=recipient_sid)
 
 
 @sio.event
@@ -453,96 +496,95 @@ async def updateGold(sid, data):
     if not player_id:
         return
 
-    db = get_db_session()
     try:
-        user_service = UserService(db)
-        account_service = AccountService(db)
-
-        user_service.get_or_create_user(player_id, f"Player {player_id[:8]}")
-        treasure = account_service.get_account_by_type(player_id, "treasure_chest")
+        with get_db_session() as db:
+            user_service = UserService(db)
+            account_service = AccountService(db)
+
+            user_service.get_or_create_user(player_id, f"Player {player_id[:8]}")
+            treasure = account_service.get_account_by_type(player_id, "treasure_chest")
+
+            current_balance = int(treasure.balance or 0)
+            if isinstance(data, dict) and data.get("newTotal") is not None:
+                target_balance = _coerce_int(data.get("newTotal"))
+            else:
+                gold_change = _coerce_number(data.get("goldChange")) if isinstance(data, dict) else 0
+                if gold_change is None:
+                    gold_change = 0
+                target_balance = _coerce_int(current_balance + gold_change)
+
+            if target_balance is None:
+                target_balance = current_balance
+
+            delta = target_balance - current_balance
+            deposit_account = None
+            deposit_user_id = None
+            credit_card_account = None
+            did_change = False
+
+            if delta != 0:
+                treasure.balance = target_balance
+                transaction = Transaction(
+                    from_account_id=treasure.id if delta < 0 else None,
+                    to_account_id=treasure.id if delta > 0 else None,
+                    amount=abs(delta),
+                    type="deposit" if delta > 0 else "withdrawal",
+                    description="Gold collected from game" if delta > 0 else "Gold lost in game"
+                )
+                db.add(transaction)
+                did_change = True
 
-        current_balance = int(treasure.balance or 0)
-        if isinstance(data, dict) and data.get("newTotal") is not None:
-            target_balance = _coerce_int(data.get("newTotal"))
-        else:
-            gold_change = _coerce_number(data.get("goldChange")) if isinstance(data, dict) else 0
-            if gold_change is None:
-                gold_change = 0
-            target_balance = _coerce_int(current_balance + gold_change)
-
-        if target_balance is None:
-            target_balance = current_balance
-
-        delta = target_balance - current_balance
-        deposit_account = None
-        deposit_user_id = None
-        credit_card_account = None
-        did_change = False
-
-        if delta != 0:
-            treasure.balance = target_balance
-            transaction = Transaction(
-                from_account_id=treasure.id if delta < 0 else None,
-                to_account_id=treasure.id if delta > 0 else None,
-                amount=abs(delta),
-                type="deposit" if delta > 0 else "withdrawal",
-                description="Gold collected from game" if delta > 0 else "Gold lost in game"
-            )
-            db.add(transaction)
-            did_change = True
-
-        if delta > 0:
-            deposit_user_id = _resolve_deposit_user_id(db, player_id)
-            deposit_account = _select_deposit_account(account_service, deposit_user_id)
-            if deposit_account:
-                deposit_account.balance += DIRECT_DEPOSIT_AMOUNT
-                deposit_transaction = Transaction(
-                    from_account_id=None,
-                    to_account_id=deposit_account.id,
-                    amount=DIRECT_DEPOSIT_AMOUNT,
-                    type="deposit",
-                    description="Direct deposit from game"
+            if delta > 0:
+                deposit_user_id = _resolve_deposit_user_id(db, player_id)
+                deposit_account = _select_deposit_account(account_service, deposit_user_id)
+                if deposit_account:
+                    deposit_account.balance += DIRECT_DEPOSIT_AMOUNT
+                    deposit_transaction = Transaction(
+                        from_account_id=None,
+                        to_account_id=deposit_account.id,
+                        amount=DIRECT_DEPOSIT_AMOUNT,
+                        type="deposit",
+                        description="Direct deposit from game"
+                    )
+                    db.add(deposit_transaction)
+                    did_change = True
+
+            if _should_apply_rock_charge(delta, data):
+                credit_card_account = account_service.get_account_by_type(player_id, "credit_card")
+                credit_card_account.balance += ROCK_HIT_CREDIT_CHARGE
+                charge_transaction = Transaction(
+                    from_account_id=credit_card_account.id,
+                    to_account_id=None,
+                    amount=ROCK_HIT_CREDIT_CHARGE,
+                    type="withdrawal",
+                    description="Rock collision fee"
                 )
-                db.add(deposit_transaction)
+                db.add(charge_transaction)
                 did_change = True
 
-        if _should_apply_rock_charge(delta, data):
-            credit_card_account = account_service.get_account_by_type(player_id, "credit_card")
-            credit_card_account.balance += ROCK_HIT_CREDIT_CHARGE
-            charge_transaction = Transaction(
-                from_account_id=credit_card_account.id,
-                to_account_id=None,
-                amount=ROCK_HIT_CREDIT_CHARGE,
-                type="withdrawal",
-                description="Rock collision fee"
-            )
-            db.add(charge_transaction)
-            did_change = True
-
-        if did_change:
-            db.commit()
-            db.refresh(treasure)
-            if deposit_account:
-                db.refresh(deposit_account)
-            if credit_card_account:
-                db.refresh(credit_card_account)
-        else:
-            db.commit()
-
-        payload = {
-            "gold": int(target_balance),
-            "change": delta,
-            "userId": player_id
-        }
-        notify_sids = _get_player_sids(player_id, fallback_sid=sid)
-        if deposit_user_id and deposit_user_id != player_id:
-            notify_sids |= _get_player_sids(deposit_user_id)
-        for target_sid in notify_sids:
-            await sio.emit("goldUpdated", payload, room=target_sid)
+            if did_change:
+                db.commit()
+                db.refresh(treasure)
+                if deposit_account:
+                    db.refresh(deposit_account)
+                if credit_card_account:
+                    db.refresh(credit_card_account)
+            else:
+                db.commit()
     except Exception as e:
         await sio.emit("error", {"message": str(e)}, room=sid)
-    finally:
-        db.close()
+        return
+
+    payload = {
+        "gold": int(target_balance),
+        "change": delta,
+        "userId": player_id
+    }
+    notify_sids = _get_player_sids(player_id, fallback_sid=sid)
+    if deposit_user_id and deposit_user_id != player_id:
+        notify_sids |= _get_player_sids(deposit_user_id)
+    for target_sid in notify_sids:
+        await sio.emit("goldUpdated", payload, room=target_sid)
 
 
 @sio.event
@@ -550,38 +592,59 @@ async def environmentUpdate(sid, data):
     """Handle environment update from game and broadcast to all clients."""
     environment = _extract_environment_payload(data)
 
-    db = get_db_session()
     try:
-        environment_service = EnvironmentService(db)
-        env_payload = _normalize_environment_payload(environment)
-        env = environment_service.update_environment(
-            temperature=env_payload["temperature"],
-            humidity=env_payload["humidity"],
-            wind_speed=env_payload["wind_speed"],
-            noise=env_payload["noise"],
-            brightness=env_payload["brightness"]
-        )
-        hints = environment_service.get_adaptation_hints()
-        env_dict = env.to_dict()
-        if isinstance(environment, dict) and environment.get("type"):
-            env_dict["region"] = environment.get("type")
-
-        # Broadcast to all connected clients (including Flutter app)
-        await sio.emit("environmentUpdated", {
-            "environment": env_dict,
-            "hints": hints
-        })
+        with get_db_session() as db:
+            environment_service = EnvironmentService(db)
+            env_payload = _normalize_environment_payload(environment)
+            env = environment_service.update_environment(
+                temperature=env_payload["temperature"],
+                humidity=env_payload["humidity"],
+                wind_speed=env_payload["wind_speed"],
+                noise=env_payload["noise"],
+                brightness=env_payload["brightness"]
+            )
+            hints = environment_service.get_adaptation_hints()
+            env_dict = env.to_dict()
+            if isinstance(environment, dict) and environment.get("type"):
+                env_dict["region"] = environment.get("type")
     except Exception as e:
         await sio.emit("error", {"message": str(e)}, room=sid)
-    finally:
-        db.close()
+        return
+
+    # Broadcast to all connected clients (including Flutter app)
+    await sio.emit("environmentUpdated", {
+        "environment": env_dict,
+        "hints": hints
+    })
+
+
+# Time and trace every handler above; must run after the last @sio.event
+instrument_socketio(sio, connected_players)
+trace_socketio(sio)
+get_profiler().install_socketio(sio)
 
 
 @app.on_event("startup")
 async def startup_event():
-    """Initialize database on startup."""
+    """Initialize database, telemetry ingest and gesture recognition on startup."""
+    global telemetry_transport
     init_db()
     print("Database initialized")
+    telemetry_transport = await start_udp_ingest()
+    if telemetry_transport:
+        print(f"Telemetry UDP ingest on port {telemetry_transport.get_extra_info('sockname')[1]}")
+    get_gesture_engine().start()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop background voice command workers, telemetry ingest and gesture recognition; close the slow query log and flush spans."""
+    await voice_command.voice_jobs.stop()
+    await get_gesture_engine().stop()
+    if telemetry_transport:
+        telemetry_transport.close()
+    get_slow_query_log().close()
+    get_exporter().flush()
 
 
 @app.get("/")
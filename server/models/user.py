@@ -12,7 +12,7 @@ class User(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
 
     # Relationships
-    accounts = relationship("Account", back_populates="user", cascade="all, delete-orphan")
+    accounts = relationship("Account", back_populates="user", cascade="all, delete-orphan", order_by="Account.id")
 
     def to_dict(self):
         return {
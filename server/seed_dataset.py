@@ -0,0 +1,290 @@
+"""
+Generate seeded synthetic datasets and reusable SQLite snapshots.
+
+The same (users, seed) always produces the same database: users with the
+four default accounts and a power-law transaction history (most players
+have a handful of transactions, a few have thousands, and money sent
+between players goes mostly to a few popular recipients). Rows are
+bulk-loaded with executemany and relaxed pragmas, so a million users take
+about a minute instead of hours through UserService.create_user.
+
+Layout guarantees that callers may rely on:
+  user n has id user_id(n) and accounts account_id(n, type), i.e. 4n+1..4n+4
+  the environment row exists
+
+Run: python seed_dataset.py generate --users 1000000 [--seed 1] [--output PATH]
+     python seed_dataset.py restore SNAPSHOT --to PATH
+     python seed_dataset.py list
+"""
+import argparse
+import json
+import os
+import shutil
+import sqlite3
+import sys
+import time
+from contextlib import closing
+
+import numpy as np
+from sqlalchemy import StaticPool, create_engine
+
+from database import Base
+from services.user_service import DEFAULT_CHECKING_BALANCE, DEFAULT_SAVINGS_BALANCE
+import models  # noqa: F401
+
+# Bump when the generated data changes, so old snapshots are not reused
+DATASET_VERSION = 1
+SNAPSHOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks", "data", "snapshots")
+
+CHUNK_USERS = 50_000  # Part of the dataset definition: each chunk has its own random stream
+ACCOUNT_TYPES = ("checking", "savings", "treasure_chest", "credit_card")
+ACCOUNT_NAMES = ("Checking Account", "Savings Account", "Treasure Chest", "Credit Card")
+
+TRANSACTIONS_PER_USER = 5.0  # Mean; per-user counts are Pareto distributed
+PARETO_ALPHA = 1.5
+MAX_TRANSACTIONS_PER_USER = 5_000
+RECIPIENT_ZIPF = 1.3  # Popularity of send-money recipients
+HISTORY_DAYS = 365
+GENERATED_AT = np.datetime64("2026-01-01T00:00:00", "us")
+
+# Kinds of generated transaction, as the game and app produce them
+KINDS = ("gold", "rock", "transfer", "send", "exchange")
+KIND_PROBABILITIES = (0.45, 0.15, 0.15, 0.15, 0.10)
+ROCK_HIT_CREDIT_CHARGE = 50
+
+FIRST_NAMES = ("Ada", "Ben", "Cleo", "Dev", "Elif", "Finn", "Gus", "Hana", "Ines", "Jon", "Kai", "Lena",
+               "Milo", "Nia", "Omar", "Pia", "Quinn", "Rosa", "Sami", "Theo", "Uma", "Vic", "Wren", "Yara")
+LAST_NAMES = ("Abara", "Berg", "Costa", "Dahl", "Eze", "Fox", "Gill", "Hart", "Ito", "Jain", "Kerr", "Lund",
+              "Moss", "Nash", "Okoro", "Park", "Reyes", "Sato", "Toth", "Ueda", "Vance", "Wolfe", "Xu", "Zola")
+
+
+def user_id(index: int) -> str:
+    return f"user{index:07d}"
+
+
+def account_id(index: int, account_type: str) -> int:
+    return 4 * index + 1 + ACCOUNT_TYPES.index(account_type)
+
+
+def snapshot_path(users: int, seed: int, directory: str = SNAPSHOT_DIR) -> str:
+    return os.path.join(directory, f"users{users}-seed{seed}-v{DATASET_VERSION}.db")
+
+
+def _timestamps(values: np.ndarray) -> list:
+    """datetime64 values as the strings SQLAlchemy stores in SQLite."""
+    return np.char.replace(np.datetime_as_string(values, unit="us"), "T", " ").tolist()
+
+
+def _nullable(ids: np.ndarray) -> list:
+    """Account ids with 0 meaning no account."""
+    return np.where(ids > 0, ids, None).tolist()
+
+
+def _generate_chunk(chunk: int, users: int, seed: int, recipients: np.ndarray, first_transaction_id: int):
+    """Rows for users [chunk * CHUNK_USERS, ...) as (users, accounts, transactions)."""
+    rng = np.random.default_rng([seed, chunk])
+    first = chunk * CHUNK_USERS
+    index = np.arange(first, min(first + CHUNK_USERS, users))
+    count = len(index)
+
+    history = np.timedelta64(HISTORY_DAYS * 86400, "s")
+    joined = GENERATED_AT - (rng.random(count) * history.astype(np.int64)).astype("timedelta64[s]")
+    names = [f"{FIRST_NAMES[a]} {LAST_NAMES[b]}" for a, b in zip(
+        rng.integers(len(FIRST_NAMES), size=count).tolist(), rng.integers(len(LAST_NAMES), size=count).tolist()
+    )]
+    user_ids = [user_id(n) for n in index.tolist()]
+    joined_text = _timestamps(joined)
+    user_rows = list(zip(user_ids, names, joined_text))
+
+    # Per-user transaction counts: Pareto with the configured mean, capped
+    scale = TRANSACTIONS_PER_USER * (PARETO_ALPHA - 1) / PARETO_ALPHA
+    per_user = np.minimum(np.rint((rng.pareto(PARETO_ALPHA, count) + 1) * scale).astype(np.int64), MAX_TRANSACTIONS_PER_USER)
+    owner = np.repeat(index, per_user)
+    total = len(owner)
+    kind = rng.choice(len(KINDS), size=total, p=KIND_PROBABILITIES)
+    since_join = (GENERATED_AT - np.repeat(joined, per_user)).astype(np.int64)  # Microseconds
+    created = GENERATED_AT - (rng.random(total) * since_join).astype("timedelta64[us]")
+
+    base = 4 * owner + 1
+    checking, savings, treasure, credit = base, base + 1, base + 2, base + 3
+    recipient = recipients[(rng.zipf(RECIPIENT_ZIPF, total) - 1) % users]
+    recipient = np.where(recipient == owner, (recipient + 1) % users, recipient)
+
+    from_id = np.zeros(total, dtype=np.int64)
+    to_id = np.zeros(total, dtype=np.int64)
+    amount = np.zeros(total)
+    is_kind = {name: kind == number for number, name in enumerate(KINDS)}
+    to_id[is_kind["gold"]] = treasure[is_kind["gold"]]
+    amount[is_kind["gold"]] = 1
+    from_id[is_kind["rock"]] = credit[is_kind["rock"]]
+    amount[is_kind["rock"]] = ROCK_HIT_CREDIT_CHARGE
+    from_id[is_kind["transfer"]] = checking[is_kind["transfer"]]
+    to_id[is_kind["transfer"]] = savings[is_kind["transfer"]]
+    from_id[is_kind["send"]] = checking[is_kind["send"]]
+    to_id[is_kind["send"]] = 4 * recipient[is_kind["send"]] + 1
+    moved = is_kind["transfer"] | is_kind["send"]
+    amount[moved] = np.round(rng.lognormal(3, 1, moved.sum()), 2)
+    from_id[is_kind["exchange"]] = treasure[is_kind["exchange"]]
+    to_id[is_kind["exchange"]] = checking[is_kind["exchange"]]
+    amount[is_kind["exchange"]] = rng.integers(1, 4, is_kind["exchange"].sum())
+
+    type_names = np.array(["deposit", "withdrawal", "transfer", "transfer", "gold_exchange"])[kind]
+    descriptions = np.array([
+        "Gold bar collected from game", "Rock collision fee", "Transfer from Checking Account to Savings Account",
+        "Money sent to another player", "Exchanged gold bars"
+    ])[kind]
+    transaction_rows = list(zip(
+        range(first_transaction_id, first_transaction_id + total), _nullable(from_id), _nullable(to_id),
+        amount.tolist(), type_names.tolist(), descriptions.tolist(), _timestamps(created)
+    ))
+
+    # Balances that agree with the history's direction: active players hold more
+    activity = np.log1p(per_user)
+    gold_in = np.bincount(owner[is_kind["gold"]] - first, minlength=count)
+    gold_out = np.bincount(owner[is_kind["exchange"]] - first, weights=amount[is_kind["exchange"]], minlength=count)
+    balances = np.stack([
+        np.round(DEFAULT_CHECKING_BALANCE * rng.lognormal(0, 0.8, count) * (1 + activity), 2),
+        np.round(DEFAULT_SAVINGS_BALANCE * rng.lognormal(0, 1.0, count), 2),
+        np.maximum(gold_in - gold_out, 0) + rng.integers(0, 3, count),
+        np.where(rng.random(count) < 0.3, np.round(rng.lognormal(5, 1, count), 2), 0.0),
+    ], axis=1)
+    account_rows = [
+        (4 * n + 1 + slot, user_ids[row], ACCOUNT_TYPES[slot], ACCOUNT_NAMES[slot], balance, joined_text[row], joined_text[row])
+        for row, (n, account_balances) in enumerate(zip(index.tolist(), balances.tolist()))
+        for slot, balance in enumerate(account_balances)
+    ]
+    return user_rows, account_rows, transaction_rows
+
+
+def generate(path: str, users: int, seed: int = 1, log=print) -> dict:
+    """Write a new dataset to the SQLite file at `path` (replacing it) and return its summary."""
+    started = time.perf_counter()
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    partial = f"{path}.partial"
+    if os.path.exists(partial):
+        os.remove(partial)
+
+    engine = create_engine(f"sqlite:///{partial}")
+    Base.metadata.create_all(bind=engine)
+    engine.dispose()
+
+    recipients = np.random.default_rng([seed, 2 ** 32 - 1]).permutation(users)
+    totals = {"users": 0, "accounts": 0, "transactions": 0}
+    with closing(sqlite3.connect(partial)) as connection:
+        connection.execute("PRAGMA journal_mode=OFF")
+        connection.execute("PRAGMA synchronous=OFF")
+        connection.execute("PRAGMA locking_mode=EXCLUSIVE")
+        connection.execute("PRAGMA cache_size=-262144")
+        for chunk in range(-(-users // CHUNK_USERS)):
+            user_rows, account_rows, transaction_rows = _generate_chunk(
+                chunk, users, seed, recipients, totals["transactions"] + 1
+            )
+            connection.executemany("INSERT INTO users (id, name, created_at) VALUES (?, ?, ?)", user_rows)
+            connection.executemany(
+                "INSERT INTO accounts (id, user_id, type, name, balance, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                account_rows
+            )
+            connection.executemany(
+                "INSERT INTO transactions (id, from_account_id, to_account_id, amount, type, description, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                transaction_rows
+            )
+            connection.commit()
+            totals["users"] += len(user_rows)
+            totals["accounts"] += len(account_rows)
+            totals["transactions"] += len(transaction_rows)
+            if log and users > CHUNK_USERS:
+                log(f"  {totals['users']:,}/{users:,} users, {totals['transactions']:,} transactions")
+        connection.execute(
+            "INSERT INTO environment (id, temperature, humidity, wind_speed, noise, brightness, updated_at) "
+            "VALUES (1, 20, 50, 0, 'quiet', 5, ?)", _timestamps(GENERATED_AT[None])
+        )
+        connection.execute(f"PRAGMA user_version={DATASET_VERSION}")
+        connection.commit()
+
+    os.replace(partial, path)
+    summary = {
+        "users": users,
+        "seed": seed,
+        "version": DATASET_VERSION,
+        **{f"{table}_rows": rows for table, rows in totals.items() if table != "users"},
+        "bytes": os.path.getsize(path),
+        "seconds": round(time.perf_counter() - started, 1),
+    }
+    with open(f"{path}.json", "w") as f:
+        json.dump(summary, f, indent=2)
+    return summary
+
+
+def ensure_snapshot(users: int, seed: int = 1, directory: str = SNAPSHOT_DIR, log=print) -> str:
+    """Path of the snapshot for (users, seed), generating it the first time."""
+    path = snapshot_path(users, seed, directory)
+    if not os.path.exists(path):
+        if log:
+            log(f"Generating {users:,} users (seed {seed}) into {path}")
+        generate(path, users, seed, log=log)
+    return path
+
+
+def restore(snapshot: str, target: str) -> str:
+    """Copy a snapshot into place as a database file (atomically replacing target)."""
+    partial = f"{target}.partial"
+    shutil.copyfile(snapshot, partial)
+    os.replace(partial, target)
+    return target
+
+
+def memory_engine(snapshot: str):
+    """A SQLAlchemy engine on an in-memory copy of a snapshot."""
+    memory = sqlite3.connect(":memory:", check_same_thread=False)
+    with closing(sqlite3.connect(snapshot)) as source:
+        source.backup(memory)
+    return create_engine("sqlite://", creator=lambda: memory, poolclass=StaticPool)
+
+
+def list_snapshots(directory: str = SNAPSHOT_DIR) -> list[dict]:
+    if not os.path.isdir(directory):
+        return []
+    snapshots = []
+    for name in sorted(os.listdir(directory)):
+        if name.endswith(".db.json"):
+            with open(os.path.join(directory, name)) as f:
+                snapshots.append({"path": os.path.join(directory, name[:-5]), **json.load(f)})
+    return snapshots
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate and restore seeded synthetic datasets")
+    commands = parser.add_subparsers(dest="command", required=True)
+    generate_parser = commands.add_parser("generate", help="generate a snapshot")
+    generate_parser.add_argument("--users", type=int, required=True)
+    generate_parser.add_argument("--seed", type=int, default=1)
+    generate_parser.add_argument("--output", help=f"snapshot file (default: under {SNAPSHOT_DIR})")
+    restore_parser = commands.add_parser("restore", help="copy a snapshot into place")
+    restore_parser.add_argument("snapshot")
+    restore_parser.add_argument("--to", required=True, help="database file to replace, e.g. game.db")
+    commands.add_parser("list", help="list generated snapshots")
+    args = parser.parse_args()
+
+    if args.command == "generate":
+        path = args.output or snapshot_path(args.users, args.seed)
+        summary = generate(path, args.users, args.seed)
+        print(f"✓ {summary['users']:,} users, {summary['accounts_rows']:,} accounts, "
+              f"{summary['transactions_rows']:,} transactions in {summary['seconds']}s")
+        print(f"  {path} ({summary['bytes'] / 1e6:.0f} MB)")
+    elif args.command == "restore":
+        started = time.perf_counter()
+        restore(args.snapshot, args.to)
+        print(f"✓ Restored {args.snapshot} to {args.to} in {time.perf_counter() - started:.1f}s")
+    else:
+        snapshots = list_snapshots()
+        if not snapshots:
+            print(f"No snapshots in {SNAPSHOT_DIR}")
+        for snapshot in snapshots:
+            print(f"  {snapshot['path']}: {snapshot['users']:,} users, {snapshot['transactions_rows']:,} transactions, "
+                  f"{snapshot['bytes'] / 1e6:.0f} MB")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
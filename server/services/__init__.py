@@ -2,5 +2,6 @@ from .user_service import UserService
 from .account_service import AccountService
 from .transaction_service import TransactionService
 from .environment_service import EnvironmentService
+from .provider_health import ProviderHealth
 
-__all__ = ["UserService", "AccountService", "TransactionService", "EnvironmentService"]
+__all__ = ["UserService", "AccountService", "TransactionService", "EnvironmentService", "ProviderHealth"]
@@ -75,8 +75,11 @@ class AccountService:
 
     def get_account_summary(self, user_id: str) -> dict:
         """Get account summary with totals."""
-        accounts = self.get_accounts_by_user_id(user_id)
+        return self.summarize_accounts(self.get_accounts_by_user_id(user_id))
 
+    @staticmethod
+    def summarize_accounts(accounts: list[Account]) -> dict:
+        """Account summary with totals from already loaded accounts."""
         total_cash = 0
         gold_bars = 0
 
@@ -0,0 +1,328 @@
+import io
+import time
+import wave
+from collections import deque
+from typing import Optional
+
+import numpy as np
+
+
+# Speech-to-text works at 16 kHz mono; anything above that is wasted upload
+TARGET_SAMPLE_RATE = 16000
+
+# Energy VAD: 20 ms frames; a frame is speech when it is VAD_MARGIN_DB above
+# the noise floor (the quietest frames) and above VAD_MIN_DB absolute.
+# VAD_PAD_MS of audio is kept on either side so word edges aren't clipped.
+VAD_FRAME_MS = 20
+VAD_MARGIN_DB = 12.0
+VAD_MIN_DB = -55.0
+VAD_NOISE_PERCENTILE = 10
+VAD_PAD_MS = 200
+
+# Noise gate threshold (dBFS) per Environment.noise level; None disables the gate
+NOISE_GATE_DB = {
+    "quiet": None,
+    "low": -50.0,
+    "med": -45.0,
+    "high": -40.0,
+    "boomboom": -35.0
+}
+NOISE_GATE_ATTENUATION = 0.1  # -20 dB for gated frames
+
+RESAMPLE_TAPS = 63
+
+# Streaming endpointing: speech starts after SPEECH_START_MS of voiced frames
+# and the utterance ends after ENDPOINT_SILENCE_MS of silence. A shorter
+# SEGMENT_PAUSE_MS pause, once SEGMENT_MIN_MS of audio has built up, closes a
+# segment so it can be transcribed while the user is still talking. The noise
+# floor is the quietest frame in the last NOISE_FLOOR_WINDOW_MS.
+SPEECH_START_MS = 60
+ENDPOINT_SILENCE_MS = 700
+SEGMENT_PAUSE_MS = 240
+SEGMENT_MIN_MS = 800
+MAX_UTTERANCE_MS = 15000
+NOISE_FLOOR_WINDOW_MS = 2000
+
+
+def decode_wav(data: bytes) -> Optional[tuple[np.ndarray, int]]:
+    """Decode PCM WAV bytes into float32 samples of shape (frames, channels) in [-1, 1]."""
+    try:
+        with wave.open(io.BytesIO(data)) as wav:
+            channels = wav.getnchannels()
+            width = wav.getsampwidth()
+            rate = wav.getframerate()
+            raw = wav.readframes(wav.getnframes())
+    except (wave.Error, EOFError):
+        return None
+
+    if width == 1:
+        samples = (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128) / 128
+    elif width == 2:
+        samples = np.frombuffer(raw, dtype="<i2").astype(np.float32) / 32768
+    elif width == 3:
+        # Sign-extend 24-bit little endian into the top of an int32
+        b = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+        samples = ((b[:, 0] << 8) | (b[:, 1] << 16) | (b[:, 2] << 24)).astype(np.float32) / 2 ** 31
+    elif width == 4:
+        samples = np.frombuffer(raw, dtype="<i4").astype(np.float32) / 2 ** 31
+    else:
+        return None
+    if channels < 1 or rate < 1:
+        return None
+
+    usable = len(samples) - len(samples) % channels
+    return samples[:usable].reshape(-1, channels), rate
+
+
+def encode_wav(samples: np.ndarray, rate: int) -> bytes:
+    """Encode mono float samples as 16-bit PCM WAV."""
+    pcm = (np.clip(samples, -1, 1) * 32767).astype("<i2")
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes(pcm.tobytes())
+    return buffer.getvalue()
+
+
+def downmix(samples: np.ndarray) -> np.ndarray:
+    """Average all channels into one."""
+    if samples.ndim == 1:
+        return samples
+    return samples.mean(axis=1, dtype=np.float32)
+
+
+def lowpass_taps(rate: int, target_rate: int) -> np.ndarray:
+    """Windowed-sinc low-pass at the target Nyquist frequency."""
+    cutoff = target_rate / rate / 2
+    n = np.arange(RESAMPLE_TAPS) - (RESAMPLE_TAPS - 1) / 2
+    taps = 2 * cutoff * np.sinc(2 * cutoff * n) * np.hamming(RESAMPLE_TAPS)
+    return (taps / taps.sum()).astype(np.float32)
+
+
+def resample(samples: np.ndarray, rate: int, target_rate: int = TARGET_SAMPLE_RATE) -> np.ndarray:
+    """Resample mono audio; downsampling low-passes first to avoid aliasing."""
+    if rate == target_rate or len(samples) == 0:
+        return samples
+    if rate > target_rate:
+        samples = np.convolve(samples, lowpass_taps(rate, target_rate), mode="same")
+    duration = len(samples) / rate
+    count = int(round(duration * target_rate))
+    positions = np.arange(count) * (rate / target_rate)
+    return np.interp(positions, np.arange(len(samples)), samples).astype(np.float32)
+
+
+class StreamResampler:
+    """
+    resample() for a live stream fed in small chunks.
+
+    Resampling each chunk on its own restarts the filter and the
+    interpolation grid at every chunk boundary, which clicks and drifts in
+    length. This keeps the filter history and the output position across
+    feed() calls, so the chunks resample as one continuous signal (delayed
+    by the filter's RESAMPLE_TAPS // 2 input samples).
+    """
+
+    def __init__(self, rate: int, target_rate: int = TARGET_SAMPLE_RATE):
+        self.rate = rate
+        self.target_rate = target_rate
+        self.taps = lowpass_taps(rate, target_rate) if rate > target_rate else None
+        self.history = np.zeros(RESAMPLE_TAPS - 1, dtype=np.float32)
+        self.buffered = np.empty(0, dtype=np.float32)  # input samples not yet passed
+        self.offset = 0  # stream index of buffered[0]
+        self.emitted = 0  # output samples returned so far
+
+    def feed(self, samples: np.ndarray) -> np.ndarray:
+        samples = samples.astype(np.float32)
+        if self.rate == self.target_rate:
+            return samples
+        if self.taps is not None:
+            padded = np.concatenate([self.history, samples])
+            self.history = padded[len(padded) - len(self.history):]
+            samples = np.convolve(padded, self.taps, mode="valid")
+        self.buffered = np.concatenate([self.buffered, samples])
+
+        # Emit every output position that falls within the buffered input
+        step = self.rate / self.target_rate
+        last = self.offset + len(self.buffered) - 1
+        count = max(0, int(last / step) - self.emitted + 1)
+        positions = (self.emitted + np.arange(count)) * step - self.offset
+        output = np.interp(positions, np.arange(len(self.buffered)), self.buffered).astype(np.float32)
+        self.emitted += count
+
+        # Keep the sample just before the next position for interpolation
+        keep = max(0, min(int(self.emitted * step) - self.offset, len(self.buffered)))
+        self.buffered = self.buffered[keep:]
+        self.offset += keep
+        return output
+
+
+def frame_energy_db(samples: np.ndarray, frame_length: int) -> np.ndarray:
+    """RMS level in dBFS of each complete frame."""
+    frames = len(samples) // frame_length
+    if frames == 0:
+        return np.empty(0, dtype=np.float32)
+    framed = samples[:frames * frame_length].reshape(frames, frame_length)
+    rms = np.sqrt(np.mean(np.square(framed, dtype=np.float32), axis=1))
+    return 20 * np.log10(np.maximum(rms, 1e-9))
+
+
+def trim_silence(samples: np.ndarray, rate: int) -> np.ndarray:
+    """Cut leading and trailing silence; audio with no detected speech is returned unchanged."""
+    frame_length = rate * VAD_FRAME_MS // 1000
+    energy = frame_energy_db(samples, frame_length)
+    if len(energy) == 0:
+        return samples
+
+    noise_floor = np.percentile(energy, VAD_NOISE_PERCENTILE)
+    threshold = max(noise_floor + VAD_MARGIN_DB, VAD_MIN_DB)
+    voiced = np.flatnonzero(energy > threshold)
+    if len(voiced) == 0:
+        return samples
+
+    pad = rate * VAD_PAD_MS // 1000
+    start = max(voiced[0] * frame_length - pad, 0)
+    end = min((voiced[-1] + 1) * frame_length + pad, len(samples))
+    return samples[start:end]
+
+
+def noise_gate(samples: np.ndarray, rate: int, threshold_db: float) -> np.ndarray:
+    """Attenuate frames quieter than threshold_db, with gain ramps to avoid clicks."""
+    frame_length = rate * VAD_FRAME_MS // 1000
+    energy = frame_energy_db(samples, frame_length)
+    if len(energy) == 0:
+        return samples
+
+    frame_gain = np.where(energy < threshold_db, NOISE_GATE_ATTENUATION, 1.0).astype(np.float32)
+    gain = np.repeat(frame_gain, frame_length)
+    gain = np.concatenate([gain, np.full(len(samples) - len(gain), gain[-1], dtype=np.float32)])
+    ramp = np.ones(frame_length, dtype=np.float32) / frame_length
+    padded = np.pad(gain, (frame_length // 2, frame_length - 1 - frame_length // 2), mode="edge")
+    gain = np.convolve(padded, ramp, mode="valid")
+    return samples * gain
+
+
+def preprocess_wav(data: bytes, noise: Optional[str] = None) -> Optional[tuple[bytes, dict]]:
+    """
+    Prepare a WAV upload for speech-to-text: 16 kHz mono, silence trimmed,
+    noise gated for the current environment noise level.
+
+    Returns (wav_bytes, stats), or None if the data isn't PCM WAV.
+    """
+    started = time.perf_counter()
+    decoded = decode_wav(data)
+    if decoded is None:
+        return None
+    samples, rate = decoded
+    input_seconds = len(samples) / rate
+
+    mono = resample(downmix(samples), rate)
+    trimmed = trim_silence(mono, TARGET_SAMPLE_RATE)
+    gate_db = NOISE_GATE_DB.get(noise)
+    if gate_db is not None:
+        trimmed = noise_gate(trimmed, TARGET_SAMPLE_RATE, gate_db)
+
+    output = encode_wav(trimmed, TARGET_SAMPLE_RATE)
+    return output, {
+        "input_bytes": len(data),
+        "output_bytes": len(output),
+        "input_seconds": round(input_seconds, 3),
+        "output_seconds": round(len(trimmed) / TARGET_SAMPLE_RATE, 3),
+        "input_sample_rate": rate,
+        "input_channels": samples.shape[1],
+        "noise_gate_db": gate_db,
+        "processing_ms": round((time.perf_counter() - started) * 1000, 2)
+    }
+
+
+class StreamingEndpointer:
+    """
+    Energy VAD over a live 16 kHz mono stream.
+
+    feed() takes samples as they arrive and returns events:
+      ("start", None)     - speech began
+      ("segment", audio)  - a pause closed a segment of the utterance
+      ("end", audio)      - the utterance ended; audio is the last segment,
+                            or None if it holds no speech
+    """
+
+    def __init__(self, rate: int = TARGET_SAMPLE_RATE):
+        self.rate = rate
+        self.frame_length = rate * VAD_FRAME_MS // 1000
+        self.pending = np.empty(0, dtype=np.float32)
+        self.energies = deque(maxlen=NOISE_FLOOR_WINDOW_MS // VAD_FRAME_MS)
+        self.preroll = deque(maxlen=VAD_PAD_MS // VAD_FRAME_MS)
+        self.speaking = False
+        self._reset_utterance()
+
+    def feed(self, samples: np.ndarray) -> list[tuple[str, Optional[np.ndarray]]]:
+        samples = np.concatenate([self.pending, samples.astype(np.float32)])
+        usable = len(samples) - len(samples) % self.frame_length
+        self.pending = samples[usable:]
+        frames = samples[:usable].reshape(-1, self.frame_length)
+        energies = frame_energy_db(samples[:usable], self.frame_length)
+
+        events = []
+        for frame, energy in zip(frames, energies):
+            events.extend(self._step(frame, energy))
+        return events
+
+    def flush(self) -> list[tuple[str, Optional[np.ndarray]]]:
+        """End the current utterance now (e.g. the client stopped recording)."""
+        if not self.speaking:
+            return []
+        return [self._end()]
+
+    def _step(self, frame: np.ndarray, energy: float) -> list:
+        self.energies.append(energy)
+        threshold = max(min(self.energies) + VAD_MARGIN_DB, VAD_MIN_DB)
+        voiced = energy > threshold
+
+        if not self.speaking:
+            self.preroll.append(frame)
+            self.voiced_run = self.voiced_run + 1 if voiced else 0
+            if self.voiced_run * VAD_FRAME_MS < SPEECH_START_MS:
+                return []
+            self.speaking = True
+            self.segment = list(self.preroll)
+            self.segment_voiced = self.voiced_run
+            self.utterance_frames = len(self.segment)
+            self.preroll.clear()
+            return [("start", None)]
+
+        self.segment.append(frame)
+        self.utterance_frames += 1
+        if voiced:
+            self.segment_voiced += 1
+            self.silent_run = 0
+        else:
+            self.silent_run += 1
+
+        silence_ms = self.silent_run * VAD_FRAME_MS
+        if silence_ms >= ENDPOINT_SILENCE_MS or self.utterance_frames * VAD_FRAME_MS >= MAX_UTTERANCE_MS:
+            return [self._end()]
+        segment_ms = len(self.segment) * VAD_FRAME_MS
+        if silence_ms == SEGMENT_PAUSE_MS and segment_ms >= SEGMENT_MIN_MS and self.segment_voiced:
+            audio = np.concatenate(self.segment)
+            self.segment = []
+            self.segment_voiced = 0
+            return [("segment", audio)]
+        return []
+
+    def _end(self) -> tuple[str, Optional[np.ndarray]]:
+        audio = None
+        if self.segment_voiced:
+            # Keep VAD_PAD_MS of the trailing silence
+            keep = len(self.segment) - max(self.silent_run - VAD_PAD_MS // VAD_FRAME_MS, 0)
+            audio = np.concatenate(self.segment[:keep])
+        self.speaking = False
+        self._reset_utterance()
+        return ("end", audio)
+
+    def _reset_utterance(self) -> None:
+        self.segment = []
+        self.segment_voiced = 0
+        self.voiced_run = 0
+        self.silent_run = 0
+        self.utterance_frames = 0
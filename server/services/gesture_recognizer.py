@@ -0,0 +1,339 @@
+import asyncio
+import time
+from collections import deque
+from functools import lru_cache
+from typing import Optional
+
+import numpy as np
+
+from services.imu_telemetry import TELEMETRY_SAMPLE_RATE, TelemetryStore
+
+
+# Windowing: every EVAL_INTERVAL the newest WINDOW_SECONDS of each glove
+# that sent data is classified, all gloves in one batch
+WINDOW_SECONDS = 1.6
+EVAL_INTERVAL = 0.05
+
+# Segmentation on gyro magnitude (dps). A gesture is reported once it has
+# ended, i.e. after END_QUIET_SECONDS below MOTION_DPS
+MOTION_DPS = 60.0
+END_QUIET_SECONDS = 0.12
+MIN_GESTURE_SECONDS = 0.15
+
+# Shake: several direction reversals of the dominant axis at speed
+SHAKE_MIN_REVERSALS = 4
+SHAKE_MIN_PEAK_DPS = 150.0
+
+# Hold: glove still for HOLD_SECONDS after having moved
+HOLD_SECONDS = 1.0
+HOLD_MAX_DPS = 12.0
+HOLD_MAX_ACCEL_STD_G = 0.04
+
+# Template matching: segments are resampled to TEMPLATE_POINTS and compared
+# to each template with DTW restricted to a DTW_BAND-wide diagonal band
+TEMPLATE_POINTS = 40
+DTW_BAND = 6
+DTW_MAX_DISTANCE = 0.45
+
+# Gestures that map to an app action; shake wakes the voice assistant like
+# shaking the phone does
+GESTURE_ACTIONS = {"shake": "activate_voice"}
+
+STATS_WINDOW = 200
+
+
+def _pulse(axis: int, sign: float) -> np.ndarray:
+    t = np.linspace(0, 1, TEMPLATE_POINTS)
+    template = np.zeros((TEMPLATE_POINTS, 3))
+    template[:, axis] = sign * np.sin(np.pi * t)
+    return template
+
+
+def _circle(direction: float) -> np.ndarray:
+    t = np.linspace(0, 1, TEMPLATE_POINTS)
+    template = np.zeros((TEMPLATE_POINTS, 3))
+    template[:, 2] = np.sin(2 * np.pi * t)
+    template[:, 1] = direction * np.cos(2 * np.pi * t)
+    return template
+
+
+def default_templates() -> dict[str, np.ndarray]:
+    """
+    Synthetic gyro templates (x roll, y pitch, z yaw rate), shaped like the
+    normalized segments they are compared against. Recorded templates can
+    be passed to GestureRecognizer instead.
+    """
+    templates = {
+        "swipe_right": _pulse(2, 1.0),
+        "swipe_left": _pulse(2, -1.0),
+        "swipe_up": _pulse(1, 1.0),
+        "swipe_down": _pulse(1, -1.0),
+        "circle_clockwise": _circle(1.0),
+        "circle_counterclockwise": _circle(-1.0),
+    }
+    return {name: _normalize(template[None])[0] for name, template in templates.items()}
+
+
+def _normalize(segments: np.ndarray) -> np.ndarray:
+    """Scale each (points, 3) segment to unit RMS magnitude."""
+    rms = np.sqrt(np.mean(np.sum(segments ** 2, axis=-1), axis=-1))
+    return segments / np.maximum(rms, 1e-6)[:, None, None]
+
+
+@lru_cache(maxsize=8)
+def _band_diagonals(n: int, m: int, band: int) -> list[tuple[np.ndarray, np.ndarray]]:
+    """(i, j) cells of each anti-diagonal inside the band, 1-based, in DP order."""
+    diagonals = []
+    for k in range(2, n + m + 1):
+        i = np.arange(max(1, k - m), min(n, k - 1) + 1)
+        j = k - i
+        keep = np.abs(i * m - j * n) <= band * max(n, m)
+        if keep.any():
+            diagonals.append((i[keep], j[keep]))
+    return diagonals
+
+
+def banded_dtw(series: np.ndarray, templates: np.ndarray, band: int = DTW_BAND) -> np.ndarray:
+    """
+    DTW distance of every series against every template.
+
+    series (B, n, d) and templates (T, m, d) -> (B, T), normalized by path
+    length. Cells on one anti-diagonal only depend on the previous two, so
+    each diagonal is filled for all B x T pairs with one vectorized step;
+    the pairs are the last axis so each cell is a contiguous row.
+    """
+    batch, n = series.shape[:2]
+    count, m = templates.shape[:2]
+    series = series.astype(np.float32)
+    templates = templates.astype(np.float32)
+    # Euclidean cost as |x|^2 + |t|^2 - 2 x.t, laid out (n, m, B * T)
+    dot = np.einsum("bid,tjd->ijbt", series, templates)
+    squared = (series ** 2).sum(-1).T[:, None, :, None] + (templates ** 2).sum(-1).T[None, :, None, :] - 2 * dot
+    cost = np.sqrt(np.maximum(squared, 0)).reshape(n, m, batch * count)
+
+    dp = np.full((n + 1, m + 1, batch * count), np.inf, dtype=np.float32)
+    dp[0, 0] = 0.0
+    for i, j in _band_diagonals(n, m, band):
+        best = np.minimum(np.minimum(dp[i - 1, j - 1], dp[i - 1, j]), dp[i, j - 1])
+        dp[i, j] = cost[i - 1, j - 1] + best
+    return (dp[n, m] / (n + m)).reshape(batch, count)
+
+
+class GestureRecognizer:
+    """
+    Vectorized gesture classification over a batch of IMU windows.
+
+    classify() takes windows from many gloves at once: feature extraction,
+    segmentation and DTW all run on (gloves, samples, axes) arrays.
+    """
+
+    def __init__(self, templates: Optional[dict[str, np.ndarray]] = None, sample_rate: int = TELEMETRY_SAMPLE_RATE):
+        templates = templates or default_templates()
+        self.names = list(templates)
+        self.templates = np.stack([templates[name] for name in self.names])
+        self.sample_rate = sample_rate
+        self.end_quiet = max(int(END_QUIET_SECONDS * sample_rate), 1)
+        self.min_length = int(MIN_GESTURE_SECONDS * sample_rate)
+        self.hold_samples = int(HOLD_SECONDS * sample_rate)
+
+    def classify(self, gyro: np.ndarray, accel: np.ndarray) -> list[Optional[dict]]:
+        """
+        gyro and accel are (B, N, 3) windows, newest sample last.
+        Returns one entry per window: None, or a dict with gesture, score,
+        and the segment's start/end sample indices.
+        """
+        batch, length = gyro.shape[:2]
+        results: list[Optional[dict]] = [None] * batch
+        magnitude = np.linalg.norm(gyro, axis=-1)
+
+        # Hold: the newest HOLD_SECONDS are still
+        still_part = magnitude[:, -self.hold_samples:]
+        still = (still_part.max(axis=1) < HOLD_MAX_DPS) & \
+            (accel[:, -self.hold_samples:].std(axis=1).max(axis=1) < HOLD_MAX_ACCEL_STD_G)
+        for b in np.flatnonzero(still):
+            results[b] = {"gesture": "hold", "score": 1.0, "start": length - self.hold_samples, "end": length - 1}
+
+        # Motion segments that have ended: active somewhere, quiet at the end
+        active = magnitude > MOTION_DPS
+        ended = active.any(axis=1) & ~active[:, -self.end_quiet:].any(axis=1) & ~still
+        start = np.argmax(active, axis=1)
+        end = length - 1 - np.argmax(active[:, ::-1], axis=1)
+        candidates = np.flatnonzero(ended & (end - start + 1 >= self.min_length))
+        if not len(candidates):
+            return results
+
+        segments = self._resample(gyro[candidates], start[candidates], end[candidates])
+        normalized = _normalize(segments)
+        peak = magnitude[candidates].max(axis=1)
+        reversals = self._reversals(gyro[candidates])
+        shake = (reversals >= SHAKE_MIN_REVERSALS) & (peak >= SHAKE_MIN_PEAK_DPS)
+
+        distances = banded_dtw(normalized, self.templates)
+        best = np.argmin(distances, axis=1)
+        best_distance = distances[np.arange(len(candidates)), best]
+
+        for row, b in enumerate(candidates):
+            segment = {"start": int(start[b]), "end": int(end[b])}
+            if shake[row]:
+                results[b] = {"gesture": "shake", "score": 1.0, "reversals": int(reversals[row]), **segment}
+            elif best_distance[row] <= DTW_MAX_DISTANCE:
+                score = 1.0 - best_distance[row] / DTW_MAX_DISTANCE
+                results[b] = {"gesture": self.names[best[row]], "score": round(float(score), 3), **segment}
+        return results
+
+    def _reversals(self, gyro: np.ndarray) -> np.ndarray:
+        """Direction changes of each window's dominant axis, counting only swings past MOTION_DPS."""
+        dominant = np.argmax(np.sum(gyro ** 2, axis=1), axis=1)
+        trace = np.take_along_axis(gyro, dominant[:, None, None], axis=2)[..., 0]
+        signs = np.where(np.abs(trace) > MOTION_DPS, np.sign(trace), 0)
+        # Carry the last strong direction forward over the weak samples between swings
+        last = np.maximum.accumulate(np.where(signs != 0, np.arange(signs.shape[1]), 0), axis=1)
+        direction = np.take_along_axis(signs, last, axis=1)
+        return np.count_nonzero((direction[:, 1:] * direction[:, :-1]) < 0, axis=1)
+
+    def _resample(self, gyro: np.ndarray, start: np.ndarray, end: np.ndarray) -> np.ndarray:
+        """Linearly resample each window's [start, end] span to TEMPLATE_POINTS."""
+        position = start[:, None] + np.linspace(0, 1, TEMPLATE_POINTS)[None] * (end - start)[:, None]
+        lower = np.floor(position).astype(int)
+        upper = np.minimum(lower + 1, gyro.shape[1] - 1)
+        frac = (position - lower)[..., None]
+        take = lambda index: np.take_along_axis(gyro, index[..., None], axis=1)
+        return take(lower) * (1 - frac) + take(upper) * frac
+
+
+class GestureEngine:
+    """
+    Runs the recognizer over live telemetry and publishes gesture events.
+
+    Each tick, gloves with new samples since the last tick are classified
+    in one batch. A gesture is published once: segments ending at or before
+    the last published one are skipped, and hold needs motion in between.
+    """
+
+    def __init__(self, store: TelemetryStore, recognizer: Optional[GestureRecognizer] = None,
+                 interval: float = EVAL_INTERVAL):
+        self.store = store
+        self.recognizer = recognizer or GestureRecognizer()
+        self.interval = interval
+        self.window = int(WINDOW_SECONDS * self.recognizer.sample_rate)
+        self.publisher = None
+        self.device_users: dict[str, str] = {}
+        self.last_total: dict[str, int] = {}
+        self.last_end_us: dict[str, int] = {}
+        self.holding: dict[str, bool] = {}
+        self.ticks = 0
+        self.events = 0
+        self.tick_seconds = deque(maxlen=STATS_WINDOW)
+        self._task: Optional[asyncio.Task] = None
+
+    def set_publisher(self, publisher) -> None:
+        """publisher(user_id, event, payload) delivers an event to the user."""
+        self.publisher = publisher
+
+    def bind(self, device_id: str, user_id: str) -> None:
+        """Send a glove's gestures to user_id (by default, the device id itself)."""
+        self.device_users[device_id] = user_id
+
+    def evaluate(self) -> list[tuple[str, dict]]:
+        """Classify gloves with new data; returns (user_id, payload) per new gesture."""
+        started = time.perf_counter()
+        device_ids, windows = [], []
+        for device_id, device in list(self.store.devices.items()):
+            with device.lock:
+                total = device.buffer.total
+                if total == self.last_total.get(device_id) or device.buffer.count < self.window:
+                    continue
+                windows.append(device.buffer.latest(self.window))
+            self.last_total[device_id] = total
+            device_ids.append(device_id)
+
+        events = []
+        if windows:
+            gyro = np.stack([window["gyro"] for window in windows])
+            accel = np.stack([window["accel"] for window in windows])
+            for device_id, window, result in zip(device_ids, windows, self.recognizer.classify(gyro, accel)):
+                payload = self._accept(device_id, window, result)
+                if payload:
+                    events.append((self.device_users.get(device_id, device_id), payload))
+
+        self.ticks += 1
+        self.events += len(events)
+        self.tick_seconds.append(time.perf_counter() - started)
+        return events
+
+    def _accept(self, device_id: str, window: dict, result: Optional[dict]) -> Optional[dict]:
+        if result is None or result["gesture"] != "hold":
+            # Any window that isn't still re-arms hold
+            self.holding[device_id] = False
+        if result is None:
+            return None
+
+        if result["gesture"] == "hold":
+            # Gloves that start out still haven't moved yet, so no hold
+            if self.holding.get(device_id, True):
+                return None
+            self.holding[device_id] = True
+        else:
+            end_us = int(window["t_us"][result["end"]])
+            if end_us <= self.last_end_us.get(device_id, -1):
+                return None
+            self.last_end_us[device_id] = end_us
+
+        payload = {
+            "gesture": result["gesture"],
+            "deviceId": device_id,
+            "score": result["score"],
+            "durationMs": round((window["t_us"][result["end"]] - window["t_us"][result["start"]]) / 1000, 1),
+            "endedAt": int(window["t_us"][result["end"]]),
+        }
+        if result["gesture"] in GESTURE_ACTIONS:
+            payload["action"] = GESTURE_ACTIONS[result["gesture"]]
+        return payload
+
+    async def tick(self) -> int:
+        events = await asyncio.to_thread(self.evaluate)
+        if self.publisher:
+            for user_id, payload in events:
+                await self.publisher(user_id, "gesture", payload)
+        return len(events)
+
+    async def run(self) -> None:
+        while True:
+            try:
+                await self.tick()
+            except Exception as e:
+                print(f"Gesture engine tick failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def stats(self) -> dict:
+        ticks = sorted(self.tick_seconds)
+        percentile = lambda fraction: round(ticks[min(int(len(ticks) * fraction), len(ticks) - 1)] * 1000, 3) if ticks else None
+        return {
+            "ticks": self.ticks,
+            "events": self.events,
+            "devices": len(self.last_total),
+            "tick_ms_p50": percentile(0.5),
+            "tick_ms_p95": percentile(0.95),
+            "interval_ms": self.interval * 1000
+        }
+
+
+gesture_engine: Optional[GestureEngine] = None
+
+
+def get_gesture_engine() -> GestureEngine:
+    global gesture_engine
+    if gesture_engine is None:
+        from services.imu_telemetry import get_telemetry_store
+        gesture_engine = GestureEngine(get_telemetry_store())
+    return gesture_engine
@@ -0,0 +1,294 @@
+import asyncio
+import os
+import struct
+import threading
+import time
+from typing import Optional
+
+import numpy as np
+
+
+# Batch packet, little endian, used for both WebSocket messages and UDP datagrams:
+#
+#   magic "GIMU" | version u8 | flags u8 | sample_count u16 | device_id 16s | seq u32
+#   sample_count x SAMPLE_DTYPE
+#
+# device_id is ASCII, NUL padded. seq counts batches per device so gaps show
+# up as lost packets. Samples carry the device's micros() clock and raw
+# MPU9250 readings at the firmware's +-2 g / +-250 dps ranges.
+PACKET_MAGIC = b"GIMU"
+PACKET_VERSION = 1
+PACKET_HEADER = struct.Struct("<4sBBH16sI")
+DEVICE_ID_BYTES = 16
+SAMPLE_DTYPE = np.dtype([
+    ("t_us", "<u4"),
+    ("accel", "<i2", (3,)),
+    ("gyro", "<i2", (3,)),
+    ("flags", "u1"),
+    ("reserved", "u1"),
+])
+MAX_SAMPLES_PER_PACKET = (65507 - PACKET_HEADER.size) // SAMPLE_DTYPE.itemsize
+
+ACCEL_LSB_PER_G = 16384.0
+GYRO_LSB_PER_DPS = 131.0
+CLOCK_WRAP = 1 << 32
+
+# Per-device history and device count bounds
+TELEMETRY_BUFFER_SECONDS = int(os.getenv("TELEMETRY_BUFFER_SECONDS", 60))
+TELEMETRY_SAMPLE_RATE = 250
+TELEMETRY_MAX_DEVICES = int(os.getenv("TELEMETRY_MAX_DEVICES", 256))
+TELEMETRY_UDP_PORT = int(os.getenv("TELEMETRY_UDP_PORT", 0))
+
+
+class TelemetryError(ValueError):
+    """A malformed or unacceptable telemetry packet."""
+
+
+def pack_batch(device_id: str, seq: int, samples: np.ndarray) -> bytes:
+    """Build a batch packet from a SAMPLE_DTYPE array."""
+    samples = np.ascontiguousarray(samples, dtype=SAMPLE_DTYPE)
+    encoded_id = device_id.encode("ascii")
+    if not encoded_id or len(encoded_id) > DEVICE_ID_BYTES:
+        raise TelemetryError(f"Device id must be 1-{DEVICE_ID_BYTES} ASCII characters")
+    if len(samples) > MAX_SAMPLES_PER_PACKET:
+        raise TelemetryError(f"At most {MAX_SAMPLES_PER_PACKET} samples per packet")
+    header = PACKET_HEADER.pack(PACKET_MAGIC, PACKET_VERSION, 0, len(samples), encoded_id, seq)
+    return header + samples.tobytes()
+
+
+def parse_batch(packet: bytes) -> tuple[str, int, np.ndarray]:
+    """
+    Split a batch packet into (device_id, seq, samples).
+    samples is a read-only SAMPLE_DTYPE view over the packet, not a copy.
+    """
+    if len(packet) < PACKET_HEADER.size:
+        raise TelemetryError("Packet shorter than its header")
+    magic, version, _, count, device_id, seq = PACKET_HEADER.unpack_from(packet)
+    if magic != PACKET_MAGIC:
+        raise TelemetryError(f"Bad magic {magic!r}")
+    if version != PACKET_VERSION:
+        raise TelemetryError(f"Unsupported version {version}")
+    if len(packet) != PACKET_HEADER.size + count * SAMPLE_DTYPE.itemsize:
+        raise TelemetryError(f"Packet length does not match {count} samples")
+    device_id = device_id.rstrip(b"\0").decode("ascii", errors="replace")
+    if not device_id:
+        raise TelemetryError("Missing device id")
+    return device_id, seq, np.frombuffer(packet, dtype=SAMPLE_DTYPE, count=count, offset=PACKET_HEADER.size)
+
+
+class ImuRingBuffer:
+    """
+    Fixed-size history for one device, stored column-wise in NumPy arrays.
+
+    Writes copy a whole batch with at most two slice assignments, so no
+    Python object is created per sample. Device timestamps are unwrapped
+    (micros() overflows every ~71 minutes) into a non-decreasing int64 clock.
+    """
+
+    def __init__(self, capacity: int, sample_rate: int = TELEMETRY_SAMPLE_RATE):
+        self.capacity = capacity
+        self.period_us = 1_000_000 // sample_rate
+        self.t_us = np.zeros(capacity, dtype=np.int64)
+        self.accel = np.zeros((capacity, 3), dtype=np.float32)
+        self.gyro = np.zeros((capacity, 3), dtype=np.float32)
+        self.flags = np.zeros(capacity, dtype=np.uint8)
+        self.head = 0  # Next write position
+        self.count = 0  # Valid samples, up to capacity
+        self.total = 0  # Samples ever written
+        self._last_raw_t = None
+        self._clock_offset = 0
+
+    def write(self, samples: np.ndarray) -> None:
+        if len(samples) > self.capacity:
+            samples = samples[-self.capacity:]
+        n = len(samples)
+        if n == 0:
+            return
+
+        raw_t = samples["t_us"].astype(np.int64)
+        previous = self._last_raw_t if self._last_raw_t is not None else raw_t[0]
+        steps = np.diff(raw_t, prepend=previous)
+        # Wraps add 2**32; other backward steps (a device reboot) restart the
+        # clock one sample period after the last timestamp
+        jumps = np.where(steps < -CLOCK_WRAP // 2, CLOCK_WRAP, np.where(steps < 0, self.period_us - steps, 0))
+        offsets = np.cumsum(jumps)
+        t_us = raw_t + offsets + self._clock_offset
+        self._clock_offset += int(offsets[-1])
+        self._last_raw_t = int(raw_t[-1])
+
+        first = min(n, self.capacity - self.head)
+        for target, source in ((slice(self.head, self.head + first), slice(0, first)),
+                               (slice(0, n - first), slice(first, n))):
+            self.t_us[target] = t_us[source]
+            np.multiply(samples["accel"][source], 1 / ACCEL_LSB_PER_G, out=self.accel[target], casting="unsafe")
+            np.multiply(samples["gyro"][source], 1 / GYRO_LSB_PER_DPS, out=self.gyro[target], casting="unsafe")
+            self.flags[target] = samples["flags"][source]
+
+        self.head = (self.head + n) % self.capacity
+        self.count = min(self.count + n, self.capacity)
+        self.total += n
+
+    def latest(self, n: int) -> dict:
+        """The newest n samples (fewer if not yet written), oldest first, as copies."""
+        n = min(n, self.count)
+        indices = (np.arange(self.head - n, self.head)) % self.capacity
+        return {
+            "t_us": self.t_us[indices],
+            "accel": self.accel[indices],
+            "gyro": self.gyro[indices],
+            "flags": self.flags[indices],
+        }
+
+    def window(self, seconds: float) -> dict:
+        """Samples within `seconds` of the newest one, oldest first."""
+        recent = self.latest(self.count)
+        if not self.count:
+            return recent
+        start = np.searchsorted(recent["t_us"], recent["t_us"][-1] - int(seconds * 1e6))
+        return {name: column[start:] for name, column in recent.items()}
+
+
+class DeviceTelemetry:
+    """A device's ring buffer plus ingest counters."""
+
+    def __init__(self, device_id: str, capacity: int):
+        self.device_id = device_id
+        self.buffer = ImuRingBuffer(capacity)
+        self.lock = threading.Lock()
+        self.batches = 0
+        self.lost_batches = 0
+        self.last_seq = None
+        self.last_received = None
+        self.first_received = None
+
+    def ingest(self, seq: int, samples: np.ndarray) -> None:
+        now = time.monotonic()
+        with self.lock:
+            if self.last_seq is not None and seq > self.last_seq + 1:
+                self.lost_batches += seq - self.last_seq - 1
+            self.last_seq = seq
+            self.buffer.write(samples)
+            self.batches += 1
+            self.first_received = self.first_received or now
+            self.last_received = now
+
+    def stats(self) -> dict:
+        with self.lock:
+            elapsed = (self.last_received - self.first_received) if self.batches > 1 else 0
+            return {
+                "device_id": self.device_id,
+                "samples": self.buffer.total,
+                "buffered": self.buffer.count,
+                "batches": self.batches,
+                "lost_batches": self.lost_batches,
+                "samples_per_second": round(self.buffer.total / elapsed, 1) if elapsed else None,
+                "idle_seconds": round(time.monotonic() - self.last_received, 3) if self.last_received else None
+            }
+
+
+class TelemetryStore:
+    """Per-device IMU ring buffers fed by the WebSocket and UDP ingest paths."""
+
+    def __init__(
+        self,
+        buffer_seconds: int = TELEMETRY_BUFFER_SECONDS,
+        sample_rate: int = TELEMETRY_SAMPLE_RATE,
+        max_devices: int = TELEMETRY_MAX_DEVICES
+    ):
+        self.capacity = buffer_seconds * sample_rate
+        self.max_devices = max_devices
+        self.devices: dict[str, DeviceTelemetry] = {}
+        self.rejected_packets = 0
+        self._lock = threading.Lock()
+        self._listeners = []
+
+    def ingest(self, packet: bytes) -> tuple[str, int]:
+        """Store one batch packet; returns (device_id, sample_count)."""
+        try:
+            device_id, seq, samples = parse_batch(packet)
+            device = self._device(device_id)
+        except TelemetryError:
+            with self._lock:
+                self.rejected_packets += 1
+            raise
+        device.ingest(seq, samples)
+        for listener in self._listeners:
+            listener(device_id, samples)
+        return device_id, len(samples)
+
+    def add_listener(self, listener) -> None:
+        """Call listener(device_id, samples) after each stored batch."""
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener) -> None:
+        self._listeners.remove(listener)
+
+    def window(self, device_id: str, seconds: float) -> Optional[dict]:
+        device = self.devices.get(device_id)
+        if device is None:
+            return None
+        with device.lock:
+            return device.buffer.window(seconds)
+
+    def latest(self, device_id: str, n: int) -> Optional[dict]:
+        device = self.devices.get(device_id)
+        if device is None:
+            return None
+        with device.lock:
+            return device.buffer.latest(n)
+
+    def stats(self) -> dict:
+        with self._lock:
+            devices = list(self.devices.values())
+            rejected = self.rejected_packets
+        return {
+            "devices": {device.device_id: device.stats() for device in devices},
+            "rejected_packets": rejected,
+            "buffer_capacity": self.capacity
+        }
+
+    def _device(self, device_id: str) -> DeviceTelemetry:
+        device = self.devices.get(device_id)
+        if device is not None:
+            return device
+        with self._lock:
+            if device_id not in self.devices:
+                if len(self.devices) >= self.max_devices:
+                    raise TelemetryError(f"Device limit of {self.max_devices} reached")
+                self.devices[device_id] = DeviceTelemetry(device_id, self.capacity)
+            return self.devices[device_id]
+
+
+class TelemetryDatagramProtocol(asyncio.DatagramProtocol):
+    """UDP ingest: one batch packet per datagram, malformed ones are counted and dropped."""
+
+    def __init__(self, store: TelemetryStore):
+        self.store = store
+
+    def datagram_received(self, data: bytes, addr) -> None:
+        try:
+            self.store.ingest(data)
+        except TelemetryError:
+            pass
+
+
+telemetry_store: Optional[TelemetryStore] = None
+
+
+def get_telemetry_store() -> TelemetryStore:
+    global telemetry_store
+    if telemetry_store is None:
+        telemetry_store = TelemetryStore()
+    return telemetry_store
+
+
+async def start_udp_ingest(port: Optional[int] = None, host: str = "0.0.0.0"):
+    """Listen for telemetry datagrams; returns the transport, or None when the port is 0."""
+    port = TELEMETRY_UDP_PORT if port is None else port
+    if not port:
+        return None
+    loop = asyncio.get_running_loop()
+    transport, _ = await loop.create_datagram_endpoint(
+        lambda: TelemetryDatagramProtocol(get_telemetry_store()), local_addr=(host, port)
+    )
+    return transport
@@ -0,0 +1,158 @@
+import asyncio
+import contextvars
+import time
+import uuid
+from collections import OrderedDict, deque
+from typing import Awaitable, Callable, Optional
+
+from services.tracing import current_span, span
+
+
+# Defaults for background job pools
+JOB_WORKERS = 4
+JOB_MAX_DEPTH = 100
+JOB_KEEP_RESULTS = 500
+JOB_STATS_WINDOW = 200
+
+
+class JobQueueFull(Exception):
+    pass
+
+
+class JobQueue:
+    """
+    Bounded asyncio queue drained by a fixed pool of worker tasks.
+
+    handler(job_id, payload) is awaited for each job. Workers start on the
+    first submit so the pool binds to the running event loop. Finished jobs are kept (up to keep_results) for polling.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        handler: Callable[[str, dict], Awaitable[dict]],
+        workers: int = JOB_WORKERS,
+        max_depth: int = JOB_MAX_DEPTH,
+        keep_results: int = JOB_KEEP_RESULTS
+    ):
+        self.name = name
+        self.handler = handler
+        self.workers = workers
+        self.max_depth = max_depth
+        self.keep_results = keep_results
+
+        self.jobs: OrderedDict[str, dict] = OrderedDict()
+        self.wait_times = deque(maxlen=JOB_STATS_WINDOW)
+        self.service_times = deque(maxlen=JOB_STATS_WINDOW)
+        self.counters = {"submitted": 0, "completed": 0, "failed": 0, "rejected": 0}
+        self.running = 0
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: list[asyncio.Task] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def submit(self, payload: dict) -> str:
+        """Queue a job and return its id. Raises JobQueueFull when at capacity."""
+        self._ensure_started()
+        job_id = uuid.uuid4().hex
+        job = {
+            "id": job_id,
+            "status": "queued",
+            "payload": payload,
+            "result": None,
+            "error": None,
+            "queued_at": time.perf_counter(),
+            "trace_parent": current_span()
+        }
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            self.counters["rejected"] += 1
+            raise JobQueueFull(f"{self.name} queue is full")
+
+        self.counters["submitted"] += 1
+        self.jobs[job_id] = job
+        while len(self.jobs) > self.keep_results:
+            self.jobs.popitem(last=False)
+        return job_id
+
+    def get_job(self, job_id: str) -> Optional[dict]:
+        """Get a job's status and result (without its payload)."""
+        job = self.jobs.get(job_id)
+        if not job:
+            return None
+        return {
+            "id": job["id"],
+            "status": job["status"],
+            "result": job["result"],
+            "error": job["error"]
+        }
+
+    def stats(self) -> dict:
+        """Queue depth, worker usage and wait/service time percentiles."""
+        return {
+            "name": self.name,
+            "depth": self._queue.qsize() if self._queue else 0,
+            "max_depth": self.max_depth,
+            "workers": self.workers,
+            "busy_workers": self.running,
+            **self.counters,
+            "wait_time_p50": _percentile(self.wait_times, 0.5),
+            "wait_time_p95": _percentile(self.wait_times, 0.95),
+            "service_time_p50": _percentile(self.service_times, 0.5),
+            "service_time_p95": _percentile(self.service_times, 0.95)
+        }
+
+    async def stop(self) -> None:
+        """Cancel the workers; queued jobs are dropped."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
+
+    def _ensure_started(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._tasks and self._loop is loop:
+            return
+        self._loop = loop
+        self._queue = asyncio.Queue(maxsize=self.max_depth)
+        # Fresh contexts, so workers don't inherit the first submitter's
+        # request state (active span, per-request SQL accounting)
+        self._tasks = [
+            asyncio.create_task(self._worker(), name=f"{self.name}-worker-{i}", context=contextvars.Context())
+            for i in range(self.workers)
+        ]
+
+    async def _worker(self) -> None:
+        while True:
+            job = await self._queue.get()
+            started = time.perf_counter()
+            self.wait_times.append(started - job["queued_at"])
+            self.running += 1
+            job["status"] = "running"
+            try:
+                # Continues the submitter's trace, if it had one
+                with span(f"job {self.name}", parent=job["trace_parent"]) as job_span:
+                    job_span.set_attribute("job.id", job["id"])
+                    job_span.set_attribute("job.wait_ms", round((started - job["queued_at"]) * 1000, 3))
+                    job["result"] = await self.handler(job["id"], job["payload"])
+                job["status"] = "done"
+                self.counters["completed"] += 1
+            except Exception as e:
+                job["status"] = "failed"
+                job["error"] = str(e)
+                self.counters["failed"] += 1
+            finally:
+                job["payload"] = None
+                job["trace_parent"] = None
+                self.running -= 1
+                self.service_times.append(time.perf_counter() - started)
+                self._queue.task_done()
+
+
+def _percentile(values, fraction: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
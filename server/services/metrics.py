@@ -0,0 +1,585 @@
+import bisect
+import contextvars
+import functools
+from contextlib import contextmanager
+import math
+import os
+import threading
+import time
+from typing import Callable, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+
+# Histogram bucket bounds
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+PROVIDER_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 15.0, 30.0)
+
+# Socket.IO events timed by instrument_socketio; connect/disconnect are
+# skipped since python-socketio retries them with fewer arguments
+UNTIMED_SOCKET_EVENTS = {"connect", "disconnect"}
+STATEMENT_KINDS = {"select", "insert", "update", "delete"}
+# The same SELECT this many times in one request is reported as a likely N+1.
+# Counting statements by text costs a dict update per statement, so REST
+# requests and socket events only do it with DETECT_N_PLUS_ONE=1;
+# track_queries() (query budgets in tests) always does.
+N_PLUS_ONE_REPEATS = 3
+DETECT_N_PLUS_ONE = bool(int(os.getenv("DETECT_N_PLUS_ONE", 0)))
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_perf_counter = time.perf_counter  # Bound once; read on every request, event and statement
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values):
+        """The child for one combination of label values."""
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {values}")
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def _samples(self):
+        """(suffix, label pairs, value) for every child."""
+        with self._lock:
+            children = list(self._children.items())
+        for values, child in children:
+            yield from child.samples(tuple(zip(self.labelnames, values)))
+
+
+class _CounterChild:
+    def __init__(self, lock):
+        self._lock = lock
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value += amount
+
+    def samples(self, labels):
+        yield "_total", labels, self.value
+
+
+class Counter(_Metric):
+    """Monotonic count, e.g. requests served."""
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild(self._lock)
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.labels().inc(amount)
+
+
+class _GaugeChild:
+    def __init__(self, lock):
+        self._lock = lock
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value -= amount
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+    def samples(self, labels):
+        yield "", labels, self.value
+
+
+class Gauge(_Metric):
+    """
+    Value that goes up and down. With `function`, the value is read from it
+    at scrape time instead, so the hot path pays nothing.
+    """
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (),
+                 function: Optional[Callable[[], float]] = None):
+        super().__init__(name, documentation, labelnames)
+        self.function = function
+
+    def _new_child(self):
+        return _GaugeChild(self._lock)
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.labels().inc(amount)
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.labels().dec(amount)
+
+    def set(self, value: float) -> None:
+        self.labels().set(value)
+
+    def _samples(self):
+        if self.function is None:
+            yield from super()._samples()
+            return
+        try:
+            yield "", (), float(self.function())
+        except Exception:
+            return
+
+
+class _HistogramChild:
+    def __init__(self, lock, bounds):
+        self._lock = lock
+        self._bounds = bounds
+        self.buckets = [0] * (len(bounds) + 1)  # Last one is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(self._bounds, value)
+        with self._lock:
+            self.buckets[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def samples(self, labels):
+        with self._lock:
+            buckets, total, count = list(self.buckets), self.sum, self.count
+        cumulative = 0
+        for bound, n in zip(self._bounds + (math.inf,), buckets):
+            cumulative += n
+            yield "_bucket", labels + (("le", _format_value(bound)),), cumulative
+        yield "_sum", labels, total
+        yield "_count", labels, count
+
+
+class Histogram(_Metric):
+    """Observations counted into cumulative `le` buckets, with sum and count."""
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(float(bound) for bound in sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramChild(self._lock, self.buckets)
+
+    def observe(self, value: float) -> None:
+        self.labels().observe(value)
+
+
+class MetricsRegistry:
+    """Named metrics rendered together in the Prometheus text format."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, documentation: str, labelnames: tuple = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: tuple = (),
+              function: Optional[Callable[[], float]] = None) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames, function))
+
+    def histogram(self, name: str, documentation: str, labelnames: tuple = (),
+                  buckets: tuple = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def _register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+        if not metric.labelnames:
+            metric.labels()  # Exported as zero before the first update
+        return metric
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format (0.0.4)."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {_escape_help(metric.documentation)}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for suffix, labels, value in metric._samples():
+                lines.append(f"{metric.name}{suffix}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def _format_labels(labels) -> str:
+    if not labels:
+        return ""
+    pairs = ",".join(f'{name}="{_escape_label(value)}"' for name, value in labels)
+    return "{" + pairs + "}"
+
+
+def _escape_label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _escape_help(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("\n", "\\n")
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if value == -math.inf:
+        return "-Inf"
+    if isinstance(value, int) or float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+registry = MetricsRegistry()
+
+http_request_duration = registry.histogram(
+    "http_request_duration_seconds", "REST request latency by route template.", ("method", "route", "status")
+)
+http_requests_in_flight = registry.gauge("http_requests_in_flight", "REST requests being served.")
+socketio_event_duration = registry.histogram(
+    "socketio_event_duration_seconds", "Socket.IO event handler latency.", ("event",)
+)
+socketio_events_in_flight = registry.gauge(
+    "socketio_events_in_flight", "Socket.IO event handlers running.", ("event",)
+)
+socketio_connected_sockets = registry.gauge("socketio_connected_sockets", "Open Engine.IO connections.")
+socketio_connected_players = registry.gauge(
+    "socketio_connected_players", "Players with at least one joined socket."
+)
+socketio_player_sockets = registry.gauge("socketio_player_sockets", "Sockets joined to a player.")
+db_queries_per_request = registry.histogram(
+    "db_queries_per_request", "SQL statements run by one request or socket event.", ("handler",),
+    buckets=QUERY_COUNT_BUCKETS
+)
+db_time_per_request = registry.histogram(
+    "db_query_seconds_per_request", "Time spent in SQL by one request or socket event.", ("handler",),
+    buckets=QUERY_BUCKETS
+)
+db_query_duration = registry.histogram(
+    "db_query_duration_seconds", "Latency of SQL statements run by requests and socket events, by statement kind.", ("statement",),
+    buckets=QUERY_BUCKETS
+)
+db_commit_duration = registry.histogram(
+    "db_commit_duration_seconds", "Session commit latency, including the flush.", buckets=QUERY_BUCKETS
+)
+db_repeated_statements = registry.counter(
+    "db_repeated_statements", f"SELECTs run {N_PLUS_ONE_REPEATS}+ times in one request (likely N+1).",
+    ("handler",)
+)
+provider_request_duration = registry.histogram(
+    "provider_request_duration_seconds", "External provider call latency (Gemini, ElevenLabs).",
+    ("provider", "outcome"), buckets=PROVIDER_BUCKETS
+)
+
+
+class RequestUsage:
+    """
+    SQL work done on behalf of one REST request or socket event. Statements
+    are counted by their SQL text, which SQLAlchemy keeps free of literal
+    values, so a loop of lookups by id shows up as one repeated statement.
+    Without record_statements only the totals are kept.
+    """
+    __slots__ = ("handler", "queries", "query_seconds", "statements")
+
+    def __init__(self, handler: str, record_statements: bool = True):
+        self.handler = handler
+        self.queries = 0
+        self.query_seconds = 0.0
+        self.statements = {} if record_statements else None  # SQL text -> times run
+
+    def repeated(self, min_repeats: int = N_PLUS_ONE_REPEATS) -> dict:
+        """SELECTs run at least min_repeats times (repeated writes are usually intended)."""
+        if not self.statements:
+            return {}
+        return {
+            statement: n for statement, n in self.statements.items()
+            if n >= min_repeats and statement[:6].lower() == "select"
+        }
+
+    def describe(self) -> str:
+        """Every statement with its count, most frequent first."""
+        lines = [f"{self.queries} statements in {self.handler}:"]
+        for statement, n in sorted((self.statements or {}).items(), key=lambda item: -item[1]):
+            lines.append(f"  {n}x {' '.join(statement.split())}")
+        return "\n".join(lines)
+
+
+# Set for the duration of a request or socket event. Sync endpoints run in
+# a thread with a copy of the context, which still holds the same object.
+_current_usage: contextvars.ContextVar[Optional[RequestUsage]] = contextvars.ContextVar(
+    "request_usage", default=None
+)
+
+
+def current_usage() -> Optional[RequestUsage]:
+    """SQL usage of the request or socket event being served, if any."""
+    return _current_usage.get()
+
+
+@contextmanager
+def track_queries(handler: str = "block"):
+    """Count the SQL run inside the block, e.g. to check a query budget in a test."""
+    usage = RequestUsage(handler)
+    token = _current_usage.set(usage)
+    try:
+        yield usage
+    finally:
+        _current_usage.reset(token)
+
+
+# (handler, statement) pairs already printed, so a hot N+1 is logged once
+_reported_repeats = set()
+
+
+def _report_repeats(usage: RequestUsage) -> None:
+    repeated = usage.repeated()
+    if not repeated:
+        return
+    db_repeated_statements.labels(usage.handler).inc(len(repeated))
+    for statement, n in repeated.items():
+        if (usage.handler, statement) not in _reported_repeats:
+            _reported_repeats.add((usage.handler, statement))
+            print(f"Possible N+1 in {usage.handler}: {n}x {' '.join(statement.split())[:200]}")
+
+
+def _observe_usage(usage: RequestUsage) -> None:
+    db_queries_per_request.labels(usage.handler).observe(usage.queries)
+    db_time_per_request.labels(usage.handler).observe(usage.query_seconds)
+    if usage.statements:
+        _report_repeats(usage)
+
+
+def observe_provider_call(provider: str, latency: float, ok: bool) -> None:
+    """Record one external provider call."""
+    provider_request_duration.labels(provider, "ok" if ok else "error").observe(latency)
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware timing REST requests by route template (not raw path,
+    which would give a series per user id). WebSockets are left alone.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        # Raw path until routing is done; the route template once it is
+        usage = RequestUsage(f"{scope['method']} {scope['path']}", DETECT_N_PLUS_ONE)
+        token = _current_usage.set(usage)
+        http_requests_in_flight.inc()
+        started = _perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = _perf_counter() - started
+            http_requests_in_flight.dec()
+            _current_usage.reset(token)
+            route = scope.get("route")
+            template = getattr(route, "path", None) or "unmatched"
+            http_request_duration.labels(scope["method"], template, str(status)).observe(elapsed)
+            usage.handler = f"{scope['method']} {template}"
+            _observe_usage(usage)
+
+
+def _timed_socket_handler(event_name: str, handler):
+    duration = socketio_event_duration.labels(event_name)
+    in_flight = socketio_events_in_flight.labels(event_name)
+    handler_label = f"socket {event_name}"
+    queries = db_queries_per_request.labels(handler_label)
+    query_seconds = db_time_per_request.labels(handler_label)
+
+    @functools.wraps(handler)
+    async def timed(*args):
+        usage = RequestUsage(handler_label, DETECT_N_PLUS_ONE)
+        token = _current_usage.set(usage)
+        in_flight.inc()
+        started = _perf_counter()
+        try:
+            return await handler(*args)
+        finally:
+            duration.observe(_perf_counter() - started)
+            in_flight.dec()
+            _current_usage.reset(token)
+            queries.observe(usage.queries)
+            query_seconds.observe(usage.query_seconds)
+            if usage.statements:
+                _report_repeats(usage)
+
+    timed._timed = True
+    return timed
+
+
+def instrument_socketio(sio, connected_players: dict, namespace: str = "/") -> None:
+    """
+    Time every event handler registered on `sio` so far, and export
+    connection counts. Call once, after the handlers are defined.
+    """
+    handlers = sio.handlers.get(namespace, {})
+    for event_name, handler in list(handlers.items()):
+        if event_name in UNTIMED_SOCKET_EVENTS or getattr(handler, "_timed", False):
+            continue
+        handlers[event_name] = _timed_socket_handler(event_name, handler)
+
+    socketio_connected_sockets.function = lambda: len(sio.eio.sockets)
+    socketio_connected_players.function = lambda: len(connected_players)
+    socketio_player_sockets.function = lambda: sum(len(sids) for sids in connected_players.values())
+
+
+_query_duration_by_kind = {kind: db_query_duration.labels(kind) for kind in STATEMENT_KINDS | {"other"}}
+
+# Callbacks (context, statement, parameters, elapsed, executemany, error) run
+# after every statement the execute hook times, e.g. the slow query log;
+# error is the exception the statement raised, if any
+_statement_observers = []
+# Whether instrument_database() asked for per-request statement counts
+_counting_statements = False
+
+
+def _execute_timed(execute, cursor, statement, parameters, context, executemany) -> bool:
+    """
+    Run a statement in place of the dialect, reading the clock once on each
+    side for every consumer. Statements outside a request or socket event
+    are left to the dialect when nothing else is observing.
+    """
+    usage = _current_usage.get() if _counting_statements else None
+    if usage is None and not _statement_observers:
+        return False
+    started = _perf_counter()
+    try:
+        execute(cursor, statement, parameters, context)
+    except Exception as error:
+        elapsed = _perf_counter() - started
+        for observer in _statement_observers:
+            observer(context, statement, parameters, elapsed, executemany, error)
+        raise
+    elapsed = _perf_counter() - started
+    if usage is not None:
+        _query_duration_by_kind.get(statement[:6].lower(), _query_duration_by_kind["other"]).observe(elapsed)
+        usage.queries += 1
+        usage.query_seconds += elapsed
+        statements = usage.statements
+        if statements is not None:
+            statements[statement] = statements.get(statement, 0) + 1
+    for observer in _statement_observers:
+        observer(context, statement, parameters, elapsed, executemany, None)
+    return True
+
+
+# Dialect hooks rather than before/after_cursor_execute: any cursor listener
+# moves every connection onto SQLAlchemy's slower event dispatch path, for
+# good, while these only cost a call per statement.
+def _do_execute(cursor, statement, parameters, context):
+    return _execute_timed(context.dialect.do_execute, cursor, statement, parameters, context, False)
+
+
+def _do_executemany(cursor, statement, parameters, context):
+    return _execute_timed(context.dialect.do_executemany, cursor, statement, parameters, context, True)
+
+
+def _execute_no_params(cursor, statement, parameters, context):
+    context.dialect.do_execute_no_params(cursor, statement, context)
+
+
+def _do_execute_no_params(cursor, statement, context):
+    return _execute_timed(_execute_no_params, cursor, statement, (), context, False)
+
+
+_EXECUTE_HOOKS = (
+    ("do_execute", _do_execute),
+    ("do_executemany", _do_executemany),
+    ("do_execute_no_params", _do_execute_no_params),
+)
+
+
+def _update_execute_hooks() -> None:
+    wanted = _counting_statements or bool(_statement_observers)
+    for name, hook in _EXECUTE_HOOKS:
+        if wanted and not event.contains(Engine, name, hook):
+            event.listen(Engine, name, hook)
+        elif not wanted and event.contains(Engine, name, hook):
+            event.remove(Engine, name, hook)
+
+
+def add_statement_observer(observer: Callable) -> None:
+    """Call observer(context, statement, parameters, elapsed, executemany, error) after every statement."""
+    if observer not in _statement_observers:
+        _statement_observers.append(observer)
+    _update_execute_hooks()
+
+
+def remove_statement_observer(observer: Callable) -> None:
+    if observer in _statement_observers:
+        _statement_observers.remove(observer)
+    _update_execute_hooks()
+
+
+def _before_commit(session):
+    session.info["metrics_commit_started"] = time.perf_counter()
+
+
+def _after_commit(session):
+    started = session.info.pop("metrics_commit_started", None)
+    if started is not None:
+        db_commit_duration.observe(time.perf_counter() - started)
+
+
+_SESSION_LISTENERS = (
+    ("before_commit", _before_commit),
+    ("after_commit", _after_commit),
+)
+
+
+def instrument_database() -> None:
+    """Time SQL statements run inside requests and socket events on every engine, and commits on every session."""
+    global _counting_statements
+    _counting_statements = True
+    _update_execute_hooks()
+    for name, listener in _SESSION_LISTENERS:
+        if not event.contains(Session, name, listener):
+            event.listen(Session, name, listener)
+
+
+def uninstrument_database() -> None:
+    global _counting_statements
+    _counting_statements = False
+    _update_execute_hooks()
+    for name, listener in _SESSION_LISTENERS:
+        if event.contains(Session, name, listener):
+            event.remove(Session, name, listener)
+
+
+def render_metrics() -> str:
+    return registry.render()
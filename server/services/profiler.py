@@ -0,0 +1,496 @@
+import contextvars
+import cProfile
+import datetime
+import functools
+import hmac
+import inspect
+import json
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from typing import Optional
+
+from fastapi.routing import APIRoute
+from starlette.routing import compile_path
+
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(BASE_DIR, "logs", "profiles"))
+# Shared secret for the X-Profile request header; unset disables the header
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN", "")
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", 5))
+# Sampling stops after this long, even if the request is still running
+PROFILE_MAX_SECONDS = float(os.getenv("PROFILE_MAX_SECONDS", 30))
+# Profiles kept on disk; the oldest are deleted beyond this
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", 50))
+PROFILE_HEADER = "x-profile"
+
+SAMPLE = "sample"
+CPROFILE = "cprofile"
+SPEEDSCOPE = "speedscope"
+COLLAPSED = "collapsed"
+_EXTENSIONS = {SPEEDSCOPE: ".speedscope.json", COLLAPSED: ".collapsed.txt", CPROFILE: ".pstats"}
+
+_UNSAFE_NAME = re.compile(r"[^A-Za-z0-9_.-]+")
+
+# The run profiling the current request; copied into threadpool workers with the context
+_active_run: contextvars.ContextVar[Optional["ProfileRun"]] = contextvars.ContextVar("active_profile_run", default=None)
+
+
+def _frame_key(frame) -> tuple:
+    code = frame.f_code
+    return code.co_name, code.co_filename, code.co_firstlineno
+
+
+def _stack(frame) -> tuple:
+    """Frame keys from the outermost call to `frame`."""
+    stack = []
+    while frame is not None:
+        stack.append(_frame_key(frame))
+        frame = frame.f_back
+    stack.reverse()
+    return tuple(stack)
+
+
+class ProfileRun:
+    """One profiled request or socket event."""
+
+    def __init__(self, target: str, mode: str, output: str, interval: float):
+        self.target = target
+        self.mode = mode
+        self.output = CPROFILE if mode == CPROFILE else output
+        self.interval = interval
+        # Threads sampled for this run: the one it started on, plus threadpool
+        # workers running its sync endpoint (see ProfiledRoute)
+        self.thread_ids = {threading.get_ident()}
+        self.started = time.perf_counter()
+        self.ended = None
+        self.stacks = Counter()
+        # Wall time each stack was seen for; the sampler can't keep to its
+        # interval while busy threads hold the GIL, so counts undercount
+        self.stack_seconds = Counter()
+        self.last_sample = self.started
+        self.samples = 0
+        self.truncated = False
+        self.cprofiles: list[cProfile.Profile] = []
+        self.profiler = None
+        stamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+        slug = _UNSAFE_NAME.sub("_", target).strip("_")[:60]
+        self.name = f"{stamp}-{slug}-{uuid.uuid4().hex[:6]}{_EXTENSIONS[self.output]}"
+
+    @property
+    def duration(self) -> float:
+        return (self.ended or time.perf_counter()) - self.started
+
+    def collapsed(self) -> str:
+        """Brendan Gregg's folded format: root;...;leaf count, one stack per line."""
+        lines = []
+        for stack, count in self.stacks.most_common():
+            frames = ";".join(f"{name} ({os.path.basename(path)}:{line})" for name, path, line in stack)
+            lines.append(f"{frames} {count}")
+        return "\n".join(lines) + "\n"
+
+    def speedscope(self) -> dict:
+        """A speedscope "sampled" profile, weighted by wall-clock seconds."""
+        frames, index, samples, weights = [], {}, [], []
+        for stack, seconds in self.stack_seconds.items():
+            sample = []
+            for key in stack:
+                if key not in index:
+                    index[key] = len(frames)
+                    frames.append({"name": key[0], "file": key[1], "line": key[2]})
+                sample.append(index[key])
+            samples.append(sample)
+            weights.append(round(seconds, 6))
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": self.target,
+            "exporter": "game-server profiler",
+            "shared": {"frames": frames},
+            "profiles": [{
+                "type": "sampled",
+                "name": self.target,
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": round(self.duration, 6),
+                "samples": samples,
+                "weights": weights
+            }]
+        }
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "target": self.target,
+            "mode": self.mode,
+            "format": self.output,
+            "duration_ms": round(self.duration * 1000, 2),
+            "samples": self.samples if self.mode == SAMPLE else None,
+            "truncated": self.truncated
+        }
+
+
+class Profiler:
+    """
+    Opt-in profiles of individual REST requests and Socket.IO events.
+
+    A request is profiled when it carries X-Profile: <PROFILE_TOKEN>, or
+    when its target ("GET /api/user/{user_id}", "socket sendMoney") has
+    been armed for the next N calls. Sampling mode reads the handling
+    thread's stack every PROFILE_INTERVAL_MS from a background thread, so
+    it measures wall-clock time, including time the event loop spends on
+    other tasks while the handler awaits; work in to_thread workers is not
+    seen. cProfile mode is deterministic but slower, and only one cProfile
+    run can be active at a time.
+
+    Sync endpoints run in a threadpool worker rather than on the event
+    loop; routes built with ProfiledRoute have that worker join the run
+    (sampled alongside the loop thread, or under its own cProfile). Work
+    handed to asyncio.to_thread elsewhere is not seen.
+
+    When nothing is armed and no token is set, the REST middleware is a
+    single check and socket handlers aren't wrapped at all.
+
+    POST /api/diagnostics/profiles/arm has no authentication, like the
+    rest of /api/diagnostics, so PROFILE_TOKEN only gates the header
+    trigger; anyone who can reach the diagnostics routes can arm profiles.
+    """
+
+    def __init__(
+        self,
+        directory: str = PROFILE_DIR,
+        token: str = PROFILE_TOKEN,
+        interval_ms: float = PROFILE_INTERVAL_MS,
+        max_seconds: float = PROFILE_MAX_SECONDS,
+        keep: int = PROFILE_KEEP
+    ):
+        self.directory = directory
+        self.token = token
+        self.interval = interval_ms / 1000
+        self.max_seconds = max_seconds
+        self.keep = keep
+        self.armed: dict[str, dict] = {}
+        self._patterns: dict[str, object] = {}
+        self.profiles: OrderedDict[str, dict] = OrderedDict()
+        self._runs: dict[int, ProfileRun] = {}
+        self._lock = threading.Lock()
+        self._sampler: Optional[threading.Thread] = None
+        self._cprofile_active = False
+        self._sio = None
+        self._namespace = "/"
+        self._unwrapped: dict[str, object] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.token or self.armed)
+
+    def install_socketio(self, sio, namespace: str = "/") -> None:
+        """Let socket events be armed; handlers are only wrapped while armed."""
+        self._sio = sio
+        self._namespace = namespace
+
+    def arm(self, target: str, count: int = 1, mode: str = SAMPLE, output: str = SPEEDSCOPE) -> dict:
+        """Profile the next `count` calls of a REST route template or "socket <event>"."""
+        if mode not in (SAMPLE, CPROFILE):
+            raise ValueError(f"mode must be {SAMPLE} or {CPROFILE}")
+        if output not in (SPEEDSCOPE, COLLAPSED):
+            raise ValueError(f"format must be {SPEEDSCOPE} or {COLLAPSED}")
+        if count < 1:
+            raise ValueError("count must be at least 1")
+        if target.startswith("socket "):
+            self._wrap_socket_handler(target)
+            pattern = None
+        else:
+            method, _, template = target.partition(" ")
+            if not method.isupper() or not template.startswith("/"):
+                raise ValueError('target must be "<METHOD> <route template>" or "socket <event>"')
+            pattern = compile_path(template)[0]
+        self.armed[target] = {"remaining": count, "mode": mode, "format": output}
+        self._patterns[target] = pattern
+        return {"target": target, **self.armed[target]}
+
+    def match(self, method: str, path: str) -> Optional[str]:
+        """The armed REST target matching a request, if any."""
+        for target in list(self.armed):
+            pattern = self._patterns.get(target)
+            if pattern is not None and target.startswith(method + " ") and pattern.match(path):
+                return target
+        return None
+
+    def disarm(self, target: Optional[str] = None) -> None:
+        for armed_target in ([target] if target else list(self.armed)):
+            self.armed.pop(armed_target, None)
+            self._patterns.pop(armed_target, None)
+            self._unwrap_socket_handler(armed_target)
+
+    def take(self, target: str) -> Optional[dict]:
+        """The armed settings for target, counting down one call; None if not armed."""
+        settings = self.armed.get(target)
+        if settings is None:
+            return None
+        settings["remaining"] -= 1
+        if settings["remaining"] <= 0:
+            self.disarm(target)
+        return settings
+
+    def _wrap_socket_handler(self, target: str) -> None:
+        event_name = target[len("socket "):]
+        handlers = self._sio.handlers.get(self._namespace, {}) if self._sio else {}
+        if event_name not in handlers:
+            raise ValueError(f"Unknown socket event {event_name!r}")
+        if target in self._unwrapped:
+            return
+        handler = handlers[event_name]
+        self._unwrapped[target] = handler
+
+        @functools.wraps(handler)
+        async def profiled_handler(*args):
+            settings = self.take(target)
+            if settings is None:
+                return await handler(*args)
+            with self.profile(target, settings["mode"], settings["format"]):
+                return await handler(*args)
+
+        handlers[event_name] = profiled_handler
+
+    def _unwrap_socket_handler(self, target: str) -> None:
+        handler = self._unwrapped.pop(target, None)
+        if handler is not None:
+            self._sio.handlers[self._namespace][target[len("socket "):]] = handler
+
+    @contextmanager
+    def profile(self, target: str, mode: str = SAMPLE, output: str = SPEEDSCOPE):
+        """Profile the enclosed block on the current thread and save the result."""
+        if mode == CPROFILE:
+            with self._lock:
+                # The interpreter has one profile hook per thread; sample instead of clobbering it
+                mode = SAMPLE if self._cprofile_active else CPROFILE
+                self._cprofile_active = self._cprofile_active or mode == CPROFILE
+        run = ProfileRun(target, mode, output, self.interval)
+        run.profiler = self
+        if mode == CPROFILE:
+            profile = cProfile.Profile()
+            run.cprofiles.append(profile)
+            profile.enable()
+        else:
+            self._start_sampling(run)
+        token = _active_run.set(run)
+        try:
+            yield run
+        finally:
+            _active_run.reset(token)
+            run.ended = time.perf_counter()
+            if run.mode == CPROFILE:
+                run.cprofiles[0].disable()
+                with self._lock:
+                    self._cprofile_active = False
+            else:
+                with self._lock:
+                    self._runs.pop(id(run), None)
+            self._save(run)
+
+    @contextmanager
+    def join(self, run: ProfileRun):
+        """Add the current (worker) thread to a run for the enclosed block."""
+        thread_id = threading.get_ident()
+        if run.ended is not None or thread_id in run.thread_ids:
+            yield
+            return
+        if run.mode == CPROFILE:
+            # Profile hooks are per thread, so the worker needs its own
+            profile = cProfile.Profile()
+            profile.enable()
+            try:
+                yield
+            finally:
+                profile.disable()
+                with self._lock:
+                    run.cprofiles.append(profile)
+            return
+        with self._lock:
+            run.thread_ids.add(thread_id)
+        try:
+            yield
+        finally:
+            with self._lock:
+                run.thread_ids.discard(thread_id)
+
+    def _start_sampling(self, run: ProfileRun) -> None:
+        with self._lock:
+            self._runs[id(run)] = run
+            if self._sampler is None:
+                self._sampler = threading.Thread(target=self._sample_loop, name="profiler-sampler", daemon=True)
+                self._sampler.start()
+
+    def _sample_loop(self) -> None:
+        while True:
+            with self._lock:
+                runs = list(self._runs.values())
+                if not runs:
+                    self._sampler = None
+                    return
+            frames = sys._current_frames()
+            now = time.perf_counter()
+            for run in runs:
+                if now - run.started > self.max_seconds:
+                    run.truncated = True
+                    with self._lock:
+                        self._runs.pop(id(run), None)
+                    continue
+                with self._lock:
+                    thread_ids = list(run.thread_ids)
+                for thread_id in thread_ids:
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        stack = _stack(frame)
+                        run.stacks[stack] += 1
+                        run.stack_seconds[stack] += now - run.last_sample
+                        run.samples += 1
+                run.last_sample = now
+            del frames
+            time.sleep(self.interval)
+
+    def _save(self, run: ProfileRun) -> None:
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            path = os.path.join(self.directory, run.name)
+            if run.output == CPROFILE:
+                with self._lock:
+                    stats = pstats.Stats(*run.cprofiles)
+                stats.dump_stats(path)
+            elif run.output == COLLAPSED:
+                with open(path, "w", encoding="utf-8") as f:
+                    f.write(run.collapsed())
+            else:
+                with open(path, "w", encoding="utf-8") as f:
+                    json.dump(run.speedscope(), f)
+        except OSError as e:
+            print(f"Saving profile {run.name} failed: {e}")
+            return
+
+        entry = run.to_dict()
+        entry["created"] = datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds")
+        entry["size"] = os.path.getsize(path)
+        with self._lock:
+            self.profiles[run.name] = entry
+            expired = []
+            while len(self.profiles) > self.keep:
+                expired.append(self.profiles.popitem(last=False)[0])
+        for name in expired:
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                pass
+
+    def list_profiles(self) -> list[dict]:
+        """Saved profiles, newest first."""
+        with self._lock:
+            return list(reversed(self.profiles.values()))
+
+    def path_for(self, name: str) -> Optional[str]:
+        """The file for a listed profile, or None (names outside the listing are refused)."""
+        with self._lock:
+            if name not in self.profiles:
+                return None
+        return os.path.join(self.directory, name)
+
+    def delete(self, name: str) -> bool:
+        path = self.path_for(name)
+        if path is None:
+            return False
+        with self._lock:
+            self.profiles.pop(name, None)
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        return True
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware profiling REST requests that carry a valid X-Profile
+    header or match an armed route. The saved profile's name is returned
+    in the X-Profile-Id response header.
+    """
+
+    def __init__(self, app, profiler: Optional[Profiler] = None):
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope, receive, send):
+        profiler = self.profiler or get_profiler()
+        if scope["type"] != "http" or not profiler.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        settings = None
+        target = None
+        headers = dict(scope.get("headers") or ())
+        token = headers.get(PROFILE_HEADER.encode("latin-1"), b"")
+        if profiler.token and hmac.compare_digest(token, profiler.token.encode("utf-8")):
+            mode = headers.get(b"x-profile-mode", b"").decode("latin-1") or SAMPLE
+            output = headers.get(b"x-profile-format", b"").decode("latin-1") or SPEEDSCOPE
+            settings = {"mode": mode if mode in (SAMPLE, CPROFILE) else SAMPLE,
+                        "format": output if output in (SPEEDSCOPE, COLLAPSED) else SPEEDSCOPE}
+        elif profiler.armed:
+            target = profiler.match(scope["method"], scope["path"])
+            if target is not None:
+                settings = profiler.take(target)
+        if settings is None:
+            await self.app(scope, receive, send)
+            return
+
+        with profiler.profile(target or f"{scope['method']} {scope['path']}",
+                              settings["mode"], settings["format"]) as run:
+            async def send_with_profile_id(message):
+                if message["type"] == "http.response.start":
+                    message = {**message, "headers": [*message.get("headers", []),
+                                                      (b"x-profile-id", run.name.encode("latin-1"))]}
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_profile_id)
+            finally:
+                # Header-triggered runs are listed under the route template once routing is done
+                route = getattr(scope.get("route"), "path", None)
+                if target is None and route:
+                    run.target = f"{scope['method']} {route}"
+
+
+def profile_in_thread(function):
+    """Wrap a sync callable so a threadpool worker running it joins the caller's profile run."""
+    @functools.wraps(function)
+    def joined(*args, **kwargs):
+        run = _active_run.get()
+        if run is None:
+            return function(*args, **kwargs)
+        with run.profiler.join(run):
+            return function(*args, **kwargs)
+    return joined
+
+
+class ProfiledRoute(APIRoute):
+    """APIRoute whose sync endpoint is visible to on-demand profiles from its threadpool worker."""
+
+    def __init__(self, path: str, endpoint, **kwargs):
+        if not inspect.iscoroutinefunction(endpoint):
+            endpoint = profile_in_thread(endpoint)
+        super().__init__(path, endpoint, **kwargs)
+
+
+_profiler: Optional[Profiler] = None
+
+
+def get_profiler() -> Profiler:
+    global _profiler
+    if _profiler is None:
+        _profiler = Profiler()
+    return _profiler
@@ -0,0 +1,172 @@
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Optional
+
+from services.metrics import observe_provider_call
+from services.tracing import CLIENT, span
+
+
+# Circuit breaker defaults for external providers (Gemini, ElevenLabs)
+HEALTH_WINDOW_SIZE = 20
+HEALTH_MIN_CALLS = 5
+HEALTH_FAILURE_THRESHOLD = 0.5
+HEALTH_OPEN_SECONDS = 30.0
+HEALTH_PROBE_JITTER = 0.2
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class ProviderHealth:
+    """
+    Rolling error/latency window with a circuit breaker for one provider.
+
+    closed    - calls go through; opens once the window's error rate
+                reaches failure_threshold
+    open      - calls are refused until a jittered cool-down expires
+    half_open - a single probe call is let through; success closes the
+                circuit, failure re-opens it
+    """
+
+    def __init__(
+        self,
+        name: str,
+        window_size: int = HEALTH_WINDOW_SIZE,
+        min_calls: int = HEALTH_MIN_CALLS,
+        failure_threshold: float = HEALTH_FAILURE_THRESHOLD,
+        open_seconds: float = HEALTH_OPEN_SECONDS,
+        jitter: float = HEALTH_PROBE_JITTER,
+        slow_call_seconds: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.name = name
+        self.min_calls = min_calls
+        self.failure_threshold = failure_threshold
+        self.open_seconds = open_seconds
+        self.jitter = jitter
+        self.slow_call_seconds = slow_call_seconds
+        self.clock = clock
+
+        self.state = CLOSED
+        self.calls = deque(maxlen=window_size)  # (ok, latency_seconds)
+        self.opened_at = None
+        self.retry_at = None
+        self.probe_in_flight = False
+        self.last_error = None
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def allow_request(self) -> bool:
+        """Return True if a call may be made now."""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and self.clock() >= self.retry_at:
+                self.state = HALF_OPEN
+            if self.state == HALF_OPEN and not self.probe_in_flight:
+                self.probe_in_flight = True
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self, latency: float) -> None:
+        if self.slow_call_seconds is not None and latency > self.slow_call_seconds:
+            self.record_failure(latency, f"Slow call: {latency:.2f}s")
+            return
+        observe_provider_call(self.name, latency, ok=True)
+        with self._lock:
+            self.calls.append((True, latency))
+            if self.state == HALF_OPEN:
+                self.state = CLOSED
+                self.calls.clear()
+                self.calls.append((True, latency))
+            self.probe_in_flight = False
+
+    def record_failure(self, latency: float, error) -> None:
+        observe_provider_call(self.name, latency, ok=False)
+        with self._lock:
+            self.calls.append((False, latency))
+            self.last_error = str(error)
+            self.probe_in_flight = False
+            if self.state == HALF_OPEN:
+                self._open()
+            elif self.state == CLOSED and len(self.calls) >= self.min_calls:
+                if self._error_rate() >= self.failure_threshold:
+                    self._open()
+
+    def record_cancelled(self) -> None:
+        """A call abandoned by our side (e.g. client disconnect) says nothing about the provider."""
+        with self._lock:
+            self.probe_in_flight = False
+
+    @contextmanager
+    def track(self):
+        """Time the enclosed call and record its outcome (and a client span inside a trace)."""
+        started = time.perf_counter()
+        with span(self.name, CLIENT, {"provider": self.name}, root=False):
+            try:
+                yield
+            except Exception as e:
+                self.record_failure(time.perf_counter() - started, e)
+                raise
+            except BaseException:
+                self.record_cancelled()
+                raise
+        self.record_success(time.perf_counter() - started)
+
+    def snapshot(self) -> dict:
+        """Current state and window statistics."""
+        with self._lock:
+            latencies = sorted(latency for _, latency in self.calls)
+            return {
+                "name": self.name,
+                "state": self.state,
+                "calls": len(self.calls),
+                "error_rate": self._error_rate(),
+                "latency_p50": _percentile(latencies, 0.5),
+                "latency_p95": _percentile(latencies, 0.95),
+                "rejected": self.rejected,
+                "last_error": self.last_error,
+                "retry_in": max(self.retry_at - self.clock(), 0) if self.state == OPEN else None
+            }
+
+    def _open(self) -> None:
+        self.state = OPEN
+        self.opened_at = self.clock()
+        spread = random.uniform(1 - self.jitter, 1 + self.jitter)
+        self.retry_at = self.opened_at + self.open_seconds * spread
+
+    def _error_rate(self) -> float:
+        if not self.calls:
+            return 0.0
+        return sum(1 for ok, _ in self.calls if not ok) / len(self.calls)
+
+
+def _percentile(values: list[float], fraction: float) -> Optional[float]:
+    if not values:
+        return None
+    index = min(int(len(values) * fraction), len(values) - 1)
+    return values[index]
+
+
+_providers: dict[str, ProviderHealth] = {}
+_providers_lock = threading.Lock()
+
+
+def get_provider_health(name: str) -> ProviderHealth:
+    """Get the shared health tracker for a provider, creating it if needed."""
+    with _providers_lock:
+        if name not in _providers:
+            _providers[name] = ProviderHealth(name)
+        return _providers[name]
+
+
+def get_all_provider_health() -> dict:
+    """Snapshots of every tracked provider."""
+    with _providers_lock:
+        providers = list(_providers.values())
+    return {provider.name: provider.snapshot() for provider in providers}
@@ -0,0 +1,249 @@
+import datetime
+import hashlib
+import json
+import logging
+import logging.handlers
+import os
+import random
+import re
+import threading
+from typing import Optional
+
+from services.metrics import add_statement_observer, current_usage, remove_statement_observer
+
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Statements at or above this many milliseconds are logged; <= 0 turns the log off
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", 100))
+SLOW_QUERY_LOG = os.getenv("SLOW_QUERY_LOG", os.path.join(BASE_DIR, "logs", "slow_queries.jsonl"))
+SLOW_QUERY_LOG_MAX_BYTES = int(os.getenv("SLOW_QUERY_LOG_MAX_BYTES", 10 * 1024 * 1024))
+SLOW_QUERY_LOG_BACKUPS = int(os.getenv("SLOW_QUERY_LOG_BACKUPS", 5))
+# Bind parameters kept per fingerprint (a uniform sample of all occurrences)
+SLOW_QUERY_PARAM_SAMPLES = int(os.getenv("SLOW_QUERY_PARAM_SAMPLES", 5))
+SLOW_QUERY_MAX_FINGERPRINTS = 500
+PARAM_REPR_CHARS = 200
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+
+
+def normalize_statement(statement: str) -> str:
+    """Statement shape: literals become ?, IN lists of any length become (?+), whitespace collapsed."""
+    shape = _STRING_LITERAL.sub("?", statement)
+    shape = _NUMBER_LITERAL.sub("?", shape)
+    shape = " ".join(shape.split())
+    return _PLACEHOLDER_LIST.sub("(?+)", shape)
+
+
+def fingerprint(statement: str) -> str:
+    return hashlib.sha1(normalize_statement(statement).encode("utf-8")).hexdigest()[:16]
+
+
+def _param_repr(parameters) -> str:
+    text = repr(parameters)
+    return text if len(text) <= PARAM_REPR_CHARS else text[:PARAM_REPR_CHARS] + "..."
+
+
+class SlowStatement:
+    """Aggregate for one statement fingerprint."""
+
+    def __init__(self, key: str, statement: str):
+        self.fingerprint = key
+        self.statement = normalize_statement(statement)
+        self.count = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.last_seen = None
+        self.handlers = {}
+        self.sample_params = []
+        self.plan = None
+
+    def to_dict(self) -> dict:
+        return {
+            "fingerprint": self.fingerprint,
+            "statement": self.statement,
+            "count": self.count,
+            "total_ms": round(self.total_seconds * 1000, 2),
+            "mean_ms": round(self.total_seconds / self.count * 1000, 2) if self.count else None,
+            "max_ms": round(self.max_seconds * 1000, 2),
+            "last_seen": self.last_seen,
+            "handlers": dict(self.handlers),
+            "sample_params": list(self.sample_params),
+            "plan": self.plan
+        }
+
+
+class SlowQueryLog:
+    """
+    Records SQL statements slower than a threshold on every engine.
+
+    Each one is appended as a JSON line to a size-rotated file and folded
+    into an in-memory aggregate per statement fingerprint (the statement
+    with literals and IN-list lengths stripped). The first time a
+    fingerprint is seen its plan is captured on the same connection:
+    EXPLAIN QUERY PLAN on SQLite, EXPLAIN elsewhere.
+    """
+
+    def __init__(
+        self,
+        threshold_ms: float = SLOW_QUERY_MS,
+        path: Optional[str] = SLOW_QUERY_LOG,
+        max_bytes: int = SLOW_QUERY_LOG_MAX_BYTES,
+        backups: int = SLOW_QUERY_LOG_BACKUPS,
+        param_samples: int = SLOW_QUERY_PARAM_SAMPLES,
+        max_fingerprints: int = SLOW_QUERY_MAX_FINGERPRINTS
+    ):
+        self.threshold_seconds = threshold_ms / 1000
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.param_samples = param_samples
+        self.max_fingerprints = max_fingerprints
+        self.statements: dict[str, SlowStatement] = {}
+        self.dropped = 0
+        self._logger = None
+        self._lock = threading.Lock()
+        self._explaining = threading.local()
+
+    @property
+    def enabled(self) -> bool:
+        return self.threshold_seconds > 0
+
+    def install(self) -> None:
+        """Start timing statements on every engine (no-op when disabled)."""
+        if self.enabled:
+            add_statement_observer(self._observe)
+
+    def uninstall(self) -> None:
+        remove_statement_observer(self._observe)
+
+    def _observe(self, context, statement, parameters, elapsed, executemany, error):
+        if error is None and elapsed >= self.threshold_seconds and not getattr(self._explaining, "active", False):
+            self.record(context.root_connection, statement, parameters, elapsed, executemany)
+
+    def record(self, conn, statement: str, parameters, elapsed: float, executemany: bool = False) -> None:
+        """Log one slow statement, capturing its plan if the fingerprint is new."""
+        key = fingerprint(statement)
+        usage = current_usage()
+        handler = usage.handler if usage is not None and usage.handler else None
+        params = _param_repr(parameters[:3] if executemany else parameters)
+        now = datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="milliseconds")
+
+        with self._lock:
+            entry = self.statements.get(key)
+            if entry is None and len(self.statements) < self.max_fingerprints:
+                entry = self.statements[key] = SlowStatement(key, statement)
+            elif entry is None:
+                self.dropped += 1
+            new_shape = entry is not None and entry.count == 0
+            if entry is not None:
+                entry.count += 1
+                entry.total_seconds += elapsed
+                entry.max_seconds = max(entry.max_seconds, elapsed)
+                entry.last_seen = now
+                if handler:
+                    entry.handlers[handler] = entry.handlers.get(handler, 0) + 1
+                self._sample_param(entry, params)
+
+        plan = None
+        if new_shape:
+            plan = self.explain(conn, statement, parameters[0] if executemany else parameters)
+            with self._lock:
+                entry.plan = plan
+
+        self._write({
+            "ts": now,
+            "fingerprint": key,
+            "duration_ms": round(elapsed * 1000, 3),
+            "handler": handler,
+            "statement": " ".join(statement.split()),
+            "params": params,
+            **({"plan": plan} if plan is not None else {})
+        })
+
+    def _sample_param(self, entry: SlowStatement, params: str) -> None:
+        # Reservoir sampling: every occurrence so far is equally likely to be kept
+        if len(entry.sample_params) < self.param_samples:
+            entry.sample_params.append(params)
+        else:
+            slot = random.randrange(entry.count)
+            if slot < self.param_samples:
+                entry.sample_params[slot] = params
+
+    def explain(self, conn, statement: str, parameters) -> Optional[list]:
+        """The backend's plan for a statement, as rows of strings, or None if it can't be explained."""
+        prefix = "EXPLAIN QUERY PLAN " if conn.dialect.name == "sqlite" else "EXPLAIN "
+        self._explaining.active = True
+        try:
+            cursor = conn.connection.dbapi_connection.cursor()
+            try:
+                cursor.execute(prefix + statement, parameters)
+                if conn.dialect.name == "sqlite":
+                    # (id, parent, notused, detail)
+                    return [row[-1] for row in cursor.fetchall()]
+                return [" ".join(str(value) for value in row) for row in cursor.fetchall()]
+            finally:
+                cursor.close()
+        except Exception as e:
+            return [f"Plan unavailable: {e}"]
+        finally:
+            self._explaining.active = False
+
+    def _write(self, record: dict) -> None:
+        if not self.path:
+            return
+        try:
+            if self._logger is None:
+                self._logger = self._open_logger()
+            self._logger.info(json.dumps(record, default=str))
+        except OSError as e:
+            print(f"Slow query log write failed: {e}")
+
+    def _open_logger(self) -> logging.Logger:
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        logger = logging.getLogger(f"slow_queries.{id(self)}")
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+        file_handler = logging.handlers.RotatingFileHandler(
+            self.path, maxBytes=self.max_bytes, backupCount=self.backups, encoding="utf-8"
+        )
+        file_handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(file_handler)
+        return logger
+
+    def close(self) -> None:
+        if self._logger is not None:
+            for handler in list(self._logger.handlers):
+                handler.close()
+                self._logger.removeHandler(handler)
+            self._logger = None
+
+    def summary(self, limit: int = 50, order_by: str = "total_ms") -> dict:
+        """Aggregates by fingerprint, worst first."""
+        with self._lock:
+            statements = [entry.to_dict() for entry in self.statements.values()]
+        statements.sort(key=lambda entry: entry[order_by] or 0, reverse=True)
+        return {
+            "threshold_ms": self.threshold_seconds * 1000,
+            "log_path": self.path,
+            "fingerprints": len(statements),
+            "dropped": self.dropped,
+            "statements": statements[:limit]
+        }
+
+    def reset(self) -> None:
+        with self._lock:
+            self.statements.clear()
+            self.dropped = 0
+
+
+_slow_query_log: Optional[SlowQueryLog] = None
+
+
+def get_slow_query_log() -> SlowQueryLog:
+    global _slow_query_log
+    if _slow_query_log is None:
+        _slow_query_log = SlowQueryLog()
+    return _slow_query_log
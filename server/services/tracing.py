@@ -0,0 +1,444 @@
+import contextvars
+import functools
+import inspect
+import json
+import os
+import queue
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+from services.metrics import add_statement_observer, remove_statement_observer
+
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Share of new traces recorded (0 turns tracing off); a sampled parent from
+# an incoming traceparent header is always followed
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", 0))
+# "jsonl" (one span per line) or "otlp" (OTLP/HTTP JSON to a collector)
+TRACE_EXPORTER = os.getenv("TRACE_EXPORTER", "jsonl")
+TRACE_JSONL = os.getenv("TRACE_JSONL", os.path.join(BASE_DIR, "logs", "traces.jsonl"))
+OTLP_ENDPOINT = os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT", "http://localhost:4318")
+SERVICE_NAME = os.getenv("OTEL_SERVICE_NAME", "game-server")
+
+TRACE_QUEUE_MAX = 10000
+TRACE_BATCH_SIZE = 512
+TRACE_EXPORT_INTERVAL = 2.0
+STATEMENT_ATTRIBUTE_CHARS = 500
+
+INTERNAL = "internal"
+SERVER = "server"
+CLIENT = "client"
+_OTLP_KINDS = {INTERNAL: 1, SERVER: 2, CLIENT: 3}
+
+_TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+
+class Span:
+    """One timed operation. Attributes are only kept on sampled spans."""
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "kind", "start_ns", "end_ns",
+                 "attributes", "status", "status_message", "sampled")
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], kind: str = INTERNAL,
+                 sampled: bool = True, attributes: Optional[dict] = None):
+        self.trace_id = trace_id
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.attributes = dict(attributes) if attributes else {}
+        self.status = "unset"
+        self.status_message = None
+        self.sampled = sampled
+
+    def set_attribute(self, key: str, value) -> None:
+        if self.sampled and value is not None:
+            self.attributes[key] = value
+
+    def record_exception(self, error: BaseException) -> None:
+        self.status = "error"
+        self.status_message = str(error)[:200]
+        self.set_attribute("exception.type", type(error).__name__)
+
+    def end(self) -> None:
+        if self.end_ns is not None:
+            return
+        self.end_ns = time.time_ns()
+        if self.sampled:
+            get_exporter().export(self)
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+    def to_dict(self) -> dict:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent_id,
+            "name": self.name,
+            "kind": self.kind,
+            "start_time_unix_nano": self.start_ns,
+            "end_time_unix_nano": self.end_ns,
+            "duration_ms": round((self.end_ns - self.start_ns) / 1e6, 3),
+            "attributes": self.attributes,
+            "status": {"code": self.status, "message": self.status_message}
+        }
+
+
+class _UnsampledSpan(Span):
+    """Stands in for a trace that was not sampled, so its children aren't either."""
+
+    def __init__(self):
+        super().__init__("unsampled", "0" * 32, None, sampled=False)
+
+    def end(self) -> None:
+        pass
+
+
+UNSAMPLED = _UnsampledSpan()
+
+_current_span: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("current_span", default=None)
+
+
+def current_span() -> Optional[Span]:
+    """The active span, which may be UNSAMPLED; None outside any trace."""
+    return _current_span.get()
+
+
+def set_attribute(key: str, value) -> None:
+    """Set an attribute on the active span, if it is sampled."""
+    span = _current_span.get()
+    if span is not None:
+        span.set_attribute(key, value)
+
+
+def start_span(name: str, kind: str = INTERNAL, attributes: Optional[dict] = None,
+               parent: Optional[Span] = None, root: bool = True) -> Span:
+    """
+    Start a span under `parent` (default: the active span) without making it
+    active. With no parent, a new trace is sampled at TRACE_SAMPLE_RATE,
+    unless root=False, which only records work inside an existing trace.
+    """
+    if parent is None:
+        parent = _current_span.get()
+    if parent is None:
+        if not root or TRACE_SAMPLE_RATE <= 0 or random.random() >= TRACE_SAMPLE_RATE:
+            return UNSAMPLED
+        return Span(name, f"{random.getrandbits(128):032x}", None, kind, attributes=attributes)
+    if not parent.sampled:
+        return UNSAMPLED
+    return Span(name, parent.trace_id, parent.span_id, kind, attributes=attributes)
+
+
+@contextmanager
+def span(name: str, kind: str = INTERNAL, attributes: Optional[dict] = None,
+         parent: Optional[Span] = None, root: bool = True):
+    """Run the block in a new active span; exceptions mark it as failed."""
+    current = start_span(name, kind, attributes, parent, root)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.record_exception(e)
+        raise
+    finally:
+        _current_span.reset(token)
+        current.end()
+
+
+def traced(name: str, kind: str = INTERNAL, root: bool = True):
+    """Decorator running a sync or async function in a span."""
+    def decorate(function):
+        if inspect.iscoroutinefunction(function):
+            @functools.wraps(function)
+            async def traced_async(*args, **kwargs):
+                with span(name, kind, root=root):
+                    return await function(*args, **kwargs)
+            return traced_async
+
+        @functools.wraps(function)
+        def traced_sync(*args, **kwargs):
+            with span(name, kind, root=root):
+                return function(*args, **kwargs)
+        return traced_sync
+    return decorate
+
+
+def parse_traceparent(header: Optional[str]) -> Optional[Span]:
+    """A remote parent from a W3C traceparent header, or None if absent or malformed."""
+    match = _TRACEPARENT.match((header or "").strip().lower())
+    if not match or match.group(1) == "0" * 32:
+        return None
+    remote = Span("remote", match.group(1), None, sampled=bool(int(match.group(3), 16) & 1))
+    remote.span_id = match.group(2)
+    return remote
+
+
+class SpanExporter:
+    """
+    Batches finished spans on a background thread and writes them to a
+    JSONL file or posts them to an OTLP/HTTP collector. Spans are dropped,
+    not queued without bound, when the exporter falls behind.
+    """
+
+    def __init__(self, kind: str = TRACE_EXPORTER, path: str = TRACE_JSONL, endpoint: str = OTLP_ENDPOINT,
+                 service_name: str = SERVICE_NAME, max_queue: int = TRACE_QUEUE_MAX,
+                 batch_size: int = TRACE_BATCH_SIZE, interval: float = TRACE_EXPORT_INTERVAL):
+        if kind not in ("jsonl", "otlp"):
+            raise ValueError(f"Unknown trace exporter {kind!r}")
+        self.kind = kind
+        self.path = path
+        self.endpoint = endpoint.rstrip("/") + "/v1/traces"
+        self.service_name = service_name
+        self.batch_size = batch_size
+        self.interval = interval
+        self.counters = {"exported": 0, "dropped": 0, "failed": 0}
+        self.last_error = None
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self._lock = threading.Lock()
+        self._client = None
+
+    def export(self, span: Span) -> None:
+        if self._thread is None:
+            self._start()
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            self.counters["dropped"] += 1
+
+    def _start(self) -> None:
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="span-exporter", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            if batch:
+                self._write(batch)
+
+    def _next_batch(self) -> Optional[list]:
+        batch = []
+        deadline = time.monotonic() + self.interval
+        while len(batch) < self.batch_size:
+            try:
+                item = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+            except queue.Empty:
+                break
+            if item is None:
+                if batch:
+                    self._write(batch)
+                return None
+            batch.append(item)
+        return batch
+
+    def _write(self, batch: list) -> None:
+        try:
+            if self.kind == "jsonl":
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.writelines(json.dumps(span.to_dict(), default=str) + "\n" for span in batch)
+            else:
+                if self._client is None:
+                    import httpx
+                    self._client = httpx.Client(timeout=5.0)
+                response = self._client.post(self.endpoint, json=otlp_payload(batch, self.service_name))
+                response.raise_for_status()
+            self.counters["exported"] += len(batch)
+        except Exception as e:
+            self.counters["failed"] += len(batch)
+            if self.last_error is None:
+                print(f"Span export failed: {e}")
+            self.last_error = str(e)
+
+    def flush(self, timeout: float = 5.0) -> None:
+        """Export everything queued so far and stop the thread."""
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join(timeout)
+        self._thread = None
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+
+    def stats(self) -> dict:
+        return {
+            "sample_rate": TRACE_SAMPLE_RATE,
+            "exporter": self.kind,
+            "target": self.path if self.kind == "jsonl" else self.endpoint,
+            "queued": self._queue.qsize(),
+            **self.counters,
+            "last_error": self.last_error
+        }
+
+
+def _otlp_value(value) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def otlp_payload(spans: list, service_name: str = SERVICE_NAME) -> dict:
+    """An OTLP/HTTP JSON ExportTraceServiceRequest for finished spans."""
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": service_name}}]},
+            "scopeSpans": [{
+                "scope": {"name": "game-server.tracing"},
+                "spans": [{
+                    "traceId": span.trace_id,
+                    "spanId": span.span_id,
+                    **({"parentSpanId": span.parent_id} if span.parent_id else {}),
+                    "name": span.name,
+                    "kind": _OTLP_KINDS[span.kind],
+                    "startTimeUnixNano": str(span.start_ns),
+                    "endTimeUnixNano": str(span.end_ns),
+                    "attributes": [{"key": key, "value": _otlp_value(value)} for key, value in span.attributes.items()],
+                    "status": {"code": {"unset": 0, "ok": 1, "error": 2}[span.status],
+                               **({"message": span.status_message} if span.status_message else {})}
+                } for span in spans]
+            }]
+        }]
+    }
+
+
+_exporter: Optional[SpanExporter] = None
+
+
+def get_exporter() -> SpanExporter:
+    global _exporter
+    if _exporter is None:
+        _exporter = SpanExporter()
+    return _exporter
+
+
+def _user_id_from(args: tuple) -> Optional[str]:
+    """The player a socket event is about: a bare id, or playerId/fromUserId in the payload."""
+    if not args:
+        return None
+    first = args[0]
+    if isinstance(first, str):
+        return first
+    if isinstance(first, dict):
+        return first.get("playerId") or first.get("fromUserId") or first.get("user_id")
+    return None
+
+
+class TracingMiddleware:
+    """
+    ASGI middleware opening a server span per REST request, continuing the
+    caller's trace from a traceparent header. The span is named after the
+    route template once routing is done.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = scope.get("headers") or ()
+        if TRACE_SAMPLE_RATE <= 0 and not any(name == b"traceparent" for name, _ in headers):
+            # Nothing to continue and nothing to sample: no span to open
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(headers)
+        parent = parse_traceparent(headers.get(b"traceparent", b"").decode("latin-1"))
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        with span(f"{scope['method']} {scope['path']}", SERVER, parent=parent) as request_span:
+            try:
+                await self.app(scope, receive, send_with_status)
+            finally:
+                if request_span.sampled:
+                    route = getattr(scope.get("route"), "path", None)
+                    if route:
+                        request_span.name = f"{scope['method']} {route}"
+                    request_span.set_attribute("http.method", scope["method"])
+                    request_span.set_attribute("http.route", route)
+                    request_span.set_attribute("http.status_code", status)
+                    params = scope.get("path_params") or {}
+                    user_id = params.get("user_id")
+                    if user_id is None:
+                        query = scope.get("query_string", b"").decode("latin-1")
+                        user_id = next((value for key, _, value in (pair.partition("=") for pair in query.split("&"))
+                                        if key == "user_id"), None)
+                    request_span.set_attribute("user_id", user_id)
+                    if status >= 500:
+                        request_span.status = "error"
+
+
+def _traced_socket_handler(event_name: str, handler):
+    @functools.wraps(handler)
+    async def traced_handler(sid, *args):
+        if TRACE_SAMPLE_RATE <= 0:
+            # Socket events carry no incoming trace, so none would be sampled
+            return await handler(sid, *args)
+        with span(f"socket {event_name}", SERVER) as event_span:
+            if event_span.sampled:
+                event_span.set_attribute("socketio.event", event_name)
+                event_span.set_attribute("socketio.sid", sid)
+                event_span.set_attribute("user_id", _user_id_from(args))
+            return await handler(sid, *args)
+
+    traced_handler._traced = True
+    return traced_handler
+
+
+def trace_socketio(sio, namespace: str = "/", skip: tuple = ("connect", "disconnect")) -> None:
+    """Run every event handler registered on `sio` so far in its own server span."""
+    handlers = sio.handlers.get(namespace, {})
+    for event_name, handler in list(handlers.items()):
+        if event_name in skip or getattr(handler, "_traced", False):
+            continue
+        handlers[event_name] = _traced_socket_handler(event_name, handler)
+
+
+def _observe_statement(context, statement, parameters, elapsed, executemany, error):
+    parent = _current_span.get()
+    if parent is None or not parent.sampled:
+        return
+    verb = statement.lstrip()[:6].upper()
+    db_span = Span(f"db {verb}", parent.trace_id, parent.span_id, CLIENT, attributes={
+        "db.system": context.dialect.name,
+        "db.statement": " ".join(statement.split())[:STATEMENT_ATTRIBUTE_CHARS]
+    })
+    # The statement has already run; date the span from its measured time
+    db_span.start_ns -= int(elapsed * 1e9)
+    if error is not None:
+        db_span.record_exception(error)
+    db_span.end()
+
+
+def trace_database() -> None:
+    """Record each SQL statement run inside a sampled trace as a client span."""
+    add_statement_observer(_observe_statement)
+
+
+def untrace_database() -> None:
+    remove_statement_observer(_observe_statement)
@@ -71,7 +71,6 @@ class TransactionService:
         )
         self.db.add(transaction)
         self.db.commit()
-        self.db.refresh(transaction)
         return transaction
 
     def deposit(
@@ -103,7 +102,6 @@ class TransactionService:
         )
         self.db.add(transaction)
         self.db.commit()
-        self.db.refresh(transaction)
         return transaction
 
     def withdraw(
@@ -137,7 +135,6 @@ class TransactionService:
         )
         self.db.add(transaction)
         self.db.commit()
-        self.db.refresh(transaction)
         return transaction
 
     def collect_gold_bar(self, user_id: str) -> Transaction:
@@ -148,14 +145,13 @@ class TransactionService:
 
         transaction = Transaction(
             from_account_id=None,
-            to_account_id=treasure_chest.id,
+            to_account=treasure_chest,  # Keeps the account loaded for the caller
             amount=1,
             type="deposit",
             description="Gold bar collected from game"
         )
         self.db.add(transaction)
         self.db.commit()
-        self.db.refresh(transaction)
         return transaction
 
     def exchange_gold(
@@ -194,7 +190,6 @@ class TransactionService:
         )
         self.db.add(transaction)
         self.db.commit()
-        self.db.refresh(transaction)
         return transaction
 
     def send_money(
@@ -246,7 +241,6 @@ class TransactionService:
         )
         self.db.add(transaction)
         self.db.commit()
-        self.db.refresh(transaction)
         return transaction
 
     def get_transaction_history(self, user_id: str, limit: int = 50) -> list[Transaction]:
@@ -0,0 +1,188 @@
+import hashlib
+import os
+import threading
+import unicodedata
+import uuid
+from collections import OrderedDict
+from typing import BinaryIO, Optional
+
+
+# Default cache location and size bound for synthesized audio
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TTS_CACHE_DIR = os.getenv("TTS_CACHE_DIR", os.path.join(BASE_DIR, "tts_cache"))
+TTS_CACHE_MAX_BYTES = int(os.getenv("TTS_CACHE_MAX_BYTES", 200 * 1024 * 1024))
+
+AUDIO_SUFFIX = ".mp3"
+PARTIAL_SUFFIX = ".part"
+
+
+def normalize_text(text: str) -> str:
+    """Collapse whitespace and unicode forms so equivalent phrases share an entry."""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def cache_key(voice_id: str, model_id: str, text: str) -> str:
+    """Content address for one rendering of a phrase."""
+    material = f"{voice_id}\0{model_id}\0{normalize_text(text)}"
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class AudioCache:
+    """
+    Size-bounded LRU of audio files on disk.
+
+    The index (key -> size, in recency order) lives in memory and is rebuilt
+    from the directory on start, oldest access first. Files are written to a
+    temp name and renamed into place so readers never see partial audio.
+    Everything here touches the disk, so async callers run it in a thread.
+    """
+
+    def __init__(self, directory: str = TTS_CACHE_DIR, max_bytes: int = TTS_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.index: OrderedDict[str, int] = OrderedDict()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._load_index()
+
+    def path_for(self, key: str) -> str:
+        return os.path.join(self.directory, key + AUDIO_SUFFIX)
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached file path and mark it recently used, or None."""
+        with self._lock:
+            path = self.path_for(key) if key in self.index else None
+            if path is not None and not os.path.exists(path):
+                path = None
+            self._record_lookup(key, path is not None)
+        if path:
+            self._touch(path)
+        return path
+
+    def open(self, key: str) -> Optional[BinaryIO]:
+        """
+        Open the cached file for reading and mark it recently used, or None.
+
+        Unlike get(), the file is opened before the lock is released, so
+        eviction can't delete it between the lookup and the read; once open,
+        it reads to the end even if the entry is evicted meanwhile.
+        """
+        file = None
+        with self._lock:
+            if key in self.index:
+                try:
+                    file = open(self.path_for(key), "rb")
+                except OSError:
+                    pass
+            self._record_lookup(key, file is not None)
+        if file:
+            self._touch(file.name)
+        return file
+
+    def put(self, key: str, data: bytes) -> str:
+        """Store audio for key and return its path."""
+        writer = self.writer(key)
+        writer.write(data)
+        return writer.commit()
+
+    def writer(self, key: str) -> "CacheWriter":
+        """Open a writer that streams audio into the cache."""
+        return CacheWriter(self, key)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self.index),
+                "bytes": self.total_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses
+            }
+
+    def _record_lookup(self, key: str, found: bool) -> None:
+        """Count a hit (marking key recently used) or a miss, dropping an entry whose file is gone. Call with the lock held."""
+        if found:
+            self.index.move_to_end(key)
+            self.hits += 1
+            return
+        if key in self.index:
+            self.total_bytes -= self.index.pop(key)
+        self.misses += 1
+
+    def _touch(self, path: str) -> None:
+        try:
+            os.utime(path)  # Keeps recency across restarts
+        except OSError:
+            pass
+
+    def _add(self, key: str, size: int) -> None:
+        with self._lock:
+            if key in self.index:
+                self.total_bytes -= self.index.pop(key)
+            self.index[key] = size
+            self.total_bytes += size
+            while self.total_bytes > self.max_bytes and len(self.index) > 1:
+                old_key, old_size = self.index.popitem(last=False)
+                self.total_bytes -= old_size
+                try:
+                    os.remove(self.path_for(old_key))
+                except OSError:
+                    pass
+
+    def _load_index(self) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        entries = []
+        for entry in os.scandir(self.directory):
+            if not entry.is_file():
+                continue
+            if entry.name.endswith(PARTIAL_SUFFIX):
+                # Leftover temp file from an interrupted write
+                os.remove(entry.path)
+                continue
+            if not entry.name.endswith(AUDIO_SUFFIX):
+                continue
+            stat = entry.stat()
+            entries.append((stat.st_mtime, entry.name[:-len(AUDIO_SUFFIX)], stat.st_size))
+        for _, key, size in sorted(entries):
+            self._add(key, size)
+
+
+class CacheWriter:
+    """
+    Writes one cache entry; commit() publishes it, abort() discards it. The
+    temp file is only created by the first write, so a writer that is never
+    written to costs no disk I/O.
+    """
+
+    def __init__(self, cache: AudioCache, key: str):
+        self.cache = cache
+        self.key = key
+        self.size = 0
+        self.temp_path = os.path.join(cache.directory, f".{key}.{uuid.uuid4().hex}{PARTIAL_SUFFIX}")
+        self.file: Optional[BinaryIO] = None
+
+    def write(self, data: bytes) -> None:
+        if self.file is None:
+            self.file = open(self.temp_path, "wb")
+        self.file.write(data)
+        self.size += len(data)
+
+    def commit(self) -> str:
+        if self.file is None:
+            self.write(b"")
+        self.file.close()
+        path = self.cache.path_for(self.key)
+        os.replace(self.temp_path, path)
+        self.cache._add(self.key, self.size)
+        return path
+
+    def abort(self) -> None:
+        if self.file is None:
+            return
+        self.file.close()
+        try:
+            os.remove(self.temp_path)
+        except OSError:
+            pass
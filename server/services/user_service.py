@@ -1,4 +1,4 @@
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, joinedload
 from fastapi import HTTPException
 from models.user import User
 from models.account import Account
@@ -22,12 +22,7 @@ class UserService:
         if existing:
             raise HTTPException(status_code=409, detail="User already exists")
 
-        # Create user
-        user = User(id=user_id, name=name)
-        self.db.add(user)
-        self.db.flush()
-
-        # Create default accounts
+        # Create user with default accounts
         accounts = [
             Account(
                 user_id=user_id,
@@ -54,30 +49,36 @@ class UserService:
                 balance=DEFAULT_CREDIT_CARD_BALANCE
             ),
         ]
-        for account in accounts:
-            self.db.add(account)
-
+        user = User(id=user_id, name=name, accounts=accounts)
+        self.db.add(user)
         self.db.commit()
-        self.db.refresh(user)
         return user
 
     def get_user(self, user_id: str) -> User:
         """Get user by ID."""
-        user = self.db.query(User).filter(User.id == user_id).first()
+        user = self.db.get(User, user_id)
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
         return user
 
     def get_user_with_accounts(self, user_id: str) -> User:
-        """Get user with all accounts."""
-        user = self.get_user(user_id)
-        # Eager load accounts
-        _ = user.accounts
+        """Get user with all accounts, in one query."""
+        user = self.db.query(User).options(joinedload(User.accounts)).filter(User.id == user_id).first()
+        if not user:
+            raise HTTPException(status_code=404, detail="User not found")
         return user
 
+    def get_users_with_accounts(self, user_ids: list[str]) -> dict[str, User]:
+        """Get several users with their accounts in one query, keyed by user ID."""
+        users = self.db.query(User).options(joinedload(User.accounts)).filter(User.id.in_(user_ids)).all()
+        found = {user.id: user for user in users}
+        if len(found) < len(set(user_ids)):
+            raise HTTPException(status_code=404, detail="User not found")
+        return found
+
     def get_or_create_user(self, user_id: str, name: str) -> tuple[User, bool]:
-        """Get existing user or create new one. Returns (user, created)."""
-        user = self.db.query(User).filter(User.id == user_id).first()
+        """Get existing user (accounts loaded) or create new one. Returns (user, created)."""
+        user = self.db.query(User).options(joinedload(User.accounts)).filter(User.id == user_id).first()
         if user:
             self._ensure_default_accounts(user)
             return user, False
@@ -95,7 +96,7 @@ class UserService:
         for account_type, name, balance in required_accounts:
             if account_type in existing_types:
                 continue
-            self.db.add(
+            user.accounts.append(
                 Account(
                     user_id=user.id,
                     type=account_type,
@@ -1,11 +1,12 @@
 import pytest
 import sys
 import os
+from contextlib import contextmanager
 
 # Add parent directory to path for imports
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from sqlalchemy import create_engine
+from sqlalchemy import StaticPool, create_engine
 from sqlalchemy.orm import sessionmaker
 from database import Base
 from models import User, Account, Transaction, Environment
@@ -54,3 +55,68 @@ def sample_users(db_session):
     user1 = service.create_user("user_1", "Alice")
     user2 = service.create_user("user_2", "Bob")
     return [user1, user2]
+
+
+@pytest.fixture
+def query_budget():
+    """
+    Context manager failing the test if its block runs more than `limit`
+    SQL statements, e.g. `with query_budget(3): ...`.
+    """
+    from services.metrics import instrument_database, track_queries
+    instrument_database()
+
+    @contextmanager
+    def budget(limit: int, handler: str = "test"):
+        with track_queries(handler) as usage:
+            yield usage
+        assert usage.queries <= limit, f"Query budget of {limit} exceeded. {usage.describe()}"
+
+    return budget
+
+
+# Voice command executors open their own sessions from worker threads, so
+# share one connection
+voice_engine = create_engine(
+    TEST_DATABASE_URL,
+    connect_args={"check_same_thread": False},
+    poolclass=StaticPool
+)
+VoiceSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=voice_engine)
+
+
+@pytest.fixture(scope="function")
+def voice_db(monkeypatch):
+    """Point the voice command module at a fresh in-memory database."""
+    from controllers import voice_command
+
+    Base.metadata.create_all(bind=voice_engine)
+    monkeypatch.setattr(voice_command, "SessionLocal", VoiceSessionLocal)
+    session = VoiceSessionLocal()
+    yield session
+    session.close()
+    Base.metadata.drop_all(bind=voice_engine)
+
+
+@pytest.fixture(scope="function")
+def voice_client(voice_db, monkeypatch):
+    """Test client with Gemini replaced by the keyword parser."""
+    from fastapi.testclient import TestClient
+    from controllers import voice_command
+    from main import app
+
+    async def fake_gemini(transcript):
+        result = voice_command.parse_command_with_keywords(transcript)
+        result["parser"] = "keywords"
+        return result
+
+    monkeypatch.setattr(voice_command, "parse_command_with_gemini", fake_gemini)
+
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def voice_user(voice_db):
+    from services.user_service import UserService
+    return UserService(voice_db).create_user("voice_user", "Voice User")
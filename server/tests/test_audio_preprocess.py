@@ -0,0 +1,167 @@
+import io
+import wave
+
+import numpy as np
+
+from services.audio_preprocess import (
+    RESAMPLE_TAPS, TARGET_SAMPLE_RATE, StreamResampler, StreamingEndpointer, decode_wav, downmix, encode_wav, noise_gate,
+    preprocess_wav, resample, trim_silence
+)
+
+
+def make_wav(samples: np.ndarray, rate: int) -> bytes:
+    """16-bit PCM WAV from float samples shaped (frames,) or (frames, channels)."""
+    if samples.ndim == 1:
+        samples = samples[:, None]
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(samples.shape[1])
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes((samples * 32767).astype("<i2").tobytes())
+    return buffer.getvalue()
+
+
+def tone(seconds: float, rate: int, level: float = 0.5, freq: float = 440.0) -> np.ndarray:
+    t = np.arange(int(seconds * rate)) / rate
+    return (level * np.sin(2 * np.pi * freq * t)).astype(np.float32)
+
+
+def silence(seconds: float, rate: int, level: float = 0.001) -> np.ndarray:
+    rng = np.random.default_rng(0)
+    return (level * rng.standard_normal(int(seconds * rate))).astype(np.float32)
+
+
+class TestAudioPreprocess:
+    """Tests for the WAV preprocessing stage in front of speech-to-text."""
+
+    def test_decode_round_trip(self):
+        """Test 16-bit PCM decodes to the same samples it was encoded from."""
+        samples = tone(0.1, 16000)
+        decoded, rate = decode_wav(encode_wav(samples, 16000))
+
+        assert rate == 16000
+        assert decoded.shape == (len(samples), 1)
+        assert np.max(np.abs(decoded[:, 0] - samples)) < 1e-3
+
+    def test_decode_rejects_non_wav(self):
+        """Test arbitrary bytes are not treated as WAV."""
+        assert decode_wav(b"ID3 not a wav file") is None
+
+    def test_downmix_and_resample(self):
+        """Test stereo 48 kHz becomes mono 16 kHz of the same duration."""
+        stereo = np.stack([tone(1.0, 48000), tone(1.0, 48000)], axis=1)
+
+        mono = resample(downmix(stereo), 48000)
+
+        assert mono.ndim == 1
+        assert len(mono) == TARGET_SAMPLE_RATE
+        assert 0.4 < np.max(np.abs(mono)) < 0.6
+
+    def test_resample_filters_aliasing(self):
+        """Test content above the new Nyquist frequency is removed, not folded down."""
+        high = tone(1.0, 48000, freq=12000)
+
+        assert np.max(np.abs(resample(high, 48000)[100:-100])) < 0.05
+
+    def test_stream_resampler_is_continuous(self):
+        """Test 20 ms chunks resample like one signal: right length, no seams, no aliasing."""
+        for rate in (8000, 11025, 44100, 48000):
+            samples = tone(1.0, rate, freq=300)
+            if rate > TARGET_SAMPLE_RATE:
+                samples += tone(1.0, rate, freq=12000)
+            resampler = StreamResampler(rate)
+            output = np.concatenate([resampler.feed(samples[start:start + rate // 50])
+                                     for start in range(0, len(samples), rate // 50)])
+
+            # Downsampling is delayed by the low-pass filter
+            delay = RESAMPLE_TAPS // 2 / rate if rate > TARGET_SAMPLE_RATE else 0
+            expected = 0.5 * np.sin(2 * np.pi * 300 * (np.arange(len(output)) / TARGET_SAMPLE_RATE - delay))
+            assert abs(len(output) - TARGET_SAMPLE_RATE) <= 1
+            assert np.max(np.abs(output - expected)[100:]) < 0.01
+
+    def test_trim_silence(self):
+        """Test leading and trailing silence is cut, keeping a little padding."""
+        rate = TARGET_SAMPLE_RATE
+        samples = np.concatenate([silence(2.0, rate), tone(1.0, rate), silence(3.0, rate)])
+
+        trimmed = trim_silence(samples, rate)
+
+        assert 1.0 <= len(trimmed) / rate <= 1.5
+
+    def test_trim_keeps_audio_without_speech(self):
+        """Test a clip with no detectable speech is left alone."""
+        samples = silence(1.0, TARGET_SAMPLE_RATE)
+
+        assert len(trim_silence(samples, TARGET_SAMPLE_RATE)) == len(samples)
+
+    def test_noise_gate(self):
+        """Test quiet frames are attenuated and loud ones pass."""
+        rate = TARGET_SAMPLE_RATE
+        samples = np.concatenate([silence(0.5, rate, level=0.005), tone(0.5, rate)])
+
+        gated = noise_gate(samples, rate, -40.0)
+
+        assert np.max(np.abs(gated[:rate // 4])) < np.max(np.abs(samples[:rate // 4])) / 5
+        assert np.allclose(gated[-rate // 4:], samples[-rate // 4:])
+
+    def test_preprocess_wav(self):
+        """Test a padded stereo 44.1 kHz clip shrinks to trimmed 16 kHz mono."""
+        rate = 44100
+        clip = np.concatenate([silence(2.0, rate), tone(1.0, rate), silence(2.0, rate)])
+        data = make_wav(np.stack([clip, clip], axis=1), rate)
+
+        output, stats = preprocess_wav(data, noise="high")
+        decoded, output_rate = decode_wav(output)
+
+        assert output_rate == TARGET_SAMPLE_RATE
+        assert decoded.shape[1] == 1
+        assert stats["input_channels"] == 2
+        assert stats["input_seconds"] == 5.0
+        assert stats["output_seconds"] < 1.5
+        assert stats["output_bytes"] < stats["input_bytes"] / 10
+        assert stats["noise_gate_db"] is not None
+
+    def test_preprocess_non_wav(self):
+        """Test non-WAV input is reported as unprocessed."""
+        assert preprocess_wav(b"RIFF0000junk") is None
+
+
+class TestStreamingEndpointer:
+    """Tests for live VAD endpointing."""
+
+    def feed_in_chunks(self, endpointer, samples, chunk=320):
+        events = []
+        for start in range(0, len(samples), chunk):
+            events.extend(endpointer.feed(samples[start:start + chunk]))
+        return events
+
+    def test_segments_on_pause_and_ends_on_silence(self):
+        """Test a pause closes a segment and trailing silence ends the utterance."""
+        rate = TARGET_SAMPLE_RATE
+        samples = np.concatenate([silence(0.5, rate), tone(1.0, rate), silence(1.0, rate)])
+
+        events = self.feed_in_chunks(StreamingEndpointer(), samples)
+
+        assert [event for event, _ in events] == ["start", "segment", "end"]
+        assert 1.0 <= len(events[1][1]) / rate <= 1.6
+        assert events[2][1] is None
+
+    def test_flush_returns_tail(self):
+        """Test ending early hands back the unsent speech."""
+        rate = TARGET_SAMPLE_RATE
+        endpointer = StreamingEndpointer()
+        self.feed_in_chunks(endpointer, np.concatenate([silence(0.5, rate), tone(0.5, rate)]))
+
+        events = endpointer.flush()
+
+        assert events[0][0] == "end"
+        assert len(events[0][1]) / rate >= 0.5
+        assert not endpointer.speaking
+        assert endpointer.flush() == []
+
+    def test_noise_alone_is_not_speech(self):
+        """Test steady background noise never starts an utterance."""
+        samples = silence(3.0, TARGET_SAMPLE_RATE, level=0.05)
+
+        assert self.feed_in_chunks(StreamingEndpointer(), samples) == []
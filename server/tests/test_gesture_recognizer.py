@@ -0,0 +1,140 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from services.gesture_recognizer import WINDOW_SECONDS, GestureEngine, GestureRecognizer, banded_dtw
+from services.imu_telemetry import SAMPLE_DTYPE, TelemetryStore, pack_batch
+
+RATE = 250
+WINDOW = int(WINDOW_SECONDS * RATE)
+
+
+def times(seconds: float) -> np.ndarray:
+    return np.arange(int(seconds * RATE)) / RATE
+
+
+def swipe(axis: int, sign: float, seconds: float = 0.3, amplitude: float = 300) -> np.ndarray:
+    gyro = np.zeros((int(seconds * RATE), 3))
+    gyro[:, axis] = sign * amplitude * np.sin(np.pi * times(seconds) / seconds)
+    return gyro
+
+
+def circle(direction: float, seconds: float = 0.8, amplitude: float = 250) -> np.ndarray:
+    phase = 2 * np.pi * times(seconds) / seconds
+    gyro = np.zeros((len(phase), 3))
+    gyro[:, 2] = amplitude * np.sin(phase)
+    gyro[:, 1] = direction * amplitude * np.cos(phase)
+    return gyro
+
+
+def shake(seconds: float = 0.8, hz: float = 5) -> np.ndarray:
+    gyro = np.zeros((int(seconds * RATE), 3))
+    gyro[:, 2] = 400 * np.sin(2 * np.pi * hz * times(seconds))
+    return gyro
+
+
+def window(motion: np.ndarray = None, tail: float = 0.2, seed: int = 0) -> np.ndarray:
+    """A WINDOW-sample gyro window with motion ending `tail` seconds before the newest sample."""
+    rng = np.random.default_rng(seed)
+    gyro = rng.normal(0, 2, (WINDOW, 3))
+    if motion is not None:
+        end = WINDOW - int(tail * RATE)
+        gyro[end - len(motion):end] += motion
+    return gyro
+
+
+def resting_accel(batch: int) -> np.ndarray:
+    accel = np.zeros((batch, WINDOW, 3))
+    accel[..., 2] = 1.0
+    return accel
+
+
+def to_samples(gyro: np.ndarray, start_index: int = 0) -> np.ndarray:
+    samples = np.zeros(len(gyro), dtype=SAMPLE_DTYPE)
+    samples["t_us"] = (start_index + np.arange(len(gyro))) * 4000
+    samples["accel"][:, 2] = 16384
+    samples["gyro"] = np.round(gyro * 131).clip(-32768, 32767)
+    return samples
+
+
+class TestGestureRecognizer:
+    """Tests for vectorized gesture classification."""
+
+    def test_classifies_a_batch_of_gestures(self):
+        """Test every gesture in one batch, alongside windows with no gesture."""
+        cases = {
+            "swipe_right": window(swipe(2, 1)),
+            "swipe_left": window(swipe(2, -1, seconds=0.5, amplitude=200)),
+            "swipe_up": window(swipe(1, 1)),
+            "swipe_down": window(swipe(1, -1, seconds=0.2, amplitude=400)),
+            "circle_clockwise": window(circle(1)),
+            "circle_counterclockwise": window(circle(-1, seconds=1.0, amplitude=180)),
+            "shake": window(shake()),
+            "hold": window(),
+            None: window(swipe(2, 1), tail=0.0),  # Still moving
+        }
+        gyro = np.stack(list(cases.values()))
+
+        results = GestureRecognizer().classify(gyro, resting_accel(len(cases)))
+
+        assert [result and result["gesture"] for result in results] == list(cases)
+
+    def test_slow_motion_is_not_a_gesture(self):
+        """Test drift below the motion threshold is ignored."""
+        gyro = window(swipe(2, 1, seconds=0.5, amplitude=40))[None]
+
+        assert GestureRecognizer().classify(gyro, resting_accel(1)) == [None]
+
+    def test_banded_dtw_tolerates_time_warp(self):
+        """Test a time-warped copy is much closer than a different shape."""
+        t = np.linspace(0, 1, 40)
+        template = np.stack([np.sin(np.pi * t), np.zeros(40), np.zeros(40)], axis=1)
+        warped = np.stack([np.sin(np.pi * t ** 1.3), np.zeros(40), np.zeros(40)], axis=1)
+        other = np.stack([np.zeros(40), np.sin(np.pi * t), np.zeros(40)], axis=1)
+
+        distances = banded_dtw(np.stack([warped, other]), template[None])
+
+        assert distances[0, 0] < 0.1
+        assert distances[1, 0] > 4 * distances[0, 0]
+
+
+class TestGestureEngine:
+    """Tests for live gesture detection over telemetry."""
+
+    @pytest.fixture
+    def engine(self):
+        published = []
+
+        async def publish(user_id, event, payload):
+            published.append((user_id, event, payload))
+
+        engine = GestureEngine(TelemetryStore(buffer_seconds=4))
+        engine.set_publisher(publish)
+        engine.published = published
+        return engine
+
+    def feed(self, engine, device_id, gyro):
+        for seq, offset in enumerate(range(0, len(gyro), 25)):
+            engine.store.ingest(pack_batch(device_id, seq, to_samples(gyro[offset:offset + 25], offset)))
+            asyncio.run(engine.tick())
+
+    def test_publishes_each_gesture_once(self, engine):
+        """Test a shake is published once to the bound user with its action."""
+        engine.bind("glove-1", "player-1")
+        self.feed(engine, "glove-1", np.concatenate([window(), shake(), window()[:100]]))
+
+        assert [(user, event, payload["gesture"]) for user, event, payload in engine.published] == [
+            ("player-1", "gesture", "shake")
+        ]
+        assert engine.published[0][2]["action"] == "activate_voice"
+
+    def test_hold_needs_motion_first(self, engine):
+        """Test a glove that starts still reports hold only after it has moved."""
+        still = window()
+        self.feed(engine, "glove-2", np.concatenate([still, swipe(2, 1), still, still]))
+
+        gestures = [payload["gesture"] for _, _, payload in engine.published]
+        assert gestures == ["swipe_right", "hold"]
+        assert engine.published[0][0] == "glove-2"
+        assert engine.stats()["events"] == 2
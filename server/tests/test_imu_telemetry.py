@@ -0,0 +1,139 @@
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from services import imu_telemetry
+from services.imu_telemetry import (
+    CLOCK_WRAP, SAMPLE_DTYPE, ImuRingBuffer, TelemetryDatagramProtocol, TelemetryError, TelemetryStore,
+    pack_batch, parse_batch
+)
+
+
+def make_samples(n: int, start_us: int = 0, period_us: int = 4000) -> np.ndarray:
+    """n samples at 250 Hz with accel x = 1 g and gyro z counting up in LSBs."""
+    samples = np.zeros(n, dtype=SAMPLE_DTYPE)
+    samples["t_us"] = (start_us + np.arange(n, dtype=np.int64) * period_us) % CLOCK_WRAP
+    samples["accel"][:, 0] = 16384
+    samples["gyro"][:, 2] = np.arange(n) % 30000
+    return samples
+
+
+@pytest.fixture
+def store(monkeypatch):
+    """A small store installed as the shared one."""
+    store = TelemetryStore(buffer_seconds=2, sample_rate=250, max_devices=2)
+    monkeypatch.setattr(imu_telemetry, "telemetry_store", store)
+    return store
+
+
+class TestImuTelemetry:
+    """Tests for the IMU packet format and ring buffers."""
+
+    def test_packet_round_trip(self):
+        """Test a packed batch parses back to the same samples."""
+        samples = make_samples(25)
+
+        device_id, seq, parsed = parse_batch(pack_batch("glove-1", 7, samples))
+
+        assert device_id == "glove-1"
+        assert seq == 7
+        assert np.array_equal(parsed, samples)
+
+    def test_rejects_malformed_packets(self):
+        """Test truncated packets and bad magic are refused."""
+        packet = pack_batch("glove-1", 0, make_samples(4))
+
+        with pytest.raises(TelemetryError):
+            parse_batch(packet[:-1])
+        with pytest.raises(TelemetryError):
+            parse_batch(b"XXXX" + packet[4:])
+
+    def test_ring_buffer_wraps(self):
+        """Test the buffer keeps the newest samples in order across the wrap point."""
+        ring = ImuRingBuffer(capacity=100)
+        for start in range(0, 250, 50):
+            ring.write(make_samples(50, start_us=start * 4000))
+
+        latest = ring.latest(1000)
+
+        assert ring.count == 100
+        assert ring.total == 250
+        assert np.array_equal(latest["t_us"], np.arange(150, 250) * 4000)
+        assert np.allclose(latest["accel"][:, 0], 1.0)
+        assert np.allclose(latest["gyro"][:, 2], np.tile(np.arange(50), 2) / 131.0)
+
+    def test_unwraps_device_clock(self):
+        """Test the micros() overflow and a reboot keep timestamps increasing."""
+        ring = ImuRingBuffer(capacity=100)
+        ring.write(make_samples(10, start_us=CLOCK_WRAP - 5 * 4000))
+        ring.write(make_samples(10, start_us=5 * 4000))
+        ring.write(make_samples(10, start_us=0))
+
+        t_us = ring.latest(30)["t_us"]
+
+        assert np.all(np.diff(t_us) == 4000)
+
+    def test_window(self):
+        """Test a window covers the requested span back from the newest sample."""
+        ring = ImuRingBuffer(capacity=500)
+        ring.write(make_samples(500))
+
+        window = ring.window(0.5)
+
+        assert len(window["t_us"]) == 126
+        assert window["t_us"][-1] == 499 * 4000
+
+    def test_store_counts_lost_batches_and_device_limit(self, store):
+        """Test sequence gaps are counted and extra devices are refused."""
+        store.ingest(pack_batch("a", 0, make_samples(10)))
+        store.ingest(pack_batch("a", 3, make_samples(10, start_us=40000)))
+        store.ingest(pack_batch("b", 0, make_samples(10)))
+
+        with pytest.raises(TelemetryError):
+            store.ingest(pack_batch("c", 0, make_samples(10)))
+
+        stats = store.stats()
+        assert stats["devices"]["a"]["samples"] == 20
+        assert stats["devices"]["a"]["lost_batches"] == 2
+        assert stats["rejected_packets"] == 1
+
+    def test_udp_protocol(self, store):
+        """Test datagrams are stored and garbage is dropped quietly."""
+        protocol = TelemetryDatagramProtocol(store)
+        protocol.datagram_received(pack_batch("udp-glove", 0, make_samples(50)), ("127.0.0.1", 9))
+        protocol.datagram_received(b"junk", ("127.0.0.1", 9))
+
+        assert store.latest("udp-glove", 100)["t_us"].shape == (50,)
+        assert store.stats()["rejected_packets"] == 1
+
+
+class TestTelemetryApi:
+    """Tests for the telemetry ingest and query endpoints."""
+
+    @pytest.fixture
+    def telemetry_client(self, store):
+        from main import app
+        with TestClient(app) as test_client:
+            yield test_client
+
+    def test_websocket_ingest_and_window(self, telemetry_client, store):
+        """Test batches sent over the WebSocket can be queried back."""
+        with telemetry_client.websocket_connect("/api/telemetry/ingest") as ws:
+            for seq in range(10):
+                ws.send_bytes(pack_batch("ws-glove", seq, make_samples(25, start_us=seq * 25 * 4000)))
+            ws.send_bytes(b"junk")
+            assert ws.receive_json()["type"] == "error"
+
+        response = telemetry_client.get("/api/telemetry/devices/ws-glove/window?seconds=0.2&max_points=20")
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["samples"] == 17
+        assert data["stride"] == 3
+        assert data["t_us"][-1] == 249 * 4000
+        assert data["accel"][0] == [1.0, 0.0, 0.0]
+        assert telemetry_client.get("/api/telemetry/devices").json()["devices"]["ws-glove"]["batches"] == 10
+
+    def test_unknown_device(self, telemetry_client):
+        """Test querying a device with no telemetry returns 404."""
+        assert telemetry_client.get("/api/telemetry/devices/nobody/window").status_code == 404
@@ -0,0 +1,88 @@
+import asyncio
+import pytest
+from services.job_queue import JobQueue, JobQueueFull
+
+
+class TestJobQueue:
+    """Tests for the bounded background job pool."""
+
+    def test_runs_jobs(self):
+        """Test submitted jobs run and keep their results."""
+        async def handler(job_id, payload):
+            return {"job": job_id, "doubled": payload["n"] * 2}
+
+        async def scenario():
+            queue = JobQueue("test", handler, workers=2)
+            job_ids = [queue.submit({"n": n}) for n in range(5)]
+            await queue._queue.join()
+            jobs = [queue.get_job(job_id) for job_id in job_ids]
+            stats = queue.stats()
+            await queue.stop()
+            return jobs, stats
+
+        jobs, stats = asyncio.run(scenario())
+
+        assert [job["result"]["doubled"] for job in jobs] == [0, 2, 4, 6, 8]
+        assert all(job["status"] == "done" for job in jobs)
+        assert stats["completed"] == 5
+        assert stats["depth"] == 0
+        assert stats["service_time_p50"] is not None
+
+    def test_rejects_when_full(self):
+        """Test submit fails fast once max_depth jobs are waiting."""
+        async def handler(job_id, payload):
+            await asyncio.sleep(1)
+
+        async def scenario():
+            queue = JobQueue("test", handler, workers=1, max_depth=2)
+            queue.submit({})
+            queue.submit({})
+            with pytest.raises(JobQueueFull):
+                queue.submit({})
+            stats = queue.stats()
+            await queue.stop()
+            return stats
+
+        stats = asyncio.run(scenario())
+
+        assert stats["rejected"] == 1
+        assert stats["submitted"] == 2
+
+    def test_failed_job(self):
+        """Test handler errors mark the job failed without killing the worker."""
+        async def handler(job_id, payload):
+            if payload["fail"]:
+                raise ValueError("bad input")
+            return {"ok": True}
+
+        async def scenario():
+            queue = JobQueue("test", handler, workers=1)
+            failed = queue.submit({"fail": True})
+            ok = queue.submit({"fail": False})
+            await queue._queue.join()
+            result = queue.get_job(failed), queue.get_job(ok)
+            await queue.stop()
+            return result
+
+        failed, ok = asyncio.run(scenario())
+
+        assert failed["status"] == "failed"
+        assert failed["error"] == "bad input"
+        assert ok["status"] == "done"
+
+    def test_keeps_bounded_results(self):
+        """Test old job records are evicted."""
+        async def handler(job_id, payload):
+            return {}
+
+        async def scenario():
+            queue = JobQueue("test", handler, keep_results=3)
+            job_ids = [queue.submit({}) for _ in range(5)]
+            await queue._queue.join()
+            await queue.stop()
+            return queue, job_ids
+
+        queue, job_ids = asyncio.run(scenario())
+
+        assert queue.get_job(job_ids[0]) is None
+        assert queue.get_job(job_ids[-1]) is not None
@@ -0,0 +1,179 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from database import Base
+from services import metrics
+from services.metrics import MetricsRegistry, current_usage, instrument_database
+from services.provider_health import ProviderHealth
+from services.user_service import UserService
+
+
+def sample(body: str, line_start: str) -> float:
+    for line in body.splitlines():
+        if line.startswith(line_start + " "):
+            return float(line.rsplit(" ", 1)[1])
+    raise AssertionError(f"{line_start} not in metrics output")
+
+
+class FakeServer:
+    def __init__(self):
+        self.handlers = {"/": {}}
+        self.eio = type("FakeEngineIO", (), {"sockets": {"sid1": None, "sid2": None, "sid3": None}})()
+
+    def event(self, handler):
+        self.handlers["/"][handler.__name__] = handler
+        return handler
+
+
+class TestMetricsRegistry:
+    """Tests for the metric types and the text exposition format."""
+
+    def test_render_counter_gauge_histogram(self):
+        """Test each metric type renders with cumulative buckets and escaped labels."""
+        registry = MetricsRegistry()
+        requests = registry.counter("requests", "Requests served.", ("path",))
+        in_flight = registry.gauge("in_flight", "Requests running.")
+        latency = registry.histogram("latency_seconds", "Latency.", buckets=(0.1, 1))
+
+        requests.labels('a"b').inc()
+        requests.labels('a"b').inc(2)
+        in_flight.inc()
+        for value in (0.05, 0.1, 0.5, 3):
+            latency.observe(value)
+
+        body = registry.render()
+        assert "# TYPE requests counter" in body
+        assert sample(body, 'requests_total{path="a\\"b"}') == 3
+        assert sample(body, "in_flight") == 1
+        assert sample(body, 'latency_seconds_bucket{le="0.1"}') == 2
+        assert sample(body, 'latency_seconds_bucket{le="1"}') == 3
+        assert sample(body, 'latency_seconds_bucket{le="+Inf"}') == 4
+        assert sample(body, "latency_seconds_count") == 4
+        assert sample(body, "latency_seconds_sum") == pytest.approx(3.65)
+
+    def test_gauge_function_read_at_scrape(self):
+        """Test a function gauge reflects the current value on each render."""
+        registry = MetricsRegistry()
+        players = {}
+        registry.gauge("players", "Players.", function=lambda: len(players))
+
+        assert sample(registry.render(), "players") == 0
+        players["p1"] = {"sid"}
+        assert sample(registry.render(), "players") == 1
+
+    def test_rejects_duplicates_and_wrong_labels(self):
+        """Test names are unique and label counts are checked."""
+        registry = MetricsRegistry()
+        counter = registry.counter("requests", "Requests.", ("path",))
+
+        with pytest.raises(ValueError):
+            registry.counter("requests", "Again.")
+        with pytest.raises(ValueError):
+            counter.labels("a", "b")
+
+
+class TestInstrumentation:
+    """Tests for the REST, socket, database and provider hooks."""
+
+    def test_socket_handler_timed_with_query_count(self, monkeypatch):
+        """Test a wrapped socket handler records latency and its SQL statements."""
+        for gauge in (metrics.socketio_connected_sockets, metrics.socketio_connected_players,
+                      metrics.socketio_player_sockets):
+            monkeypatch.setattr(gauge, "function", gauge.function)
+        instrument_database()
+        engine = create_engine("sqlite:///:memory:")
+        server = FakeServer()
+
+        @server.event
+        async def connect(sid, environ):
+            pass
+
+        @server.event
+        async def countQueries(sid, data):
+            with engine.connect() as connection:
+                for _ in range(3):
+                    connection.execute(text("SELECT 1"))
+            return current_usage().queries
+
+        metrics.instrument_socketio(server, {"player": {"sid1", "sid2"}})
+        handlers = server.handlers["/"]
+
+        assert handlers["connect"] is connect
+        assert asyncio.run(handlers["countQueries"]("sid1", {})) == 3
+        assert current_usage() is None
+        body = metrics.render_metrics()
+        assert sample(body, 'socketio_event_duration_seconds_count{event="countQueries"}') == 1
+        assert sample(body, 'db_queries_per_request_bucket{handler="socket countQueries",le="3"}') == 1
+        assert sample(body, 'db_queries_per_request_bucket{handler="socket countQueries",le="2"}') == 0
+        assert sample(body, 'socketio_events_in_flight{event="countQueries"}') == 0
+        assert sample(body, "socketio_connected_players") == 1
+        assert sample(body, "socketio_player_sockets") == 2
+        assert sample(body, "socketio_connected_sockets") == 3
+
+    def test_statements_timed_only_inside_requests(self):
+        """Test every execute style is counted in a request, and statements outside one are left alone."""
+        instrument_database()
+        engine = create_engine("sqlite:///:memory:")
+        selects = metrics.db_query_duration.labels("select")
+
+        with engine.connect() as connection:
+            connection.execute(text("CREATE TABLE t (x INTEGER)"))
+            before = selects.count
+            connection.execute(text("SELECT 1"))
+            assert selects.count == before
+
+            with metrics.track_queries() as usage:
+                connection.execute(text("SELECT 1"))
+                connection.execute(text("SELECT x FROM t WHERE x = :x"), {"x": 1})
+                connection.execute(text("INSERT INTO t VALUES (:x)"), [{"x": 1}, {"x": 2}])
+            assert connection.execute(text("SELECT count(*) FROM t")).scalar() == 2
+
+        assert usage.queries == 3
+        assert selects.count == before + 2
+
+    def test_commit_latency_recorded(self):
+        """Test session commits are timed."""
+        instrument_database()
+        engine = create_engine("sqlite:///:memory:")
+        Base.metadata.create_all(bind=engine)
+        before = metrics.db_commit_duration.labels().count
+
+        session = sessionmaker(bind=engine)()
+        UserService(session).create_user("metrics_user", "Metrics")
+        session.close()
+
+        assert metrics.db_commit_duration.labels().count > before
+
+    def test_provider_latency_by_outcome(self):
+        """Test provider calls are recorded with their outcome, slow calls as errors."""
+        health = ProviderHealth("metrics_test", slow_call_seconds=1.0)
+        health.record_success(0.2)
+        health.record_success(2.0)
+        health.record_failure(0.3, "boom")
+
+        body = metrics.render_metrics()
+        assert sample(body, 'provider_request_duration_seconds_count{provider="metrics_test",outcome="ok"}') == 1
+        assert sample(body, 'provider_request_duration_seconds_count{provider="metrics_test",outcome="error"}') == 2
+
+    def test_metrics_endpoint_labels_route_template(self):
+        """Test REST latency is labelled by route template, not the raw path."""
+        from main import app
+
+        with TestClient(app) as client:
+            client.get("/api/diagnostics/providers")
+            client.get("/api/telemetry/devices/no-such-glove/window")
+            response = client.get("/metrics")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+        body = response.text
+        assert sample(
+            body, 'http_request_duration_seconds_count{method="GET",route="/api/diagnostics/providers",status="200"}'
+        ) >= 1
+        assert 'route="/api/telemetry/devices/{device_id}/window",status="404"' in body
+        assert "no-such-glove" not in body
+        assert "socketio_connected_sockets" in body
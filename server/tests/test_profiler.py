@@ -0,0 +1,175 @@
+import asyncio
+import json
+import pstats
+import time
+
+import pytest
+from fastapi import APIRouter, FastAPI
+from fastapi.testclient import TestClient
+
+from services import profiler as profiler_module
+from services.profiler import ProfiledRoute, Profiler, ProfilingMiddleware
+
+
+def busy_wait(seconds: float):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+@pytest.fixture
+def profiler(tmp_path, monkeypatch):
+    """A fresh profiler writing to a temp directory, used by the app."""
+    instance = Profiler(directory=str(tmp_path), interval_ms=1, keep=3)
+    monkeypatch.setattr(profiler_module, "_profiler", instance)
+    return instance
+
+
+class FakeServer:
+    def __init__(self):
+        async def getUser(sid, player_id):
+            busy_wait(0.02)
+            return player_id
+
+        self.getUser = getUser
+        self.handlers = {"/": {"getUser": getUser}}
+
+
+class TestProfiler:
+    """Tests for sampling, cProfile runs and saved profile files."""
+
+    def test_sampled_stacks_in_both_formats(self, profiler):
+        """Test the sampler sees the running function and writes speedscope and collapsed files."""
+        with profiler.profile("test busy", output="speedscope") as run:
+            busy_wait(0.05)
+        with profiler.profile("test busy", output="collapsed") as folded_run:
+            busy_wait(0.05)
+
+        assert run.samples > 5
+        document = json.loads(open(profiler.path_for(run.name)).read())
+        frames = document["shared"]["frames"]
+        profile = document["profiles"][0]
+        assert "busy_wait" in {frame["name"] for frame in frames}
+        assert len(profile["samples"]) == len(profile["weights"])
+        assert all(index < len(frames) for sample in profile["samples"] for index in sample)
+
+        lines = open(profiler.path_for(folded_run.name)).read().splitlines()
+        stack, count = lines[0].rsplit(" ", 1)
+        assert "busy_wait (test_profiler.py:" in stack and int(count) > 0
+
+    def test_cprofile_run_and_fallback(self, profiler):
+        """Test cProfile runs save pstats, and a nested cProfile request samples instead."""
+        with profiler.profile("outer", mode="cprofile") as outer:
+            with profiler.profile("inner", mode="cprofile") as inner:
+                busy_wait(0.01)
+
+        assert outer.mode == "cprofile" and inner.mode == "sample"
+        stats = pstats.Stats(profiler.path_for(outer.name))
+        assert any(function == "busy_wait" for _, _, function in stats.stats)
+
+    def test_oldest_profiles_deleted(self, profiler, tmp_path):
+        """Test only the newest `keep` profiles are listed and kept on disk."""
+        names = []
+        for _ in range(5):
+            with profiler.profile("test keep") as run:
+                pass
+            names.append(run.name)
+
+        assert [entry["name"] for entry in profiler.list_profiles()] == names[:1:-1]
+        assert sorted(path.name for path in tmp_path.iterdir()) == sorted(names[2:])
+        assert profiler.path_for(names[0]) is None
+        assert profiler.path_for("../secrets") is None
+
+    def test_socket_event_wrapped_only_while_armed(self, profiler):
+        """Test arming wraps a socket handler for the next calls, then restores it."""
+        server = FakeServer()
+        profiler.install_socketio(server)
+
+        with pytest.raises(ValueError):
+            profiler.arm("socket noSuchEvent")
+        profiler.arm("socket getUser", count=2)
+        handler = server.handlers["/"]["getUser"]
+
+        assert handler is not server.getUser
+        for _ in range(3):
+            assert asyncio.run(handler("sid1", "alice")) == "alice"
+        assert server.handlers["/"]["getUser"] is server.getUser
+        assert [entry["target"] for entry in profiler.list_profiles()] == ["socket getUser"] * 2
+        assert profiler.armed == {}
+
+
+def sync_app(profiler: Profiler) -> FastAPI:
+    """An app with one sync route, which FastAPI runs in a threadpool worker."""
+    router = APIRouter(route_class=ProfiledRoute)
+
+    @router.get("/slow/{item_id}")
+    def slow_sync_route(item_id: str):
+        busy_wait(0.1)
+        return {"item_id": item_id}
+
+    app = FastAPI()
+    app.include_router(router)
+    app.add_middleware(ProfilingMiddleware, profiler=profiler)
+    return app
+
+
+class TestProfilingEndpoints:
+    """Tests for the REST trigger and the admin endpoints."""
+
+    def test_armed_route_profiled_once(self, profiler):
+        """Test an armed route template is profiled for the armed count and can be downloaded."""
+        from main import app
+
+        with TestClient(app) as client:
+            armed = client.post("/api/diagnostics/profiles/arm", json={
+                "target": "GET /api/telemetry/devices/{device_id}/window", "count": 1
+            })
+            first = client.get("/api/telemetry/devices/glove-1/window")
+            second = client.get("/api/telemetry/devices/glove-2/window")
+            listing = client.get("/api/diagnostics/profiles").json()
+            download = client.get(f"/api/diagnostics/profiles/{first.headers['x-profile-id']}")
+            bad_mode = client.post("/api/diagnostics/profiles/arm", json={"target": "GET /", "mode": "perf"})
+
+        assert armed.status_code == 200
+        assert "x-profile-id" not in second.headers
+        assert listing["armed"] == {}
+        assert listing["profiles"][0]["target"] == "GET /api/telemetry/devices/{device_id}/window"
+        assert download.json()["profiles"][0]["type"] == "sampled"
+        assert bad_mode.status_code == 400
+
+    @pytest.mark.parametrize("mode", ["sample", "cprofile"])
+    def test_sync_route_profiled_in_worker_thread(self, profiler, mode):
+        """Test a sync endpoint's frames are captured from the threadpool worker it runs on."""
+        profiler.arm("GET /slow/{item_id}", mode=mode)
+
+        with TestClient(sync_app(profiler)) as client:
+            response = client.get("/slow/a")
+
+        assert response.json() == {"item_id": "a"}
+        path = profiler.path_for(response.headers["x-profile-id"])
+        if mode == "cprofile":
+            functions = {function for _, _, function in pstats.Stats(path).stats}
+            assert "slow_sync_route" in functions and "busy_wait" in functions
+        else:
+            document = json.loads(open(path).read())
+            frames = document["shared"]["frames"]
+            profile = document["profiles"][0]
+            in_handler = sum(weight for sample, weight in zip(profile["samples"], profile["weights"])
+                             if any(frames[index]["name"] == "slow_sync_route" for index in sample))
+            assert in_handler >= 0.05
+
+    def test_header_requires_token(self, profiler):
+        """Test the X-Profile header only triggers a profile with the configured token."""
+        from main import app
+
+        with TestClient(app) as client:
+            disabled = client.get("/api/diagnostics/providers", headers={"X-Profile": ""})
+            profiler.token = "secret"
+            wrong = client.get("/api/diagnostics/providers", headers={"X-Profile": "guess"})
+            right = client.get("/api/diagnostics/providers",
+                               headers={"X-Profile": "secret", "X-Profile-Mode": "cprofile"})
+
+        assert "x-profile-id" not in disabled.headers
+        assert "x-profile-id" not in wrong.headers
+        assert right.headers["x-profile-id"].endswith(".pstats")
+        assert profiler.list_profiles()[0]["target"] == "GET /api/diagnostics/providers"
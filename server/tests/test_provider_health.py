@@ -0,0 +1,169 @@
+import pytest
+from services.provider_health import ProviderHealth, CLOSED, OPEN, HALF_OPEN
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def health(clock):
+    return ProviderHealth("test", window_size=10, min_calls=4, failure_threshold=0.5,
+                          open_seconds=10, jitter=0, clock=clock)
+
+
+class TestProviderHealth:
+    """Tests for the provider circuit breaker."""
+
+    def test_stays_closed_below_min_calls(self, health):
+        """Test a few failures don't open the circuit."""
+        for _ in range(3):
+            health.record_failure(0.1, "boom")
+
+        assert health.state == CLOSED
+        assert health.allow_request()
+
+    def test_opens_on_error_rate(self, health):
+        """Test the circuit opens once the error rate hits the threshold."""
+        health.record_success(0.1)
+        health.record_success(0.1)
+        health.record_failure(0.1, "quota")
+        health.record_failure(0.1, "quota")
+
+        assert health.state == OPEN
+        assert not health.allow_request()
+        assert health.snapshot()["rejected"] == 1
+        assert health.snapshot()["last_error"] == "quota"
+
+    def test_half_open_single_probe(self, health, clock):
+        """Test only one probe is let through after the cool-down."""
+        for _ in range(4):
+            health.record_failure(0.1, "down")
+
+        clock.now = 10
+        assert health.allow_request()
+        assert health.state == HALF_OPEN
+        assert not health.allow_request()
+
+    def test_probe_success_closes(self, health, clock):
+        """Test a successful probe closes the circuit."""
+        for _ in range(4):
+            health.record_failure(0.1, "down")
+        clock.now = 10
+        health.allow_request()
+
+        health.record_success(0.2)
+
+        assert health.state == CLOSED
+        assert health.snapshot()["error_rate"] == 0
+
+    def test_probe_failure_reopens(self, health, clock):
+        """Test a failed probe re-opens with a new cool-down."""
+        for _ in range(4):
+            health.record_failure(0.1, "down")
+        clock.now = 10
+        health.allow_request()
+
+        health.record_failure(0.1, "still down")
+
+        assert health.state == OPEN
+        assert not health.allow_request()
+        clock.now = 20
+        assert health.allow_request()
+
+    def test_track_records_outcome(self, health):
+        """Test track() records successes and re-raises failures."""
+        with health.track():
+            pass
+        with pytest.raises(ValueError):
+            with health.track():
+                raise ValueError("bad")
+
+        snapshot = health.snapshot()
+        assert snapshot["calls"] == 2
+        assert snapshot["error_rate"] == 0.5
+
+    def test_slow_calls_count_as_failures(self, clock):
+        """Test calls over the latency limit count against the provider."""
+        health = ProviderHealth("slow", min_calls=1, slow_call_seconds=1.0, clock=clock)
+        health.record_success(2.5)
+
+        assert health.state == OPEN
+
+    def test_jittered_cool_down(self, clock):
+        """Test the cool-down is spread around open_seconds."""
+        health = ProviderHealth("jitter", min_calls=1, open_seconds=10, jitter=0.2, clock=clock)
+        health.record_failure(0.1, "down")
+
+        assert 8 <= health.retry_at <= 12
+
+
+class TestProviderFallback:
+    """Tests for callers skipping an open provider."""
+
+    def test_gemini_open_uses_keywords(self, monkeypatch):
+        """Test the parser doesn't call Gemini while its circuit is open."""
+        import asyncio
+        from controllers import voice_command
+
+        class FailingModel:
+            async def generate_content_async(self, prompt, **kwargs):
+                raise AssertionError("Gemini should not be called")
+
+        health = ProviderHealth("gemini", min_calls=1)
+        health.record_failure(0.1, "quota")
+        monkeypatch.setattr(voice_command, "gemini_health", health)
+        monkeypatch.setattr(voice_command, "model", FailingModel())
+
+        result = asyncio.run(voice_command.parse_command_with_gemini("Help"))
+
+        assert result["parser"] == "keywords"
+        assert result["action"] == "help"
+
+    def test_diagnostics_endpoint(self):
+        """Test provider state is exposed for diagnostics."""
+        from fastapi.testclient import TestClient
+        from main import app
+
+        response = TestClient(app).get("/api/diagnostics/providers")
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["gemini"]["state"] in (CLOSED, OPEN, HALF_OPEN)
+        assert "elevenlabs_stt" in data
+
+    def test_transcribe_no_retry_on_server_error(self, monkeypatch):
+        """Test STT is not retried without model_id for non-model errors."""
+        from types import SimpleNamespace
+        from fastapi.testclient import TestClient
+        from controllers import speech_to_text
+        from main import app
+
+        calls = []
+
+        class ServerError(Exception):
+            status_code = 500
+
+        async def convert(**kwargs):
+            calls.append(kwargs)
+            raise ServerError("upstream down")
+
+        stub_client = SimpleNamespace(speech_to_text=SimpleNamespace(convert=convert))
+        monkeypatch.setattr(speech_to_text, "client", stub_client)
+        monkeypatch.setattr(speech_to_text, "stt_health", ProviderHealth("elevenlabs_stt"))
+
+        response = TestClient(app).post(
+            "/api/transcribe", files={"file": ("clip.wav", b"RIFF0000", "audio/wav")}
+        )
+
+        assert response.status_code == 500
+        assert len(calls) == 1
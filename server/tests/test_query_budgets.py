@@ -0,0 +1,143 @@
+import asyncio
+import functools
+import inspect
+
+import pytest
+from sqlalchemy import create_engine, StaticPool
+
+import database
+from database import Base
+from models import User
+from services import metrics
+from services.metrics import track_queries
+from services.user_service import UserService
+
+
+@pytest.fixture
+def socket_handlers(monkeypatch):
+    """main.py's Socket.IO handlers on an in-memory database, with two players."""
+    import main
+
+    engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    monkeypatch.setattr(main, "SessionLocal", functools.partial(database.SessionLocal, bind=engine))
+    handlers = {name: inspect.unwrap(handler) for name, handler in main.sio.handlers["/"].items()}
+
+    def call(event, *args):
+        return asyncio.run(handlers[event]("sid1", *args))
+
+    call("join", "alice")
+    call("join", "bob")
+    yield call
+    engine.dispose()
+
+
+class TestQueryBudgets:
+    """Statement budgets for the hot socket events and user lookups."""
+
+    @pytest.mark.parametrize("event, args, limit", [
+        ("join", ("alice",), 1),
+        ("getUser", ("alice",), 1),
+        ("collectGold", ("alice",), 3),
+        ("getAccountSummary", ("alice",), 1),
+        ("sendMoney", ({"fromUserId": "alice", "toUserId": "bob", "amount": 5},), 7),
+    ])
+    def test_socket_event_budget(self, socket_handlers, query_budget, event, args, limit):
+        """Test each socket event stays within its statement budget."""
+        with query_budget(limit, event) as usage:
+            socket_handlers(event, *args)
+
+        assert not usage.repeated(), usage.describe()
+
+    def test_new_player_join_budget(self, socket_handlers, query_budget):
+        """Test creating a player on join does not re-read what it just wrote."""
+        with query_budget(7, "join"):
+            socket_handlers("join", "carol")
+
+    def test_user_with_accounts_single_query(self, db_session, sample_user, query_budget):
+        """Test get_user_with_accounts loads the accounts in the same query."""
+        user_id = sample_user.id
+        db_session.expunge_all()
+
+        with query_budget(1):
+            user = UserService(db_session).get_user_with_accounts(user_id)
+            assert [account.type for account in user.accounts] == [
+                "checking", "savings", "treasure_chest", "credit_card"
+            ]
+
+
+class TestSocketSessions:
+    """Tests for connection use around socket emits."""
+
+    def test_no_connection_held_while_emitting(self, tmp_path, monkeypatch):
+        """Test each socket event returns its pooled connection before it awaits an emit."""
+        import main
+
+        engine = create_engine(f"sqlite:///{tmp_path / 'game.db'}", connect_args={"check_same_thread": False})
+        Base.metadata.create_all(bind=engine)
+        monkeypatch.setattr(main, "SessionLocal", functools.partial(database.SessionLocal, bind=engine))
+        handlers = {name: inspect.unwrap(handler) for name, handler in main.sio.handlers["/"].items()}
+        held = []
+
+        async def emit(event, data=None, **kwargs):
+            held.append((event, engine.pool.checkedout()))
+
+        monkeypatch.setattr(main.sio, "emit", emit)
+        for event, args in [
+            ("join", ("alice",)),
+            ("join", ("bob",)),
+            ("updateGold", ({"playerId": "alice", "goldChange": 10},)),
+            ("environmentUpdate", ({"temperature": 20},)),
+            ("getAccountSummary", ("alice",)),
+            ("sendMoney", ({"fromUserId": "alice", "toUserId": "bob", "amount": 5},)),
+            ("getUser", ("nobody",)),
+        ]:
+            asyncio.run(handlers[event]("sid1", *args))
+        engine.dispose()
+
+        assert [event for event, _ in held][-1] == "error"
+        assert all(checked_out == 0 for _, checked_out in held), held
+
+
+class TestRepeatedStatements:
+    """Tests for the N+1 detector."""
+
+    def test_lazy_load_loop_reported_once(self, db_session, sample_users, capsys):
+        """Test a loop of lazy loads is flagged, counted and printed once per handler."""
+        UserService(db_session).create_user("user_3", "Carol")
+        users = db_session.query(User).all()
+        before = metrics.db_repeated_statements.labels("test lazy").value
+
+        for _ in range(2):
+            with track_queries("test lazy") as usage:
+                for user in users:
+                    db_session.expire(user, ["accounts"])
+                    _ = user.accounts
+            metrics._observe_usage(usage)
+
+        assert list(usage.repeated().values()) == [3]
+        assert metrics.db_repeated_statements.labels("test lazy").value == before + 2
+        assert capsys.readouterr().out.count("Possible N+1 in test lazy: 3x SELECT") == 1
+
+    def test_repeated_writes_not_flagged(self, db_session, query_budget):
+        """Test several INSERTs of one shape are not reported as N+1."""
+        with query_budget(20) as usage:
+            UserService(db_session).create_user("writer", "Writer")
+
+        assert usage.statements
+        assert usage.repeated() == {}
+
+    @pytest.mark.parametrize("detect", [False, True])
+    def test_socket_events_count_statements_only_when_detecting(self, db_session, sample_users, monkeypatch, detect):
+        """Test socket events keep per-statement counts only with DETECT_N_PLUS_ONE on."""
+        metrics.instrument_database()
+        monkeypatch.setattr(metrics, "DETECT_N_PLUS_ONE", detect)
+
+        async def listUsers(sid):
+            db_session.query(User).all()
+            return metrics.current_usage()
+
+        usage = asyncio.run(metrics._timed_socket_handler("listUsers", listUsers)("sid1"))
+
+        assert usage.queries == 1
+        assert bool(usage.statements) is detect
@@ -0,0 +1,78 @@
+import sqlite3
+
+from sqlalchemy.orm import sessionmaker
+
+import seed_dataset
+from seed_dataset import account_id, ensure_snapshot, generate, memory_engine, restore, user_id
+from services.account_service import AccountService
+from services.transaction_service import TransactionService
+from services.user_service import UserService
+
+
+def table_counts(path) -> dict:
+    connection = sqlite3.connect(path)
+    try:
+        return {
+            table: connection.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            for table in ("users", "accounts", "transactions", "environment")
+        }
+    finally:
+        connection.close()
+
+
+class TestSeedDataset:
+    """Tests for the seeded dataset generator and snapshots."""
+
+    def test_same_seed_same_bytes(self, tmp_path):
+        """Test a seed always produces the same file and another seed does not."""
+        generate(str(tmp_path / "a.db"), 300, seed=7, log=None)
+        generate(str(tmp_path / "b.db"), 300, seed=7, log=None)
+        generate(str(tmp_path / "c.db"), 300, seed=8, log=None)
+
+        a, b, c = ((tmp_path / name).read_bytes() for name in ("a.db", "b.db", "c.db"))
+        assert a == b
+        assert a != c
+
+    def test_layout_and_history(self, tmp_path, monkeypatch):
+        """Test the user/account layout and a power-law history spanning chunks."""
+        monkeypatch.setattr(seed_dataset, "CHUNK_USERS", 200)
+        path = str(tmp_path / "data.db")
+        summary = generate(path, 500, seed=1, log=None)
+
+        counts = table_counts(path)
+        assert counts["users"] == 500
+        assert counts["accounts"] == 2000
+        assert counts["environment"] == 1
+        assert counts["transactions"] == summary["transactions_rows"]
+
+        connection = sqlite3.connect(path)
+        rows = connection.execute(
+            "SELECT (COALESCE(from_account_id, to_account_id) - 1) / 4 AS owner, COUNT(*) FROM transactions GROUP BY owner"
+        ).fetchall()
+        connection.close()
+        counts_by_owner = sorted(count for _, count in rows)
+        # Heavy tail: the busiest user has many times the median
+        assert counts_by_owner[-1] > 5 * counts_by_owner[len(counts_by_owner) // 2]
+
+        session = sessionmaker(bind=memory_engine(path))()
+        user = UserService(session).get_user_with_accounts(user_id(123))
+        assert {account.type: account.id for account in user.accounts} == {
+            kind: account_id(123, kind) for kind in seed_dataset.ACCOUNT_TYPES
+        }
+        assert AccountService(session).get_account_summary(user_id(123))["total_cash"] > 0
+        assert TransactionService(session).get_transaction_history(user_id(0), limit=5)
+        session.close()
+
+    def test_snapshot_is_generated_once_and_restored(self, tmp_path):
+        """Test ensure_snapshot reuses the file and restore copies it into place."""
+        directory = str(tmp_path / "snapshots")
+        snapshot = ensure_snapshot(100, seed=3, directory=directory, log=None)
+        modified = (tmp_path / "snapshots" / snapshot.split("/")[-1]).stat().st_mtime_ns
+
+        assert ensure_snapshot(100, seed=3, directory=directory, log=None) == snapshot
+        assert (tmp_path / "snapshots" / snapshot.split("/")[-1]).stat().st_mtime_ns == modified
+        assert seed_dataset.list_snapshots(directory)[0]["users"] == 100
+
+        target = str(tmp_path / "game.db")
+        restore(snapshot, target)
+        assert table_counts(target)["users"] == 100
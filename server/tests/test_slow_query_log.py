@@ -0,0 +1,135 @@
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+
+from services.metrics import track_queries
+from services.slow_query_log import SlowQueryLog, fingerprint, normalize_statement
+
+
+@pytest.fixture
+def slow_log(tmp_path):
+    """A log that records every statement, installed on all engines."""
+    log = SlowQueryLog(threshold_ms=1e-6, path=str(tmp_path / "slow.jsonl"))
+    log.install()
+    yield log
+    log.uninstall()
+    log.close()
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite:///:memory:")
+    with engine.begin() as connection:
+        connection.execute(text("CREATE TABLE items (id INTEGER PRIMARY KEY, owner TEXT, price REAL)"))
+        connection.execute(text("CREATE INDEX ix_items_price ON items (price)"))
+    yield engine
+    engine.dispose()
+
+
+class TestFingerprint:
+    """Tests for statement normalization."""
+
+    def test_literals_and_in_lists_collapse(self):
+        """Test literals and IN lists of any length share a fingerprint."""
+        a = "SELECT * FROM items WHERE owner = 'bob' AND id IN (?, ?, ?)"
+        b = "SELECT  *\nFROM items WHERE owner = 'it''s' AND id IN (?, ?)"
+
+        assert normalize_statement(a) == "SELECT * FROM items WHERE owner = ? AND id IN (?+)"
+        assert fingerprint(a) == fingerprint(b)
+        assert fingerprint(a) != fingerprint("SELECT * FROM items WHERE owner = ?")
+
+    def test_identifiers_keep_digits(self):
+        """Test digits inside identifiers like accounts_1 are not treated as literals."""
+        assert normalize_statement("SELECT accounts_1.id FROM accounts AS accounts_1 LIMIT 10") == (
+            "SELECT accounts_1.id FROM accounts AS accounts_1 LIMIT ?"
+        )
+
+
+class TestSlowQueryLog:
+    """Tests for slow statement capture, aggregation and the log file."""
+
+    def test_aggregates_by_fingerprint_with_plan(self, slow_log, engine):
+        """Test repeated statements aggregate under one fingerprint and get a SQLite plan."""
+        with engine.connect() as connection:
+            with track_queries("socket test"):
+                for owner in ("alice", "bob", "carol"):
+                    connection.execute(text("SELECT * FROM items WHERE owner = :owner"), {"owner": owner})
+            connection.execute(text("SELECT * FROM items WHERE price > :price"), {"price": 5})
+
+        summary = slow_log.summary(order_by="count")
+        by_owner = summary["statements"][0]
+        assert by_owner["count"] == 3
+        assert by_owner["handlers"] == {"socket test": 3}
+        assert sorted(by_owner["sample_params"]) == ["('alice',)", "('bob',)", "('carol',)"]
+        assert any("SCAN items" in row for row in by_owner["plan"])
+
+        by_price = next(entry for entry in summary["statements"] if "price >" in entry["statement"])
+        assert any("USING INDEX ix_items_price" in row for row in by_price["plan"])
+
+    def test_file_lines_and_rotation(self, tmp_path, engine):
+        """Test each slow statement is a JSON line and the file rotates by size."""
+        path = tmp_path / "slow.jsonl"
+        log = SlowQueryLog(threshold_ms=1e-6, path=str(path), max_bytes=2000, backups=2)
+        log.install()
+        try:
+            with engine.connect() as connection:
+                for n in range(40):
+                    connection.execute(text("SELECT * FROM items WHERE id = :id"), {"id": n})
+        finally:
+            log.uninstall()
+            log.close()
+
+        records = [json.loads(line) for line in path.read_text().splitlines()]
+        assert records and all(record["fingerprint"] == records[0]["fingerprint"] for record in records)
+        assert (tmp_path / "slow.jsonl.1").exists()
+        assert (tmp_path / "slow.jsonl.2").exists()
+        assert not (tmp_path / "slow.jsonl.3").exists()
+        # The plan is only written with the first occurrence
+        assert "plan" not in records[-1]
+
+    def test_fast_statements_ignored(self, tmp_path, engine):
+        """Test statements under the threshold are not recorded."""
+        log = SlowQueryLog(threshold_ms=10_000, path=str(tmp_path / "slow.jsonl"))
+        log.install()
+        try:
+            with engine.connect() as connection:
+                connection.execute(text("SELECT 1"))
+        finally:
+            log.uninstall()
+
+        assert log.summary()["statements"] == []
+        assert not (tmp_path / "slow.jsonl").exists()
+
+    def test_fingerprint_cap(self, tmp_path, engine):
+        """Test new shapes beyond max_fingerprints are counted as dropped."""
+        log = SlowQueryLog(threshold_ms=1e-6, path=None, max_fingerprints=2)
+        log.install()
+        try:
+            with engine.connect() as connection:
+                for column in ("id", "owner", "price"):
+                    connection.execute(text(f"SELECT {column} FROM items"))
+        finally:
+            log.uninstall()
+
+        summary = log.summary()
+        assert summary["fingerprints"] == 2
+        assert summary["dropped"] == 1
+
+    def test_diagnostics_endpoint(self, monkeypatch, slow_log, engine):
+        """Test the admin endpoint returns aggregates and can be reset."""
+        from main import app
+        from controllers import diagnostics_controller
+        monkeypatch.setattr(diagnostics_controller, "get_slow_query_log", lambda: slow_log)
+        with engine.connect() as connection:
+            connection.execute(text("SELECT owner FROM items"))
+
+        with TestClient(app) as client:
+            body = client.get("/api/diagnostics/slow-queries", params={"order_by": "max_ms"}).json()
+            assert client.get("/api/diagnostics/slow-queries", params={"order_by": "bogus"}).status_code == 400
+            client.delete("/api/diagnostics/slow-queries")
+            after = client.get("/api/diagnostics/slow-queries").json()
+
+        assert any(entry["statement"] == "SELECT owner FROM items" for entry in body["statements"])
+        assert after["fingerprints"] == 0
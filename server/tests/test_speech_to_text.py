@@ -0,0 +1,314 @@
+import asyncio
+import numpy as np
+import pytest
+from types import SimpleNamespace
+from fastapi.testclient import TestClient
+
+from controllers import speech_to_text
+from services.audio_preprocess import decode_wav
+from services.provider_health import ProviderHealth
+from services.tts_cache import AudioCache, cache_key
+from tests.test_audio_preprocess import make_wav
+
+
+class StubTTS:
+    """Async-generator stand-in for client.text_to_speech.convert."""
+
+    def __init__(self, chunks, fail_at=None):
+        self.chunks = chunks
+        self.fail_at = fail_at
+        self.closed = False
+
+    def convert(self, **kwargs):
+        async def generate():
+            try:
+                for i, chunk in enumerate(self.chunks):
+                    if i == self.fail_at:
+                        raise RuntimeError("upstream failed")
+                    yield chunk
+            finally:
+                self.closed = True
+        return generate()
+
+
+@pytest.fixture
+def tts_client(monkeypatch, tmp_path):
+    from main import app
+
+    monkeypatch.setattr(speech_to_text, "tts_cache", AudioCache(str(tmp_path)))
+
+    def install(stub):
+        monkeypatch.setattr(speech_to_text, "client", SimpleNamespace(text_to_speech=stub))
+        health = ProviderHealth("elevenlabs_tts")
+        monkeypatch.setattr(speech_to_text, "tts_health", health)
+        return health
+
+    return TestClient(app), install
+
+
+class TestTextToSpeech:
+    """Tests for streamed text-to-speech."""
+
+    def test_streams_chunks(self, tts_client):
+        """Test all chunks arrive in order and the upstream is closed."""
+        client, install = tts_client
+        stub = StubTTS([b"ID3", b"frame1", b"frame2"])
+        health = install(stub)
+
+        with client.stream("POST", "/api/text-to-speech", json={"text": "Hello"}) as response:
+            assert response.status_code == 200
+            assert response.headers["content-type"] == "audio/mpeg"
+            body = b"".join(response.iter_bytes())
+
+        assert body == b"ID3frame1frame2"
+        assert stub.closed
+        assert health.snapshot()["calls"] == 1
+        assert health.snapshot()["error_rate"] == 0
+
+    def test_failure_before_first_chunk(self, tts_client):
+        """Test an upstream error before any audio is a 500, not an empty 200."""
+        client, install = tts_client
+        health = install(StubTTS([b"ID3"], fail_at=0))
+
+        response = client.post("/api/text-to-speech", json={"text": "Hello"})
+
+        assert response.status_code == 500
+        assert health.snapshot()["error_rate"] == 1
+
+    def test_open_circuit(self, tts_client):
+        """Test requests are refused while TTS is down."""
+        client, install = tts_client
+        health = install(StubTTS([b"ID3"]))
+        for _ in range(5):
+            health.record_failure(0.1, "down")
+
+        response = client.post("/api/text-to-speech", json={"text": "Hello"})
+
+        assert response.status_code == 503
+
+    def test_empty_text(self, tts_client):
+        """Test empty text is rejected."""
+        client, install = tts_client
+        install(StubTTS([]))
+
+        response = client.post("/api/text-to-speech", json={"text": "  "})
+
+        assert response.status_code == 400
+
+    def test_second_request_served_from_cache(self, tts_client):
+        """Test a repeated phrase is served from disk without calling ElevenLabs."""
+        client, install = tts_client
+        stub = StubTTS([b"ID3", b"frame"])
+        health = install(stub)
+
+        first = client.post("/api/text-to-speech", json={"text": "Your credit card has no balance."})
+        second = client.post("/api/text-to-speech", json={"text": "  Your credit  card has no balance. "})
+
+        assert first.headers["x-tts-cache"] == "miss"
+        assert second.headers["x-tts-cache"] == "hit"
+        assert second.content == b"ID3frame"
+        assert health.snapshot()["calls"] == 1
+
+    def test_failed_stream_not_cached(self, tts_client):
+        """Test a broken rendering never becomes a cache entry."""
+        client, install = tts_client
+        install(StubTTS([b"ID3", b"frame"], fail_at=1))
+
+        with pytest.raises(RuntimeError):
+            client.post("/api/text-to-speech", json={"text": "Hello"})
+
+        assert speech_to_text.tts_cache.stats()["entries"] == 0
+
+
+
+class StubSTT:
+    """Stand-in for client.speech_to_text.convert that reads the upload like httpx does."""
+
+    def __init__(self, reject_model=False):
+        self.reject_model = reject_model
+        self.calls = []
+
+    async def convert(self, file, **kwargs):
+        filename, handle, content_type = file
+        self.calls.append({"body": handle.read(), **kwargs})
+        if self.reject_model and "model_id" in kwargs:
+            error = RuntimeError("unknown model")
+            error.status_code = 422
+            raise error
+        return SimpleNamespace(text="check my balance", language_code="eng", words=[])
+
+
+@pytest.fixture
+def stt_client(monkeypatch):
+    from main import app
+
+    monkeypatch.setattr(speech_to_text, "current_noise_level", lambda: "quiet")
+
+    def install(stub):
+        monkeypatch.setattr(speech_to_text, "client", SimpleNamespace(speech_to_text=stub))
+        monkeypatch.setattr(speech_to_text, "stt_health", ProviderHealth("elevenlabs_stt"))
+
+    return TestClient(app), install
+
+
+class TestTranscribe:
+    """Tests for spooled audio uploads."""
+
+    def test_transcribes_spooled_file(self, stt_client):
+        """Test the upload reaches ElevenLabs as a file object, not a bytes buffer."""
+        client, install = stt_client
+        stub = StubSTT()
+        install(stub)
+
+        response = client.post("/api/transcribe", files={"file": ("clip.wav", b"RIFF" * 1000, "audio/wav")})
+
+        assert response.status_code == 200
+        assert response.json()["transcript"] == "check my balance"
+        assert response.json()["filename"] == "clip.wav"
+        assert stub.calls[0]["body"] == b"RIFF" * 1000
+
+    def test_retry_rereads_spooled_file(self, stt_client):
+        """Test a rejected model retries from the start of the same file."""
+        client, install = stt_client
+        stub = StubSTT(reject_model=True)
+        install(stub)
+
+        response = client.post("/api/transcribe", files={"file": ("clip.wav", b"RIFFdata", "audio/wav")})
+
+        assert response.status_code == 200
+        assert [call["body"] for call in stub.calls] == [b"RIFFdata", b"RIFFdata"]
+
+    def test_wav_preprocessed(self, stt_client):
+        """Test WAV uploads reach ElevenLabs as trimmed 16 kHz mono."""
+        client, install = stt_client
+        stub = StubSTT()
+        install(stub)
+        rate = 48000
+        clip = np.concatenate([np.zeros(rate), 0.5 * np.sin(np.arange(rate) / 10), np.zeros(rate)])
+        data = make_wav(np.stack([clip, clip], axis=1), rate)
+
+        response = client.post("/api/transcribe", files={"file": ("clip.wav", data, "audio/wav")})
+
+        stats = response.json()["preprocessing"]
+        sent, sent_rate = decode_wav(stub.calls[0]["body"])
+        assert response.status_code == 200
+        assert sent_rate == 16000
+        assert sent.shape[1] == 1
+        assert stats["output_bytes"] == len(stub.calls[0]["body"])
+        assert stats["output_bytes"] < len(data) / 8
+
+    def test_preprocess_disabled(self, stt_client):
+        """Test preprocess=false forwards the upload unchanged."""
+        client, install = stt_client
+        stub = StubSTT()
+        install(stub)
+        data = make_wav(np.zeros(48000), 48000)
+
+        response = client.post(
+            "/api/transcribe?preprocess=false", files={"file": ("clip.wav", data, "audio/wav")}
+        )
+
+        assert response.json()["preprocessing"] is None
+        assert stub.calls[0]["body"] == data
+
+    def test_upload_too_large(self, stt_client, monkeypatch):
+        """Test uploads past the size limit are refused before reaching ElevenLabs."""
+        client, install = stt_client
+        stub = StubSTT()
+        install(stub)
+        monkeypatch.setattr(speech_to_text, "TRANSCRIBE_MAX_BYTES", 1024)
+
+        response = client.post("/api/transcribe", files={"file": ("clip.wav", b"0" * 4096, "audio/wav")})
+
+        assert response.status_code == 413
+        assert stub.calls == []
+
+    def test_missing_file(self, stt_client):
+        """Test a form without a file part is rejected."""
+        client, install = stt_client
+        install(StubSTT())
+
+        response = client.post("/api/transcribe", data={"note": "no audio"}, files={"other": ("a.txt", b"x")})
+
+        assert response.status_code == 422
+
+    def test_concurrency_limit(self, stt_client, monkeypatch):
+        """Test a request that can't get an upload slot in time gets 503."""
+        client, install = stt_client
+        install(StubSTT())
+        monkeypatch.setattr(speech_to_text, "transcribe_slots", asyncio.Semaphore(0))
+        monkeypatch.setattr(speech_to_text, "TRANSCRIBE_SLOT_TIMEOUT", 0.01)
+
+        response = client.post("/api/transcribe", files={"file": ("clip.wav", b"RIFF", "audio/wav")})
+
+        assert response.status_code == 503
+
+class TestAudioCache:
+    """Tests for the on-disk TTS cache."""
+
+    def test_key_normalizes_text(self):
+        """Test whitespace differences share a key but voices don't."""
+        assert cache_key("v1", "m", "Hello   there\n") == cache_key("v1", "m", "Hello there")
+        assert cache_key("v1", "m", "Hello") != cache_key("v2", "m", "Hello")
+        assert cache_key("v1", "m", "Hello") != cache_key("v1", "m2", "Hello")
+
+    def test_lru_eviction(self, tmp_path):
+        """Test the least recently used entries are evicted past max_bytes."""
+        cache = AudioCache(str(tmp_path), max_bytes=10)
+        cache.put("a", b"1234")
+        cache.put("b", b"1234")
+        cache.get("a")
+        cache.put("c", b"1234")
+
+        assert cache.get("b") is None
+        assert cache.get("a") is not None
+        assert cache.get("c") is not None
+        assert cache.stats()["bytes"] == 8
+
+    def test_index_rebuilt_from_disk(self, tmp_path):
+        """Test entries survive a restart and partial writes are cleaned up."""
+        cache = AudioCache(str(tmp_path))
+        cache.put("a", b"audio")
+        cache.writer("b").write(b"partial")
+
+        reloaded = AudioCache(str(tmp_path))
+
+        assert reloaded.get("a") is not None
+        assert reloaded.get("b") is None
+        assert not [p for p in tmp_path.iterdir() if p.name.endswith(".part")]
+
+    def test_open_file_survives_eviction(self, tmp_path):
+        """Test audio opened for a hit reads to the end after its entry is evicted."""
+        cache = AudioCache(str(tmp_path), max_bytes=10)
+        cache.put("a", b"12345678")
+        file = cache.open("a")
+
+        cache.put("b", b"12345678")
+
+        assert cache.open("a") is None
+        assert file.read() == b"12345678"
+        file.close()
+
+    def test_cached_speech_streams_through_eviction(self, tmp_path, monkeypatch):
+        """Test a cache hit streams in full when the entry is evicted before it is read."""
+        cache = AudioCache(str(tmp_path), max_bytes=10)
+        monkeypatch.setattr(speech_to_text, "tts_cache", cache)
+        monkeypatch.setattr(speech_to_text, "CACHED_AUDIO_CHUNK_SIZE", 2)
+        key = cache_key(speech_to_text.resolve_voice_id("default"), speech_to_text.TTS_MODEL_ID, "Hello")
+        cache.put(key, b"ID3frame")
+
+        async def stream():
+            chunks, status = await speech_to_text.open_cached_speech("Hello")
+            cache.put("other", b"evicts it")  # Before the response starts reading
+            return status, b"".join([chunk async for chunk in chunks])
+
+        assert asyncio.run(stream()) == ("hit", b"ID3frame")
+        assert cache.get(key) is None
+
+    def test_unused_writer_touches_no_files(self, tmp_path):
+        """Test a writer only creates its temp file on the first write."""
+        cache = AudioCache(str(tmp_path))
+        writer = cache.writer("a")
+        writer.abort()
+
+        assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,267 @@
+import asyncio
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+
+from services import tracing
+from services.job_queue import JobQueue
+from services.provider_health import ProviderHealth
+from services.tracing import SpanExporter, otlp_payload, parse_traceparent, span, traced
+
+
+class CollectingExporter:
+    def __init__(self):
+        self.spans = []
+
+    def export(self, finished):
+        self.spans.append(finished)
+
+    def flush(self):
+        pass
+
+    def named(self, name):
+        return [finished for finished in self.spans if finished.name == name]
+
+
+@pytest.fixture
+def spans(monkeypatch):
+    """Sample every trace and collect finished spans in memory."""
+    exporter = CollectingExporter()
+    monkeypatch.setattr(tracing, "TRACE_SAMPLE_RATE", 1.0)
+    monkeypatch.setattr(tracing, "_exporter", exporter)
+    return exporter
+
+
+class TestSpans:
+    """Tests for span nesting, sampling and context propagation."""
+
+    def test_children_share_trace_and_parent(self, spans):
+        """Test nested spans form one trace and exceptions mark the span failed."""
+        with span("outer") as outer:
+            with span("inner", attributes={"user_id": "alice"}) as inner:
+                pass
+            with pytest.raises(ValueError):
+                with span("failing"):
+                    raise ValueError("boom")
+
+        assert [finished.name for finished in spans.spans] == ["inner", "failing", "outer"]
+        assert inner.trace_id == outer.trace_id and inner.parent_id == outer.span_id
+        assert inner.attributes == {"user_id": "alice"}
+        assert spans.named("failing")[0].status == "error"
+        assert tracing.current_span() is None
+
+    def test_unsampled_trace_records_nothing(self, spans, monkeypatch):
+        """Test children of an unsampled root are not recorded, nor are non-root spans outside a trace."""
+        monkeypatch.setattr(tracing, "TRACE_SAMPLE_RATE", 0.0)
+        with span("root") as root:
+            with span("child") as child:
+                child.set_attribute("user_id", "alice")
+        with span("orphan", root=False):
+            pass
+
+        assert root is tracing.UNSAMPLED and child is tracing.UNSAMPLED
+        assert child.attributes == {}
+        assert spans.spans == []
+
+    def test_propagates_to_threads_and_tasks(self, spans):
+        """Test spans started in to_thread workers and tasks join the caller's trace."""
+        @traced("in_thread", root=False)
+        def work():
+            return tracing.current_span().trace_id
+
+        async def child_task():
+            with span("in_task", root=False):
+                await asyncio.sleep(0)
+
+        async def request():
+            with span("request") as root:
+                thread_trace = await asyncio.to_thread(work)
+                await asyncio.create_task(child_task())
+                return root, thread_trace
+
+        root, thread_trace = asyncio.run(request())
+
+        assert thread_trace == root.trace_id
+        assert spans.named("in_thread")[0].parent_id == root.span_id
+        assert spans.named("in_task")[0].parent_id == root.span_id
+
+    def test_job_queue_continues_submitter_trace(self, spans):
+        """Test a queued job runs under the submitter's trace, and workers don't inherit its context."""
+        seen = []
+
+        async def handler(job_id, payload):
+            seen.append(tracing.current_span())
+            return {}
+
+        async def run():
+            jobs = JobQueue("trace_test", handler, workers=1)
+            with span("request") as root:
+                jobs.submit({})
+            jobs.submit({})
+            await jobs._queue.join()
+            await jobs.stop()
+            return root
+
+        root = asyncio.run(run())
+
+        traced_job, untraced_job = spans.named("job trace_test")
+        assert traced_job.trace_id == root.trace_id and traced_job.parent_id == root.span_id
+        assert untraced_job.trace_id != root.trace_id and untraced_job.parent_id is None
+        assert "job.wait_ms" in traced_job.attributes
+        assert seen == [traced_job, untraced_job]
+
+    def test_database_and_provider_spans(self, spans):
+        """Test SQL statements and provider calls inside a trace become client spans."""
+        tracing.trace_database()
+        engine = create_engine("sqlite:///:memory:")
+        health = ProviderHealth("trace_provider")
+
+        with span("request") as root:
+            with engine.connect() as connection:
+                connection.execute(text("SELECT 1"))
+            with health.track():
+                pass
+
+        db_span = spans.named("db SELECT")[0]
+        assert db_span.parent_id == root.span_id and db_span.kind == tracing.CLIENT
+        assert db_span.attributes["db.statement"] == "SELECT 1"
+        assert spans.named("trace_provider")[0].attributes == {"provider": "trace_provider"}
+
+    def test_failed_statement_span(self, spans):
+        """Test a statement that raises still gets a span, marked failed."""
+        tracing.trace_database()
+        engine = create_engine("sqlite:///:memory:")
+
+        with span("request") as root:
+            with engine.connect() as connection, pytest.raises(Exception):
+                connection.execute(text("SELECT missing FROM nowhere"))
+
+        db_span = spans.named("db SELECT")[0]
+        assert db_span.parent_id == root.span_id
+        assert db_span.status == "error"
+        assert db_span.start_ns <= db_span.end_ns
+
+
+class TestTraceparent:
+    """Tests for W3C trace context parsing."""
+
+    def test_parse_and_format(self):
+        """Test a valid header round-trips and malformed ones are ignored."""
+        header = "00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-01"
+        remote = parse_traceparent(header)
+
+        assert remote.traceparent == header and remote.sampled
+        assert not parse_traceparent(header[:-2] + "00").sampled
+        for bad in (None, "", "00-xyz-00f067aa0ba902b7-01", "00-" + "0" * 32 + "-00f067aa0ba902b7-01"):
+            assert parse_traceparent(bad) is None
+
+
+class TestExport:
+    """Tests for the JSONL and OTLP exporters."""
+
+    def test_jsonl_export_flushes_on_shutdown(self, tmp_path, monkeypatch):
+        """Test queued spans are written as JSON lines when the exporter is flushed."""
+        exporter = SpanExporter("jsonl", path=str(tmp_path / "traces.jsonl"), interval=60)
+        monkeypatch.setattr(tracing, "TRACE_SAMPLE_RATE", 1.0)
+        monkeypatch.setattr(tracing, "_exporter", exporter)
+
+        with span("request", attributes={"user_id": "alice"}):
+            with span("child"):
+                pass
+        exporter.flush()
+
+        lines = [json.loads(line) for line in (tmp_path / "traces.jsonl").read_text().splitlines()]
+        assert [line["name"] for line in lines] == ["child", "request"]
+        assert lines[0]["parent_span_id"] == lines[1]["span_id"]
+        assert lines[1]["attributes"] == {"user_id": "alice"}
+        assert exporter.stats()["exported"] == 2
+
+    def test_otlp_payload_shape(self, spans):
+        """Test spans are encoded as an OTLP/HTTP JSON export request."""
+        with span("request", tracing.SERVER, {"user_id": "alice", "http.status_code": 200, "ok": True}):
+            pass
+
+        payload = otlp_payload(spans.spans, "test-service")
+        resource_spans = payload["resourceSpans"][0]
+        encoded = resource_spans["scopeSpans"][0]["spans"][0]
+        assert resource_spans["resource"]["attributes"][0]["value"] == {"stringValue": "test-service"}
+        assert encoded["kind"] == 2 and "parentSpanId" not in encoded
+        assert len(encoded["traceId"]) == 32 and len(encoded["spanId"]) == 16
+        assert encoded["attributes"] == [
+            {"key": "user_id", "value": {"stringValue": "alice"}},
+            {"key": "http.status_code", "value": {"intValue": "200"}},
+            {"key": "ok", "value": {"boolValue": True}},
+        ]
+
+    def test_full_queue_drops_spans(self, spans):
+        """Test the exporter drops rather than blocks once its queue is full."""
+        exporter = SpanExporter("jsonl", path="unused", max_queue=1)
+        exporter._thread = object()  # never drained
+
+        for _ in range(3):
+            exporter.export(tracing.Span("s", "1" * 32, None))
+
+        assert exporter.stats()["dropped"] == 2
+
+
+class TestInstrumentation:
+    """Tests for the REST and Socket.IO entry points."""
+
+    def test_rest_request_continues_incoming_trace(self, spans):
+        """Test a REST request span takes the route template, status and caller's trace."""
+        from main import app
+
+        parent = "00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-01"
+        with TestClient(app) as client:
+            client.get("/api/telemetry/devices/glove-1/window", headers={"traceparent": parent})
+
+        request_span = spans.named("GET /api/telemetry/devices/{device_id}/window")[0]
+        assert request_span.trace_id == "4bf92f3577b34da6a3ce929d0e0e4736"
+        assert request_span.parent_id == "00f067aa0ba902b7"
+        assert request_span.kind == tracing.SERVER
+        assert request_span.attributes["http.status_code"] == 404
+
+    def test_socket_event_span(self, spans):
+        """Test socket handlers get a span with the event name and player id."""
+        class FakeServer:
+            handlers = {"/": {}}
+
+        async def getUser(sid, player_id):
+            return tracing.current_span()
+
+        async def connect(sid, environ):
+            pass
+
+        FakeServer.handlers["/"] = {"getUser": getUser, "connect": connect}
+        tracing.trace_socketio(FakeServer)
+        tracing.trace_socketio(FakeServer)
+        handlers = FakeServer.handlers["/"]
+
+        active = asyncio.run(handlers["getUser"]("sid1", "alice"))
+
+        assert handlers["connect"] is connect
+        assert handlers["getUser"].__wrapped__ is getUser
+        assert spans.spans == [active]
+        assert active.name == "socket getUser"
+        assert active.attributes == {"socketio.event": "getUser", "socketio.sid": "sid1", "user_id": "alice"}
+
+    def test_unsampled_requests_skip_spans(self, spans, monkeypatch):
+        """Test at sample rate 0 only a REST request with an incoming traceparent opens a span."""
+        from main import app
+
+        monkeypatch.setattr(tracing, "TRACE_SAMPLE_RATE", 0.0)
+
+        async def getUser(sid, player_id):
+            return tracing.current_span()
+
+        handler = tracing._traced_socket_handler("getUser", getUser)
+        parent = "00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-01"
+        with TestClient(app) as client:
+            client.get("/api/telemetry/devices/glove-1/window")
+            assert spans.spans == []
+            client.get("/api/telemetry/devices/glove-1/window", headers={"traceparent": parent})
+
+        assert asyncio.run(handler("sid1", "alice")) is None
+        assert [finished.trace_id for finished in spans.spans] == ["4bf92f3577b34da6a3ce929d0e0e4736"]
@@ -0,0 +1,406 @@
+import asyncio
+import pytest
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.testclient import TestClient
+
+from controllers import voice_command
+
+
+class TestUserSnapshot:
+    """Tests for the prefetched account snapshot."""
+
+    def test_load_user_snapshot(self, voice_user):
+        """Test snapshot contains accounts keyed by type."""
+        snapshot = voice_command.load_user_snapshot(voice_user.id)
+
+        assert set(snapshot["accounts"]) == {"checking", "savings", "treasure_chest", "credit_card"}
+        assert snapshot["accounts"]["checking"]["balance"] == 1000
+        assert snapshot["transactions"] == []
+
+    def test_load_user_snapshot_unknown_user(self, voice_db):
+        """Test snapshot is None for users without accounts."""
+        assert voice_command.load_user_snapshot("nobody") is None
+
+    def test_check_balance_uses_snapshot(self, voice_user):
+        """Test balance checks are answered without touching the database."""
+        snapshot = voice_command.load_user_snapshot(voice_user.id)
+        snapshot["accounts"]["savings"]["balance"] = 1234
+
+        result = voice_command.execute_check_balance(
+            voice_user.id, {"account_type": "savings"}, snapshot
+        )
+
+        assert result["data"]["balance"] == 1234
+
+    def test_transfer_validates_at_write_time(self, voice_user, voice_db):
+        """Test a stale snapshot cannot overdraw the account."""
+        snapshot = voice_command.load_user_snapshot(voice_user.id)
+
+        from services.account_service import AccountService
+        checking = AccountService(voice_db).get_account_by_type(voice_user.id, "checking")
+        checking.balance = 10
+        voice_db.commit()
+
+        result = voice_command.execute_transfer(
+            voice_user.id,
+            {"from_account": "checking", "to_account": "savings", "amount": 500},
+            snapshot
+        )
+
+        assert result["success"] is False
+        assert result["error"] == "Insufficient funds"
+
+
+class TestVoiceCommandEndpoint:
+    """Tests for /api/voice-command."""
+
+    def test_check_balance(self, voice_client, voice_user):
+        """Test balance command end to end."""
+        response = voice_client.post(
+            "/api/voice-command",
+            json={"user_id": voice_user.id, "transcript": "How much do I have in savings?"}
+        )
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["action"] == "check_balance"
+        assert data["data"]["balance"] == 500
+
+    def test_transfer_then_history(self, voice_client, voice_user):
+        """Test a transfer shows up in the next request's history."""
+        response = voice_client.post(
+            "/api/voice-command",
+            json={"user_id": voice_user.id, "transcript": "Transfer 50 dollars from checking to savings"}
+        )
+        assert response.json()["success"] is True
+        assert response.json()["data"]["from_balance"] == 950
+
+        response = voice_client.post(
+            "/api/voice-command",
+            json={"user_id": voice_user.id, "transcript": "Show my transactions"}
+        )
+        data = response.json()
+        assert data["action"] == "get_transactions"
+        assert len(data["data"]["transactions"]) == 1
+
+
+class StubResponse:
+    def __init__(self, text, prompt_tokens=100, output_tokens=20):
+        self.text = text
+        self.usage_metadata = type("Usage", (), {
+            "prompt_token_count": prompt_tokens,
+            "candidates_token_count": output_tokens
+        })()
+
+
+class StubModel:
+    """Stands in for the Gemini model, replaying canned responses."""
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.prompts = []
+
+    async def generate_content_async(self, prompt, **kwargs):
+        self.prompts.append(prompt)
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+class TestBatchParse:
+    """Tests for /api/voice-command/parse-batch."""
+
+    @pytest.fixture
+    def batch_client(self, voice_db):
+        from main import app
+        with TestClient(app) as test_client:
+            yield test_client
+
+    def test_results_mapped_by_index(self, batch_client, monkeypatch):
+        """Test results come back in request order with a keyword fallback for gaps."""
+        stub = StubModel([StubResponse(
+            '[{"index": 1, "action": "help", "parameters": {}, "confidence": 0.9},'
+            ' {"index": 0, "action": "check_balance", "parameters": {"account_type": "all"}, "confidence": 0.95}]'
+        )])
+        monkeypatch.setattr(voice_command, "model", stub)
+
+        response = batch_client.post(
+            "/api/voice-command/parse-batch",
+            json={"transcripts": ["What's my balance?", "Help", "Exchange 2 gold bars"]}
+        )
+
+        assert response.status_code == 200
+        data = response.json()
+        assert [r["action"] for r in data["results"]] == ["check_balance", "help", "exchange_gold"]
+        assert [r["parser"] for r in data["results"]] == ["gemini", "gemini", "keywords"]
+        assert data["stats"]["llm_calls"] == 1
+        assert data["stats"]["fallbacks"] == 1
+        assert data["stats"]["tokens_per_transcript"] == 40
+        assert len(stub.prompts) == 1
+
+    def test_chunks_and_failures(self, batch_client, monkeypatch):
+        """Test large batches are split and a failed chunk falls back per item."""
+        monkeypatch.setattr(voice_command, "BATCH_PARSE_SIZE", 2)
+        stub = StubModel([
+            StubResponse('[{"index": 0, "action": "help", "parameters": {}, "confidence": 0.9},'
+                         ' {"index": 1, "action": "help", "parameters": {}, "confidence": 0.9}]'),
+            RuntimeError("quota exceeded"),
+        ])
+        monkeypatch.setattr(voice_command, "model", stub)
+
+        response = batch_client.post(
+            "/api/voice-command/parse-batch",
+            json={"transcripts": ["Help", "Help", "Show my transactions"]}
+        )
+
+        data = response.json()
+        assert data["results"][2]["action"] == "get_transactions"
+        assert data["results"][2]["gemini_error"] == "quota exceeded"
+        assert data["stats"]["llm_calls"] == 1
+        assert len(stub.prompts) == 2
+
+    def test_empty_batch(self, batch_client):
+        """Test an empty batch is rejected."""
+        response = batch_client.post("/api/voice-command/parse-batch", json={"transcripts": []})
+        assert response.status_code == 400
+
+
+class TestStructuredParse:
+    """Tests for schema-validated Gemini output."""
+
+    def test_valid_response(self, monkeypatch):
+        """Test a valid response is returned without unset parameters."""
+        stub = StubModel([StubResponse('{"action": "help", "parameters": {}, "confidence": 0.9}')])
+        monkeypatch.setattr(voice_command, "model", stub)
+
+        result = asyncio.run(voice_command.parse_command_with_gemini("Help"))
+
+        assert result == {"action": "help", "parameters": {}, "confidence": 0.9, "parser": "gemini"}
+        assert stub.prompts == ["Help"]
+
+    def test_invalid_response_falls_back(self, monkeypatch):
+        """Test a response outside the schema uses the keyword parser."""
+        stub = StubModel([StubResponse('{"action": "launch_rocket", "parameters": {}, "confidence": 0.9}')])
+        monkeypatch.setattr(voice_command, "model", stub)
+
+        result = asyncio.run(voice_command.parse_command_with_gemini("Show my transactions"))
+
+        assert result["parser"] == "keywords"
+        assert result["action"] == "get_transactions"
+        assert result["gemini_error"].startswith("Invalid response")
+
+    def test_empty_transcript_not_sent(self, monkeypatch):
+        """Test nothing heard parses as unknown without a Gemini call."""
+        stub = StubModel([])
+        monkeypatch.setattr(voice_command, "model", stub)
+
+        result = asyncio.run(voice_command.parse_command_with_gemini("  "))
+
+        assert result["action"] == "unknown" and result["parser"] == "empty"
+        assert stub.prompts == []
+
+    def test_parser_report_corpus(self):
+        """Test a corpus without recorded replies only estimates prompt sizes, the same way on both sides."""
+        from benchmarks.parser_report import load_corpus, run_report, DEFAULT_CORPUS
+
+        report = run_report(load_corpus(DEFAULT_CORPUS))
+
+        assert report["tokens_counted"] == "estimated"
+        assert report["tokens_per_request_after"] > len(voice_command.SYSTEM_PROMPT) / 4
+        assert report["tokens_per_request_after"] < report["tokens_per_request_before"]
+        assert "parse_failure_rate_before" not in report
+
+    def test_parser_report_replays_both_paths(self, monkeypatch):
+        """Test recorded replies are replayed through the old and new parse paths, with provider errors kept apart."""
+        from benchmarks import parser_report
+
+        replies = {
+            "What's my balance?": (
+                '```json\n{"action": "check_balance", "parameters": {}, "confidence": 0.9}\n```',
+                '{"action": "check_balance", "parameters": {}, "confidence": 0.9}'),
+            "Help": (
+                'Sure! {"action": "help"}',
+                '{"action": "help", "parameters": {}, "confidence": 0.9}'),
+            "Show my transactions": (
+                '{"action": "get_transactions", "parameters": {}, "confidence": 0.9}',
+                '{"action": "get_transactions", "parameters": {}, "confidence": 7}'),
+            "Exchange 2 gold bars": (
+                '{"action": "help", "parameters": {}, "confidence": 0.5}',
+                RuntimeError("quota exceeded")),
+        }
+
+        class RecordingStub(StubModel):
+            model_name = "stub"
+
+        def stub_responses(path, prompt_tokens):
+            return [reply[path] if isinstance(reply[path], Exception) else StubResponse(reply[path], prompt_tokens)
+                    for reply in replies.values()]
+
+        monkeypatch.setattr(voice_command, "model", RecordingStub(stub_responses(1, 100)))
+        monkeypatch.setattr("google.generativeai.GenerativeModel", lambda name: RecordingStub(stub_responses(0, 200)))
+        actions = ["check_balance", "help", "get_transactions", "exchange_gold"]
+        corpus = [{"transcript": transcript, "action": action} for transcript, action in zip(replies, actions)]
+
+        report = parser_report.run_report(corpus, live=True)
+
+        assert report["recorded"] == 4 and report["tokens_counted"] == "billed"
+        assert report["tokens_per_request_before"] == 200 and report["tokens_per_request_after"] == 100
+        assert report["provider_errors_before"] == 0 and report["provider_errors_after"] == 1
+        assert report["parse_failure_rate_before"] == pytest.approx(1 / 4)
+        assert report["parse_failure_rate_after"] == pytest.approx(1 / 3)
+        assert report["action_accuracy_before"] == pytest.approx(2 / 4)
+        assert report["action_accuracy_after"] == pytest.approx(2 / 3)
+
+
+class TestDeferredVoiceCommand:
+    """Tests for deferred voice commands pushed over Socket.IO."""
+
+    def test_defer_returns_job_and_pushes_result(self, voice_client, voice_user, monkeypatch):
+        """Test defer=true returns 202 and the worker publishes the result."""
+        import time
+        pushed = []
+
+        async def publisher(user_id, event, payload):
+            pushed.append((user_id, event, payload))
+
+        monkeypatch.setattr(voice_command, "result_publisher", publisher)
+
+        response = voice_client.post(
+            "/api/voice-command",
+            json={"user_id": voice_user.id, "transcript": "What's my balance?", "defer": True}
+        )
+        assert response.status_code == 202
+        job_id = response.json()["job_id"]
+
+        for _ in range(100):
+            job = voice_client.get(f"/api/voice-command/jobs/{job_id}").json()
+            if job["status"] == "done":
+                break
+            time.sleep(0.01)
+
+        assert job["result"]["action"] == "check_balance"
+        assert pushed[0][0] == voice_user.id
+        assert pushed[0][1] == "voiceCommandResult"
+        assert pushed[0][2]["jobId"] == job_id
+        assert "audio" not in pushed[0][2]
+
+    def test_unknown_job(self, voice_client):
+        """Test polling an unknown job id."""
+        response = voice_client.get("/api/voice-command/jobs/missing")
+        assert response.status_code == 404
+
+
+class TestVoiceAudio:
+    """Tests for the one-shot audio in, audio out endpoint."""
+
+    @pytest.fixture
+    def speech_stubs(self, monkeypatch, tmp_path):
+        from types import SimpleNamespace
+        from controllers import speech_to_text
+        from services.provider_health import ProviderHealth
+        from services.tts_cache import AudioCache
+        from tests.test_speech_to_text import StubSTT, StubTTS
+
+        stubs = SimpleNamespace(speech_to_text=StubSTT(), text_to_speech=StubTTS([b"ID3", b"frame"]))
+        monkeypatch.setattr(speech_to_text, "client", stubs)
+        monkeypatch.setattr(speech_to_text, "tts_cache", AudioCache(str(tmp_path)))
+        monkeypatch.setattr(speech_to_text, "stt_health", ProviderHealth("elevenlabs_stt"))
+        monkeypatch.setattr(speech_to_text, "tts_health", ProviderHealth("elevenlabs_tts"))
+        return stubs
+
+    def post_audio(self, client, user_id, response_format="mp3"):
+        return client.post(
+            f"/api/voice-command/audio?user_id={user_id}&response_format={response_format}",
+            files={"file": ("clip.webm", b"audio-bytes", "audio/webm")}
+        )
+
+    def test_audio_in_audio_out(self, voice_client, voice_user, speech_stubs):
+        """Test the spoken answer streams back with the result and stage timings in headers."""
+        import json
+
+        response = self.post_audio(voice_client, voice_user.id)
+
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "audio/mpeg"
+        assert response.content == b"ID3frame"
+        result = json.loads(response.headers["x-voice-result"])
+        assert result["action"] == "check_balance"
+        assert result["transcript"] == "check my balance"
+        assert speech_stubs.speech_to_text.calls[0]["body"] == b"audio-bytes"
+        stages = [part.split(";")[0] for part in response.headers["server-timing"].split(", ")]
+        assert stages == ["stt", "intent", "execute", "tts", "total"]
+
+    def test_large_result_summarized_in_header(self, voice_client, voice_user, speech_stubs, monkeypatch):
+        """Test a large result leaves X-Voice-Result small, and response_format=json returns all of it."""
+        import base64
+        import json
+
+        def long_answer(user_id, params, snapshot=None):
+            return {"success": True, "spoken_response": "é" * 5000, "data": {"rows": list(range(2000))}}
+
+        monkeypatch.setitem(voice_command.COMMAND_EXECUTORS, "check_balance", long_answer)
+
+        streamed = self.post_audio(voice_client, voice_user.id)
+        full = self.post_audio(voice_client, voice_user.id, response_format="json")
+
+        header = streamed.headers["x-voice-result"]
+        summary = json.loads(header)
+        assert len(header) < 2048
+        assert summary["truncated"] is True and "data" not in summary
+        assert summary["spoken_response"] == "é" * voice_command.VOICE_RESULT_HEADER_TEXT_CHARS
+        assert full.headers["content-type"] == "application/json"
+        assert full.json()["data"]["rows"] == list(range(2000))
+        assert base64.b64decode(full.json()["audio"]) == b"ID3frame"
+
+    def test_repeated_answer_served_from_cache(self, voice_client, voice_user, speech_stubs):
+        """Test a fixed answer is synthesized once and then read from the TTS cache."""
+        first = self.post_audio(voice_client, voice_user.id)
+        second = self.post_audio(voice_client, voice_user.id)
+
+        assert first.headers["x-tts-cache"] == "miss"
+        assert second.headers["x-tts-cache"] == "hit"
+        assert second.content == b"ID3frame"
+
+    def test_snapshot_prefetch_dropped_without_transcript(self, voice_client, voice_user, speech_stubs,
+                                                          monkeypatch):
+        """Test the account prefetch is cancelled when transcription fails, and not started without a slot."""
+        from controllers import speech_to_text
+
+        class FailingSTT:
+            async def convert(self, file, **kwargs):
+                raise RuntimeError("transcription down")
+
+        prefetches = []
+        prefetch = voice_command.prefetch_user_snapshot
+
+        def recording_prefetch(user_id):
+            prefetches.append(prefetch(user_id))
+            return prefetches[-1]
+
+        monkeypatch.setattr(voice_command, "prefetch_user_snapshot", recording_prefetch)
+        speech_stubs.speech_to_text = FailingSTT()
+        failed = self.post_audio(voice_client, voice_user.id)
+
+        monkeypatch.setattr(speech_to_text, "transcribe_slots", asyncio.Semaphore(0))
+        monkeypatch.setattr(speech_to_text, "TRANSCRIBE_SLOT_TIMEOUT", 0.01)
+        refused = self.post_audio(voice_client, voice_user.id)
+
+        assert failed.status_code >= 500
+        assert refused.status_code == 503
+        assert len(prefetches) == 1 and prefetches[0].cancelled()
+
+    def test_tts_failure_returns_json(self, voice_client, voice_user, speech_stubs):
+        """Test the command result still comes back when speech synthesis fails."""
+        speech_stubs.text_to_speech.fail_at = 0
+
+        response = self.post_audio(voice_client, voice_user.id)
+
+        assert response.status_code == 200
+        assert response.json()["action"] == "check_balance"
+        assert "tts_error" in response.json()
+        assert "tts;" not in response.headers["server-timing"]
@@ -0,0 +1,147 @@
+import asyncio
+
+import numpy as np
+import pytest
+from starlette.websockets import WebSocketDisconnect
+
+from controllers import voice_command, voice_stream
+from tests.test_audio_preprocess import silence, tone
+
+RATE = 16000
+FRAME = RATE // 50  # 20 ms
+
+
+def pcm_frames(samples: np.ndarray, rate: int = RATE):
+    frame = rate // 50
+    pcm = (samples * 32767).astype("<i2")
+    for start in range(0, len(pcm), frame):
+        yield pcm[start:start + frame].tobytes()
+
+
+def receive_until_final(ws) -> list[dict]:
+    messages = []
+    while not messages or messages[-1]["type"] not in ("final", "error"):
+        messages.append(ws.receive_json())
+    return messages
+
+
+@pytest.fixture
+def stream_stubs(monkeypatch):
+    """Stub STT with a fixed transcript per segment and count intent parses; `slow` ones hang."""
+    state = {"transcripts": ["check my balance"], "segments": [], "parses": [], "slow": set(), "cancelled": []}
+
+    async def fake_transcribe(samples):
+        state["segments"].append(len(samples) / RATE)
+        return state["transcripts"][min(len(state["segments"]), len(state["transcripts"])) - 1]
+
+    parse = voice_command.parse_command_with_gemini
+
+    async def counting_parse(transcript):
+        state["parses"].append(transcript)
+        try:
+            await asyncio.sleep(5 if transcript in state["slow"] else 0)
+        except asyncio.CancelledError:
+            state["cancelled"].append(transcript)
+            raise
+        return await parse(transcript)
+
+    monkeypatch.setattr(voice_stream, "transcribe_segment", fake_transcribe)
+    monkeypatch.setattr(voice_command, "parse_command_with_gemini", counting_parse)
+    return state
+
+
+class TestVoiceStream:
+    """Tests for the streaming speech WebSocket."""
+
+    def test_endpoint_with_early_intent(self, voice_client, voice_user, stream_stubs):
+        """Test a pause triggers a partial, and the final result reuses its parse."""
+        audio = np.concatenate([silence(0.3, RATE), tone(1.0, RATE), silence(1.0, RATE)])
+
+        with voice_client.websocket_connect(f"/api/voice-stream?user_id={voice_user.id}") as ws:
+            for frame in pcm_frames(audio):
+                ws.send_bytes(frame)
+            messages = receive_until_final(ws)
+
+        types = [m["type"] for m in messages]
+        final = messages[-1]
+        assert types[0] == "speechStart"
+        assert "partial" in types
+        assert final["transcript"] == "check my balance"
+        assert final["result"]["action"] == "check_balance"
+        assert final["result"]["success"] is True
+        assert final["latency"]["early_intent"] is True
+        assert final["latency"]["from_last_frame_ms"] >= 0
+        assert stream_stubs["parses"] == ["check my balance"]
+
+    def test_end_message_flushes_utterance(self, voice_client, voice_user, stream_stubs):
+        """Test the client can end an utterance without trailing silence."""
+        stream_stubs["transcripts"] = ["show my transactions"]
+        audio = np.concatenate([silence(0.3, RATE), tone(0.5, RATE)])
+
+        with voice_client.websocket_connect(f"/api/voice-stream?user_id={voice_user.id}") as ws:
+            for frame in pcm_frames(audio):
+                ws.send_bytes(frame)
+            ws.send_json({"type": "end"})
+            messages = receive_until_final(ws)
+
+        final = messages[-1]
+        assert final["transcript"] == "show my transactions"
+        assert final["result"]["action"] == "get_transactions"
+        assert final["latency"]["segments"] == 1
+        assert final["latency"]["early_intent"] is False
+
+    def test_stale_early_intent_cancelled(self, voice_client, voice_user, stream_stubs):
+        """Test a partial parse whose text isn't the final transcript is cancelled, not awaited."""
+        stream_stubs["transcripts"] = ["show my", "transactions"]
+        stream_stubs["slow"] = {"show my"}
+        audio = np.concatenate([silence(0.3, RATE), tone(1.0, RATE), silence(0.3, RATE), tone(0.5, RATE)])
+
+        with voice_client.websocket_connect(f"/api/voice-stream?user_id={voice_user.id}") as ws:
+            for frame in pcm_frames(audio):
+                ws.send_bytes(frame)
+            ws.send_json({"type": "end"})
+            messages = receive_until_final(ws)
+            cancelled = list(stream_stubs["cancelled"])  # Before disconnecting cancels everything
+
+        final = messages[-1]
+        assert final["transcript"] == "show my transactions"
+        assert final["latency"]["early_intent"] is False
+        assert cancelled == ["show my"]
+
+    def test_resamples_input(self, voice_client, voice_user, stream_stubs):
+        """Test 48 kHz input is accepted and segmented at the right duration."""
+        rate = 48000
+        audio = np.concatenate([silence(0.3, rate), tone(1.0, rate), silence(1.0, rate)])
+
+        with voice_client.websocket_connect(
+            f"/api/voice-stream?user_id={voice_user.id}&sample_rate={rate}"
+        ) as ws:
+            for frame in pcm_frames(audio, rate):
+                ws.send_bytes(frame)
+            messages = receive_until_final(ws)
+
+        assert messages[-1]["result"]["action"] == "check_balance"
+        assert 1.0 <= stream_stubs["segments"][0] <= 1.6
+
+    def test_transcription_error(self, voice_client, voice_user, monkeypatch):
+        """Test an STT failure is reported instead of running a partial command."""
+        async def failing_transcribe(samples):
+            raise RuntimeError("stt down")
+
+        monkeypatch.setattr(voice_stream, "transcribe_segment", failing_transcribe)
+        audio = np.concatenate([silence(0.3, RATE), tone(0.5, RATE)])
+
+        with voice_client.websocket_connect(f"/api/voice-stream?user_id={voice_user.id}") as ws:
+            for frame in pcm_frames(audio):
+                ws.send_bytes(frame)
+            ws.send_json({"type": "end"})
+            messages = receive_until_final(ws)
+
+        assert messages[-1]["type"] == "error"
+        assert "stt down" in messages[-1]["message"]
+
+    def test_rejects_bad_sample_rate(self, voice_client):
+        """Test unsupported sample rates are refused."""
+        with pytest.raises(WebSocketDisconnect):
+            with voice_client.websocket_connect("/api/voice-stream?user_id=u&sample_rate=1000") as ws:
+                ws.receive_json()
@@ -0,0 +1,35 @@
+"""
+Pre-render the fixed voice command responses into the TTS cache.
+Run: python warm_tts_cache.py [voice ...]   (default: every preset voice)
+"""
+import asyncio
+import sys
+
+from controllers.speech_to_text import VOICES, TTS_MODEL_ID, get_tts_cache, resolve_voice_id, synthesize_speech
+from controllers.voice_command import FIXED_RESPONSES
+from services.tts_cache import cache_key
+
+
+async def warm_cache(voices: list[str]) -> None:
+    cache = get_tts_cache()
+    rendered = skipped = failed = 0
+
+    for voice in voices:
+        for text in FIXED_RESPONSES:
+            if cache.get(cache_key(resolve_voice_id(voice), TTS_MODEL_ID, text)):
+                skipped += 1
+                continue
+            try:
+                await synthesize_speech(text, voice)
+                rendered += 1
+            except Exception as e:
+                failed += 1
+                print(f"✗ {voice}: {text[:40]!r}... {getattr(e, 'detail', e)}")
+
+    stats = cache.stats()
+    print(f"✓ Rendered {rendered}, already cached {skipped}, failed {failed}")
+    print(f"  Cache: {stats['entries']} entries, {stats['bytes']} bytes in {cache.directory}")
+
+
+if __name__ == "__main__":
+    asyncio.run(warm_cache(sys.argv[1:] or list(VOICES)))
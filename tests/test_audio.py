@@ -0,0 +1,374 @@
+import io
+import os
+import struct
+import sys
+import time
+import warnings
+from collections import Counter
+
+import numpy as np
+import pytest
+
+# audio.py lives at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import audio
+
+
+ALWAYS = "always"
+
+
+def speech_like(frames=4000, seed=0):
+    """A few tones plus noise, as int16 samples."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(frames) / 16000
+    signal = sum(np.sin(2 * np.pi * f * t) * a for f, a in ((180, 6000), (720, 3000), (2400, 1200)))
+    return np.clip(signal + rng.normal(0, 300, frames), -32768, 32767).astype("<i2")
+
+
+class FakeGlove:
+    """
+    Firmware on the far end of a fake serial port. Sends HEADER, DATA and
+    END, then answers each NAK with the requested frames and another END.
+
+    `drop` and `corrupt` hold (frame, attempt) pairs, where frame is
+    "header", "end" or a chunk index and attempt counts from 0 (ALWAYS
+    matches every attempt). A corrupted frame has one payload byte flipped.
+    """
+
+    def __init__(self, pcm, codec=audio.CODEC_PCM, chunk_size=512, drop=(), corrupt=(), responsive=True):
+        self.pcm = bytes(pcm)
+        self.payload = audio.encode_audio(self.pcm, codec)
+        self.codec = codec
+        self.chunk_size = chunk_size
+        self.chunk_count = -(-len(self.payload) // chunk_size)
+        self.drop = set(drop)
+        self.corrupt = set(corrupt)
+        self.responsive = responsive
+        self.attempts = Counter()
+        self.outgoing = bytearray()
+        self.host_parser = audio.FrameParser()
+        self.naks = []
+        self.acks = 0
+        self.timeout = None
+
+        self.send("header", self.header_frame())
+        for seq in range(self.chunk_count):
+            self.send(seq, self.data_frame(seq))
+        self.send("end", audio.encode_frame(audio.FRAME_TYPE_END))
+
+    def header_frame(self):
+        return audio.encode_frame(audio.FRAME_TYPE_HEADER, payload=audio.WAV_HEADER.pack(
+            audio.WAV_MAGIC, len(self.payload), 16000, 1, 16,
+            self.chunk_size, self.chunk_count, self.codec, len(self.pcm) // 2
+        ))
+
+    def data_frame(self, seq):
+        chunk = self.payload[seq * self.chunk_size:(seq + 1) * self.chunk_size]
+        return audio.encode_frame(audio.FRAME_TYPE_DATA, seq, chunk)
+
+    def send(self, frame, data):
+        attempt = self.attempts[frame]
+        self.attempts[frame] += 1
+        if {(frame, attempt), (frame, ALWAYS)} & self.drop:
+            return
+        if {(frame, attempt), (frame, ALWAYS)} & self.corrupt:
+            data = bytearray(data)
+            data[audio.FRAME_HEADER.size] ^= 0xFF
+        self.outgoing += data
+
+    # pyserial interface used by read_framed_transfer
+
+    @property
+    def in_waiting(self):
+        return len(self.outgoing)
+
+    def read(self, size=1):
+        if not self.outgoing:
+            time.sleep(0.001)
+            return b""
+        data = bytes(self.outgoing[:size])
+        del self.outgoing[:size]
+        return data
+
+    def write(self, data):
+        for frame_type, _, payload in self.host_parser.feed(data):
+            if frame_type == audio.FRAME_TYPE_ACK:
+                self.acks += 1
+            elif frame_type == audio.FRAME_TYPE_NAK:
+                seqs = struct.unpack(f"<{len(payload) // 4}I", payload)
+                self.naks.append(seqs)
+                if not self.responsive:
+                    continue
+                for seq in seqs:
+                    if seq == audio.HEADER_SEQ:
+                        self.send("header", self.header_frame())
+                    else:
+                        self.send(seq, self.data_frame(seq))
+                self.send("end", audio.encode_frame(audio.FRAME_TYPE_END))
+        return len(data)
+
+
+@pytest.fixture(autouse=True)
+def fast_resend(monkeypatch):
+    """Ask for resends after 10 ms of silence instead of a second."""
+    monkeypatch.setattr(audio, "RESEND_TIMEOUT", 0.01)
+
+
+def reference_audioop():
+    """The stdlib G.711/IMA reference (deprecated, removed in Python 3.13)."""
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", DeprecationWarning)
+        return pytest.importorskip("audioop")
+
+
+def swap_nibbles(data):
+    """WAV IMA-ADPCM packs the first sample in the low nibble; audioop uses the high one."""
+    codes = np.frombuffer(data, dtype=np.uint8)
+    return ((codes >> 4) | ((codes & 0x0F) << 4)).astype(np.uint8).tobytes()
+
+
+class TestCodecs:
+    """Tests for the mu-law and IMA-ADPCM codecs against reference vectors and audioop."""
+
+    def test_mulaw_reference_vectors(self):
+        """Test known G.711 codes for zero, the extremes and segment edges."""
+        samples = [0, -1, 32767, -32768, 4, -5, 1000, -1000]
+        assert list(audio.mulaw_encode(samples)) == [0xFF, 0x7E, 0x80, 0x00, 0xFE, 0x7E, 0xCE, 0x4E]
+        assert audio.mulaw_decode(bytes([0xFF, 0x7F, 0x80, 0x00, 0xCE])).tolist() == [0, 0, 32124, -32124, 988]
+
+    def test_mulaw_matches_audioop_for_every_sample(self):
+        """Test encoding every int16 value, and decoding every code, matches audioop bit for bit."""
+        audioop = reference_audioop()
+        samples = np.arange(-32768, 32768, dtype="<i2")
+        codes = bytes(range(256))
+
+        assert audio.mulaw_encode(samples) == audioop.lin2ulaw(samples.tobytes(), 2)
+        assert audio.mulaw_decode(codes).astype("<i2").tobytes() == audioop.ulaw2lin(codes, 2)
+
+    def test_mulaw_round_trip(self):
+        """Test decode(encode(x)) re-encodes identically and stays within one step of its segment."""
+        samples = np.arange(-32768, 32768, dtype=np.int32)
+        encoded = audio.mulaw_encode(samples)
+        decoded = audio.mulaw_decode(encoded).astype(np.int32)
+
+        # Segment e quantizes in steps of 8 << e (in 16-bit units); past the
+        # largest code (32124) samples saturate
+        exponent = (np.frombuffer(encoded, dtype=np.uint8).astype(np.int32) ^ 0xFF) >> 4 & 0x07
+        in_range = np.abs(samples) <= 32124
+        assert audio.mulaw_encode(decoded) == encoded
+        assert np.all(np.abs(samples - decoded)[in_range] <= (8 << exponent)[in_range])
+
+    def test_ima_adpcm_matches_audioop(self):
+        """Test each block's codes and decoded samples match audioop from the block's header state."""
+        audioop = reference_audioop()
+        samples = speech_like(2 * audio.ADPCM_SAMPLES_PER_BLOCK + 100)
+        encoded = audio.ima_adpcm_encode(samples)
+        padded = np.zeros(3 * audio.ADPCM_SAMPLES_PER_BLOCK, dtype="<i2")
+        padded[:len(samples)] = samples
+
+        blocks = np.frombuffer(encoded, dtype=np.uint8).reshape(-1, audio.ADPCM_BLOCK_ALIGN)
+        assert len(blocks) == 3
+        for number, block in enumerate(blocks):
+            predictor = int(block[:2].view("<i2")[0])
+            index = int(block[2])
+            block_samples = padded[number * audio.ADPCM_SAMPLES_PER_BLOCK:(number + 1) * audio.ADPCM_SAMPLES_PER_BLOCK]
+            codes = block[audio.ADPCM_BLOCK_HEADER:].tobytes()
+
+            assert predictor == block_samples[0]
+            reference_codes, _ = audioop.lin2adpcm(block_samples[1:].tobytes(), 2, (predictor, index))
+            assert swap_nibbles(reference_codes) == codes
+            reference_pcm, _ = audioop.adpcm2lin(swap_nibbles(codes), 2, (predictor, index))
+            decoded = audio.ima_adpcm_decode(block.tobytes(), audio.ADPCM_SAMPLES_PER_BLOCK)
+            assert decoded[1:].astype("<i2").tobytes() == reference_pcm
+
+    def test_ima_adpcm_round_trip(self):
+        """Test the round trip keeps length, block alignment and speech-level quality."""
+        samples = speech_like(3000)
+        encoded = audio.ima_adpcm_encode(samples)
+        decoded = audio.ima_adpcm_decode(encoded, len(samples))
+
+        assert len(encoded) % audio.ADPCM_BLOCK_ALIGN == 0
+        assert len(decoded) == len(samples)
+        assert audio.snr_db(samples, decoded) > 18
+        assert audio.ima_adpcm_decode(audio.ima_adpcm_encode([]), 0).size == 0
+        with pytest.raises(ValueError):
+            audio.ima_adpcm_decode(encoded[:-1], len(samples))
+
+
+class TestFrameParser:
+    """Tests for frame sync, CRC checks and resynchronization."""
+
+    def test_frames_split_across_reads(self):
+        """Test frames fed a byte at a time, with line noise between them, are all recovered."""
+        stream = (b"boot log\r\n" + audio.encode_frame(audio.FRAME_TYPE_DATA, 7, b"abc")
+                  + b"\xa5junk" + audio.encode_frame(audio.FRAME_TYPE_END))
+        parser = audio.FrameParser()
+
+        frames = [frame for i in range(len(stream)) for frame in parser.feed(stream[i:i + 1])]
+
+        assert frames == [(audio.FRAME_TYPE_DATA, 7, b"abc"), (audio.FRAME_TYPE_END, 0, b"")]
+        assert parser.crc_errors == 0
+
+    def test_corrupt_frame_skipped(self):
+        """Test a frame with a bad CRC is counted and the next frame still parses."""
+        damaged = bytearray(audio.encode_frame(audio.FRAME_TYPE_DATA, 1, b"payload"))
+        damaged[-6] ^= 0x01
+        parser = audio.FrameParser()
+
+        frames = parser.feed(bytes(damaged) + audio.encode_frame(audio.FRAME_TYPE_DATA, 2, b"next"))
+
+        assert frames == [(audio.FRAME_TYPE_DATA, 2, b"next")]
+        assert parser.crc_errors == 1
+
+
+class TestFramedTransfer:
+    """Tests for read_framed_transfer's NAK/resend state machine against a fake glove."""
+
+    def test_clean_transfer(self):
+        """Test an undamaged transfer is ACKed once with no resends."""
+        pcm = speech_like().tobytes()
+        glove = FakeGlove(pcm)
+
+        transfer = audio.read_framed_transfer(glove, log=lambda message: None)
+
+        assert transfer["pcm"] == pcm
+        assert (transfer["resent"], transfer["crc_errors"], glove.acks, glove.naks) == (0, 0, 1, [])
+
+    def test_dropped_and_corrupted_chunks_resent(self):
+        """Test missing and damaged chunks are NAKed together and the audio is rebuilt exactly."""
+        pcm = speech_like().tobytes()
+        glove = FakeGlove(pcm, drop={(2, 0), (5, 0)}, corrupt={(9, 0), (5, 1)})
+
+        transfer = audio.read_framed_transfer(glove, log=lambda message: None)
+
+        assert transfer["pcm"] == pcm
+        assert glove.naks == [(2, 5, 9), (5,)]
+        assert transfer["crc_errors"] == 2 and transfer["resent"] == 4
+        assert glove.acks == 1
+
+    def test_lost_end_frame(self):
+        """Test a lost END is recovered by NAKing after RESEND_TIMEOUT of silence."""
+        pcm = speech_like().tobytes()
+        glove = FakeGlove(pcm, drop={("end", 0), (3, 0)})
+
+        transfer = audio.read_framed_transfer(glove, log=lambda message: None)
+
+        assert transfer["pcm"] == pcm
+        assert glove.naks == [(3,)]
+        assert glove.acks == 1
+
+    def test_lost_header(self):
+        """Test a lost HEADER is requested, then every chunk sent before it."""
+        pcm = speech_like().tobytes()
+        glove = FakeGlove(pcm, drop={("header", 0)})
+
+        transfer = audio.read_framed_transfer(glove, log=lambda message: None)
+
+        assert transfer["pcm"] == pcm
+        assert glove.naks == [(audio.HEADER_SEQ,), tuple(range(glove.chunk_count))]
+
+    def test_gives_up_after_max_resend_rounds(self):
+        """Test a chunk that never arrives fails the transfer after MAX_RESEND_ROUNDS NAKs."""
+        glove = FakeGlove(speech_like().tobytes(), drop={(4, ALWAYS)})
+
+        with pytest.raises(TimeoutError, match="after 10 resend rounds"):
+            audio.read_framed_transfer(glove, log=lambda message: None)
+
+        assert glove.naks == [(4,)] * audio.MAX_RESEND_ROUNDS
+
+    def test_silent_glove_gives_up(self):
+        """Test a glove that stops answering NAKs doesn't hang the receiver."""
+        glove = FakeGlove(speech_like().tobytes(), drop={(1, 0)}, responsive=False)
+
+        with pytest.raises(TimeoutError):
+            audio.read_framed_transfer(glove, log=lambda message: None)
+
+        assert len(glove.naks) == audio.MAX_RESEND_ROUNDS
+
+    def test_oversized_chunk_rejected(self):
+        """Test a CRC-valid chunk longer than chunk_size, or past total_length, fails the transfer."""
+        glove = FakeGlove(speech_like(1000).tobytes(), chunk_size=512)
+        last = glove.chunk_count - 1
+        glove.outgoing = bytearray(glove.header_frame()
+                                   + audio.encode_frame(audio.FRAME_TYPE_DATA, last, b"\x00" * 512)
+                                   + audio.encode_frame(audio.FRAME_TYPE_END))
+
+        with pytest.raises(ValueError, match=f"Chunk {last} overruns"):
+            audio.read_framed_transfer(glove, log=lambda message: None)
+
+    def test_inconsistent_header_rejected(self):
+        """Test a header whose chunks can't cover total_length fails the transfer."""
+        glove = FakeGlove(speech_like(1000).tobytes())
+        glove.chunk_count = 1
+        glove.outgoing = bytearray(glove.header_frame())
+
+        with pytest.raises(ValueError, match="can't hold"):
+            audio.read_framed_transfer(glove, log=lambda message: None)
+
+    @pytest.mark.parametrize("codec", [audio.CODEC_MULAW, audio.CODEC_IMA_ADPCM])
+    def test_compressed_transfer_decoded(self, codec):
+        """Test compressed transfers with a resend decode to the codec's own round trip."""
+        samples = speech_like()
+        glove = FakeGlove(samples.tobytes(), codec=codec, chunk_size=256, drop={(1, 0)})
+
+        transfer = audio.read_framed_transfer(glove, log=lambda message: None)
+
+        expected = audio.decode_audio(glove.payload, codec, len(samples), 1)
+        assert transfer["pcm"] == expected
+        assert transfer["encoded_bytes"] == len(glove.payload)
+
+
+class TestBase64Receive:
+    """Tests for the streaming base64 decoder and the 'd' command receiver."""
+
+    def test_decoder_handles_split_groups_and_whitespace(self):
+        """Test base64 split mid-group and across line breaks decodes to the original bytes."""
+        import base64
+        data = bytes(range(256)) * 3
+        encoded = base64.encodebytes(data)
+        out = io.BytesIO()
+        decoder = audio.Base64StreamDecoder(out)
+
+        for i in range(0, len(encoded), 7):
+            decoder.feed(encoded[i:i + 7])
+
+        assert decoder.finish() == len(data)
+        assert out.getvalue() == data
+
+    def test_decoder_rejects_truncated_input(self):
+        """Test a stream that stops mid-group is reported, not silently padded."""
+        decoder = audio.Base64StreamDecoder(io.BytesIO())
+        decoder.feed(b"QUJD\nRA")
+
+        with pytest.raises(ValueError, match="2 stray characters"):
+            decoder.finish()
+
+    def test_receive_base64_wav(self, tmp_path):
+        """Test the 'd' receiver skips log output, decodes to a file and reports its size."""
+        import base64
+
+        class FakeSerial:
+            def __init__(self, data):
+                self.data = bytearray(data)
+                self.timeout = None
+
+            @property
+            def in_waiting(self):
+                return min(len(self.data), 5)
+
+            def read(self, size=1):
+                chunk = bytes(self.data[:size])
+                del self.data[:size]
+                return chunk
+
+        wav = audio.wav_bytes(speech_like(500).tobytes(), 16000, 1, 16)
+        encoded = base64.encodebytes(wav)
+        stream = b"Recording done\r\n" + audio.BEGIN_MARKER + b"\r\n" + encoded + audio.END_MARKER + b"\r\n"
+        output = tmp_path / "out.wav"
+
+        size = audio.receive_base64_wav(FakeSerial(stream), str(output))
+
+        assert size == len(wav)
+        assert output.read_bytes() == wav
+        assert not (tmp_path / "out.wav.part").exists()
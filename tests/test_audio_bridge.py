@@ -0,0 +1,21 @@
+import os
+import sys
+
+# audio_bridge.py lives at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import audio_bridge
+
+
+class TestArguments:
+    """Tests for the bridge's command line."""
+
+    def test_default_server_is_backend_port(self, monkeypatch):
+        """Test the bridge posts to the port server/main.py listens on unless told otherwise."""
+        monkeypatch.delenv("GLOVE_SERVER_URL", raising=False)
+
+        args = audio_bridge.build_parser().parse_args(["/dev/ttyUSB0=user_123"])
+
+        assert args.server == "http://localhost:3000"
+        assert args.gloves == [("/dev/ttyUSB0", "user_123")]
+        assert args.endpoint == "voice"